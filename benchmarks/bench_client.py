@@ -0,0 +1,165 @@
+"""Client benchmarks against a local stand-in for the GWLandscape API and file server.
+
+Measures query latency and object construction rate for the ``get_*`` methods, download throughput for
+``get_files_by_reference`` and ``save_files_by_reference``, upload throughput for ``create_dataset``, and the peak
+memory allocated by each of them. No connection to the real GWLandscape server is made.
+
+Usage::
+
+    python benchmarks/bench_client.py [--n-publications 200] [--n-systems 100000] [--repeats 5] [--output results.json]
+"""
+import argparse
+import json
+import statistics
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from gwdc_python.files import FileReferenceList
+
+from gwlandscape_python.tests.local_server import LocalGWLandscapeServer
+from gwlandscape_python.tests.utils import create_compas_file
+
+
+def _timings(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def _summary(times):
+    times = sorted(times)
+    return {
+        'median_s': statistics.median(times),
+        'min_s': times[0],
+        'max_s': times[-1],
+    }
+
+
+def _peak_memory(fn):
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+class _TimedRequests:
+    # Records the time spent in requests to the server, so that it can be separated from object construction
+    def __init__(self, gwl):
+        self.request = gwl.request
+        self.elapsed = 0
+        gwl.request = self
+
+    def __call__(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self.request(*args, **kwargs)
+        finally:
+            self.elapsed += time.perf_counter() - start
+
+
+def bench_queries(gwl, repeats):
+    """Latency, object construction rate and peak memory of each of the get_* methods"""
+    timed = _TimedRequests(gwl)
+    results = {}
+    for name, fn in [
+        ('get_keywords', gwl.get_keywords),
+        ('get_publications', gwl.get_publications),
+        ('get_models', gwl.get_models),
+        ('get_datasets', gwl.get_datasets),
+    ]:
+        n_objects = len(fn())
+        timed.elapsed = 0
+        times = _timings(fn, repeats)
+        construction_s = max(sum(times) - timed.elapsed, 1e-9) / repeats
+        results[name] = {
+            'n_objects': n_objects,
+            **_summary(times),
+            'request_s': timed.elapsed / repeats,
+            'objects_per_s': n_objects / construction_s,
+            'peak_bytes': _peak_memory(fn),
+        }
+    gwl.request = timed.request
+    return results
+
+
+def bench_downloads(gwl, repeats):
+    """Throughput and peak memory of downloading the files of every dataset"""
+    file_list = FileReferenceList([f for dataset in gwl.get_datasets() for f in dataset.get_full_file_list()])
+    total_bytes = file_list.get_total_bytes()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as root_path:
+        for name, fn in [
+            ('get_files_by_reference', lambda: gwl.get_files_by_reference(file_list)),
+            ('save_files_by_reference', lambda: gwl.save_files_by_reference(file_list, Path(root_path))),
+        ]:
+            times = _timings(fn, repeats)
+            results[name] = {
+                'n_files': len(file_list),
+                'total_bytes': total_bytes,
+                **_summary(times),
+                'bytes_per_s': total_bytes / statistics.median(times),
+                'peak_bytes': _peak_memory(fn),
+            }
+    return results
+
+
+def bench_upload(gwl, n_systems, repeats):
+    """Throughput and peak memory of uploading a dataset with create_dataset"""
+    publication = gwl.get_publications()[0]
+    model = gwl.get_models()[0]
+
+    with tempfile.TemporaryDirectory() as directory:
+        datafile = create_compas_file(Path(directory) / 'COMPAS_Output.h5', n_systems=n_systems, seed=1)
+        size = datafile.stat().st_size
+
+        def _upload():
+            gwl.create_dataset(publication, model, datafile)
+
+        times = _timings(_upload, repeats)
+        return {
+            'create_dataset': {
+                'total_bytes': size,
+                **_summary(times),
+                'bytes_per_s': size / statistics.median(times),
+                'peak_bytes': _peak_memory(_upload),
+            }
+        }
+
+
+def run(n_publications=200, n_models=2, n_systems=100_000, repeats=5):
+    with LocalGWLandscapeServer() as server:
+        server.seed(n_publications=n_publications, n_models=n_models, n_systems=n_systems)
+        gwl = server.client()
+        return {
+            'queries': bench_queries(gwl, repeats),
+            'downloads': bench_downloads(gwl, repeats),
+            'upload': bench_upload(gwl, n_systems, repeats),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--n-publications', type=int, default=200)
+    parser.add_argument('--n-models', type=int, default=2)
+    parser.add_argument('--n-systems', type=int, default=100_000, help='Binary systems in each synthetic HDF5 file')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    results = run(args.n_publications, args.n_models, args.n_systems, args.repeats)
+    print(json.dumps(results, indent=4))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Decompression benchmark for compressed COMPAS HDF5 files.
+
+Measures the rate at which the columns of a synthetic, gzip-compressed COMPAS file are read, by single-threaded
+``h5py`` slicing and by the parallel chunk reader, ``gwlandscape_python.utils.chunk_reader.read_dataset``.
+
+Usage::
+
+    python benchmarks/bench_decompress.py [--n-systems 2000000] [--chunks 65536] [--workers 4] [--repeats 5]
+        [--output results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import h5py
+
+from gwlandscape_python.tests.utils import create_compas_file
+from gwlandscape_python.utils.chunk_reader import read_dataset
+
+GROUP = 'BSE_System_Parameters'
+
+
+def _median_time(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def bench_decompress(path, workers, repeats):
+    """Rows and bytes per second read from every column of a group, by h5py slicing and by the parallel reader"""
+    with h5py.File(path, 'r') as f:
+        n_rows = sum(len(column) for column in f[GROUP].values())
+        n_bytes = sum(column.size * column.dtype.itemsize for column in f[GROUP].values())
+
+    def _read(read_column):
+        # The file is opened afresh for each read, so that no decompressed chunks are cached between repeats
+        with h5py.File(path, 'r') as f:
+            for column in f[GROUP].values():
+                read_column(column)
+
+    h5py_s = _median_time(lambda: _read(lambda column: column[()]), repeats)
+    parallel_s = _median_time(lambda: _read(lambda column: read_dataset(column, workers)), repeats)
+
+    return {
+        'workers': workers,
+        'h5py': {'rows_per_s': n_rows / h5py_s, 'bytes_per_s': n_bytes / h5py_s},
+        'parallel': {'rows_per_s': n_rows / parallel_s, 'bytes_per_s': n_bytes / parallel_s},
+    }
+
+
+def run(n_systems=2_000_000, chunks=65536, workers=None, repeats=5):
+    workers = workers or os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as tmp:
+        path = create_compas_file(Path(tmp) / 'COMPAS_Output.h5', n_systems=n_systems, chunks=chunks)
+        return {'decompress': bench_decompress(path, workers, repeats)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--n-systems', type=int, default=2_000_000, help='Binary systems in the synthetic HDF5 file')
+    parser.add_argument('--chunks', type=int, default=65536, help='Rows per chunk of each column')
+    parser.add_argument('--workers', type=int, help='Decompression threads, by default the number of CPUs')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    results = run(args.n_systems, args.chunks, args.workers, args.repeats)
+    print(json.dumps(results, indent=4))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Import time benchmark.
+
+Measures the time taken by ``import gwlandscape_python`` in a fresh interpreter using ``python -X importtime``, split
+into the time spent importing the package's own modules and its dependencies, and lists the optional or heavy
+modules that were imported with it.
+
+Usage::
+
+    python benchmarks/bench_import.py [--repeats 10] [--output results.json]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Modules which should only be imported once the feature that needs them is used
+DEFERRED_MODULES = ['h5py', 'numpy', 'tarfile', 'asyncio', 'aiohttp', 'sqlite3']
+
+
+def _import_times(statement):
+    # Self and cumulative import times of each module, in seconds, parsed from the -X importtime report
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us) / 1e6, int(cumulative_us) / 1e6)
+    return times
+
+
+def bench_import(repeats):
+    """Median time taken to import the package, over repeats fresh interpreters"""
+    runs = [_import_times('import gwlandscape_python') for _ in range(repeats)]
+    return {
+        'n_modules': len(runs[0]),
+        'import_s': statistics.median(times['gwlandscape_python'][1] for times in runs),
+        'package_s': statistics.median(
+            sum(self_s for name, (self_s, _) in times.items() if name.split('.')[0] == 'gwlandscape_python')
+            for times in runs
+        ),
+        'deferred_modules_imported': [name for name in DEFERRED_MODULES if name in runs[0]],
+    }
+
+
+def run(repeats=10):
+    return {'import': bench_import(repeats)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeats', type=int, default=10, help='Number of fresh interpreters to time the import in')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    results = run(args.repeats)
+    print(json.dumps(results, indent=4))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == '__main__':
+    main()
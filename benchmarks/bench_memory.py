@@ -0,0 +1,141 @@
+"""Memory benchmark for large catalog listings.
+
+Measures the memory used by 100k Keyword, Publication, Model and Dataset objects, compared with equivalent dataclasses
+that keep a per-instance ``__dict__``, and the memory used by a 100k dataset ``get_datasets`` result.
+
+Usage::
+
+    python benchmarks/bench_memory.py [--n-objects 100000] [--output results.json]
+"""
+import argparse
+import gc
+import json
+import tracemalloc
+from dataclasses import dataclass, fields, make_dataclass
+
+from gwlandscape_python import GWLandscape, Keyword, Publication, Model, Dataset
+
+
+def _unslotted(cls):
+    # The same dataclass without __slots__, for comparison
+    return dataclass(make_dataclass(f'Unslotted{cls.__name__}', [(f.name, f.type, f) for f in fields(cls)]))
+
+
+def _measure(create, n_objects):
+    gc.collect()
+    tracemalloc.start()
+    objects = [create(i) for i in range(n_objects)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return current
+
+
+def _keyword_data(i):
+    return {'id': f'keyword_id{i}', 'tag': f'tag {i}'}
+
+
+def _publication_data(i, keywords):
+    return {
+        'id': f'publication_id{i}',
+        'author': f'author {i}',
+        'published': True,
+        'title': f'title {i}',
+        'year': 2000 + i % 20,
+        'journal': f'journal {i}',
+        'journal_doi': f'journal doi {i}',
+        'dataset_doi': f'dataset doi {i}',
+        'description': f'description {i}',
+        'public': True,
+        'download_link': f'download link {i}',
+        'arxiv_id': f'arxiv id {i}',
+        'creation_time': '2022-06-20T02:12:59.459297+00:00',
+        'keywords': keywords,
+    }
+
+
+def _model_data(i):
+    return {'id': f'model_id{i}', 'name': f'name {i}', 'summary': f'summary {i}', 'description': f'description {i}'}
+
+
+def bench_objects(n_objects):
+    """Bytes per object for each of the catalog types, with and without ``__slots__``"""
+    keyword = Keyword(client=None, **_keyword_data(0))
+    results = {}
+    for cls, create_data in [
+        (Keyword, _keyword_data),
+        (Publication, lambda i: _publication_data(i, [keyword])),
+        (Model, _model_data),
+    ]:
+        unslotted = _unslotted(cls)
+        slotted_bytes = _measure(lambda i: cls(client=None, **create_data(i)), n_objects)
+        unslotted_bytes = _measure(lambda i: unslotted(client=None, **create_data(i)), n_objects)
+        results[cls.__name__] = {
+            'bytes_per_object': slotted_bytes / n_objects,
+            'unslotted_bytes_per_object': unslotted_bytes / n_objects,
+        }
+
+    publication = Publication(client=None, **_publication_data(0, [keyword]))
+    model = Model(client=None, **_model_data(0))
+    dataset_bytes = _measure(lambda i: Dataset(None, f'dataset_id{i}', publication, model), n_objects)
+    results['Dataset'] = {'bytes_per_object': dataset_bytes / n_objects}
+
+    return results
+
+
+def bench_get_datasets(n_objects, n_publications=500, n_keywords=5):
+    """Memory held by a get_datasets result for n_objects datasets spread over n_publications publications"""
+    def _node(i):
+        pub = i % n_publications
+        keywords = [{'node': _keyword_data(k)} for k in range(n_keywords)]
+        return {
+            'node': {
+                'id': f'dataset_id{i}',
+                'compas_publication': {**_publication_data(pub, {'edges': keywords})},
+                'compas_model': _model_data(pub),
+            }
+        }
+
+    def _request(**kwargs):
+        return {'compas_dataset_models': {'edges': [_node(i) for i in range(n_objects)]}}
+
+    # The request is replaced, so no connection to the server is made
+    gwl = GWLandscape.__new__(GWLandscape)
+    gwl.request = _request
+
+    gc.collect()
+    tracemalloc.start()
+    datasets = gwl.get_datasets()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'n_datasets': len(datasets),
+        'bytes_per_dataset': current / n_objects,
+        'peak_bytes': peak,
+    }
+
+
+def run(n_objects=100_000):
+    return {
+        'objects': bench_objects(n_objects),
+        'get_datasets': bench_get_datasets(n_objects),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--n-objects', type=int, default=100_000)
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    results = run(args.n_objects)
+    print(json.dumps(results, indent=4))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == '__main__':
+    main()
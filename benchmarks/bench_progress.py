@@ -0,0 +1,111 @@
+"""Progress reporting overhead benchmark.
+
+Compares updating a shared ``tqdm`` bar from every download thread for every chunk, as was done before progress
+sinks were added, with the per-thread counters that are merged on a timer, for many threads and chunks, and for a
+download of many small files from a local stand-in for the GWLandscape file server.
+
+Usage::
+
+    python benchmarks/bench_progress.py [--n-updates 20000] [--n-files 2000] [--output results.json]
+"""
+import argparse
+import concurrent.futures
+import io
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from gwdc_python.files import FileReferenceList
+from tqdm import tqdm
+
+from gwlandscape_python.tests.local_server import LocalGWLandscapeServer
+from gwlandscape_python.utils import NullProgress, TqdmProgress
+from gwlandscape_python.utils.progress import progress_counter
+
+N_THREADS = 20
+CHUNK_SIZE = 1024 * 16
+
+
+def _run_threads(update, n_updates):
+    def _worker(_):
+        for _ in range(n_updates):
+            update(CHUNK_SIZE)
+
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=N_THREADS) as executor:
+        list(executor.map(_worker, range(N_THREADS)))
+    return time.perf_counter() - start
+
+
+def bench_updates(n_updates):
+    """Time taken by N_THREADS threads each reporting n_updates chunks"""
+    total = N_THREADS * n_updates * CHUNK_SIZE
+
+    bar = tqdm(total=total, file=io.StringIO())
+    shared_s = _run_threads(bar.update, n_updates)
+    bar.close()
+
+    with progress_counter(TqdmProgress(file=io.StringIO()), total) as counter:
+        merged_s = _run_threads(counter.update, n_updates)
+
+    with progress_counter(NullProgress(), total) as counter:
+        null_s = _run_threads(counter.update, n_updates)
+
+    return {
+        'n_updates': N_THREADS * n_updates,
+        'shared_tqdm_s': shared_s,
+        'merged_tqdm_s': merged_s,
+        'none_s': null_s,
+        'shared_tqdm_updates_per_s': N_THREADS * n_updates / shared_s,
+        'merged_tqdm_updates_per_s': N_THREADS * n_updates / merged_s,
+    }
+
+
+def bench_downloads(n_files, file_size=1024 * 64):
+    """Time taken to save many small files with each kind of progress reporting"""
+    n_extra_files = 20
+    with LocalGWLandscapeServer() as server:
+        server.seed(n_publications=max(n_files // n_extra_files, 1), n_models=1, n_systems=100,
+                    n_extra_files=n_extra_files, extra_file_size=file_size)
+        gwl = server.client()
+        file_list = FileReferenceList([
+            f for dataset in gwl.get_datasets() for f in dataset.get_full_file_list() if f.path.suffix == '.txt'
+        ])
+
+        results = {'n_files': len(file_list)}
+        with tempfile.TemporaryDirectory() as root_path:
+            for name, progress in [
+                ('tqdm', TqdmProgress(file=io.StringIO())),
+                ('none', NullProgress()),
+            ]:
+                start = time.perf_counter()
+                gwl.save_files_by_reference(file_list, Path(root_path), progress=progress)
+                results[f'{name}_s'] = time.perf_counter() - start
+        return results
+
+
+def run(n_updates=20_000, n_files=2000):
+    return {
+        'updates': bench_updates(n_updates),
+        'downloads': bench_downloads(n_files),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--n-updates', type=int, default=20_000, help='Chunks reported by each thread')
+    parser.add_argument('--n-files', type=int, default=2000)
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    results = run(args.n_updates, args.n_files)
+    print(json.dumps(results, indent=4))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == '__main__':
+    main()
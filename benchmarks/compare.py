@@ -0,0 +1,78 @@
+"""Compare two benchmark results files and report the measurements that changed by more than a threshold.
+
+Measurements whose names end in ``_per_s`` are rates, for which higher is better. All other measurements, such as
+times and byte counts, are better when lower. Counts, with names starting with ``n_``, and metadata are ignored.
+The exit status is 1 if any measurement regressed.
+
+Usage::
+
+    python benchmarks/compare.py baseline.json results.json [--threshold 0.1]
+"""
+import argparse
+import json
+import sys
+
+
+def _measurements(results, prefix=()):
+    for key, value in results.items():
+        if key == 'metadata' or key.startswith('n_'):
+            continue
+        if isinstance(value, dict):
+            yield from _measurements(value, prefix + (key,))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield prefix + (key,), value
+
+
+def compare(baseline, results, threshold=0.1):
+    """Find the measurements that changed by more than the threshold
+
+    Parameters
+    ----------
+    baseline : dict
+        Results to compare against
+    results : dict
+        New results
+    threshold : float, optional
+        Relative change above which a measurement is reported, by default 0.1
+
+    Returns
+    -------
+    list
+        Tuples of (name, baseline value, new value, relative change, whether it is a regression)
+    """
+    baseline = dict(_measurements(baseline))
+    changes = []
+    for key, value in _measurements(results):
+        if key not in baseline or not baseline[key]:
+            continue
+        change = (value - baseline[key]) / baseline[key]
+        if abs(change) > threshold:
+            higher_is_better = key[-1].endswith('_per_s')
+            changes.append(('.'.join(key), baseline[key], value, change, (change < 0) == higher_is_better))
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('results')
+    parser.add_argument('--threshold', type=float, default=0.1)
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.results) as f:
+        results = json.load(f)
+
+    changes = compare(baseline, results, args.threshold)
+    for name, old, new, change, regression in changes:
+        print(f'{"REGRESSION" if regression else "improvement"}  {name}: {old:.4g} -> {new:.4g} ({change:+.1%})')
+
+    if not changes:
+        print(f'No changes above {args.threshold:.0%}')
+
+    sys.exit(any(regression for *_, regression in changes))
+
+
+if __name__ == '__main__':
+    main()
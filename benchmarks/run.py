@@ -0,0 +1,71 @@
+"""Run the benchmark suite and save the results, along with the package and Python versions, as JSON.
+
+Usage::
+
+    python benchmarks/run.py [--quick] [--output results.json]
+"""
+import argparse
+import json
+import platform
+import sys
+from datetime import datetime, timezone
+
+import gwlandscape_python
+
+import bench_client
+import bench_decompress
+import bench_import
+import bench_memory
+import bench_progress
+
+# Arguments used for each benchmark in a quick run, useful for checking the suite works
+QUICK = {
+    'client': {'n_publications': 10, 'n_systems': 1000, 'repeats': 1},
+    'decompress': {'n_systems': 100_000, 'chunks': 8192, 'repeats': 1},
+    'import': {'repeats': 2},
+    'memory': {'n_objects': 1000},
+    'progress': {'n_updates': 1000, 'n_files': 100},
+}
+
+BENCHMARKS = {
+    'client': bench_client.run,
+    'decompress': bench_decompress.run,
+    'import': bench_import.run,
+    'memory': bench_memory.run,
+    'progress': bench_progress.run,
+}
+
+
+def run(quick=False, only=None):
+    results = {
+        'metadata': {
+            'version': gwlandscape_python.__version__,
+            'python': sys.version,
+            'platform': platform.platform(),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+        },
+    }
+    for name, fn in BENCHMARKS.items():
+        if only and name not in only:
+            continue
+        results[name] = fn(**(QUICK[name] if quick else {}))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quick', action='store_true', help='Run each benchmark at a small size')
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help='Only run these benchmarks')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    results = run(args.quick, args.only)
+    print(json.dumps(results, indent=4))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,42 @@
+import importlib
+
 from .gwlandscape import GWLandscape
 from .keyword_type import Keyword
 from .publication_type import Publication
 from .model_type import Model
 from .dataset_type import Dataset
+from .records import KeywordRecord, PublicationRecord, ModelRecord, DatasetRecord
+from .instrumentation import EventAggregator, RequestEvent, FileEvent, RetryEvent, ValidationEvent
 
 from gwdc_python.files import FileReference, FileReferenceList
 
+# Names imported from their module when first used rather than with the package, as they bring in modules, such as
+# asyncio and sqlite3, which most scripts don't need
+_LAZY_IMPORTS = {
+    'AsyncGWLandscape': 'async_gwlandscape',
+    'CatalogSnapshot': 'snapshot',
+    'OfflineGWLandscape': 'snapshot',
+    'PublicationIndex': 'search',
+    'CatalogIndex': 'catalog',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        value = getattr(importlib.import_module(f'.{_LAZY_IMPORTS[name]}', __name__), name)
+    elif name == '__version__':
+        # Reading the package metadata is slow, so is only done when the version is asked for
+        try:
+            from importlib.metadata import version
+        except ModuleNotFoundError:
+            from importlib_metadata import version
+        value = version('gwlandscape_python')
+    else:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    globals()[name] = value
+    return value
+
 
-try:
-    from importlib.metadata import version
-except ModuleNotFoundError:
-    from importlib_metadata import version
-__version__ = version('gwlandscape_python')
+def __dir__():
+    return sorted({*globals(), *_LAZY_IMPORTS, '__version__'})
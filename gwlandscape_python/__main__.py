@@ -0,0 +1,5 @@
+import sys
+
+from gwlandscape_python.cli import main
+
+sys.exit(main())
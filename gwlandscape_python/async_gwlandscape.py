@@ -0,0 +1,387 @@
+import asyncio
+import json
+import threading
+import time
+import uuid
+import weakref
+from contextlib import ExitStack
+from functools import partial
+from pathlib import Path
+
+from gwdc_python.exceptions import GWDCAuthenticationError, GWDCUnknownException
+from gwdc_python.logger import create_logger
+from gwdc_python.utils import split_variables_dict
+from humps import camelize, decamelize
+
+from gwlandscape_python import queries
+from gwlandscape_python.gwlandscape import GWLandscape, FILE_LIST_BATCH_SIZE
+from gwlandscape_python.instrumentation import RequestEvent, operation_name, request_size, response_size
+from gwlandscape_python.utils import mutually_exclusive, obtain_public_id
+from gwlandscape_python.utils.file_download import _download_files_async, _get_file_async, _save_file_async
+from gwlandscape_python.utils.manifest import ManifestWriter
+from gwlandscape_python.utils.rate_limit import get_token_bucket
+from gwlandscape_python.utils.retry import DEFAULT_RETRY
+from gwlandscape_python.settings import GWLANDSCAPE_ENDPOINT, GWLANDSCAPE_FILE_DOWNLOAD_ENDPOINT
+
+logger = create_logger(__name__)
+
+SESSION_USER_QUERY = """
+    query {
+        sessionUser {
+            isAuthenticated
+        }
+    }
+"""
+
+
+def _import_aiohttp():
+    try:
+        import aiohttp
+    except ImportError:
+        raise ImportError(
+            'AsyncGWLandscape requires aiohttp, which can be installed with "pip install gwlandscape-python[async]"'
+        ) from None
+    return aiohttp
+
+
+class AsyncGWLandscape:
+    """
+    An asyncio version of :class:`~.GWLandscape`, for use in applications that run an event loop, such as web
+    services. Each of the query, mutation and download methods of :class:`~.GWLandscape` has an awaitable
+    equivalent here, which sends the same queries. Requires aiohttp.
+
+    The client should be used as an asynchronous context manager, which checks the API token on entry and closes
+    the connections to the server on exit:
+
+    ::
+
+        async with AsyncGWLandscape(token='<user_api_token_here>') as gwl:
+            publications = await gwl.get_publications(author='Riley')
+
+    Updating or deleting objects through their own methods, such as :meth:`~.Publication.update`, is only possible
+    with a :class:`~.GWLandscape` client. The file lists of datasets returned by this client must be fetched with
+    :meth:`get_files_by_datasets` before calling :meth:`~.Dataset.get_full_file_list`.
+
+    Parameters
+    ----------
+    token : str
+        API token for a GWDC user
+    endpoint : str, optional
+        URL to which we send the queries, by default GWLANDSCAPE_ENDPOINT
+    file_download_endpoint : str, optional
+        URL to which file download tokens are appended to download files, by default GWLANDSCAPE_FILE_DOWNLOAD_ENDPOINT
+    progress : ~gwlandscape_python.utils.progress.ProgressSink, str or callable, optional
+        How to report the progress of downloads and uploads, by default 'tqdm'
+    retry : ~gwlandscape_python.utils.retry.RetryPolicy, optional
+        How to retry queries and file downloads that fail with transient errors, by default DEFAULT_RETRY. Mutations
+        are never retried
+    rate_limit : float or ~gwlandscape_python.utils.rate_limit.TokenBucket, optional
+        Maximum number of requests per second to the API, or a shared token bucket, by default no limit
+    bandwidth_limit : float or ~gwlandscape_python.utils.rate_limit.TokenBucket, optional
+        Maximum number of bytes per second downloaded, or a shared token bucket, by default no limit
+    max_concurrency : int, optional
+        Maximum number of files downloaded at the same time, by default 20
+    """
+
+    def __init__(
+        self,
+        token="",
+        endpoint=GWLANDSCAPE_ENDPOINT,
+        file_download_endpoint=GWLANDSCAPE_FILE_DOWNLOAD_ENDPOINT,
+        progress='tqdm',
+        retry=DEFAULT_RETRY,
+        rate_limit=None,
+        bandwidth_limit=None,
+        max_concurrency=20,
+    ):
+        self.token = token
+        self.endpoint = endpoint
+        self.file_download_endpoint = file_download_endpoint
+        self.progress = progress
+        self.retry = retry
+        self.rate_limit = get_token_bucket(rate_limit)
+        self.bandwidth_limit = get_token_bucket(bandwidth_limit)
+        self.max_concurrency = max_concurrency
+
+        if not token:
+            # Identifies anonymous requests in the same way as the synchronous client
+            self._public_id = obtain_public_id()
+            self._session_id = str(uuid.uuid4())
+
+        # Created on first use, as an aiohttp session must be created inside the event loop
+        self._session = None
+
+        self._catalog_listeners = weakref.WeakSet()
+        self._event_listeners = ()
+        self._listener_lock = threading.Lock()
+
+    async def __aenter__(self):
+        if self.token:
+            await self._check_api_token()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """Close the connections to the server"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def create_keyword(self, tag):
+        """Awaitable version of :meth:`.GWLandscape.create_keyword`"""
+        return await queries.run_async(self, queries.create_keyword(self, tag))
+
+    @mutually_exclusive('exact', 'contains', '_id')
+    async def get_keywords(self, exact=None, contains=None, _id=None):
+        """Awaitable version of :meth:`.GWLandscape.get_keywords`"""
+        return await queries.run_async(self, queries.get_keywords(self, exact, contains, _id))
+
+    async def create_publication(
+        self,
+        author,
+        title,
+        arxiv_id,
+        published=None,
+        year=None,
+        journal=None,
+        journal_doi=None,
+        dataset_doi=None,
+        description=None,
+        public=None,
+        download_link=None,
+        keywords=None
+    ):
+        """Awaitable version of :meth:`.GWLandscape.create_publication`"""
+        inputs = {key: val for key, val in locals().items() if ((val is not None) and (key != 'self'))}
+        return await queries.run_async(self, queries.create_publication(self, inputs))
+
+    @mutually_exclusive('author | title', '_id')
+    async def get_publications(self, author=None, title=None, _id=None):
+        """Awaitable version of :meth:`.GWLandscape.get_publications`"""
+        return await queries.run_async(self, queries.get_publications(self, author, title, _id))
+
+    async def create_model(self, name, summary=None, description=None):
+        """Awaitable version of :meth:`.GWLandscape.create_model`"""
+        inputs = {key: val for key, val in locals().items() if ((val is not None) and (key != 'self'))}
+        return await queries.run_async(self, queries.create_model(self, inputs))
+
+    @mutually_exclusive('name | summary | description', '_id')
+    async def get_models(self, name=None, summary=None, description=None, _id=None):
+        """Awaitable version of :meth:`.GWLandscape.get_models`"""
+        return await queries.run_async(self, queries.get_models(self, name, summary, description, _id))
+
+    async def create_dataset(self, publication, model, datafile, progress=None, optimise=False):
+        """Awaitable version of :meth:`.GWLandscape.create_dataset`. The file is validated, and optimised if
+        requested, in a thread, so that the event loop isn't blocked"""
+        loop = asyncio.get_running_loop()
+        upload = ExitStack()
+        file_path = await loop.run_in_executor(
+            None, upload.enter_context, queries.prepare_upload(self, Path(datafile), optimise)
+        )
+        try:
+            return await queries.run_async(
+                self, queries.upload_dataset(self, publication, model, file_path, self._progress_sink(progress))
+            )
+        finally:
+            # Removes the optimised copy, if there is one
+            await loop.run_in_executor(None, upload.close)
+
+    @mutually_exclusive('publication | model', '_id')
+    async def get_datasets(self, publication=None, model=None, _id=None):
+        """Awaitable version of :meth:`.GWLandscape.get_datasets`"""
+        return await queries.run_async(self, queries.get_datasets(self, publication, model, _id))
+
+    async def get_files_by_datasets(self, datasets, batch_size=FILE_LIST_BATCH_SIZE):
+        """Awaitable version of :meth:`.GWLandscape.get_files_by_datasets`. The file lists are cached on the datasets,
+        after which :meth:`~.Dataset.get_full_file_list` can be called"""
+        missing = [dataset for dataset in datasets if not dataset.has_cached_file_list()]
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            file_lists = await queries.run_async(self, queries.get_files_by_dataset_batch(self, batch))
+            for dataset, file_list in zip(batch, file_lists):
+                dataset._file_list = file_list
+
+        return [dataset.get_full_file_list() for dataset in datasets]
+
+    async def get_files_by_reference(self, file_references, progress=None, retry=None):
+        """Awaitable version of :meth:`.GWLandscape.get_files_by_reference`. At most :attr:`max_concurrency` files
+        are downloaded at the same time"""
+        files = await _download_files_async(
+            await self._get_session(),
+            _get_file_async,
+            file_references,
+            max_concurrency=self.max_concurrency,
+            download_endpoint=self.file_download_endpoint,
+            emit=self._emit if self._event_listeners else None,
+            progress=self._progress_sink(progress),
+            retry=self.retry if retry is None else retry,
+            bandwidth=self.bandwidth_limit
+        )
+
+        self._log_download_report(files, 'downloaded')
+
+        return files
+
+    async def save_files_by_reference(self, file_references, root_path, progress=None, retry=None, resume=False,
+                                      extract=False):
+        """Awaitable version of :meth:`.GWLandscape.save_files_by_reference`, taking the same arguments. At most
+        :attr:`max_concurrency` files are downloaded at the same time, and the files are written from the default
+        executor of the event loop"""
+        root_path = Path(root_path)
+        manifest = ManifestWriter(root_path)
+        files = await _download_files_async(
+            await self._get_session(),
+            _save_file_async,
+            file_references,
+            root_path,
+            max_concurrency=self.max_concurrency,
+            download_endpoint=self.file_download_endpoint,
+            emit=self._emit if self._event_listeners else None,
+            progress=self._progress_sink(progress),
+            retry=self.retry if retry is None else retry,
+            bandwidth=self.bandwidth_limit,
+            manifest=manifest,
+            resume=resume,
+            extract=extract
+        )
+        manifest.write()
+
+        self._log_download_report(files, 'saved')
+
+        return files
+
+    def add_event_listener(self, listener):
+        """Register a callable to receive instrumentation events, as for :meth:`.GWLandscape.add_event_listener`
+
+        Parameters
+        ----------
+        listener : callable
+            Called with each event
+        """
+        self._event_listeners = self._event_listeners + (listener,)
+
+    def remove_event_listener(self, listener):
+        """Stop sending instrumentation events to a listener registered with :meth:`add_event_listener`
+
+        Parameters
+        ----------
+        listener : callable
+            The listener to remove
+        """
+        self._event_listeners = tuple(registered for registered in self._event_listeners if registered != listener)
+
+    async def request(self, query, variables=None, headers=None, authorize=True):
+        """Send a query or mutation to the GWLandscape API, as for :meth:`.GWLandscape.request`
+
+        Parameters
+        ----------
+        query : str
+            The query or mutation
+        variables : dict, optional
+            Variables of the query, by default None
+        headers : dict, optional
+            Additional headers to send, by default None
+        authorize : bool, optional
+            Whether to send the API token, by default True
+
+        Returns
+        -------
+        dict
+            The data returned by the query, with snake case keys
+        """
+        async def _send():
+            if self.rate_limit is not None:
+                await self.rate_limit.acquire_async()
+            if self._event_listeners:
+                return await self._instrumented_request(query, variables, headers, authorize)
+            return await self._send_request(query, variables, headers, authorize)
+
+        if self.retry is None or query.lstrip().startswith('mutation'):
+            return await _send()
+
+        return await self.retry.run_async(_send, on_retry=partial(self._on_request_retry, operation_name(query)))
+
+    async def _send_request(self, query, variables, headers, authorize):
+        # Sends a request in the same way as GWDC.request, including any files in the variables using the GraphQL
+        # multipart request spec
+        aiohttp = _import_aiohttp()
+        session = await self._get_session()
+
+        all_headers = self._auth_headers() if authorize else {}
+        if headers is not None:
+            all_headers.update(headers)
+
+        variables, files, files_map = split_variables_dict(camelize(variables or {}))
+        if files:
+            data = aiohttp.FormData()
+            data.add_field('operations', json.dumps({
+                'query': query,
+                'variables': variables,
+                'operationName': query.replace('(', ' ').split()[1],
+            }))
+            data.add_field('map', json.dumps(files_map))
+            for key, (filename, f) in files.items():
+                data.add_field(key, f, filename=filename)
+            request_params = {'data': data}
+        else:
+            request_params = {'json': {'query': query, 'variables': variables}}
+
+        async with session.post(self.endpoint, headers=all_headers, **request_params) as response:
+            content = json.loads(await response.read())
+
+        errors = content.get('errors', None)
+        if errors:
+            raise GWDCUnknownException(errors[0].get('message'), extensions=errors[0].get('extensions'))
+        return decamelize(content.get('data', None))
+
+    async def _instrumented_request(self, query, variables, headers, authorize):
+        start = time.perf_counter()
+        result = error = None
+        try:
+            result = await self._send_request(query, variables, headers, authorize)
+            return result
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._emit(RequestEvent(
+                operation=operation_name(query),
+                duration=time.perf_counter() - start,
+                request_bytes=request_size(query, variables),
+                response_bytes=response_size(result),
+                error=error,
+            ))
+
+    async def _get_session(self):
+        if self._session is None:
+            self._session = _import_aiohttp().ClientSession()
+        return self._session
+
+    def _auth_headers(self):
+        if self.token:
+            return {'Authorization': self.token}
+        return {'X-Correlation-ID': f'{self._public_id} {self._session_id}'}
+
+    async def _check_api_token(self):
+        result = await self.request(query=SESSION_USER_QUERY)
+        if not (result.get('session_user') or {}).get('is_authenticated'):
+            raise GWDCAuthenticationError
+
+    def _get_files_by_dataset(self, dataset):
+        # Called by Dataset.get_full_file_list, which can't await a request
+        raise RuntimeError(
+            'The file list of a dataset from an AsyncGWLandscape client must first be fetched with '
+            '"await client.get_files_by_datasets(datasets)"'
+        )
+
+    # These don't make any requests, so are shared with the synchronous client
+    _on_request_retry = GWLandscape._on_request_retry
+    _emit = GWLandscape._emit
+    _progress_sink = GWLandscape._progress_sink
+    _validate_dataset = GWLandscape._validate_dataset
+    _add_catalog_listener = GWLandscape._add_catalog_listener
+    _notify_catalog_listeners = GWLandscape._notify_catalog_listeners
+    _intern = GWLandscape._intern
+    _log_download_report = GWLandscape._log_download_report
@@ -0,0 +1,404 @@
+import threading
+from collections import defaultdict
+
+from gwdc_python.files import FileReferenceList
+
+import gwlandscape_python
+
+
+class CatalogIndex:
+    """
+    An in-memory index of the relationships between keywords, publications, models, datasets and files, allowing
+    joins such as "all datasets for publications with keyword X that use model Y" to be answered locally.
+
+    Filters are answered by intersecting the forward and reverse mappings, starting from the smallest candidate set,
+    so the cost of a query is proportional to the size of its result rather than the size of the catalog.
+
+    If a client is provided, the index will be kept up to date with any objects created, updated or deleted
+    through that client.
+
+    Parameters
+    ----------
+    publications : list
+        :class:`~.Publication` instances to index
+    models : list
+        :class:`~.Model` instances to index
+    datasets : list
+        :class:`~.Dataset` instances to index. Their publications and models are indexed too.
+    files : dict, optional
+        Dictionary mapping dataset ids to a :class:`~gwdc_python.files.file_reference.FileReferenceList`,
+        by default None
+    client : ~gwlandscape_python.gwlandscape.GWLandscape, optional
+        Client from which to receive updates, by default None
+    """
+
+    def __init__(self, publications=(), models=(), datasets=(), files=None, client=None):
+        self._lock = threading.RLock()
+
+        # Objects by id
+        self._keywords = _Store()
+        self._publications = _Store()
+        self._models = _Store()
+        self._datasets = _Store()
+        self._files = {}
+
+        # Forward and reverse mappings between ids. Objects may be changed in place before the index is notified,
+        # so the relationships are stored separately rather than read back from the objects
+        self._keyword_tags = {}
+        self._tag_keywords = defaultdict(set)
+        self._publication_keywords = {}
+        self._keyword_publications = defaultdict(set)
+        self._publication_datasets = defaultdict(set)
+        self._model_datasets = defaultdict(set)
+        self._dataset_relations = {}
+
+        for publication in publications:
+            self.add_publication(publication)
+        for model in models:
+            self.add_model(model)
+        for dataset in datasets:
+            self.add_dataset(dataset)
+        for dataset_id, file_list in (files or {}).items():
+            self.set_files(dataset_id, file_list)
+
+        if client is not None:
+            client._add_catalog_listener(self)
+
+    def add_publication(self, publication):
+        """Add or replace a publication and its keywords in the index
+
+        Parameters
+        ----------
+        publication : ~gwlandscape_python.publication_type.Publication
+            Publication to index
+        """
+        with self._lock:
+            self._remove_publication_keywords(publication.id)
+            self._publications[publication.id] = publication
+            self._publication_keywords[publication.id] = [keyword.id for keyword in publication.keywords]
+            for keyword in publication.keywords:
+                self._add_keyword(keyword)
+                self._keyword_publications[keyword.id].add(publication.id)
+
+    def add_model(self, model):
+        """Add or replace a model in the index
+
+        Parameters
+        ----------
+        model : ~gwlandscape_python.model_type.Model
+            Model to index
+        """
+        with self._lock:
+            self._models[model.id] = model
+
+    def add_dataset(self, dataset):
+        """Add or replace a dataset in the index, along with its publication and model
+
+        Parameters
+        ----------
+        dataset : ~gwlandscape_python.dataset_type.Dataset
+            Dataset to index
+        """
+        with self._lock:
+            self._remove_dataset_relations(dataset.id)
+
+            if dataset.publication.id not in self._publications:
+                self.add_publication(dataset.publication)
+            if dataset.model.id not in self._models:
+                self.add_model(dataset.model)
+
+            self._datasets[dataset.id] = dataset
+            self._dataset_relations[dataset.id] = (dataset.publication.id, dataset.model.id)
+            self._publication_datasets[dataset.publication.id].add(dataset.id)
+            self._model_datasets[dataset.model.id].add(dataset.id)
+
+    def set_files(self, dataset_id, file_list):
+        """Store the file list of a dataset in the index
+
+        Parameters
+        ----------
+        dataset_id : str
+            Id of the dataset
+        file_list : ~gwdc_python.files.file_reference.FileReferenceList
+            Files belonging to the dataset
+        """
+        with self._lock:
+            self._files[dataset_id] = file_list
+
+    def remove(self, obj):
+        """Remove a keyword, publication, model or dataset from the index, along with any datasets that depend on it
+
+        Parameters
+        ----------
+        obj : ~gwlandscape_python.keyword_type.Keyword or ~gwlandscape_python.publication_type.Publication or \
+~gwlandscape_python.model_type.Model or ~gwlandscape_python.dataset_type.Dataset
+            Object to remove
+        """
+        with self._lock:
+            if isinstance(obj, gwlandscape_python.Dataset):
+                self._remove_dataset_relations(obj.id)
+                self._datasets.pop(obj.id, None)
+                self._files.pop(obj.id, None)
+            elif isinstance(obj, gwlandscape_python.Publication):
+                for dataset_id in list(self._publication_datasets.get(obj.id, ())):
+                    self.remove(self._datasets[dataset_id])
+                self._remove_publication_keywords(obj.id)
+                self._publication_keywords.pop(obj.id, None)
+                self._publications.pop(obj.id, None)
+            elif isinstance(obj, gwlandscape_python.Model):
+                for dataset_id in list(self._model_datasets.get(obj.id, ())):
+                    self.remove(self._datasets[dataset_id])
+                self._models.pop(obj.id, None)
+            elif isinstance(obj, gwlandscape_python.Keyword):
+                # Only the index forgets the keyword, as the publications belong to the caller
+                for publication_id in self._keyword_publications.pop(obj.id, ()):
+                    self._publication_keywords[publication_id] = [
+                        keyword_id for keyword_id in self._publication_keywords[publication_id] if keyword_id != obj.id
+                    ]
+                self._remove_keyword(obj.id)
+                self._keywords.pop(obj.id, None)
+
+    def _add_keyword(self, keyword):
+        self._remove_keyword(keyword.id)
+        self._keywords[keyword.id] = keyword
+        self._keyword_tags[keyword.id] = keyword.tag.casefold()
+        self._tag_keywords[keyword.tag.casefold()].add(keyword.id)
+
+    def _remove_keyword(self, keyword_id):
+        tag = self._keyword_tags.pop(keyword_id, None)
+        if tag is not None:
+            _discard(self._tag_keywords, tag, keyword_id)
+
+    def _remove_publication_keywords(self, publication_id):
+        for keyword_id in self._publication_keywords.get(publication_id, ()):
+            _discard(self._keyword_publications, keyword_id, publication_id)
+
+    def _remove_dataset_relations(self, dataset_id):
+        relations = self._dataset_relations.pop(dataset_id, None)
+        if relations is not None:
+            publication_id, model_id = relations
+            _discard(self._publication_datasets, publication_id, dataset_id)
+            _discard(self._model_datasets, model_id, dataset_id)
+
+    def _keyword_ids(self, keyword):
+        # A keyword can be provided as a Keyword instance or as a tag, which is matched case-insensitively
+        if isinstance(keyword, str):
+            return self._tag_keywords.get(keyword.casefold(), set())
+        return {keyword.id}
+
+    def _publication_ids_for_keyword(self, keyword):
+        ids = set()
+        for keyword_id in self._keyword_ids(keyword):
+            ids |= self._keyword_publications.get(keyword_id, set())
+        return ids
+
+    def _dataset_ids(self, keyword=None, publication=None, model=None):
+        candidates = []
+        if publication is not None:
+            candidates.append(self._publication_datasets.get(publication.id, set()))
+        if model is not None:
+            candidates.append(self._model_datasets.get(model.id, set()))
+        if keyword is not None:
+            publication_ids = self._publication_ids_for_keyword(keyword)
+            if publication is not None:
+                publication_ids = publication_ids & {publication.id}
+            candidates.append(_LazyUnion(self._publication_datasets, publication_ids))
+
+        if not candidates:
+            return set(self._datasets)
+
+        return _intersect(candidates)
+
+    def keywords(self, publication=None):
+        """Get the keywords in the index, optionally only those of a publication
+
+        Parameters
+        ----------
+        publication : ~gwlandscape_python.publication_type.Publication, optional
+            Only return the keywords of this publication, by default None
+
+        Returns
+        -------
+        list
+            A list of :class:`~.Keyword` instances
+        """
+        with self._lock:
+            if publication is None:
+                return list(self._keywords.values())
+            return [self._keywords[keyword_id] for keyword_id in self._publication_keywords[publication.id]]
+
+    def publications(self, keyword=None, model=None):
+        """Get the publications matching all of the provided filters
+
+        Parameters
+        ----------
+        keyword : ~gwlandscape_python.keyword_type.Keyword or str, optional
+            Only return publications with this keyword or tag (case-insensitive), by default None
+        model : ~gwlandscape_python.model_type.Model, optional
+            Only return publications with a dataset using this model, by default None
+
+        Returns
+        -------
+        list
+            A list of :class:`~.Publication` instances
+        """
+        with self._lock:
+            candidates = []
+            if keyword is not None:
+                candidates.append(self._publication_ids_for_keyword(keyword))
+            if model is not None:
+                candidates.append({
+                    self._dataset_relations[dataset_id][0]
+                    for dataset_id in self._model_datasets.get(model.id, ())
+                })
+
+            if not candidates:
+                return list(self._publications.values())
+            return self._publications.ordered(_intersect(candidates))
+
+    def models(self, keyword=None, publication=None):
+        """Get the models matching all of the provided filters
+
+        Parameters
+        ----------
+        keyword : ~gwlandscape_python.keyword_type.Keyword or str, optional
+            Only return models used by a dataset of a publication with this keyword or tag (case-insensitive),
+            by default None
+        publication : ~gwlandscape_python.publication_type.Publication, optional
+            Only return models used by a dataset of this publication, by default None
+
+        Returns
+        -------
+        list
+            A list of :class:`~.Model` instances
+        """
+        with self._lock:
+            if keyword is None and publication is None:
+                return list(self._models.values())
+
+            dataset_ids = self._dataset_ids(keyword=keyword, publication=publication)
+            return self._models.ordered({self._dataset_relations[dataset_id][1] for dataset_id in dataset_ids})
+
+    def datasets(self, keyword=None, publication=None, model=None):
+        """Get the datasets matching all of the provided filters
+
+        Parameters
+        ----------
+        keyword : ~gwlandscape_python.keyword_type.Keyword or str, optional
+            Only return datasets of publications with this keyword or tag (case-insensitive), by default None
+        publication : ~gwlandscape_python.publication_type.Publication, optional
+            Only return datasets of this publication, by default None
+        model : ~gwlandscape_python.model_type.Model, optional
+            Only return datasets using this model, by default None
+
+        Returns
+        -------
+        list
+            A list of :class:`~.Dataset` instances
+        """
+        with self._lock:
+            if keyword is None and publication is None and model is None:
+                return list(self._datasets.values())
+            return self._datasets.ordered(self._dataset_ids(keyword=keyword, publication=publication, model=model))
+
+    def files(self, dataset=None, keyword=None, publication=None, model=None):
+        """Get the files of a dataset, or of all datasets matching the provided filters.
+        Only datasets whose file lists have been stored in the index are included.
+
+        Parameters
+        ----------
+        dataset : ~gwlandscape_python.dataset_type.Dataset, optional
+            Only return files of this dataset, by default None
+        keyword : ~gwlandscape_python.keyword_type.Keyword or str, optional
+            Only return files of datasets of publications with this keyword or tag (case-insensitive),
+            by default None
+        publication : ~gwlandscape_python.publication_type.Publication, optional
+            Only return files of datasets of this publication, by default None
+        model : ~gwlandscape_python.model_type.Model, optional
+            Only return files of datasets using this model, by default None
+
+        Returns
+        -------
+        ~gwdc_python.files.file_reference.FileReferenceList
+            The files of the matching datasets
+        """
+        with self._lock:
+            if dataset is not None:
+                return FileReferenceList(self._files.get(dataset.id, []))
+
+            file_list = FileReferenceList()
+            for matched in self.datasets(keyword=keyword, publication=publication, model=model):
+                file_list.extend(self._files.get(matched.id, []))
+            return file_list
+
+    def catalog_changed(self, action, obj):
+        """Update the index after an object was created, updated or deleted through the client.
+        Called by the client, and not usually needed otherwise.
+
+        Parameters
+        ----------
+        action : str
+            One of 'created', 'updated' or 'deleted'
+        obj : object
+            The object that was changed
+        """
+        with self._lock:
+            if action == 'deleted':
+                self.remove(obj)
+            elif isinstance(obj, gwlandscape_python.Dataset):
+                self.add_dataset(obj)
+            elif isinstance(obj, gwlandscape_python.Publication):
+                self.add_publication(obj)
+            elif isinstance(obj, gwlandscape_python.Model):
+                self.add_model(obj)
+            elif isinstance(obj, gwlandscape_python.Keyword) and obj.id in self._keywords:
+                self._add_keyword(obj)
+
+
+class _LazyUnion:
+    """The union of several sets in a mapping, which is only built if it is the smallest candidate"""
+
+    def __init__(self, mapping, keys):
+        self.mapping = mapping
+        self.keys = keys
+
+    def __len__(self):
+        return sum(len(self.mapping.get(key, ())) for key in self.keys)
+
+    def __contains__(self, value):
+        return any(value in self.mapping.get(key, ()) for key in self.keys)
+
+    def __iter__(self):
+        for key in self.keys:
+            yield from self.mapping.get(key, ())
+
+
+def _intersect(candidates):
+    # Iterate over the smallest candidate set, checking for membership in the others
+    candidates = sorted(candidates, key=len)
+    smallest, others = candidates[0], candidates[1:]
+    return {value for value in smallest if all(value in other for other in others)}
+
+
+class _Store(dict):
+    """Objects by id, which remembers the order in which each id was first added"""
+
+    def __init__(self):
+        super().__init__()
+        self._positions = {}
+
+    def __setitem__(self, key, value):
+        self._positions.setdefault(key, len(self._positions))
+        super().__setitem__(key, value)
+
+    def ordered(self, ids):
+        """The objects with the provided ids, in the order they were added"""
+        return [self[key] for key in sorted((key for key in ids if key in self), key=self._positions.__getitem__)]
+
+
+def _discard(mapping, key, value):
+    values = mapping.get(key)
+    if values is not None:
+        values.discard(value)
+        if not values:
+            del mapping[key]
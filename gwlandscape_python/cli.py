@@ -0,0 +1,343 @@
+"""The ``gwlandscape`` command, for listing, downloading, syncing and uploading datasets from the command line or
+from scheduled jobs.
+
+Usage::
+
+    gwlandscape list [--files]
+    gwlandscape download DIRECTORY [--dataset ID ...] [--resume]
+    gwlandscape sync DIRECTORY [--publication ID ...] [--prune]
+    gwlandscape upload FILE ... --publication ID --model ID
+
+The API token is read from the GWLANDSCAPE_TOKEN environment variable, or given with ``--token``. The exit status is
+0 on success, 1 if any file could not be downloaded or uploaded, 2 if the arguments are invalid and 3 for any other
+error.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+from pathlib import Path
+
+from gwlandscape_python.gwlandscape import GWLandscape
+from gwlandscape_python.settings import GWLANDSCAPE_ENDPOINT, GWLANDSCAPE_FILE_DOWNLOAD_ENDPOINT
+from gwlandscape_python.utils import DEFAULT_RETRY, ProgressSink, RetryPolicy
+from gwlandscape_python.utils.sync import _mirror_file_list
+
+TOKEN_VARIABLE = 'GWLANDSCAPE_TOKEN'
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_ERROR = 3
+
+# Events are reported from the download threads, so lines are written under a lock to keep them whole
+_output_lock = threading.Lock()
+
+
+def _json_line(stream, obj):
+    line = json.dumps(obj, default=str) + '\n'
+    with _output_lock:
+        stream.write(line)
+        stream.flush()
+
+
+class _JsonProgress(ProgressSink):
+    # Reports the bytes transferred so far as JSON lines
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def start(self, total):
+        self.total = total
+        self.completed = 0
+        _json_line(self.stream, {'event': 'progress', 'bytes': 0, 'total': total})
+
+    def update(self, n_bytes):
+        self.completed += n_bytes
+        _json_line(self.stream, {'event': 'progress', 'bytes': self.completed, 'total': self.total})
+
+
+def _json_events(stream):
+    # Event listener reporting each downloaded file and each retry as JSON lines
+    def _listener(event):
+        if event.kind == 'file':
+            _json_line(stream, {
+                'event': 'file',
+                'path': event.path,
+                'size': event.size,
+                'duration': event.duration,
+                'error': str(event.error) if event.error else None,
+            })
+        elif event.kind == 'retry':
+            _json_line(stream, {
+                'event': 'retry',
+                'operation': event.operation,
+                'attempt': event.attempt,
+                'delay': event.delay,
+                'error': str(event.error),
+            })
+
+    return _listener
+
+
+def _client(args):
+    if args.progress == 'json':
+        progress = _JsonProgress(sys.stderr)
+    else:
+        progress = {'bar': 'tqdm', 'log': 'logging', 'none': 'none'}[args.progress]
+
+    gwl = GWLandscape(
+        token=args.token,
+        endpoint=args.endpoint or GWLANDSCAPE_ENDPOINT,
+        file_download_endpoint=args.file_download_endpoint or GWLANDSCAPE_FILE_DOWNLOAD_ENDPOINT,
+        progress=progress,
+        retry=DEFAULT_RETRY if args.retries is None else RetryPolicy(max_attempts=args.retries + 1),
+        rate_limit=args.rate_limit,
+        **{
+            name: getattr(args, name) for name in ['bandwidth_limit', 'max_workers', 'chunk_size']
+            if getattr(args, name, None) is not None
+        }
+    )
+    if args.progress == 'json':
+        gwl.add_event_listener(_json_events(sys.stderr))
+    return gwl
+
+
+def _select_datasets(gwl, args):
+    # All datasets are fetched with a single query, then filtered by id, publication and model
+    datasets = gwl.get_datasets()
+    if args.dataset:
+        missing = set(args.dataset) - {dataset.id for dataset in datasets}
+        if missing:
+            raise ValueError(f'No datasets found with ids {", ".join(sorted(missing))}')
+        datasets = [dataset for dataset in datasets if dataset.id in args.dataset]
+    if args.publication:
+        datasets = [dataset for dataset in datasets if dataset.publication.id in args.publication]
+    if args.model:
+        datasets = [dataset for dataset in datasets if dataset.model.id in args.model]
+    return datasets
+
+
+def _print_failures(failed):
+    for path, error in failed:
+        print(f'Failed: {path}: {error}', file=sys.stderr)
+
+
+def list_datasets(args):
+    gwl = _client(args)
+    datasets = _select_datasets(gwl, args)
+    file_lists = gwl.get_files_by_datasets(datasets) if args.files else [None] * len(datasets)
+
+    for dataset, file_list in zip(datasets, file_lists):
+        if args.json:
+            result = {
+                'id': dataset.id,
+                'publication': {'id': dataset.publication.id, 'title': dataset.publication.title},
+                'model': {'id': dataset.model.id, 'name': dataset.model.name},
+            }
+            if file_list is not None:
+                result['files'] = [{'path': file_ref.path, 'size': file_ref.file_size} for file_ref in file_list]
+            _json_line(sys.stdout, result)
+        else:
+            print(f'{dataset.id}\t{dataset.publication.title}\t{dataset.model.name}')
+            for file_ref in file_list or []:
+                print(f'\t{file_ref.path}\t{file_ref.file_size}')
+    return EXIT_OK
+
+
+def download(args):
+    gwl = _client(args)
+    datasets = _select_datasets(gwl, args)
+    file_list = _mirror_file_list(datasets, gwl.get_files_by_datasets(datasets))
+
+    report = gwl.save_files_by_reference(file_list, Path(args.directory), resume=args.resume, extract=args.extract)
+    failed = [(file_ref.path, error) for file_ref, error in report.failed]
+
+    if args.json:
+        _json_line(sys.stdout, {
+            'saved': report,
+            'bytes': file_list.get_total_bytes() - sum(file_ref.file_size for file_ref, _ in report.failed),
+            'failed': [{'path': path, 'error': str(error)} for path, error in failed],
+        })
+    else:
+        print(f'Saved {len(report)} files from {len(datasets)} datasets, {len(failed)} failed')
+        _print_failures(failed)
+    return EXIT_OK if report.ok else EXIT_FAILED
+
+
+def sync(args):
+    gwl = _client(args)
+    datasets = _select_datasets(gwl, args)
+
+    report = gwl.sync(datasets, args.directory, prune=args.prune, resume=args.resume)
+    failed = [(file_ref.path, error) for file_ref, error in report.downloaded.failed]
+
+    if args.json:
+        _json_line(sys.stdout, {
+            'downloaded': report.downloaded,
+            'skipped': report.skipped,
+            'pruned': report.pruned,
+            'bytes_downloaded': report.bytes_downloaded,
+            'bytes_saved': report.bytes_saved,
+            'failed': [{'path': path, 'error': str(error)} for path, error in failed],
+        })
+    else:
+        print(
+            f'Synced {len(datasets)} datasets: {len(report.downloaded)} files downloaded, {len(report.skipped)} up to '
+            f'date, {len(report.pruned)} pruned, {len(failed)} failed'
+        )
+        _print_failures(failed)
+    return EXIT_OK if report.ok else EXIT_FAILED
+
+
+def upload(args):
+    gwl = _client(args)
+    publications = gwl.get_publications(_id=args.publication)
+    models = gwl.get_models(_id=args.model)
+    if not publications:
+        raise ValueError(f'No publication found with id {args.publication}')
+    if not models:
+        raise ValueError(f'No model found with id {args.model}')
+
+    # Each file is uploaded as a separate dataset, and a file that fails doesn't stop the rest
+    uploaded, failed = [], []
+    for path in args.files:
+        try:
+            dataset = gwl.create_dataset(publications[0], models[0], path, optimise=args.optimise)
+        except Exception as e:
+            failed.append((path, e))
+        else:
+            uploaded.append((path, dataset.id))
+
+    if args.json:
+        _json_line(sys.stdout, {
+            'uploaded': [{'path': path, 'dataset': dataset_id} for path, dataset_id in uploaded],
+            'failed': [{'path': path, 'error': str(error)} for path, error in failed],
+        })
+    else:
+        for path, dataset_id in uploaded:
+            print(f'{path}\t{dataset_id}')
+        _print_failures(failed)
+    return EXIT_OK if not failed else EXIT_FAILED
+
+
+def _non_negative_int(value):
+    value = int(value)
+    if value < 0:
+        raise argparse.ArgumentTypeError(f'must be at least 0, not {value}')
+    return value
+
+
+def _positive_int(value):
+    value = int(value)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f'must be at least 1, not {value}')
+    return value
+
+
+def _positive_float(value):
+    value = float(value)
+    if value <= 0:
+        raise argparse.ArgumentTypeError(f'must be greater than 0, not {value}')
+    return value
+
+
+def _parser():
+    client = argparse.ArgumentParser(add_help=False)
+    group = client.add_argument_group('client options')
+    group.add_argument('--token', default=os.environ.get(TOKEN_VARIABLE),
+                       help=f'API token, by default read from the {TOKEN_VARIABLE} environment variable')
+    group.add_argument('--endpoint', help='URL of the GraphQL API')
+    group.add_argument('--file-download-endpoint', help='URL to which file download tokens are appended')
+    group.add_argument('--rate-limit', type=_positive_float, metavar='REQUESTS',
+                       help='Maximum number of API requests per second')
+    group.add_argument('--retries', type=_non_negative_int, metavar='N',
+                       help='Number of times to retry a request or download that fails with a transient error')
+    group.add_argument('--progress', choices=['bar', 'json', 'log', 'none'],
+                       default='bar' if sys.stderr.isatty() else 'none',
+                       help='How to report the progress of transfers on stderr, by default a progress bar when '
+                            'stderr is a terminal')
+    group.add_argument('--json', action='store_true', help='Write the results to stdout as JSON lines')
+    group.add_argument('-q', '--quiet', action='store_true', help='Only log warnings and errors')
+
+    selection = argparse.ArgumentParser(add_help=False)
+    group = selection.add_argument_group('dataset selection', 'By default, every dataset is selected')
+    group.add_argument('--dataset', action='append', metavar='ID', help='Select the dataset with this id')
+    group.add_argument('--publication', action='append', metavar='ID', help='Select the datasets of a publication')
+    group.add_argument('--model', action='append', metavar='ID', help='Select the datasets of a model')
+
+    transfer = argparse.ArgumentParser(add_help=False)
+    group = transfer.add_argument_group('transfer options')
+    group.add_argument('--workers', dest='max_workers', type=_positive_int, metavar='N',
+                       help='Number of files to download at once')
+    group.add_argument('--chunk-size', type=_positive_int, metavar='BYTES',
+                       help='Size of the chunks in which files are read')
+    group.add_argument('--bandwidth-limit', type=_positive_float, metavar='BYTES',
+                       help='Maximum number of bytes per second downloaded')
+    group.add_argument('--resume', action='store_true',
+                       help='Skip files already saved, and continue downloads that failed part way through')
+
+    parser = argparse.ArgumentParser(
+        prog='gwlandscape', description='List, download, sync and upload GWLandscape datasets'
+    )
+    commands = parser.add_subparsers(dest='command', required=True, metavar='COMMAND')
+
+    command = commands.add_parser('list', parents=[client, selection], help='List datasets')
+    command.add_argument('--files', action='store_true', help='Also list the files of each dataset')
+    command.set_defaults(fn=list_datasets)
+
+    command = commands.add_parser('download', parents=[client, selection, transfer],
+                                  help='Save the files of datasets to a directory, in a directory for each dataset')
+    command.add_argument('directory')
+    command.add_argument('--extract', action='store_true',
+                         help='Save the HDF5 file from each tarball as it is downloaded, rather than the tarball')
+    command.set_defaults(fn=download)
+
+    command = commands.add_parser('sync', parents=[client, selection, transfer],
+                                  help='Update a local mirror of datasets, downloading only new or changed files')
+    command.add_argument('directory')
+    command.add_argument('--prune', action='store_true', help='Delete local files no longer part of their dataset')
+    command.set_defaults(fn=sync)
+
+    command = commands.add_parser('upload', parents=[client], help='Upload files, each as a new dataset')
+    command.add_argument('files', nargs='+', metavar='file')
+    command.add_argument('--publication', required=True, metavar='ID', help='Publication of the new datasets')
+    command.add_argument('--model', required=True, metavar='ID', help='Model of the new datasets')
+    command.add_argument('--optimise', action='store_true',
+                         help='Upload copies of hdf5 files repacked with read-friendly chunks and compression')
+    command.set_defaults(fn=upload)
+
+    return parser
+
+
+def main(argv=None):
+    """Run the ``gwlandscape`` command
+
+    Parameters
+    ----------
+    argv : list, optional
+        Command-line arguments, by default sys.argv[1:]
+
+    Returns
+    -------
+    int
+        Exit status
+    """
+    parser = _parser()
+    args = parser.parse_args(argv)
+    if not args.token:
+        parser.error(f'an API token is required, either with --token or the {TOKEN_VARIABLE} environment variable')
+
+    if args.quiet:
+        logging.disable(logging.INFO)
+
+    try:
+        return args.fn(args)
+    except KeyboardInterrupt:
+        return 130
+    except Exception as e:
+        print(f'gwlandscape: error: {e}', file=sys.stderr)
+        return EXIT_ERROR
+    finally:
+        logging.disable(logging.NOTSET)
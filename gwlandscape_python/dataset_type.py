@@ -1,6 +1,8 @@
+from gwdc_python.files import FileReferenceList
 from gwdc_python.objects.base import GWDCObjectBase
 from gwdc_python.files.constants import GWDCObjectType
 
+from gwlandscape_python.records import DatasetRecord, _memoise
 from gwlandscape_python.utils import file_filters
 
 
@@ -24,14 +26,65 @@ class Dataset(GWDCObjectBase):
         'data': file_filters.data_filter
     }
 
+    # GWDCObjectBase does not define __slots__, but declaring every attribute here means the instance __dict__ is
+    # never populated, which keeps large dataset listings small
+    __slots__ = ('client', 'id', 'type', 'publication', 'model', '_file_list')
+
     def __init__(self, client, dataset_id, publication, model):
         super().__init__(client, dataset_id, GWDCObjectType.UPLOADED)
         self.publication = publication
         self.model = model
+        self._file_list = None
 
     def __repr__(self):
         return f'Dataset({self.publication} - {self.model})'
 
+    def get_full_file_list(self):
+        """Get information for all files associated with this Dataset. The file list is fetched once and cached,
+        until :meth:`invalidate_file_list` is called
+
+        Returns
+        -------
+        ~gwdc_python.files.file_reference.FileReferenceList
+            Contains FileReference instances for each of the files associated with this Dataset
+        """
+        if self._file_list is None:
+            self._file_list = super().get_full_file_list()
+        return FileReferenceList(self._file_list)
+
+    def has_cached_file_list(self):
+        """Whether the file list of this Dataset has been fetched and cached
+
+        Returns
+        -------
+        bool
+            True if :meth:`get_full_file_list` won't make a request
+        """
+        return self._file_list is not None
+
+    def invalidate_file_list(self):
+        """Discard the cached file list, so that it is fetched again by the next call to :meth:`get_full_file_list`"""
+        self._file_list = None
+
+    def detach(self, _memo=None):
+        """
+        Create a picklable record of this Dataset, its Publication and its Model that holds no reference to the client
+
+        Returns
+        -------
+        ~gwlandscape_python.records.DatasetRecord
+            Detached Dataset
+        """
+        return _memoise(
+            self,
+            _memo,
+            lambda: DatasetRecord(
+                id=self.id,
+                publication=self.publication.detach(_memo) if self.publication is not None else None,
+                model=self.model.detach(_memo) if self.model is not None else None,
+            )
+        )
+
     def update(self, publication=None, model=None):
         """
         Update a Dataset in the GWLandscape database
@@ -71,6 +124,8 @@ class Dataset(GWDCObjectBase):
             for key, val in inputs.items():
                 setattr(self, key, val)
 
+            self.client._notify_catalog_listeners('updated', self)
+
     def delete(self):
         """
         Remove this Dataset from the GWLandscape database
@@ -93,3 +148,6 @@ class Dataset(GWDCObjectBase):
         result = self.client.request(mutation, params)
 
         assert result['delete_compas_dataset_model']['result']
+
+        self.invalidate_file_list()
+        self.client._notify_catalog_listeners('deleted', self)
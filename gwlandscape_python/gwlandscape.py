@@ -1,20 +1,81 @@
+import json
+import threading
+import time
+import weakref
+from functools import partial
 from pathlib import Path
 
+import requests
 from gwdc_python import GWDC
-from gwdc_python.files import FileReference, FileReferenceList
+from gwdc_python.exceptions import GWDCUnknownException
 from gwdc_python.logger import create_logger
+from gwdc_python.utils import split_variables_dict
+from humps import camelize, decamelize
+from requests_toolbelt.multipart.encoder import MultipartEncoder
 
 import gwlandscape_python
-from gwlandscape_python.utils import mutually_exclusive, validate_dataset
-from gwlandscape_python.utils.file_download import _download_files, _get_file_map_fn, _save_file_map_fn
-from gwlandscape_python.settings import GWLANDSCAPE_ENDPOINT
+from gwlandscape_python import queries
+from gwlandscape_python.instrumentation import (
+    RequestEvent, RetryEvent, ValidationEvent, operation_name, request_size, response_size
+)
+from gwlandscape_python.utils import mutually_exclusive, validate_dataset, get_progress_sink
+from gwlandscape_python.utils.file_download import (
+    _download_files, _get_file_map_fn, _save_file_map_fn, CHUNK_SIZE, MAX_WORKERS
+)
+from gwlandscape_python.utils.manifest import ManifestWriter
+from gwlandscape_python.utils.rate_limit import get_token_bucket
+from gwlandscape_python.utils.retry import DEFAULT_RETRY
+from gwlandscape_python.utils.tar_member import open_remote_hdf5
+from gwlandscape_python.utils.sync import SyncReport, dataset_directory, _mirror_file_list, _plan_sync, _prune
+from gwlandscape_python.settings import GWLANDSCAPE_ENDPOINT, GWLANDSCAPE_FILE_DOWNLOAD_ENDPOINT
 
 logger = create_logger(__name__)
 
+# Number of datasets whose file lists are fetched by each query of GWLandscape.get_files_by_datasets
+FILE_LIST_BATCH_SIZE = 100
+
+
+class _GWDC(GWDC):
+    # GWDC, sending files without the tqdm bar that GWDC shows for them, as the progress of uploads is reported to the
+    # client's progress sink instead. Requests without files are sent by GWDC as usual
+
+    def _request(self, endpoint, query, variables=None, headers=None, method='POST'):
+        split_variables, files, files_map = split_variables_dict(camelize(variables or {}))
+        if not files:
+            return super()._request(endpoint, query, variables=variables, headers=headers, method=method)
+
+        # Files are sent with the GraphQL multipart request spec, streamed from disk rather than read into memory
+        encoder = MultipartEncoder({
+            'operations': json.dumps({
+                'query': query,
+                'variables': split_variables,
+                'operationName': query.replace('(', ' ').split()[1],
+            }),
+            'map': json.dumps(files_map),
+            **files,
+        })
+        response = requests.request(
+            method=method, url=endpoint, headers={**(headers or {}), 'Content-Type': encoder.content_type}, data=encoder
+        )
+
+        content = json.loads(response.content)
+        errors = content.get('errors', None)
+        if errors:
+            raise GWDCUnknownException(errors[0].get('message'), extensions=errors[0].get('extensions'))
+        return decamelize(content.get('data', None))
+
+
+def _request_args(args, kwargs):
+    # The query and variables from the arguments of GWDC.request, which may be passed by position or keyword
+    query = args[0] if args else kwargs['query']
+    variables = args[1] if len(args) > 1 else kwargs.get('variables')
+    return query, variables
+
 
 class GWLandscape:
     """
     GWLandscape class provides an API for interacting with COMPAS, allowing jobs to be submitted and acquired.
+    A single instance can be shared by many threads.
 
     Parameters
     ----------
@@ -22,6 +83,25 @@ class GWLandscape:
         API token for a GWDC user
     endpoint : str, optional
         URL to which we send the queries, by default GWLANDSCAPE_ENDPOINT
+    file_download_endpoint : str, optional
+        URL to which file download tokens are appended to download files, by default GWLANDSCAPE_FILE_DOWNLOAD_ENDPOINT
+    progress : ~gwlandscape_python.utils.progress.ProgressSink, str or callable, optional
+        How to report the progress of downloads and uploads, by default 'tqdm'. Can be a
+        :class:`~gwlandscape_python.utils.progress.ProgressSink`, one of 'tqdm', 'logging' or 'none', or a function
+        called with the number of bytes transferred and the total
+    retry : ~gwlandscape_python.utils.retry.RetryPolicy, optional
+        How to retry queries and file downloads that fail with transient errors, by default DEFAULT_RETRY. Mutations
+        are never retried, as they may have taken effect on the server. If None, nothing is retried
+    rate_limit : float or ~gwlandscape_python.utils.rate_limit.TokenBucket, optional
+        Maximum number of requests per second to the API, or a token bucket shared with other clients, threads or
+        processes, by default no limit
+    bandwidth_limit : float or ~gwlandscape_python.utils.rate_limit.TokenBucket, optional
+        Maximum number of bytes per second downloaded by all download threads together, or a token bucket shared with
+        other clients, threads or processes, by default no limit
+    max_workers : int, optional
+        Number of files downloaded at once, by default MAX_WORKERS
+    chunk_size : int, optional
+        Size in bytes of the chunks in which files are read from the file server, by default CHUNK_SIZE
 
     Attributes
     ----------
@@ -33,13 +113,47 @@ class GWLandscape:
         self,
         token="",
         endpoint=GWLANDSCAPE_ENDPOINT,
+        file_download_endpoint=GWLANDSCAPE_FILE_DOWNLOAD_ENDPOINT,
+        progress='tqdm',
+        retry=DEFAULT_RETRY,
+        rate_limit=None,
+        bandwidth_limit=None,
+        max_workers=MAX_WORKERS,
+        chunk_size=CHUNK_SIZE,
     ):
-        self.client = GWDC(
+        self.client = _GWDC(
             token=token,
             endpoint=endpoint,
         )
+        self._init_state(
+            self.client.request, file_download_endpoint, progress, retry, rate_limit, bandwidth_limit, max_workers,
+            chunk_size
+        )
+
+    def _init_state(self, send_request, file_download_endpoint, progress, retry, rate_limit, bandwidth_limit,
+                    max_workers, chunk_size):
+        # Sets up everything but the connection to the API, so that clients which answer queries some other way,
+        # such as OfflineGWLandscape, have the same state
+        self.file_download_endpoint = file_download_endpoint
+        self.progress = progress
+        self.retry = retry
+        self.rate_limit = get_token_bucket(rate_limit)
+        self.bandwidth_limit = get_token_bucket(bandwidth_limit)
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+
+        # Sends a single request, replaced with an instrumented version while there are event listeners
+        self._send_request = send_request
 
-        self.request = self.client.request  # Setting shorthand for simplicity
+        # Objects such as a PublicationIndex that are notified of changes made through this client
+        self._catalog_listeners = weakref.WeakSet()
+
+        # Callables that receive instrumentation events. Requests are only timed while there are listeners
+        self._event_listeners = ()
+
+        # Guards changes to the listeners, so that the client can be shared between threads. The event listeners are
+        # replaced rather than changed in place, so they can be read without holding the lock
+        self._listener_lock = threading.Lock()
 
     def create_keyword(self, tag):
         """
@@ -55,25 +169,7 @@ class GWLandscape:
         Keyword
             Created Keyword
         """
-        mutation = """
-            mutation AddKeywordMutation($input: AddKeywordMutationInput!) {
-                addKeyword(input: $input) {
-                    id
-                }
-            }
-        """
-
-        params = {
-            'input': {
-                'tag': tag
-            }
-        }
-
-        result = self.request(mutation, params)
-
-        assert 'id' in result['add_keyword']
-
-        return self.get_keywords(_id=result['add_keyword']['id'])[0]
+        return queries.run(self, queries.create_keyword(self, tag))
 
     @mutually_exclusive('exact', 'contains', '_id')
     def get_keywords(self, exact=None, contains=None, _id=None):
@@ -98,32 +194,7 @@ class GWLandscape:
         list
             A list of :class:`.Keyword` instances
         """
-
-        query = """
-            query ($exact: String, $contains: String, $id: ID) {
-                keywords (tag: $exact, tag_Icontains: $contains, id: $id) {
-                    edges {
-                        node {
-                            id
-                            tag
-                        }
-                    }
-                }
-            }
-        """
-
-        variables = {
-            'exact': exact,
-            'contains': contains,
-            'id': _id
-        }
-
-        result = self.request(query=query, variables=variables)
-
-        return [
-            gwlandscape_python.Keyword(client=self, **kw['node'])
-            for kw in result['keywords']['edges']
-        ]
+        return queries.run(self, queries.get_keywords(self, exact, contains, _id))
 
     def create_publication(
         self,
@@ -177,33 +248,7 @@ class GWLandscape:
         """
         inputs = {key: val for key, val in locals().items() if ((val is not None) and (key != 'self'))}
 
-        mutation = """
-            mutation AddPublicationMutation($input: AddPublicationMutationInput!) {
-                addPublication(input: $input) {
-                    id
-                }
-            }
-        """
-
-        # Handle keywords
-        if isinstance(keywords, list):
-            inputs['keywords'] = [
-                self.get_keywords(exact=keyword)[0].id if isinstance(keyword, str) else keyword.id
-                for keyword in keywords
-            ]
-            inputs['keywords'] = [keyword.id for keyword in keywords]
-
-        params = {
-            'input': {
-                **inputs
-            }
-        }
-
-        result = self.request(mutation, params)
-
-        assert 'id' in result['add_publication']
-
-        return self.get_publications(_id=result['add_publication']['id'])[0]
+        return queries.run(self, queries.create_publication(self, inputs))
 
     @mutually_exclusive('author | title', '_id')
     def get_publications(self, author=None, title=None, _id=None):
@@ -228,61 +273,7 @@ class GWLandscape:
         list
             A list of :class:`.Publication` instances
         """
-
-        query = """
-            query ($author: String, $title: String, $id: ID) {
-                compasPublications (
-                    author_Icontains: $author,
-                    title_Icontains: $title,
-                    id: $id
-                ) {
-                    edges {
-                        node {
-                            id
-                            author
-                            published
-                            title
-                            year
-                            journal
-                            journalDoi
-                            datasetDoi
-                            creationTime
-                            description
-                            public
-                            downloadLink
-                            arxivId
-                            keywords {
-                                edges {
-                                    node {
-                                        id
-                                        tag
-                                    }
-                                }
-                            }
-                        }
-                    }
-                }
-            }
-        """
-
-        variables = {
-            'author': author,
-            'title': title,
-            'id': _id
-        }
-
-        result = self.request(query=query, variables=variables)
-
-        # Handle keywords
-        for pub in result['compas_publications']['edges']:
-            pub['node']['keywords'] = [
-                gwlandscape_python.Keyword(client=self, **kw['node']) for kw in pub['node']['keywords']['edges']
-            ]
-
-        return [
-            gwlandscape_python.Publication(client=self, **kw['node'])
-            for kw in result['compas_publications']['edges']
-        ]
+        return queries.run(self, queries.get_publications(self, author, title, _id))
 
     def create_model(self, name, summary=None, description=None):
         """
@@ -304,25 +295,7 @@ class GWLandscape:
         """
         inputs = {key: val for key, val in locals().items() if ((val is not None) and (key != 'self'))}
 
-        mutation = """
-            mutation AddCompasModelMutation($input: AddCompasModelMutationInput!) {
-                addCompasModel(input: $input) {
-                    id
-                }
-            }
-        """
-
-        params = {
-            'input': {
-                **inputs
-            }
-        }
-
-        result = self.request(mutation, params)
-
-        assert 'id' in result['add_compas_model']
-
-        return self.get_models(_id=result['add_compas_model']['id'])[0]
+        return queries.run(self, queries.create_model(self, inputs))
 
     @mutually_exclusive('name | summary | description', '_id')
     def get_models(self, name=None, summary=None, description=None, _id=None):
@@ -349,42 +322,9 @@ class GWLandscape:
         list
             A list of :class:`.Model` instances
         """
+        return queries.run(self, queries.get_models(self, name, summary, description, _id))
 
-        query = """
-            query ($name: String, $summary: String, $description: String, $id: ID) {
-                compasModels (
-                    name_Icontains: $name,
-                    summary_Icontains: $summary,
-                    description_Icontains: $description,
-                    id: $id
-                ) {
-                    edges {
-                        node {
-                            id
-                            name
-                            summary
-                            description
-                        }
-                    }
-                }
-            }
-        """
-
-        variables = {
-            'name': name,
-            'summary': summary,
-            'description': description,
-            'id': _id
-        }
-
-        result = self.request(query=query, variables=variables)
-
-        return [
-            gwlandscape_python.Model(client=self, **kw['node'])
-            for kw in result['compas_models']['edges']
-        ]
-
-    def create_dataset(self, publication, model, datafile):
+    def create_dataset(self, publication, model, datafile, progress=None, optimise=False):
         """
         Creates a new dataset object with the specified publication and model.
         Datasets must contain exactly one hdf5 file, and should either be a hdf5 file
@@ -398,37 +338,21 @@ class GWLandscape:
             The model this dataset is for
         datafile : str or Path
             Local path to the COMPAS h5 file or tarfile
+        progress : ~gwlandscape_python.utils.progress.ProgressSink, str or callable, optional
+            How to report the progress of the upload, by default the client's progress setting
+        optimise : bool, optional
+            If True, upload a copy of the hdf5 file repacked for fast reads by
+            :func:`~gwlandscape_python.utils.optimise.optimise_dataset`, by default False. Tarfiles are uploaded as
+            they are
 
         Returns
         -------
         Dataset
             Created Dataset
         """
-        query = """
-            mutation UploadCompasDatasetModelMutation($input: UploadCompasDatasetModelMutationInput!) {
-                uploadCompasDatasetModel(input: $input) {
-                    id
-                }
-            }
-        """
-        file_path = Path(datafile)
-        validate_dataset(file_path)
-
-        with Path(datafile).open('rb') as f:
-            variables = {
-                'input': {
-                    "uploadToken": self._generate_compas_dataset_model_upload_token(),
-                    'compas_publication': publication.id,
-                    'compas_model': model.id,
-                    'jobFile': f
-                }
-            }
-
-            result = self.request(query=query, variables=variables, authorize=False)
-
-        assert 'id' in result['upload_compas_dataset_model']
-
-        return self.get_datasets(_id=result['upload_compas_dataset_model']['id'])[0]
+        return queries.run(
+            self, queries.create_dataset(self, publication, model, datafile, self._progress_sink(progress), optimise)
+        )
 
     @mutually_exclusive('publication | model', '_id')
     def get_datasets(self, publication=None, model=None, _id=None):
@@ -453,80 +377,182 @@ class GWLandscape:
         list
             A list of Dataset instances
         """
+        return queries.run(self, queries.get_datasets(self, publication, model, _id))
 
-        query = """
-            query ($publication: ID, $model: ID, $id: ID) {
-                compasDatasetModels (compasPublication: $publication, compasModel: $model, id: $id) {
-                    edges {
-                        node {
-                            id
-                            compasPublication {
-                                id
-                                author
-                                published
-                                title
-                                year
-                                journal
-                                journalDoi
-                                datasetDoi
-                                creationTime
-                                description
-                                public
-                                downloadLink
-                                arxivId
-                                keywords {
-                                    edges {
-                                        node {
-                                            id
-                                            tag
-                                        }
-                                    }
-                                }
-                            }
-                            compasModel {
-                                id
-                                name
-                                summary
-                                description
-                            }
-                        }
-                    }
-                }
-            }
+    def build_publication_index(self):
+        """Fetch all publications and build a local full-text index over their titles, authors, descriptions and
+        keywords. The index is kept up to date with publications created, updated or deleted through this client.
+
+        Returns
+        -------
+        ~gwlandscape_python.search.PublicationIndex
+            Index of all publications
         """
+        return gwlandscape_python.PublicationIndex(self.get_publications(), client=self)
 
-        variables = {
-            'publication': publication.id if publication else None,
-            'model': model.id if model else None,
-            'id': _id
-        }
-
-        result = self.request(query=query, variables=variables)
-
-        # Handle publication and model objects
-        for dataset in result['compas_dataset_models']['edges']:
-            # Handle publication keywords
-            dataset['node']['compas_publication']['keywords'] = [
-                gwlandscape_python.Keyword(client=self, **kw['node'])
-                for kw in dataset['node']['compas_publication']['keywords']['edges']
-            ]
-
-            dataset['node']['publication'] = gwlandscape_python.Publication(
-                client=self,
-                **dataset['node']['compas_publication']
-            )
-            dataset['node']['model'] = gwlandscape_python.Model(client=self, **dataset['node']['compas_model'])
+    def build_catalog_index(self, include_files=False):
+        """Fetch all publications, models and datasets and build a local index of the relationships between them,
+        so that questions such as "all datasets for publications with keyword X that use model Y" can be answered
+        without further queries. The index is kept up to date with objects created, updated or deleted through
+        this client.
+
+        Parameters
+        ----------
+        include_files : bool, optional
+            Also fetch the file list of every dataset, by default False
+
+        Returns
+        -------
+        ~gwlandscape_python.catalog.CatalogIndex
+            Index of the catalog
+        """
+        datasets = self.get_datasets()
+        files = dict(zip([dataset.id for dataset in datasets], self.get_files_by_datasets(datasets))) \
+            if include_files else None
+
+        return gwlandscape_python.CatalogIndex(
+            publications=self.get_publications(),
+            models=self.get_models(),
+            datasets=datasets,
+            files=files,
+            client=self
+        )
+
+    def snapshot(self, path):
+        """Save the full catalog of keywords, publications, models, datasets and dataset file lists to a local SQLite
+        file, which can be refreshed with :meth:`~.CatalogSnapshot.refresh` and read without connecting to the
+        server using :class:`~.OfflineGWLandscape`
+
+        Parameters
+        ----------
+        path : str or ~pathlib.Path
+            Path to the SQLite file, which will be overwritten if it already exists
+
+        Returns
+        -------
+        ~gwlandscape_python.snapshot.CatalogSnapshot
+            The created snapshot
+        """
+        snapshot = gwlandscape_python.CatalogSnapshot(path)
+        snapshot.update(self)
+        return snapshot
+
+    def add_event_listener(self, listener):
+        """Register a callable to receive instrumentation events, such as an :class:`~.EventAggregator`.
+        The listener is called with a :class:`~.RequestEvent` after each request to the API, a :class:`~.FileEvent`
+        after each file download, a :class:`~.RetryEvent` before each retry and a :class:`~.ValidationEvent` after a
+        dataset file is validated. File events are emitted from the download threads.
+
+        Parameters
+        ----------
+        listener : callable
+            Called with each event
+        """
+        with self._listener_lock:
+            if not self._event_listeners:
+                self._uninstrumented_request = self._send_request
+                self._send_request = self._instrumented_request
+            self._event_listeners = self._event_listeners + (listener,)
 
-            # Delete the compas_ fields - we don't need them anymore
-            del dataset['node']['compas_publication']
-            del dataset['node']['compas_model']
+    def remove_event_listener(self, listener):
+        """Stop sending instrumentation events to a listener registered with :meth:`add_event_listener`
+
+        Parameters
+        ----------
+        listener : callable
+            The listener to remove
+        """
+        with self._listener_lock:
+            if not self._event_listeners:
+                return
+            self._event_listeners = tuple(
+                registered for registered in self._event_listeners if registered != listener
+            )
+            if not self._event_listeners:
+                self._send_request = self._uninstrumented_request
 
-            dataset['node']['dataset_id'] = dataset['node'].pop('id')
+    def request(self, *args, **kwargs):
+        """Send a query or mutation to the GWLandscape API, retrying queries that fail with transient errors according
+        to the client's retry policy, and waiting as needed to stay within the client's rate limit. Takes the same
+        arguments as :meth:`gwdc_python.gwdc.GWDC.request`.
 
-        return [
-            gwlandscape_python.dataset_type.Dataset(client=self, **kw['node'])
-            for kw in result['compas_dataset_models']['edges']
-        ]
+        Returns
+        -------
+        dict
+            The response data
+        """
+        query = _request_args(args, kwargs)[0]
+
+        def _send():
+            if self.rate_limit is not None:
+                self.rate_limit.acquire()
+            return self._send_request(*args, **kwargs)
+
+        if self.retry is None or query.lstrip().startswith('mutation'):
+            return _send()
+
+        return self.retry.run(_send, on_retry=partial(self._on_request_retry, operation_name(query)))
+
+    def _on_request_retry(self, operation, attempt, delay, error):
+        logger.warning(f'Request {operation} failed ({error}), retrying in {delay:.1f}s')
+        if self._event_listeners:
+            self._emit(RetryEvent(operation=operation, attempt=attempt, delay=delay, error=error))
+
+    def _emit(self, event):
+        for listener in self._event_listeners:
+            listener(event)
+
+    def _instrumented_request(self, *args, **kwargs):
+        query, variables = _request_args(args, kwargs)
+        start = time.perf_counter()
+        result = error = None
+        try:
+            result = self._uninstrumented_request(*args, **kwargs)
+            return result
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._emit(RequestEvent(
+                operation=operation_name(query),
+                duration=time.perf_counter() - start,
+                request_bytes=request_size(query, variables),
+                response_bytes=response_size(result),
+                error=error,
+            ))
+
+    def _progress_sink(self, progress):
+        return get_progress_sink(self.progress if progress is None else progress)
+
+    def _validate_dataset(self, file_path):
+        if not self._event_listeners:
+            return validate_dataset(file_path)
+
+        start = time.perf_counter()
+        error = None
+        try:
+            validate_dataset(file_path)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._emit(ValidationEvent(path=file_path, duration=time.perf_counter() - start, error=error))
+
+    def _add_catalog_listener(self, listener):
+        with self._listener_lock:
+            self._catalog_listeners.add(listener)
+
+    def _notify_catalog_listeners(self, action, obj):
+        with self._listener_lock:
+            listeners = list(self._catalog_listeners)
+        for listener in listeners:
+            listener.catalog_changed(action, obj)
+
+    def _intern(self, instances, object_type, data):
+        # Returns the instance already created for this id, or creates it
+        if data['id'] not in instances:
+            instances[data['id']] = object_type(client=self, **data)
+        return instances[data['id']]
 
     def _generate_compas_dataset_model_upload_token(self):
         """Creates a new long lived upload token for use uploading compas publications
@@ -536,48 +562,47 @@ class GWLandscape:
         str
             The upload token
         """
-        query = """
-            query GenerateCompasDatasetModelUploadToken {
-                generateCompasDatasetModelUploadToken {
-                  token
-                }
-            }
-        """
-
-        data = self.request(query=query)
-        return data['generate_compas_dataset_model_upload_token']['token']
+        return queries.run(self, queries.generate_upload_token(self))
 
     def _get_files_by_dataset(self, dataset):
-        query = """
-            query ($id: ID!) {
-                compasDatasetModel (id: $id) {
-                    files {
-                        path
-                        fileSize
-                        downloadToken
-                    }
-                }
-            }
-        """
+        return queries.run(self, queries.get_files_by_dataset(self, dataset))
 
-        variables = {
-            "id": dataset.id
-        }
+    def get_files_by_datasets(self, datasets, batch_size=FILE_LIST_BATCH_SIZE):
+        """Get the file lists of many datasets, with a single query for each batch of datasets rather than one query
+        for each dataset. The file lists are cached on the datasets, so that later calls to
+        :meth:`~.Dataset.get_full_file_list` don't make any requests, and only datasets without a cached file list
+        are fetched.
 
-        data = self.request(query=query, variables=variables)
+        Parameters
+        ----------
+        datasets : list
+            The :class:`~.Dataset` instances for which to get the file lists
+        batch_size : int, optional
+            Maximum number of datasets for which to get the file lists in one query, by default FILE_LIST_BATCH_SIZE
 
-        file_list = FileReferenceList()
-        for file_data in data['compas_dataset_model']['files']:
-            file_list.append(
-                FileReference(
-                    **file_data,
-                    parent=dataset
-                ),
-            )
+        Returns
+        -------
+        list
+            A :class:`~gwdc_python.files.file_reference.FileReferenceList` for each dataset, in the same order
+
+        Raises
+        ------
+        ValueError
+            If the server returns no result for a dataset, such as one that has been deleted. No file list is cached
+            for any dataset in the same batch
+        """
+        missing = [dataset for dataset in datasets if not dataset.has_cached_file_list()]
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            for dataset, file_list in zip(batch, self._get_files_by_dataset_batch(batch)):
+                dataset._file_list = file_list
+
+        return [dataset.get_full_file_list() for dataset in datasets]
 
-        return file_list
+    def _get_files_by_dataset_batch(self, datasets):
+        return queries.run(self, queries.get_files_by_dataset_batch(self, datasets))
 
-    def get_files_by_reference(self, file_references):
+    def get_files_by_reference(self, file_references, progress=None, retry=None):
         """Obtains file data when provided a :class:`~gwdc_python.files.file_reference.FileReferenceList`
 
         Parameters
@@ -585,20 +610,38 @@ class GWLandscape:
         file_references : ~gwdc_python.files.file_reference.FileReferenceList
             Contains the :class:`~gwdc_python.files.file_reference.FileReference` objects for which
             to download the contents
+        progress : ~gwlandscape_python.utils.progress.ProgressSink, str or callable, optional
+            How to report the progress of the downloads, by default the client's progress setting
+        retry : ~gwlandscape_python.utils.retry.RetryPolicy, optional
+            How to retry downloads that fail with transient errors, by default the client's retry policy
 
         Returns
         -------
-        list
-            List of tuples containing the file path and file contents as a byte string
+        ~gwlandscape_python.utils.file_download.DownloadReport
+            List of tuples containing the file path and file contents as a byte string. Files that could not be
+            downloaded are listed in its :attr:`~.DownloadReport.failed` attribute
         """
-        files = _download_files(_get_file_map_fn, file_references)
+        files = _download_files(
+            _get_file_map_fn,
+            file_references,
+            download_endpoint=self.file_download_endpoint,
+            emit=self._emit if self._event_listeners else None,
+            progress=self._progress_sink(progress),
+            retry=self.retry if retry is None else retry,
+            bandwidth=self.bandwidth_limit,
+            max_workers=self.max_workers,
+            chunk_size=self.chunk_size
+        )
 
-        logger.info(f'All {len(file_references)} files downloaded!')
+        self._log_download_report(files, 'downloaded')
 
         return files
 
-    def save_files_by_reference(self, file_references, root_path):
-        """Save files when provided a :class:`~gwdc_python.files.file_reference.FileReferenceList` and a root path
+    def save_files_by_reference(self, file_references, root_path, progress=None, retry=None, resume=False,
+                                extract=False):
+        """Save files when provided a :class:`~gwdc_python.files.file_reference.FileReferenceList` and a root path.
+        The size of each file is checked as it is saved, and its size and checksum are added to a manifest in the root
+        directory, which can be used to check the files later with :func:`~gwlandscape_python.utils.manifest.verify`
 
         Parameters
         ----------
@@ -607,9 +650,148 @@ class GWLandscape:
             to save the associated files
         root_path : str or ~pathlib.Path
             Directory into which to save the files
-        preserve_directory_structure : bool, optional
-            Remove any directory structure for the downloaded files, by default True
+        progress : ~gwlandscape_python.utils.progress.ProgressSink, str or callable, optional
+            How to report the progress of the downloads, by default the client's progress setting
+        retry : ~gwlandscape_python.utils.retry.RetryPolicy, optional
+            How to retry downloads that fail with transient errors, by default the client's retry policy
+        resume : bool, optional
+            If True, files that have already been saved with the right size are not downloaded again, and files whose
+            download failed part way through are kept with a ``.part`` suffix and continued from where they stopped
+            by the next call, by default False
+        extract : bool, optional
+            If True, the HDF5 file is extracted from each tarball as it is downloaded, and saved in place of the
+            tarball, which is never written to disk. Tarballs are recognised by their names, by default False. When
+            resuming, tarballs whose HDF5 file is recorded in the manifest as extracted from a tarball of the same
+            path and size are not downloaded again, but extractions that failed part way through start again
+
+        Returns
+        -------
+        ~gwlandscape_python.utils.file_download.DownloadReport
+            List of the paths of the saved files. Files that could not be downloaded are listed in its
+            :attr:`~.DownloadReport.failed` attribute
+        """
+        manifest = ManifestWriter(root_path)
+        files = _download_files(
+            _save_file_map_fn,
+            file_references,
+            root_path,
+            download_endpoint=self.file_download_endpoint,
+            emit=self._emit if self._event_listeners else None,
+            progress=self._progress_sink(progress),
+            retry=self.retry if retry is None else retry,
+            bandwidth=self.bandwidth_limit,
+            max_workers=self.max_workers,
+            chunk_size=self.chunk_size,
+            manifest=manifest,
+            resume=resume,
+            extract=extract
+        )
+        manifest.write()
+
+        self._log_download_report(files, 'saved')
+
+        return files
+
+    def open_hdf5(self, file_reference):
+        """Open a HDF5 file on the file server with ``h5py``, without downloading it. Only the parts of the file that
+        are read are fetched, with range requests. If the file is an uncompressed tarball, the HDF5 file inside it is
+        opened in place.
+
+        Parameters
+        ----------
+        file_reference : ~gwdc_python.files.file_reference.FileReference
+            The HDF5 file, or uncompressed tarball containing it
+
+        Returns
+        -------
+        h5py.File
+            The HDF5 file, opened read-only
         """
-        _download_files(_save_file_map_fn, file_references, root_path)
+        return open_remote_hdf5(
+            self.file_download_endpoint + str(file_reference.download_token),
+            file_reference.file_size,
+            tarball=str(file_reference.path).lower().endswith('.tar'),
+            retry=self.retry
+        )
 
-        logger.info(f'All {len(file_references)} files saved!')
+    def sync(self, datasets, root_path, prune=False, progress=None, retry=None, resume=False):
+        """Keep a local mirror of the files of some datasets up to date, downloading only the files that are new or
+        whose size has changed since the last sync. The files of each dataset are saved to a directory named after
+        the dataset id, in the root directory.
+
+        Parameters
+        ----------
+        datasets : Dataset, Publication or list
+            The datasets to mirror. The datasets of any publications are mirrored
+        root_path : str or ~pathlib.Path
+            Directory holding the mirror
+        prune : bool, optional
+            If True, delete local files that are no longer part of their dataset, by default False
+        progress : ~gwlandscape_python.utils.progress.ProgressSink, str or callable, optional
+            How to report the progress of the downloads, by default the client's progress setting
+        retry : ~gwlandscape_python.utils.retry.RetryPolicy, optional
+            How to retry downloads that fail with transient errors, by default the client's retry policy
+        resume : bool, optional
+            If True, downloads that fail part way through are continued from where they stopped by the next sync, as
+            for :meth:`save_files_by_reference`, by default False
+
+        Returns
+        -------
+        ~gwlandscape_python.utils.sync.SyncReport
+            The files that were downloaded, skipped and pruned, and the bytes downloaded and saved
+        """
+        root_path = Path(root_path)
+        datasets = self._sync_datasets(datasets)
+        file_list = _mirror_file_list(datasets, self.get_files_by_datasets(datasets))
+
+        changed, skipped = _plan_sync(file_list, root_path)
+        report = SyncReport(
+            skipped=[file_ref.path for file_ref in skipped],
+            bytes_downloaded=changed.get_total_bytes(),
+            bytes_saved=sum(file_ref.file_size for file_ref in skipped),
+        )
+
+        if changed:
+            report.downloaded = self.save_files_by_reference(
+                changed, root_path, progress=progress, retry=retry, resume=resume
+            )
+            report.bytes_downloaded -= sum(file_ref.file_size for file_ref, _ in report.downloaded.failed)
+
+        if prune:
+            report.pruned = _prune(
+                root_path,
+                [dataset_directory(dataset) for dataset in datasets],
+                set(file_list.get_paths())
+            )
+            manifest = ManifestWriter(root_path)
+            for path in report.pruned:
+                manifest.remove(path)
+            manifest.write()
+
+        logger.info(
+            f'Synced {len(datasets)} datasets: {len(report.downloaded)} files downloaded, {len(report.skipped)} '
+            f'up to date, {len(report.pruned)} pruned'
+        )
+        return report
+
+    def _sync_datasets(self, datasets):
+        # Expands publications into their datasets, removing duplicates
+        if isinstance(datasets, (gwlandscape_python.Dataset, gwlandscape_python.Publication)):
+            datasets = [datasets]
+
+        unique = {}
+        for obj in datasets:
+            if isinstance(obj, gwlandscape_python.Publication):
+                unique.update((dataset.id, dataset) for dataset in self.get_datasets(publication=obj))
+            else:
+                unique[obj.id] = obj
+        return list(unique.values())
+
+    def _log_download_report(self, report, action):
+        if report.ok:
+            logger.info(f'All {len(report)} files {action}!')
+        else:
+            logger.warning(
+                f'{len(report.failed)} of {len(report) + len(report.failed)} files could not be {action}: '
+                + ', '.join(f'{file_ref.path} ({error})' for file_ref, error in report.failed)
+            )
@@ -0,0 +1,254 @@
+import io
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, fields
+from pathlib import Path
+
+OPERATION_PATTERN = re.compile(r'\{\s*(\w+)')
+
+
+@dataclass(frozen=True)
+class RequestEvent:
+    """Emitted after each request to the GraphQL API
+
+    Attributes
+    ----------
+    operation : str
+        Name of the top-level field that was queried or mutated, such as 'compasDatasetModels'
+    duration : float
+        Time taken by the request in seconds
+    request_bytes : int
+        Approximate size of the request payload in bytes, including any uploaded files
+    response_bytes : int
+        Approximate size of the response data in bytes
+    error : Exception or None
+        The exception raised by the request, if it failed
+    """
+    kind = 'request'
+
+    operation: str
+    duration: float
+    request_bytes: int
+    response_bytes: int
+    error: Exception = None
+
+
+@dataclass(frozen=True)
+class FileEvent:
+    """Emitted after each file is downloaded
+
+    Attributes
+    ----------
+    path : ~pathlib.Path
+        Path of the file within its dataset
+    duration : float
+        Time taken to download the file in seconds
+    time_to_first_byte : float or None
+        Time between starting the request and receiving the first chunk of the file in seconds, or None if no data
+        was received
+    size : int
+        Number of bytes received
+    error : Exception or None
+        The exception raised by the download, if it failed
+    """
+    kind = 'file'
+
+    path: Path
+    duration: float
+    time_to_first_byte: float
+    size: int
+    error: Exception = None
+
+    @property
+    def throughput(self):
+        """Bytes received per second"""
+        return self.size / self.duration if self.duration else 0.0
+
+
+@dataclass(frozen=True)
+class RetryEvent:
+    """Emitted when a failed request or download is about to be retried
+
+    Attributes
+    ----------
+    operation : str
+        The request operation, or the path of the file being downloaded
+    attempt : int
+        Number of the attempt that failed, starting from 1
+    delay : float
+        Time waited before the next attempt in seconds
+    error : Exception
+        The exception raised by the failed attempt
+    """
+    kind = 'retry'
+
+    operation: str
+    attempt: int
+    delay: float
+    error: Exception = None
+
+
+@dataclass(frozen=True)
+class ValidationEvent:
+    """Emitted after a dataset file is validated before upload
+
+    Attributes
+    ----------
+    path : ~pathlib.Path
+        Path of the validated file
+    duration : float
+        Time taken to validate the file in seconds
+    error : Exception or None
+        The exception raised if the file was invalid
+    """
+    kind = 'validation'
+
+    path: Path
+    duration: float
+    error: Exception = None
+
+
+def _percentile(values, q):
+    # Linear interpolation between the closest ranks of sorted values
+    position = (len(values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+class EventAggregator:
+    """
+    Collects instrumentation events in memory and summarises them. Instances are callable, so can be registered
+    directly with :meth:`~.GWLandscape.add_event_listener`, and are safe to use from multiple threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Discard all collected events"""
+        with self._lock:
+            self._counts = defaultdict(int)
+            self._errors = defaultdict(int)
+            self._values = defaultdict(lambda: defaultdict(list))
+
+    def __call__(self, event):
+        measurements = {
+            field.name: getattr(event, field.name) for field in fields(event)
+            if field.type in (int, float) and getattr(event, field.name) is not None
+        }
+        if isinstance(event, FileEvent):
+            measurements['throughput'] = event.throughput
+
+        with self._lock:
+            self._counts[event.kind] += 1
+            self._errors[event.kind] += event.error is not None
+            for name, value in measurements.items():
+                self._values[event.kind][name].append(value)
+
+    def summary(self, percentiles=(50, 95, 99)):
+        """Summarise the collected events
+
+        Parameters
+        ----------
+        percentiles : tuple, optional
+            Percentiles to calculate for each measurement, by default (50, 95, 99)
+
+        Returns
+        -------
+        dict
+            For each kind of event ('request', 'file', 'retry' and 'validation'), the number of events, the number of
+            errors, and the total, mean, maximum and percentiles of each measurement, such as
+            ``summary['request']['duration']['p95']``
+        """
+        with self._lock:
+            summary = {}
+            for kind, count in self._counts.items():
+                summary[kind] = {'count': count, 'errors': self._errors[kind]}
+                for name, values in self._values[kind].items():
+                    values = sorted(values)
+                    summary[kind][name] = {
+                        'total': sum(values),
+                        'mean': sum(values) / len(values),
+                        'max': values[-1],
+                        **{f'p{q}': _percentile(values, q) for q in percentiles},
+                    }
+            return summary
+
+
+def operation_name(query):
+    """Name of the first top-level field in a GraphQL query"""
+    match = OPERATION_PATTERN.search(query)
+    return match.group(1) if match else ''
+
+
+def request_size(query, variables):
+    """Approximate size of a request payload in bytes, counting the size of any file objects in the variables"""
+    file_bytes = 0
+
+    def _default(obj):
+        nonlocal file_bytes
+        if isinstance(obj, io.IOBase):
+            file_bytes += os.fstat(obj.fileno()).st_size
+            return None
+        return str(obj)
+
+    payload = json.dumps({'query': query, 'variables': variables}, default=_default)
+    return len(payload.encode()) + file_bytes
+
+
+def response_size(data):
+    """Approximate size of response data in bytes"""
+    return len(json.dumps(data, default=str).encode()) if data is not None else 0
+
+
+def _ignore(n_bytes):
+    pass
+
+
+@contextmanager
+def file_timer(file_ref, emit):
+    """Time the download of a file, emitting a :class:`FileEvent` once it completes or fails. Yields a function to
+    be called with the size of each chunk as it is received. Does nothing if emit is None.
+
+    Parameters
+    ----------
+    file_ref : ~gwdc_python.files.file_reference.FileReference
+        The file being downloaded
+    emit : callable or None
+        Called with the event
+    """
+    if emit is None:
+        yield _ignore
+        return
+
+    start = time.perf_counter()
+    first_byte = None
+    size = 0
+
+    def _received(n_bytes):
+        nonlocal first_byte, size
+        if first_byte is None:
+            first_byte = time.perf_counter()
+        size += n_bytes
+
+    error = None
+    try:
+        yield _received
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        emit(FileEvent(
+            path=file_ref.path,
+            duration=time.perf_counter() - start,
+            time_to_first_byte=first_byte - start if first_byte is not None else None,
+            size=size,
+            error=error,
+        ))
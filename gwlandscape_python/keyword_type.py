@@ -1,8 +1,11 @@
 from dataclasses import dataclass, field
 
 import gwlandscape_python
+from gwlandscape_python.records import KeywordRecord, _memoise
+from gwlandscape_python.utils import dataclass_slots
 
 
+@dataclass_slots
 @dataclass
 class Keyword:
     client: gwlandscape_python.gwlandscape.GWLandscape = field(compare=False)
@@ -12,6 +15,17 @@ class Keyword:
     def __repr__(self):
         return f'Keyword("{self.tag}")'
 
+    def detach(self, _memo=None):
+        """
+        Create a picklable record of this Keyword that holds no reference to the client
+
+        Returns
+        -------
+        ~gwlandscape_python.records.KeywordRecord
+            Detached Keyword
+        """
+        return _memoise(self, _memo, lambda: KeywordRecord(id=self.id, tag=self.tag))
+
     def update(self, tag=None):
         """
         Update this Keyword in the GWLandscape database
@@ -46,6 +60,7 @@ class Keyword:
 
         if result['update_keyword']['result']:
             self.tag = tag if tag is not None else self.tag
+            self.client._notify_catalog_listeners('updated', self)
 
     def delete(self):
         """
@@ -69,3 +84,5 @@ class Keyword:
         result = self.client.request(mutation, params)
 
         assert result['delete_keyword']['result']
+
+        self.client._notify_catalog_listeners('deleted', self)
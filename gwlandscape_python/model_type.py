@@ -1,8 +1,11 @@
 from dataclasses import dataclass, field
 
 import gwlandscape_python
+from gwlandscape_python.records import ModelRecord, _memoise
+from gwlandscape_python.utils import dataclass_slots
 
 
+@dataclass_slots
 @dataclass
 class Model:
     client: gwlandscape_python.gwlandscape.GWLandscape = field(compare=False)
@@ -14,6 +17,21 @@ class Model:
     def __repr__(self):
         return f'Model("{self.name}")'
 
+    def detach(self, _memo=None):
+        """
+        Create a picklable record of this Model that holds no reference to the client
+
+        Returns
+        -------
+        ~gwlandscape_python.records.ModelRecord
+            Detached Model
+        """
+        return _memoise(
+            self,
+            _memo,
+            lambda: ModelRecord(id=self.id, name=self.name, summary=self.summary, description=self.description)
+        )
+
     def update(self, name=None, summary=None, description=None):
         """
         Update this Model in the GWLandscape database
@@ -50,6 +68,8 @@ class Model:
             for key, val in inputs.items():
                 setattr(self, key, val)
 
+            self.client._notify_catalog_listeners('updated', self)
+
     def delete(self):
         """
         Remove this Model from the GWLandscape database
@@ -72,3 +92,5 @@ class Model:
         result = self.client.request(mutation, params)
 
         assert result['delete_compas_model']['result']
+
+        self.client._notify_catalog_listeners('deleted', self)
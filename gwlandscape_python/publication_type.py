@@ -1,8 +1,11 @@
 from dataclasses import dataclass, field
 
 import gwlandscape_python
+from gwlandscape_python.records import PublicationRecord, _memoise
+from gwlandscape_python.utils import dataclass_slots
 
 
+@dataclass_slots
 @dataclass
 class Publication:
     client: gwlandscape_python.gwlandscape.GWLandscape = field(compare=False)
@@ -24,6 +27,22 @@ class Publication:
     def __repr__(self):
         return f'Publication("{self.title}")'
 
+    def detach(self, _memo=None):
+        """
+        Create a picklable record of this Publication and its Keywords that holds no reference to the client
+
+        Returns
+        -------
+        ~gwlandscape_python.records.PublicationRecord
+            Detached Publication
+        """
+        def _create():
+            values = {name: getattr(self, name) for name in PublicationRecord.__slots__}
+            values['keywords'] = tuple(keyword.detach(_memo) for keyword in self.keywords)
+            return PublicationRecord(**values)
+
+        return _memoise(self, _memo, _create)
+
     def update(
         self,
         author=None,
@@ -108,6 +127,8 @@ class Publication:
             if keywords:
                 self.keywords = keywords
 
+            self.client._notify_catalog_listeners('updated', self)
+
     def delete(self):
         """
         Remove this Publication from the GWLandscape database
@@ -130,3 +151,5 @@ class Publication:
         result = self.client.request(mutation, params)
 
         assert result['delete_publication']['result']
+
+        self.client._notify_catalog_listeners('deleted', self)
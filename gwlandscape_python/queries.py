@@ -0,0 +1,515 @@
+"""The queries and mutations sent to the GWLandscape API, and the handling of their results, shared by
+:class:`~.GWLandscape` and :class:`~.AsyncGWLandscape`.
+
+Each operation is a generator which yields the arguments of each request it needs to make, is sent the result of
+that request, and finally returns its result. This keeps the operations independent of how the requests are made,
+so that the synchronous and asynchronous clients only differ in how they drive them, with :func:`run` and
+:func:`run_async` respectively.
+"""
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from gwdc_python.files import FileReference, FileReferenceList
+
+import gwlandscape_python
+from gwlandscape_python.utils.extract import HDF5_SUFFIXES
+from gwlandscape_python.utils.progress import ProgressReader, progress_counter
+
+KEYWORDS_QUERY = """
+    query ($exact: String, $contains: String, $id: ID) {
+        keywords (tag: $exact, tag_Icontains: $contains, id: $id) {
+            edges {
+                node {
+                    id
+                    tag
+                }
+            }
+        }
+    }
+"""
+
+ADD_KEYWORD_MUTATION = """
+    mutation AddKeywordMutation($input: AddKeywordMutationInput!) {
+        addKeyword(input: $input) {
+            id
+        }
+    }
+"""
+
+PUBLICATIONS_QUERY = """
+    query ($author: String, $title: String, $id: ID) {
+        compasPublications (
+            author_Icontains: $author,
+            title_Icontains: $title,
+            id: $id
+        ) {
+            edges {
+                node {
+                    id
+                    author
+                    published
+                    title
+                    year
+                    journal
+                    journalDoi
+                    datasetDoi
+                    creationTime
+                    description
+                    public
+                    downloadLink
+                    arxivId
+                    keywords {
+                        edges {
+                            node {
+                                id
+                                tag
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    }
+"""
+
+ADD_PUBLICATION_MUTATION = """
+    mutation AddPublicationMutation($input: AddPublicationMutationInput!) {
+        addPublication(input: $input) {
+            id
+        }
+    }
+"""
+
+MODELS_QUERY = """
+    query ($name: String, $summary: String, $description: String, $id: ID) {
+        compasModels (
+            name_Icontains: $name,
+            summary_Icontains: $summary,
+            description_Icontains: $description,
+            id: $id
+        ) {
+            edges {
+                node {
+                    id
+                    name
+                    summary
+                    description
+                }
+            }
+        }
+    }
+"""
+
+ADD_MODEL_MUTATION = """
+    mutation AddCompasModelMutation($input: AddCompasModelMutationInput!) {
+        addCompasModel(input: $input) {
+            id
+        }
+    }
+"""
+
+DATASETS_QUERY = """
+    query ($publication: ID, $model: ID, $id: ID) {
+        compasDatasetModels (compasPublication: $publication, compasModel: $model, id: $id) {
+            edges {
+                node {
+                    id
+                    compasPublication {
+                        id
+                        author
+                        published
+                        title
+                        year
+                        journal
+                        journalDoi
+                        datasetDoi
+                        creationTime
+                        description
+                        public
+                        downloadLink
+                        arxivId
+                        keywords {
+                            edges {
+                                node {
+                                    id
+                                    tag
+                                }
+                            }
+                        }
+                    }
+                    compasModel {
+                        id
+                        name
+                        summary
+                        description
+                    }
+                }
+            }
+        }
+    }
+"""
+
+UPLOAD_DATASET_MUTATION = """
+    mutation UploadCompasDatasetModelMutation($input: UploadCompasDatasetModelMutationInput!) {
+        uploadCompasDatasetModel(input: $input) {
+            id
+        }
+    }
+"""
+
+UPLOAD_TOKEN_QUERY = """
+    query GenerateCompasDatasetModelUploadToken {
+        generateCompasDatasetModelUploadToken {
+          token
+        }
+    }
+"""
+
+DATASET_FILES_QUERY = """
+    query ($id: ID!) {
+        compasDatasetModel (id: $id) {
+            files {
+                path
+                fileSize
+                downloadToken
+            }
+        }
+    }
+"""
+
+
+def files_by_datasets_query(n_datasets):
+    """A query for the file lists of several datasets, with each dataset's result under the alias dataset<i>
+
+    Parameters
+    ----------
+    n_datasets : int
+        Number of datasets
+
+    Returns
+    -------
+    str
+        The query, taking the dataset ids as the variables id<i>
+    """
+    variables = ', '.join(f'$id{i}: ID!' for i in range(n_datasets))
+    fields = '\n'.join(
+        f"""
+        dataset{i}: compasDatasetModel (id: $id{i}) {{
+            files {{
+                path
+                fileSize
+                downloadToken
+            }}
+        }}"""
+        for i in range(n_datasets)
+    )
+    return f"""
+    query ({variables}) {{{fields}
+    }}
+"""
+
+
+def _call(*args, **kwargs):
+    # The arguments of a request, as passed to GWLandscape.request
+    return args, kwargs
+
+
+def run(client, operation):
+    """Run an operation, making each of its requests with :meth:`~.GWLandscape.request`
+
+    Parameters
+    ----------
+    client : ~gwlandscape_python.gwlandscape.GWLandscape
+        The client
+    operation : generator
+        The operation
+
+    Returns
+    -------
+    object
+        The result of the operation
+    """
+    try:
+        args, kwargs = next(operation)
+        while True:
+            try:
+                result = client.request(*args, **kwargs)
+            except Exception as e:
+                # Raised inside the operation, so that it can handle the error or clean up
+                args, kwargs = operation.throw(e)
+            else:
+                args, kwargs = operation.send(result)
+    except StopIteration as e:
+        return e.value
+    finally:
+        operation.close()
+
+
+async def run_async(client, operation):
+    """Run an operation, awaiting each of its requests with :meth:`~.AsyncGWLandscape.request`
+
+    Parameters
+    ----------
+    client : ~gwlandscape_python.async_gwlandscape.AsyncGWLandscape
+        The client
+    operation : generator
+        The operation
+
+    Returns
+    -------
+    object
+        The result of the operation
+    """
+    try:
+        args, kwargs = next(operation)
+        while True:
+            try:
+                result = await client.request(*args, **kwargs)
+            except Exception as e:
+                # Raised inside the operation, so that it can handle the error or clean up
+                args, kwargs = operation.throw(e)
+            else:
+                args, kwargs = operation.send(result)
+    except StopIteration as e:
+        return e.value
+    finally:
+        operation.close()
+
+
+def create_keyword(client, tag):
+    params = {
+        'input': {
+            'tag': tag
+        }
+    }
+
+    result = yield _call(ADD_KEYWORD_MUTATION, params)
+
+    assert 'id' in result['add_keyword']
+
+    keyword = (yield from get_keywords(client, _id=result['add_keyword']['id']))[0]
+    client._notify_catalog_listeners('created', keyword)
+    return keyword
+
+
+def get_keywords(client, exact=None, contains=None, _id=None):
+    variables = {
+        'exact': exact,
+        'contains': contains,
+        'id': _id
+    }
+
+    result = yield _call(query=KEYWORDS_QUERY, variables=variables)
+
+    return [
+        gwlandscape_python.Keyword(client=client, **kw['node'])
+        for kw in result['keywords']['edges']
+    ]
+
+
+def create_publication(client, inputs):
+    # Handle keywords
+    keywords = inputs.get('keywords')
+    if isinstance(keywords, list):
+        inputs['keywords'] = []
+        for keyword in keywords:
+            if isinstance(keyword, str):
+                keyword = (yield from get_keywords(client, exact=keyword))[0]
+            inputs['keywords'].append(keyword.id)
+
+    params = {
+        'input': {
+            **inputs
+        }
+    }
+
+    result = yield _call(ADD_PUBLICATION_MUTATION, params)
+
+    assert 'id' in result['add_publication']
+
+    publication = (yield from get_publications(client, _id=result['add_publication']['id']))[0]
+    client._notify_catalog_listeners('created', publication)
+    return publication
+
+
+def get_publications(client, author=None, title=None, _id=None):
+    variables = {
+        'author': author,
+        'title': title,
+        'id': _id
+    }
+
+    result = yield _call(query=PUBLICATIONS_QUERY, variables=variables)
+
+    # Handle keywords, sharing a single Keyword instance between all publications with that keyword
+    keywords = {}
+    for pub in result['compas_publications']['edges']:
+        pub['node']['keywords'] = [
+            client._intern(keywords, gwlandscape_python.Keyword, kw['node'])
+            for kw in pub['node']['keywords']['edges']
+        ]
+
+    return [
+        gwlandscape_python.Publication(client=client, **kw['node'])
+        for kw in result['compas_publications']['edges']
+    ]
+
+
+def create_model(client, inputs):
+    params = {
+        'input': {
+            **inputs
+        }
+    }
+
+    result = yield _call(ADD_MODEL_MUTATION, params)
+
+    assert 'id' in result['add_compas_model']
+
+    model = (yield from get_models(client, _id=result['add_compas_model']['id']))[0]
+    client._notify_catalog_listeners('created', model)
+    return model
+
+
+def get_models(client, name=None, summary=None, description=None, _id=None):
+    variables = {
+        'name': name,
+        'summary': summary,
+        'description': description,
+        'id': _id
+    }
+
+    result = yield _call(query=MODELS_QUERY, variables=variables)
+
+    return [
+        gwlandscape_python.Model(client=client, **kw['node'])
+        for kw in result['compas_models']['edges']
+    ]
+
+
+@contextmanager
+def prepare_upload(client, file_path, optimise):
+    # Validates a dataset, and gives the file to upload, which is an optimised copy of a HDF5 file if requested,
+    # removed once it has been uploaded
+    client._validate_dataset(file_path)
+    if not optimise or not file_path.name.lower().endswith(HDF5_SUFFIXES):
+        yield file_path
+        return
+
+    from gwlandscape_python.utils.optimise import optimise_dataset
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report = optimise_dataset(file_path, Path(tmp) / file_path.name, measure=False)
+        yield report.path
+
+
+def create_dataset(client, publication, model, datafile, progress, optimise=False):
+    with prepare_upload(client, Path(datafile), optimise) as file_path:
+        return (yield from upload_dataset(client, publication, model, file_path, progress))
+
+
+def upload_dataset(client, publication, model, file_path, progress):
+    # Uploads a file already checked by prepare_upload
+    upload_token = yield from generate_upload_token(client)
+
+    with progress_counter(progress, file_path.stat().st_size) as counter, file_path.open('rb') as f:
+        variables = {
+            'input': {
+                "uploadToken": upload_token,
+                'compas_publication': publication.id,
+                'compas_model': model.id,
+                'jobFile': ProgressReader(f, counter)
+            }
+        }
+
+        result = yield _call(query=UPLOAD_DATASET_MUTATION, variables=variables, authorize=False)
+
+    assert 'id' in result['upload_compas_dataset_model']
+
+    dataset = (yield from get_datasets(client, _id=result['upload_compas_dataset_model']['id']))[0]
+    client._notify_catalog_listeners('created', dataset)
+    return dataset
+
+
+def get_datasets(client, publication=None, model=None, _id=None):
+    variables = {
+        'publication': publication.id if publication else None,
+        'model': model.id if model else None,
+        'id': _id
+    }
+
+    result = yield _call(query=DATASETS_QUERY, variables=variables)
+
+    # Handle publication and model objects. Many datasets share the same publication and model, so only a single
+    # instance of each publication, model and keyword is created for the whole result
+    keywords, publications, models = {}, {}, {}
+    for dataset in result['compas_dataset_models']['edges']:
+        publication = dataset['node']['compas_publication']
+        if publication['id'] not in publications:
+            # Handle publication keywords
+            publication['keywords'] = [
+                client._intern(keywords, gwlandscape_python.Keyword, kw['node'])
+                for kw in publication['keywords']['edges']
+            ]
+
+        dataset['node']['publication'] = client._intern(publications, gwlandscape_python.Publication, publication)
+        dataset['node']['model'] = client._intern(models, gwlandscape_python.Model, dataset['node']['compas_model'])
+
+        # Delete the compas_ fields - we don't need them anymore
+        del dataset['node']['compas_publication']
+        del dataset['node']['compas_model']
+
+        dataset['node']['dataset_id'] = dataset['node'].pop('id')
+
+    return [
+        gwlandscape_python.dataset_type.Dataset(client=client, **kw['node'])
+        for kw in result['compas_dataset_models']['edges']
+    ]
+
+
+def generate_upload_token(client):
+    data = yield _call(query=UPLOAD_TOKEN_QUERY)
+    return data['generate_compas_dataset_model_upload_token']['token']
+
+
+def get_files_by_dataset(client, dataset):
+    variables = {
+        "id": dataset.id
+    }
+
+    data = yield _call(query=DATASET_FILES_QUERY, variables=variables)
+    if data['compas_dataset_model'] is None:
+        raise ValueError(f'Could not get the file list of dataset {dataset.id}')
+
+    file_list = FileReferenceList()
+    for file_data in data['compas_dataset_model']['files']:
+        file_list.append(
+            FileReference(
+                **file_data,
+                parent=dataset
+            ),
+        )
+
+    return file_list
+
+
+def get_files_by_dataset_batch(client, datasets):
+    data = yield _call(
+        query=files_by_datasets_query(len(datasets)),
+        variables={f'id{i}': dataset.id for i, dataset in enumerate(datasets)}
+    )
+
+    # A dataset that has been deleted, or that the server won't return, has no result. Treating it as a dataset with
+    # no files would, for example, make a sync prune its whole mirror, so nothing from the batch is returned
+    missing = [dataset.id for i, dataset in enumerate(datasets) if data[f'dataset{i}'] is None]
+    if missing:
+        raise ValueError(f'Could not get the file lists of datasets {", ".join(missing)}')
+
+    return [
+        FileReferenceList([
+            FileReference(**file_data, parent=dataset)
+            for file_data in data[f'dataset{i}']['files']
+        ])
+        for i, dataset in enumerate(datasets)
+    ]
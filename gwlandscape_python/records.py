@@ -0,0 +1,216 @@
+import gwlandscape_python
+
+
+class _Record:
+    """Base class for the detached record types. Records are immutable, hold no reference to a client and store
+    their values in ``__slots__``, so they are cheap to keep in memory, pickle and send to other processes.
+    """
+    __slots__ = ()
+
+    def __init__(self, *args, **kwargs):
+        if len(args) > len(self.__slots__):
+            raise TypeError(f'{self.__class__.__name__} takes at most {len(self.__slots__)} positional arguments')
+
+        values = {**dict(zip(self.__slots__, args)), **kwargs}
+
+        missing = [name for name in self.__slots__ if name not in values]
+        unknown = [name for name in values if name not in self.__slots__]
+        if missing or unknown:
+            raise TypeError(
+                f'{self.__class__.__name__} got unknown fields {unknown} and is missing fields {missing}'
+            )
+
+        for name in self.__slots__:
+            object.__setattr__(self, name, values[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{self.__class__.__name__} is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{self.__class__.__name__} is immutable')
+
+    def _values(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __reduce__(self):
+        # Pickle as a plain tuple of values rather than a dict of slot names, to keep the payload small
+        return self.__class__, self._values()
+
+    def __eq__(self, other):
+        if not isinstance(other, self.__class__):
+            return NotImplemented
+        return self._values() == other._values()
+
+    def __hash__(self):
+        return hash((self.__class__, self._values()))
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(id="{self.id}")'
+
+
+class KeywordRecord(_Record):
+    """Detached form of a :class:`~gwlandscape_python.keyword_type.Keyword`"""
+    __slots__ = ('id', 'tag')
+
+    def attach(self, client, _memo=None):
+        """Create a live Keyword from this record
+
+        Parameters
+        ----------
+        client : ~gwlandscape_python.gwlandscape.GWLandscape
+            The client to which the Keyword will be attached
+
+        Returns
+        -------
+        ~gwlandscape_python.keyword_type.Keyword
+            Keyword attached to the provided client
+        """
+        return _memoise(self, _memo, lambda: gwlandscape_python.Keyword(client=client, id=self.id, tag=self.tag))
+
+
+class PublicationRecord(_Record):
+    """Detached form of a :class:`~gwlandscape_python.publication_type.Publication`.
+    The keywords are stored as a tuple of :class:`KeywordRecord` instances.
+    """
+    __slots__ = (
+        'id',
+        'author',
+        'published',
+        'title',
+        'year',
+        'journal',
+        'journal_doi',
+        'dataset_doi',
+        'description',
+        'public',
+        'download_link',
+        'arxiv_id',
+        'creation_time',
+        'keywords',
+    )
+
+    def attach(self, client, _memo=None):
+        """Create a live Publication from this record
+
+        Parameters
+        ----------
+        client : ~gwlandscape_python.gwlandscape.GWLandscape
+            The client to which the Publication and its Keywords will be attached
+
+        Returns
+        -------
+        ~gwlandscape_python.publication_type.Publication
+            Publication attached to the provided client
+        """
+        def _create():
+            values = {name: getattr(self, name) for name in self.__slots__}
+            values['keywords'] = [keyword.attach(client, _memo) for keyword in self.keywords]
+            return gwlandscape_python.Publication(client=client, **values)
+
+        return _memoise(self, _memo, _create)
+
+
+class ModelRecord(_Record):
+    """Detached form of a :class:`~gwlandscape_python.model_type.Model`"""
+    __slots__ = ('id', 'name', 'summary', 'description')
+
+    def attach(self, client, _memo=None):
+        """Create a live Model from this record
+
+        Parameters
+        ----------
+        client : ~gwlandscape_python.gwlandscape.GWLandscape
+            The client to which the Model will be attached
+
+        Returns
+        -------
+        ~gwlandscape_python.model_type.Model
+            Model attached to the provided client
+        """
+        return _memoise(
+            self,
+            _memo,
+            lambda: gwlandscape_python.Model(client=client, **{name: getattr(self, name) for name in self.__slots__})
+        )
+
+
+class DatasetRecord(_Record):
+    """Detached form of a :class:`~gwlandscape_python.dataset_type.Dataset`.
+    The publication and model are stored as :class:`PublicationRecord` and :class:`ModelRecord` instances.
+    """
+    __slots__ = ('id', 'publication', 'model')
+
+    def attach(self, client, _memo=None):
+        """Create a live Dataset from this record
+
+        Parameters
+        ----------
+        client : ~gwlandscape_python.gwlandscape.GWLandscape
+            The client to which the Dataset, its Publication and its Model will be attached
+
+        Returns
+        -------
+        ~gwlandscape_python.dataset_type.Dataset
+            Dataset attached to the provided client
+        """
+        return _memoise(
+            self,
+            _memo,
+            lambda: gwlandscape_python.Dataset(
+                client=client,
+                dataset_id=self.id,
+                publication=self.publication.attach(client, _memo) if self.publication is not None else None,
+                model=self.model.attach(client, _memo) if self.model is not None else None,
+            )
+        )
+
+
+def _memoise(obj, memo, create):
+    # Converts obj using create, reusing the result for any other object of the same type and id
+    if memo is None:
+        return create()
+
+    key = (obj.__class__, obj.id)
+    if key not in memo:
+        memo[key] = create()
+    return memo[key]
+
+
+def detach(objects):
+    """Detach many Keyword, Publication, Model or Dataset objects at once.
+    Objects which appear more than once (for example, a Publication shared by several Datasets) will be converted
+    to a single shared record, so that the result is as small as possible when pickled.
+
+    Parameters
+    ----------
+    objects : list
+        A list of :class:`~.Keyword`, :class:`~.Publication`, :class:`~.Model` or :class:`~.Dataset` instances
+
+    Returns
+    -------
+    list
+        A list of the corresponding record instances
+    """
+    memo = {}
+    return [obj.detach(_memo=memo) for obj in objects]
+
+
+def attach(records, client):
+    """Attach many records to a client at once.
+    Records with the same type and id will be attached as a single shared live object.
+
+    Parameters
+    ----------
+    records : list
+        A list of :class:`KeywordRecord`, :class:`PublicationRecord`, :class:`ModelRecord` or
+        :class:`DatasetRecord` instances
+    client : ~gwlandscape_python.gwlandscape.GWLandscape
+        The client to which the objects will be attached
+
+    Returns
+    -------
+    list
+        A list of the corresponding live objects
+    """
+    memo = {}
+    return [record.attach(client, _memo=memo) for record in records]
@@ -0,0 +1,239 @@
+import math
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+import gwlandscape_python
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# Relative weights of matches in each of the indexed fields
+FIELD_WEIGHTS = {
+    'title': 3.0,
+    'author': 2.0,
+    'keywords': 2.0,
+    'description': 1.0,
+}
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Score multiplier for a query term that only matches a token as a prefix
+PREFIX_PENALTY = 0.5
+
+
+def tokenize(text):
+    """Split text into case-folded word tokens
+
+    Parameters
+    ----------
+    text : str
+        Text to split
+
+    Returns
+    -------
+    list
+        List of tokens
+    """
+    return TOKEN_PATTERN.findall(text.casefold()) if text else []
+
+
+class PublicationIndex:
+    """
+    An in-memory inverted index supporting ranked, multi-term search over the title, author, description and keyword
+    tags of publications.
+
+    If a client is provided, the index will be kept up to date with any publications created, updated or deleted
+    through that client.
+
+    Parameters
+    ----------
+    publications : list
+        The :class:`~.Publication` instances to index
+    client : ~gwlandscape_python.gwlandscape.GWLandscape, optional
+        Client from which to receive updates, by default None
+    """
+
+    def __init__(self, publications, client=None):
+        self._lock = threading.RLock()
+        self._publications = {}
+        self._postings = defaultdict(dict)
+        self._doc_tokens = {}
+        self._doc_lengths = {}
+        self._vocabulary = []
+
+        # The tag of each keyword of each publication, keyed by publication and keyword id. Keywords updated or
+        # deleted through the client are changed here, leaving the publications as they are
+        self._keyword_tags = {}
+
+        for publication in publications:
+            self.add(publication)
+
+        if client is not None:
+            client._add_catalog_listener(self)
+
+    def __len__(self):
+        return len(self._publications)
+
+    def __contains__(self, publication):
+        return publication.id in self._publications
+
+    def add(self, publication):
+        """Add a publication to the index, replacing it if it has already been indexed
+
+        Parameters
+        ----------
+        publication : ~gwlandscape_python.publication_type.Publication
+            Publication to index
+        """
+        keyword_tags = {keyword.id: keyword.tag for keyword in publication.keywords}
+        with self._lock:
+            self._add(publication, keyword_tags)
+
+    def _add(self, publication, keyword_tags):
+        weights = defaultdict(float)
+        length = 0
+        for field, field_weight in FIELD_WEIGHTS.items():
+            if field == 'keywords':
+                tokens = [token for tag in keyword_tags.values() for token in tokenize(tag)]
+            else:
+                tokens = tokenize(getattr(publication, field))
+            length += len(tokens)
+            for token in tokens:
+                weights[token] += field_weight
+
+        self._remove(publication.id)
+
+        self._publications[publication.id] = publication
+        self._keyword_tags[publication.id] = keyword_tags
+        self._doc_tokens[publication.id] = tuple(weights)
+        self._doc_lengths[publication.id] = length
+        for token, weight in weights.items():
+            if not self._postings[token]:
+                insort(self._vocabulary, token)
+            self._postings[token][publication.id] = weight
+
+    def remove(self, publication):
+        """Remove a publication from the index
+
+        Parameters
+        ----------
+        publication : ~gwlandscape_python.publication_type.Publication
+            Publication to remove
+        """
+        with self._lock:
+            self._remove(publication.id)
+
+    def _remove(self, publication_id):
+        if publication_id not in self._publications:
+            return
+
+        for token in self._doc_tokens.pop(publication_id):
+            postings = self._postings[token]
+            postings.pop(publication_id, None)
+            if not postings:
+                del self._postings[token]
+                del self._vocabulary[bisect_left(self._vocabulary, token)]
+
+        del self._publications[publication_id]
+        del self._keyword_tags[publication_id]
+        del self._doc_lengths[publication_id]
+
+    def _expand(self, term, prefix):
+        # Returns the indexed tokens matching this query term, and the score multiplier for each
+        matches = {term: 1.0} if term in self._postings else {}
+        if prefix:
+            start = bisect_left(self._vocabulary, term)
+            for token in self._vocabulary[start:]:
+                if not token.startswith(term):
+                    break
+                matches.setdefault(token, PREFIX_PENALTY)
+        return matches
+
+    def search(self, query, limit=None, prefix=True, match_all=True):
+        """Search for publications matching the query
+
+        Parameters
+        ----------
+        query : str
+            Search terms, separated by whitespace or punctuation. Case is ignored.
+        limit : int, optional
+            Maximum number of results to return, by default all results are returned
+        prefix : bool, optional
+            Whether query terms also match any token that starts with them, by default True
+        match_all : bool, optional
+            Whether a publication must match every query term, rather than any of them, by default True
+
+        Returns
+        -------
+        list
+            The matching :class:`~.Publication` instances, ordered from the best match to the worst
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        with self._lock:
+            n_docs = len(self._publications)
+            avg_length = (sum(self._doc_lengths.values()) / n_docs) if n_docs else 0
+
+            scores = None
+            for term in terms:
+                term_scores = defaultdict(float)
+                for token, multiplier in self._expand(term, prefix).items():
+                    postings = self._postings[token]
+                    idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for publication_id, weight in postings.items():
+                        norm = K1 * (1 - B + B * self._doc_lengths[publication_id] / (avg_length or 1))
+                        term_scores[publication_id] = max(
+                            term_scores[publication_id],
+                            multiplier * idf * weight * (K1 + 1) / (weight + norm)
+                        )
+
+                if scores is None:
+                    scores = term_scores
+                elif match_all:
+                    scores = {pid: score + term_scores[pid] for pid, score in scores.items() if pid in term_scores}
+                else:
+                    for publication_id, score in term_scores.items():
+                        scores[publication_id] = scores.get(publication_id, 0) + score
+
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+            if limit is not None:
+                ranked = ranked[:limit]
+
+            return [self._publications[publication_id] for publication_id, _ in ranked]
+
+    def catalog_changed(self, action, obj):
+        """Update the index after an object was created, updated or deleted through the client.
+        Indexed publications holding an updated or deleted keyword are searched by the keyword's new tag, or no longer
+        by its tag, without changing the publications themselves. Called by the client, and not usually needed
+        otherwise.
+
+        Parameters
+        ----------
+        action : str
+            One of 'created', 'updated' or 'deleted'
+        obj : object
+            The object that was changed
+        """
+        if isinstance(obj, gwlandscape_python.Publication):
+            if action == 'deleted':
+                self.remove(obj)
+            elif action == 'created' or obj in self:
+                self.add(obj)
+        elif isinstance(obj, gwlandscape_python.Keyword):
+            with self._lock:
+                affected = [
+                    publication_id for publication_id, keyword_tags in self._keyword_tags.items()
+                    if obj.id in keyword_tags
+                ]
+                for publication_id in affected:
+                    keyword_tags = dict(self._keyword_tags[publication_id])
+                    if action == 'deleted':
+                        del keyword_tags[obj.id]
+                    else:
+                        keyword_tags[obj.id] = obj.tag
+                    self._add(self._publications[publication_id], keyword_tags)
@@ -0,0 +1,487 @@
+import sqlite3
+from contextlib import closing, contextmanager
+from pathlib import Path
+
+from gwdc_python.files import FileReference, FileReferenceList
+from gwdc_python.logger import create_logger
+
+import gwlandscape_python
+from gwlandscape_python.gwlandscape import GWLandscape
+from gwlandscape_python.settings import GWLANDSCAPE_FILE_DOWNLOAD_ENDPOINT
+from gwlandscape_python.utils import mutually_exclusive
+from gwlandscape_python.utils.file_download import CHUNK_SIZE, MAX_WORKERS
+from gwlandscape_python.utils.retry import DEFAULT_RETRY
+
+logger = create_logger(__name__)
+
+PUBLICATION_FIELDS = (
+    'id',
+    'author',
+    'published',
+    'title',
+    'year',
+    'journal',
+    'journal_doi',
+    'dataset_doi',
+    'description',
+    'public',
+    'download_link',
+    'arxiv_id',
+    'creation_time',
+)
+
+MODEL_FIELDS = ('id', 'name', 'summary', 'description')
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS metadata (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+    CREATE TABLE IF NOT EXISTS keywords (
+        id TEXT PRIMARY KEY,
+        tag TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS keywords_tag ON keywords (tag COLLATE NOCASE);
+    CREATE TABLE IF NOT EXISTS publications (
+        id TEXT PRIMARY KEY,
+        author TEXT,
+        published INTEGER,
+        title TEXT,
+        year INTEGER,
+        journal TEXT,
+        journal_doi TEXT,
+        dataset_doi TEXT,
+        description TEXT,
+        public INTEGER,
+        download_link TEXT,
+        arxiv_id TEXT,
+        creation_time TEXT
+    );
+    CREATE INDEX IF NOT EXISTS publications_creation_time ON publications (creation_time);
+    CREATE TABLE IF NOT EXISTS publication_keywords (
+        publication_id TEXT NOT NULL,
+        keyword_id TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        PRIMARY KEY (publication_id, keyword_id)
+    );
+    CREATE INDEX IF NOT EXISTS publication_keywords_keyword ON publication_keywords (keyword_id);
+    CREATE TABLE IF NOT EXISTS models (
+        id TEXT PRIMARY KEY,
+        name TEXT,
+        summary TEXT,
+        description TEXT
+    );
+    CREATE TABLE IF NOT EXISTS datasets (
+        id TEXT PRIMARY KEY,
+        publication_id TEXT NOT NULL,
+        model_id TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS datasets_publication ON datasets (publication_id);
+    CREATE INDEX IF NOT EXISTS datasets_model ON datasets (model_id);
+    CREATE TABLE IF NOT EXISTS files (
+        dataset_id TEXT NOT NULL,
+        path TEXT NOT NULL,
+        file_size INTEGER,
+        download_token TEXT,
+        PRIMARY KEY (dataset_id, path)
+    );
+"""
+
+
+def _contains(value):
+    # Escape the LIKE wildcards, so that the value is matched literally
+    escaped = value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+class CatalogSnapshot:
+    """
+    A local SQLite copy of the GWLandscape catalog, holding the keywords, publications, models, datasets and the
+    file lists of each dataset.
+
+    Parameters
+    ----------
+    path : str or ~pathlib.Path
+        Path to the SQLite file. It will be created if it does not exist.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # A new connection is used for every operation, so that a snapshot can be shared between threads
+        with closing(sqlite3.connect(self.path)) as conn:
+            conn.row_factory = sqlite3.Row
+            with conn:
+                yield conn
+
+    @property
+    def watermark(self):
+        """The creation time of the newest publication in the snapshot, or None if the snapshot is empty"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM metadata WHERE key = 'watermark'").fetchone()
+        return row['value'] if row else None
+
+    def update(self, client):
+        """Replace the contents of the snapshot with the full catalog obtained from the client
+
+        Parameters
+        ----------
+        client : ~gwlandscape_python.gwlandscape.GWLandscape
+            The client from which to fetch the catalog
+        """
+        keywords = client.get_keywords()
+        publications = client.get_publications()
+        models = client.get_models()
+        datasets = client.get_datasets()
+        files = dict(zip([dataset.id for dataset in datasets], client.get_files_by_datasets(datasets)))
+
+        with self._connect() as conn:
+            conn.execute('DELETE FROM datasets')
+            conn.execute('DELETE FROM files')
+            self._write_catalog(conn, keywords, publications, models)
+            self._write_datasets(conn, datasets, files)
+
+        logger.info(f'Snapshot of {len(publications)} publications and {len(datasets)} datasets saved to {self.path}')
+
+    def refresh(self, client):
+        """Update the snapshot with any changes to the catalog, fetching the datasets and file lists only for
+        publications created after the :attr:`watermark`.
+
+        Keywords, models and the publication metadata are small, and are always replaced in full. Publications which
+        have been removed from the catalog are removed from the snapshot, along with their datasets.
+        Datasets that were added to a publication older than the watermark are not detected, and require a full
+        :meth:`update`.
+
+        Parameters
+        ----------
+        client : ~gwlandscape_python.gwlandscape.GWLandscape
+            The client from which to fetch the changes
+
+        Returns
+        -------
+        list
+            The new :class:`~.Publication` instances that were added to the snapshot
+        """
+        watermark = self.watermark
+
+        keywords = client.get_keywords()
+        publications = client.get_publications()
+        models = client.get_models()
+
+        new_publications = [
+            publication for publication in publications
+            if watermark is None or (publication.creation_time or '') > watermark
+        ]
+
+        datasets = [
+            dataset for publication in new_publications for dataset in client.get_datasets(publication=publication)
+        ]
+        files = dict(zip([dataset.id for dataset in datasets], client.get_files_by_datasets(datasets)))
+
+        with self._connect() as conn:
+            self._write_catalog(conn, keywords, publications, models)
+
+            # Remove the datasets of any publications that no longer exist, as well as those being replaced
+            conn.execute(
+                'DELETE FROM files WHERE dataset_id IN ('
+                '    SELECT id FROM datasets WHERE publication_id NOT IN (SELECT id FROM publications)'
+                ')'
+            )
+            conn.execute('DELETE FROM datasets WHERE publication_id NOT IN (SELECT id FROM publications)')
+            self._write_datasets(conn, datasets, files)
+
+        logger.info(f'Snapshot refreshed with {len(new_publications)} new publications and {len(datasets)} datasets')
+
+        return new_publications
+
+    def _write_catalog(self, conn, keywords, publications, models):
+        conn.execute('DELETE FROM keywords')
+        conn.execute('DELETE FROM publications')
+        conn.execute('DELETE FROM publication_keywords')
+        conn.execute('DELETE FROM models')
+
+        # Publications can hold keywords that were not returned by get_keywords, so gather them from both
+        all_keywords = {keyword.id: keyword for keyword in keywords}
+        for publication in publications:
+            all_keywords.update({keyword.id: keyword for keyword in publication.keywords})
+
+        conn.executemany(
+            'INSERT INTO keywords (id, tag) VALUES (?, ?)',
+            [(keyword.id, keyword.tag) for keyword in all_keywords.values()]
+        )
+        conn.executemany(
+            f'INSERT INTO publications ({", ".join(PUBLICATION_FIELDS)}) '
+            f'VALUES ({", ".join("?" * len(PUBLICATION_FIELDS))})',
+            [tuple(getattr(publication, name) for name in PUBLICATION_FIELDS) for publication in publications]
+        )
+        conn.executemany(
+            'INSERT OR IGNORE INTO publication_keywords (publication_id, keyword_id, position) VALUES (?, ?, ?)',
+            [
+                (publication.id, keyword.id, position)
+                for publication in publications
+                for position, keyword in enumerate(publication.keywords)
+            ]
+        )
+        conn.executemany(
+            f'INSERT INTO models ({", ".join(MODEL_FIELDS)}) VALUES ({", ".join("?" * len(MODEL_FIELDS))})',
+            [tuple(getattr(model, name) for name in MODEL_FIELDS) for model in models]
+        )
+
+        creation_times = [publication.creation_time for publication in publications if publication.creation_time]
+        conn.execute(
+            "INSERT OR REPLACE INTO metadata (key, value) VALUES ('watermark', ?)",
+            (max(creation_times) if creation_times else None,)
+        )
+
+    def _write_datasets(self, conn, datasets, files):
+        conn.executemany(
+            'DELETE FROM files WHERE dataset_id = ?',
+            [(dataset.id,) for dataset in datasets]
+        )
+        conn.executemany(
+            'INSERT OR REPLACE INTO datasets (id, publication_id, model_id) VALUES (?, ?, ?)',
+            [(dataset.id, dataset.publication.id, dataset.model.id) for dataset in datasets]
+        )
+        conn.executemany(
+            'INSERT OR REPLACE INTO files (dataset_id, path, file_size, download_token) VALUES (?, ?, ?, ?)',
+            [
+                (dataset_id, str(file_ref.path), file_ref.file_size, file_ref.download_token)
+                for dataset_id, file_list in files.items()
+                for file_ref in file_list
+            ]
+        )
+
+    def get_keywords(self, exact=None, contains=None, _id=None):
+        """Keyword rows matching the provided parameters, with the same semantics as
+        :meth:`~.GWLandscape.get_keywords`"""
+        conditions, params = [], []
+        if exact is not None:
+            conditions.append('tag = ? COLLATE NOCASE')
+            params.append(exact)
+        if contains is not None:
+            conditions.append("tag LIKE ? ESCAPE '\\'")
+            params.append(_contains(contains))
+        if _id is not None:
+            conditions.append('id = ?')
+            params.append(_id)
+
+        return self._select('SELECT id, tag FROM keywords', conditions, params)
+
+    def get_publications(self, author=None, title=None, _id=None):
+        """Publication rows matching the provided parameters, with the same semantics as
+        :meth:`~.GWLandscape.get_publications`. The keywords of each publication are included as a list of rows."""
+        conditions, params = [], []
+        if author is not None:
+            conditions.append("author LIKE ? ESCAPE '\\'")
+            params.append(_contains(author))
+        if title is not None:
+            conditions.append("title LIKE ? ESCAPE '\\'")
+            params.append(_contains(title))
+        if _id is not None:
+            conditions.append('id = ?')
+            params.append(_id)
+
+        where = _where(conditions)
+        with self._connect() as conn:
+            publications = _rows(conn, f'SELECT {", ".join(PUBLICATION_FIELDS)} FROM publications{where}', params)
+            _add_keywords(conn, publications, f'SELECT id FROM publications{where}', params)
+        return publications
+
+    def get_models(self, name=None, summary=None, description=None, _id=None):
+        """Model rows matching the provided parameters, with the same semantics as :meth:`~.GWLandscape.get_models`"""
+        conditions, params = [], []
+        for column, value in [('name', name), ('summary', summary), ('description', description)]:
+            if value is not None:
+                conditions.append(f"{column} LIKE ? ESCAPE '\\'")
+                params.append(_contains(value))
+        if _id is not None:
+            conditions.append('id = ?')
+            params.append(_id)
+
+        return self._select(f'SELECT {", ".join(MODEL_FIELDS)} FROM models', conditions, params)
+
+    def get_datasets(self, publication_id=None, model_id=None, _id=None):
+        """Dataset rows matching the provided parameters, with the same semantics as
+        :meth:`~.GWLandscape.get_datasets`"""
+        conditions, params = [], []
+        for column, value in [('publication_id', publication_id), ('model_id', model_id), ('id', _id)]:
+            if value is not None:
+                conditions.append(f'{column} = ?')
+                params.append(value)
+
+        return self._select('SELECT id, publication_id, model_id FROM datasets', conditions, params)
+
+    def get_datasets_with_catalog(self, publication_id=None, model_id=None, _id=None):
+        """Dataset rows matching the provided parameters, as for :meth:`get_datasets`, together with the rows of their
+        publications and models, all read with one query each
+
+        Returns
+        -------
+        tuple of list
+            The dataset rows, the rows of their publications with their keywords, and the rows of their models
+        """
+        conditions, params = [], []
+        for column, value in [('publication_id', publication_id), ('model_id', model_id), ('id', _id)]:
+            if value is not None:
+                conditions.append(f'{column} = ?')
+                params.append(value)
+        where = _where(conditions)
+
+        with self._connect() as conn:
+            datasets = _rows(conn, f'SELECT id, publication_id, model_id FROM datasets{where}', params)
+            publication_ids = f'SELECT publication_id FROM datasets{where}'
+            publications = _rows(
+                conn,
+                f'SELECT {", ".join(PUBLICATION_FIELDS)} FROM publications WHERE id IN ({publication_ids})',
+                params
+            )
+            _add_keywords(conn, publications, publication_ids, params)
+            models = _rows(
+                conn,
+                f'SELECT {", ".join(MODEL_FIELDS)} FROM models '
+                f'WHERE id IN (SELECT model_id FROM datasets{where})',
+                params
+            )
+        return datasets, publications, models
+
+    def get_files(self, dataset_id):
+        """File rows for the dataset with the provided id"""
+        return self._select(
+            'SELECT path, file_size, download_token FROM files',
+            ['dataset_id = ?'],
+            [dataset_id],
+            order='path'
+        )
+
+    def _select(self, query, conditions, params, order='rowid'):
+        with self._connect() as conn:
+            return _rows(conn, query + _where(conditions), params, order)
+
+
+def _where(conditions):
+    return ' WHERE ' + ' AND '.join(conditions) if conditions else ''
+
+
+def _rows(conn, query, params, order='rowid'):
+    return [dict(row) for row in conn.execute(f'{query} ORDER BY {order}', params)]
+
+
+def _add_keywords(conn, publications, publication_ids, params):
+    # Adds the keywords of each publication as a list of rows, reading the keywords of all the publications at once.
+    # publication_ids is a query for the ids of the publications, with the parameters params
+    by_id = {publication['id']: publication for publication in publications}
+    for publication in publications:
+        publication['keywords'] = []
+    for row in conn.execute(
+        'SELECT publication_keywords.publication_id, keywords.id, keywords.tag FROM publication_keywords '
+        'JOIN keywords ON keywords.id = publication_keywords.keyword_id '
+        f'WHERE publication_keywords.publication_id IN ({publication_ids}) '
+        'ORDER BY publication_keywords.publication_id, publication_keywords.position',
+        params
+    ):
+        by_id[row['publication_id']]['keywords'].append({'id': row['id'], 'tag': row['tag']})
+
+
+def _offline_request(*args, **kwargs):
+    raise Exception('Unable to make requests to the GWLandscape server with an offline client')
+
+
+class OfflineGWLandscape(GWLandscape):
+    """
+    A GWLandscape client that answers the ``get_*`` methods from a local :class:`CatalogSnapshot`, without making
+    any requests to the GWLandscape server. Creating, updating or deleting objects is not possible while offline,
+    though files can still be downloaded using the download tokens stored in the snapshot.
+
+    Parameters
+    ----------
+    path : str or ~pathlib.Path
+        Path to a snapshot created by :meth:`~.GWLandscape.snapshot`
+    file_download_endpoint : str, optional
+        URL to which file download tokens are appended to download files, by default GWLANDSCAPE_FILE_DOWNLOAD_ENDPOINT
+    progress : ~gwlandscape_python.utils.progress.ProgressSink, str or callable, optional
+        How to report the progress of downloads, by default 'tqdm'
+    retry : ~gwlandscape_python.utils.retry.RetryPolicy, optional
+        How to retry file downloads that fail with transient errors, by default DEFAULT_RETRY
+    bandwidth_limit : float or ~gwlandscape_python.utils.rate_limit.TokenBucket, optional
+        Maximum number of bytes per second downloaded, or a shared token bucket, by default no limit
+    max_workers : int, optional
+        Number of files downloaded at once, by default MAX_WORKERS
+    chunk_size : int, optional
+        Size in bytes of the chunks in which files are read from the file server, by default CHUNK_SIZE
+    """
+
+    def __init__(self, path, file_download_endpoint=GWLANDSCAPE_FILE_DOWNLOAD_ENDPOINT, progress='tqdm',
+                 retry=DEFAULT_RETRY, bandwidth_limit=None, max_workers=MAX_WORKERS, chunk_size=CHUNK_SIZE):
+        if not Path(path).exists():
+            raise FileNotFoundError(f'No snapshot found at {path}')
+
+        self.client = None
+        self._init_state(
+            _offline_request, file_download_endpoint, progress, retry, None, bandwidth_limit, max_workers, chunk_size
+        )
+        self.catalog = CatalogSnapshot(path)
+
+    def request(self, *args, **kwargs):
+        return _offline_request(*args, **kwargs)
+
+    @mutually_exclusive('exact', 'contains', '_id')
+    def get_keywords(self, exact=None, contains=None, _id=None):
+        return [
+            gwlandscape_python.Keyword(client=self, **row)
+            for row in self.catalog.get_keywords(exact=exact, contains=contains, _id=_id)
+        ]
+
+    @mutually_exclusive('author | title', '_id')
+    def get_publications(self, author=None, title=None, _id=None):
+        return self._create_publications(self.catalog.get_publications(author=author, title=title, _id=_id), {})
+
+    @mutually_exclusive('name | summary | description', '_id')
+    def get_models(self, name=None, summary=None, description=None, _id=None):
+        return [
+            gwlandscape_python.Model(client=self, **row)
+            for row in self.catalog.get_models(name=name, summary=summary, description=description, _id=_id)
+        ]
+
+    @mutually_exclusive('publication | model', '_id')
+    def get_datasets(self, publication=None, model=None, _id=None):
+        rows, publication_rows, model_rows = self.catalog.get_datasets_with_catalog(
+            publication_id=publication.id if publication else None,
+            model_id=model.id if model else None,
+            _id=_id
+        )
+
+        publications = {
+            publication.id: publication for publication in self._create_publications(publication_rows, {})
+        }
+        models = {row['id']: gwlandscape_python.Model(client=self, **row) for row in model_rows}
+
+        return [
+            gwlandscape_python.Dataset(
+                client=self,
+                dataset_id=row['id'],
+                publication=publications[row['publication_id']],
+                model=models[row['model_id']]
+            )
+            for row in rows
+        ]
+
+    def _create_publications(self, rows, keywords):
+        for row in rows:
+            row['published'] = bool(row['published']) if row['published'] is not None else None
+            row['public'] = bool(row['public']) if row['public'] is not None else None
+            row['keywords'] = [self._intern(keywords, gwlandscape_python.Keyword, kw) for kw in row['keywords']]
+
+        return [gwlandscape_python.Publication(client=self, **row) for row in rows]
+
+    def _get_files_by_dataset_batch(self, datasets):
+        return [self._get_files_by_dataset(dataset) for dataset in datasets]
+
+    def _get_files_by_dataset(self, dataset):
+        return FileReferenceList([
+            FileReference(**row, parent=dataset)
+            for row in self.catalog.get_files(dataset.id)
+        ])
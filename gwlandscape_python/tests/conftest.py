@@ -4,6 +4,7 @@ from gwlandscape_python.dataset_type import Dataset
 from gwlandscape_python.keyword_type import Keyword
 from gwlandscape_python.model_type import Model
 from gwlandscape_python.publication_type import Publication
+from gwlandscape_python.tests.local_server import LocalGWLandscapeServer
 
 
 @pytest.fixture
@@ -18,6 +19,18 @@ def setup_gwl_request(mocker):
     return GWLandscape(token='my_token'), mock_request
 
 
+@pytest.fixture(scope='module')
+def local_server():
+    with LocalGWLandscapeServer() as server:
+        server.seed(n_publications=3, n_models=2, n_keywords=2, n_systems=500)
+        yield server
+
+
+@pytest.fixture
+def local_gwl(local_server):
+    return local_server.client()
+
+
 @pytest.fixture
 def mock_keyword_data():
     def _mock_keyword_data(i=1):
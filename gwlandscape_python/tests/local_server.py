@@ -0,0 +1,669 @@
+"""A local stand-in for the GWLandscape API and file server, used by the benchmarks and by tests that exercise the
+real request, download and upload paths.
+
+The GraphQL endpoint is built with ``graphql-core`` and implements the subset of the GWLandscape schema used by this
+package. Mutation inputs are declared as scalars, so any input fields are accepted and stored as sent. The file
+server supports HTTP range requests.
+"""
+import email.parser
+import email.policy
+import itertools
+import json
+import re
+import tempfile
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+from graphql import build_schema, graphql_sync
+
+from gwlandscape_python.tests.utils import create_compas_file
+
+SCHEMA = build_schema("""
+    scalar AddKeywordMutationInput
+    scalar UpdateKeywordMutationInput
+    scalar DeleteKeywordMutationInput
+    scalar AddPublicationMutationInput
+    scalar UpdatePublicationMutationInput
+    scalar DeletePublicationMutationInput
+    scalar AddCompasModelMutationInput
+    scalar UpdateCompasModelMutationInput
+    scalar DeleteCompasModelMutationInput
+    scalar UploadCompasDatasetModelMutationInput
+    scalar UpdateCompasDatasetModelMutationInput
+    scalar DeleteCompasDatasetModelMutationInput
+
+    type SessionUser {
+        isAuthenticated: Boolean
+    }
+
+    type KeywordNode {
+        id: ID!
+        tag: String
+    }
+
+    type KeywordEdge {
+        node: KeywordNode
+    }
+
+    type KeywordConnection {
+        edges: [KeywordEdge]
+    }
+
+    type PublicationNode {
+        id: ID!
+        author: String
+        published: Boolean
+        title: String
+        year: Int
+        journal: String
+        journalDoi: String
+        datasetDoi: String
+        creationTime: String
+        description: String
+        public: Boolean
+        downloadLink: String
+        arxivId: String
+        keywords: KeywordConnection
+    }
+
+    type PublicationEdge {
+        node: PublicationNode
+    }
+
+    type PublicationConnection {
+        edges: [PublicationEdge]
+    }
+
+    type ModelNode {
+        id: ID!
+        name: String
+        summary: String
+        description: String
+    }
+
+    type ModelEdge {
+        node: ModelNode
+    }
+
+    type ModelConnection {
+        edges: [ModelEdge]
+    }
+
+    type FileNode {
+        path: String
+        fileSize: String
+        downloadToken: String
+    }
+
+    type DatasetNode {
+        id: ID!
+        compasPublication: PublicationNode
+        compasModel: ModelNode
+        files: [FileNode]
+    }
+
+    type DatasetEdge {
+        node: DatasetNode
+    }
+
+    type DatasetConnection {
+        edges: [DatasetEdge]
+    }
+
+    type UploadToken {
+        token: String
+    }
+
+    type IdPayload {
+        id: ID
+    }
+
+    type ResultPayload {
+        result: Boolean
+    }
+
+    type Query {
+        sessionUser: SessionUser
+        keywords(tag: String, tag_Icontains: String, id: ID): KeywordConnection
+        compasPublications(author_Icontains: String, title_Icontains: String, id: ID): PublicationConnection
+        compasModels(
+            name_Icontains: String,
+            summary_Icontains: String,
+            description_Icontains: String,
+            id: ID
+        ): ModelConnection
+        compasDatasetModels(compasPublication: ID, compasModel: ID, id: ID): DatasetConnection
+        compasDatasetModel(id: ID!): DatasetNode
+        generateCompasDatasetModelUploadToken: UploadToken
+    }
+
+    type Mutation {
+        addKeyword(input: AddKeywordMutationInput!): IdPayload
+        updateKeyword(input: UpdateKeywordMutationInput!): ResultPayload
+        deleteKeyword(input: DeleteKeywordMutationInput!): ResultPayload
+        addPublication(input: AddPublicationMutationInput!): IdPayload
+        updatePublication(input: UpdatePublicationMutationInput!): ResultPayload
+        deletePublication(input: DeletePublicationMutationInput!): ResultPayload
+        addCompasModel(input: AddCompasModelMutationInput!): IdPayload
+        updateCompasModel(input: UpdateCompasModelMutationInput!): ResultPayload
+        deleteCompasModel(input: DeleteCompasModelMutationInput!): ResultPayload
+        uploadCompasDatasetModel(input: UploadCompasDatasetModelMutationInput!): IdPayload
+        updateCompasDatasetModel(input: UpdateCompasDatasetModelMutationInput!): ResultPayload
+        deleteCompasDatasetModel(input: DeleteCompasDatasetModelMutationInput!): ResultPayload
+    }
+""")
+
+RANGE_PATTERN = re.compile(r'bytes=(\d*)-(\d*)$')
+
+CHUNK_SIZE = 1024 * 64
+
+
+def _contains(value, search):
+    return search is None or search.casefold() in (value or '').casefold()
+
+
+def _equals(value, search):
+    return search is None or value == search
+
+
+def _edges(nodes):
+    return {'edges': [{'node': node} for node in nodes]}
+
+
+class _Catalog:
+    # In-memory catalog, with resolvers for the query and mutation fields of the schema
+
+    def __init__(self, server):
+        self._server = server
+        self._lock = threading.RLock()
+        self._ids = itertools.count(1)
+        self._keywords = {}
+        self._publications = {}
+        self._models = {}
+        self._datasets = {}
+
+    def _new_id(self, prefix):
+        return f'{prefix}:{next(self._ids)}'
+
+    # Nodes
+
+    def _publication_node(self, publication):
+        return {
+            **publication,
+            'keywords': _edges(self._keywords[_id] for _id in publication['keywords'] if _id in self._keywords),
+        }
+
+    def _dataset_node(self, dataset):
+        return {
+            'id': dataset['id'],
+            'compasPublication': self._publication_node(self._publications[dataset['compasPublication']]),
+            'compasModel': self._models[dataset['compasModel']],
+            'files': [
+                {'path': path, 'fileSize': str(self._server.file_size(token)), 'downloadToken': token}
+                for path, token in dataset['files'].items()
+            ],
+        }
+
+    # Queries
+
+    def sessionUser(self, info):
+        return {'isAuthenticated': True}
+
+    def keywords(self, info, tag=None, tag_Icontains=None, id=None):
+        with self._lock:
+            return _edges(
+                keyword for keyword in self._keywords.values()
+                if _equals(keyword['tag'], tag) and _contains(keyword['tag'], tag_Icontains)
+                and _equals(keyword['id'], id)
+            )
+
+    def compasPublications(self, info, author_Icontains=None, title_Icontains=None, id=None):
+        with self._lock:
+            return _edges(
+                self._publication_node(publication) for publication in self._publications.values()
+                if _contains(publication.get('author'), author_Icontains)
+                and _contains(publication.get('title'), title_Icontains) and _equals(publication['id'], id)
+            )
+
+    def compasModels(self, info, name_Icontains=None, summary_Icontains=None, description_Icontains=None, id=None):
+        with self._lock:
+            return _edges(
+                model for model in self._models.values()
+                if _contains(model.get('name'), name_Icontains) and _contains(model.get('summary'), summary_Icontains)
+                and _contains(model.get('description'), description_Icontains) and _equals(model['id'], id)
+            )
+
+    def compasDatasetModels(self, info, compasPublication=None, compasModel=None, id=None):
+        with self._lock:
+            return _edges(
+                self._dataset_node(dataset) for dataset in self._datasets.values()
+                if _equals(dataset['compasPublication'], compasPublication)
+                and _equals(dataset['compasModel'], compasModel) and _equals(dataset['id'], id)
+            )
+
+    def compasDatasetModel(self, info, id):
+        with self._lock:
+            return self._dataset_node(self._datasets[id]) if id in self._datasets else None
+
+    def generateCompasDatasetModelUploadToken(self, info):
+        return {'token': self._new_id('UploadToken')}
+
+    # Mutations
+
+    def _add(self, objects, prefix, values):
+        with self._lock:
+            _id = self._new_id(prefix)
+            objects[_id] = {**values, 'id': _id}
+            return {'id': _id}
+
+    def _update(self, objects, values):
+        with self._lock:
+            values = dict(values)
+            _id = values.pop('id')
+            if _id not in objects:
+                return {'result': False}
+            objects[_id].update(values)
+            return {'result': True}
+
+    def _delete(self, objects, values):
+        with self._lock:
+            return {'result': objects.pop(values['id'], None) is not None}
+
+    def addKeyword(self, info, input):
+        return self.add_keyword(**input)
+
+    def updateKeyword(self, info, input):
+        return self._update(self._keywords, input)
+
+    def deleteKeyword(self, info, input):
+        return self._delete(self._keywords, input)
+
+    def addPublication(self, info, input):
+        return self.add_publication(**input)
+
+    def updatePublication(self, info, input):
+        return self._update(self._publications, input)
+
+    def deletePublication(self, info, input):
+        with self._lock:
+            for dataset in list(self._datasets.values()):
+                if dataset['compasPublication'] == input['id']:
+                    del self._datasets[dataset['id']]
+            return self._delete(self._publications, input)
+
+    def addCompasModel(self, info, input):
+        return self.add_model(**input)
+
+    def updateCompasModel(self, info, input):
+        return self._update(self._models, input)
+
+    def deleteCompasModel(self, info, input):
+        with self._lock:
+            for dataset in list(self._datasets.values()):
+                if dataset['compasModel'] == input['id']:
+                    del self._datasets[dataset['id']]
+            return self._delete(self._models, input)
+
+    def uploadCompasDatasetModel(self, info, input):
+        filename, content = input['jobFile']
+        token = self._server.add_file(content)
+        return self.add_dataset(input['compasPublication'], input['compasModel'], {filename: token})
+
+    def updateCompasDatasetModel(self, info, input):
+        return self._update(self._datasets, input)
+
+    def deleteCompasDatasetModel(self, info, input):
+        return self._delete(self._datasets, input)
+
+    # Direct population, used for seeding
+
+    def add_keyword(self, tag):
+        return self._add(self._keywords, 'Keyword', {'tag': tag})
+
+    def add_publication(self, keywords=(), **fields):
+        return self._add(self._publications, 'Publication', {
+            'creationTime': datetime.now(timezone.utc).isoformat(),
+            **fields,
+            'keywords': list(keywords),
+        })
+
+    def add_model(self, **fields):
+        return self._add(self._models, 'Model', fields)
+
+    def add_dataset(self, publication_id, model_id, files):
+        return self._add(self._datasets, 'Dataset', {
+            'compasPublication': publication_id,
+            'compasModel': model_id,
+            'files': dict(files),
+        })
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b'', content_type='application/json', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if urlparse(self.path).path != '/graphql':
+            return self._send(404)
+
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.headers.get_content_type() == 'multipart/form-data':
+            operations = self._parse_multipart(body)
+        else:
+            operations = json.loads(body)
+
+        result = graphql_sync(
+            SCHEMA,
+            operations['query'],
+            root_value=self.server.stand_in.catalog,
+            variable_values=operations.get('variables'),
+        )
+
+        response = {'data': result.data}
+        if result.errors:
+            response['errors'] = [{'message': error.message} for error in result.errors]
+
+        self._send(200, json.dumps(response).encode())
+
+    def _parse_multipart(self, body):
+        # Implements the GraphQL multipart request spec, replacing each mapped variable with (filename, content)
+        message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+            f'Content-Type: {self.headers["Content-Type"]}\r\n\r\n'.encode() + body
+        )
+        parts = {part.get_param('name', header='content-disposition'): part for part in message.iter_parts()}
+
+        operations = json.loads(parts.pop('operations').get_content())
+        file_map = json.loads(parts.pop('map').get_content())
+
+        for key, paths in file_map.items():
+            part = parts[key]
+            value = (part.get_filename(), part.get_payload(decode=True))
+            for path in paths:
+                *parents, last = path.split('.')
+                target = operations
+                for name in parents:
+                    target = target[int(name)] if isinstance(target, list) else target[name]
+                target[last] = value
+
+        return operations
+
+    def do_HEAD(self):
+        self._serve_file(head=True)
+
+    def do_GET(self):
+        self._serve_file()
+
+    def _serve_file(self, head=False):
+        url = urlparse(self.path)
+        token = parse_qs(url.query).get('fileId', [None])[0]
+        if url.path != '/file_download/' or not self.server.stand_in.has_file(token):
+            return self._send(404)
+
+        stand_in = self.server.stand_in
+        stand_in.download_log.append((token, self.headers.get('Range')))
+
+        fault = stand_in.next_fault(token)
+        if fault.get('status'):
+            return self._send(fault['status'])
+
+        path = stand_in.file_path(token)
+        size = path.stat().st_size
+        start, end = 0, size - 1
+        status = 200
+
+        match = RANGE_PATTERN.match(self.headers.get('Range', ''))
+        if match and any(match.groups()):
+            first, last = match.groups()
+            if not first:
+                start = max(size - int(last), 0)
+            else:
+                start = int(first)
+                end = min(int(last), end) if last else end
+            if start > end:
+                return self._send(416, headers={'Content-Range': f'bytes */{size}'})
+            status = 206
+
+        length = end - start + 1
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(length))
+        self.send_header('Accept-Ranges', 'bytes')
+        if status == 206:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        self.end_headers()
+
+        if head:
+            return
+
+        if fault.get('drop_after') is not None:
+            # Send part of the file, then close the connection
+            length = min(length, fault['drop_after'])
+            self.close_connection = True
+
+        with path.open('rb') as f:
+            f.seek(start)
+            while length > 0:
+                chunk = f.read(min(CHUNK_SIZE, length))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                length -= len(chunk)
+
+
+class _Server(ThreadingHTTPServer):
+    # GraphQL requests open a new connection each, so allow for many clients connecting at once
+    request_queue_size = 128
+
+
+class LocalGWLandscapeServer:
+    """
+    Serves a local GraphQL endpoint and file server with an in-memory catalog, for use as a stand-in for the
+    GWLandscape API. Use as a context manager, or call :meth:`start` and :meth:`stop`.
+
+    Parameters
+    ----------
+    root_path : str or ~pathlib.Path, optional
+        Directory in which to store served files, by default a temporary directory removed when the server stops
+    """
+
+    def __init__(self, root_path=None):
+        self._tmpdir = None if root_path else tempfile.TemporaryDirectory()
+        self.root_path = Path(root_path or self._tmpdir.name)
+        self.catalog = _Catalog(self)
+        self._files = {}
+        self._file_ids = itertools.count(1)
+        self._faults = {}
+        self._lock = threading.Lock()
+        # The download token and Range header of each file request
+        self.download_log = []
+        self._httpd = None
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        self._httpd = _Server(('127.0.0.1', 0), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.stand_in = self
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._thread.join()
+            self._httpd = None
+        if self._tmpdir is not None:
+            self._tmpdir.cleanup()
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address
+        return f'http://{host}:{port}'
+
+    @property
+    def endpoint(self):
+        return f'{self.url}/graphql'
+
+    @property
+    def file_download_endpoint(self):
+        return f'{self.url}/file_download/?fileId='
+
+    def client(self, **kwargs):
+        """Create a :class:`~.GWLandscape` client connected to this server
+
+        Returns
+        -------
+        ~gwlandscape_python.gwlandscape.GWLandscape
+            Connected client
+        """
+        from gwlandscape_python import GWLandscape
+        return GWLandscape(
+            token='local-token',
+            endpoint=self.endpoint,
+            file_download_endpoint=self.file_download_endpoint,
+            **kwargs
+        )
+
+    def async_client(self, **kwargs):
+        """Create an :class:`~.AsyncGWLandscape` client connected to this server
+
+        Returns
+        -------
+        ~gwlandscape_python.async_gwlandscape.AsyncGWLandscape
+            Client, to be used as an asynchronous context manager
+        """
+        from gwlandscape_python import AsyncGWLandscape
+        return AsyncGWLandscape(
+            token='local-token',
+            endpoint=self.endpoint,
+            file_download_endpoint=self.file_download_endpoint,
+            **kwargs
+        )
+
+    def add_file(self, content):
+        """Add a file to be served, returning its download token
+
+        Parameters
+        ----------
+        content : bytes or ~pathlib.Path
+            File contents, or the path of an existing file to serve
+
+        Returns
+        -------
+        str
+            Download token
+        """
+        with self._lock:
+            token = f'token-{next(self._file_ids)}'
+            if isinstance(content, bytes):
+                path = self.root_path / 'files' / token
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(content)
+                content = path
+            self._files[token] = Path(content)
+            return token
+
+    def inject_fault(self, token, status=None, drop_after=None, times=1):
+        """Make the next requests for a file fail
+
+        Parameters
+        ----------
+        token : str
+            Download token of the file
+        status : int, optional
+            Respond with this HTTP status code instead of the file
+        drop_after : int, optional
+            Close the connection after sending this many bytes of the file
+        times : int, optional
+            Number of requests that fail, by default 1
+        """
+        with self._lock:
+            self._faults.setdefault(token, []).extend([{'status': status, 'drop_after': drop_after}] * times)
+
+    def next_fault(self, token):
+        with self._lock:
+            faults = self._faults.get(token)
+            return faults.pop(0) if faults else {}
+
+    def has_file(self, token):
+        return token in self._files
+
+    def file_path(self, token):
+        return self._files[token]
+
+    def file_size(self, token):
+        return self._files[token].stat().st_size
+
+    def seed(self, n_publications=10, n_models=2, n_keywords=5, n_systems=1000, n_extra_files=2, extra_file_size=1024):
+        """Populate the catalog with synthetic publications, models and datasets. Every publication has a dataset for
+        each model, made up of a COMPAS-shaped HDF5 file and some smaller files. All datasets share the same HDF5 file.
+
+        Parameters
+        ----------
+        n_publications : int, optional
+            Number of publications, by default 10
+        n_models : int, optional
+            Number of models, by default 2
+        n_keywords : int, optional
+            Number of keywords, which are all assigned to every publication, by default 5
+        n_systems : int, optional
+            Number of binary systems in the HDF5 file, by default 1000
+        n_extra_files : int, optional
+            Number of additional files in each dataset, by default 2
+        extra_file_size : int, optional
+            Size of each additional file in bytes, by default 1024
+        """
+        h5_path = create_compas_file(self.root_path / 'seed' / 'COMPAS_Output.h5', n_systems=n_systems)
+        extra_paths = []
+        for j in range(n_extra_files):
+            extra_paths.append(self.root_path / 'seed' / f'output_{j}.txt')
+            extra_paths[-1].write_bytes(bytes(b % 256 for b in range(j, j + extra_file_size)))
+
+        keywords = [self.catalog.add_keyword(tag=f'tag {i}')['id'] for i in range(n_keywords)]
+        models = [
+            self.catalog.add_model(name=f'model {i}', summary=f'summary {i}', description=f'description {i}')['id']
+            for i in range(n_models)
+        ]
+
+        for i in range(n_publications):
+            publication = self.catalog.add_publication(
+                keywords=keywords,
+                author=f'author {i}',
+                published=True,
+                title=f'title {i}',
+                year=2000 + i % 20,
+                journal=f'journal {i}',
+                journalDoi=f'journal doi {i}',
+                datasetDoi=f'dataset doi {i}',
+                description=f'description {i}',
+                public=True,
+                downloadLink=f'download link {i}',
+                arxivId=f'arxiv id {i}',
+            )['id']
+
+            for model in models:
+                files = {'COMPAS_Output/COMPAS_Output.h5': self.add_file(h5_path)}
+                for path in extra_paths:
+                    files[f'COMPAS_Output/Detailed_Output/{path.name}'] = self.add_file(path)
+                self.catalog.add_dataset(publication, model, files)
@@ -0,0 +1,295 @@
+import asyncio
+import io
+import tarfile
+import threading
+from pathlib import Path
+
+import pytest
+from gwdc_python.exceptions import GWDCAuthenticationError
+from gwdc_python.files import FileReference, FileReferenceList
+
+from gwlandscape_python import AsyncGWLandscape, RequestEvent, queries
+from gwlandscape_python.tests.utils import create_compas_file
+from gwlandscape_python.utils import RetryPolicy, read_manifest, verify
+from gwlandscape_python.utils import file_download
+from gwlandscape_python.utils.optimise import optimise_dataset
+
+pytest.importorskip('aiohttp')
+
+
+def run(coroutine_fn, client):
+    async def _run():
+        async with client as gwl:
+            return await coroutine_fn(gwl)
+    return asyncio.run(_run())
+
+
+def test_async_queries(local_server, local_gwl):
+    async def _queries(gwl):
+        publication = (await gwl.get_publications(title='title 2'))[0]
+        return (
+            await gwl.get_keywords(),
+            await gwl.get_keywords(contains='1'),
+            publication,
+            await gwl.get_models(),
+            await gwl.get_datasets(publication=publication),
+        )
+
+    keywords, filtered, publication, models, datasets = run(_queries, local_server.async_client())
+
+    assert keywords == local_gwl.get_keywords()
+    assert filtered == local_gwl.get_keywords(contains='1')
+    assert publication == local_gwl.get_publications(title='title 2')[0]
+    assert models == local_gwl.get_models()
+    assert datasets == local_gwl.get_datasets(publication=publication)
+
+    with pytest.raises(SyntaxError):
+        asyncio.run(AsyncGWLandscape().get_keywords(exact='a', contains='b'))
+
+
+def test_async_shares_queries(mocker, setup_gwl_request, query_dataset_return):
+    gwl, mock_request = setup_gwl_request
+    mock_request.return_value = query_dataset_return(2)
+    async_gwl = AsyncGWLandscape(token='token')
+    mock_send = mocker.patch.object(async_gwl, '_send_request', mocker.AsyncMock(return_value=query_dataset_return(2)))
+
+    assert asyncio.run(async_gwl.get_datasets(_id='mock_dataset_id1')) == gwl.get_datasets(_id='mock_dataset_id1')
+
+    query, variables, _, _ = mock_send.call_args.args
+    assert query == mock_request.call_args.kwargs['query']
+    assert variables == mock_request.call_args.kwargs['variables']
+
+
+def test_async_authentication(mocker):
+    gwl = AsyncGWLandscape(token='wrong-token')
+    mocker.patch.object(gwl, '_send_request', mocker.AsyncMock(return_value={'session_user': None}))
+
+    with pytest.raises(GWDCAuthenticationError):
+        run(lambda gwl: gwl.get_keywords(), gwl)
+
+
+def test_async_create_dataset(local_server, tmp_path):
+    datafile = create_compas_file(tmp_path / 'upload.h5', n_systems=100)
+
+    async def _create(gwl):
+        keyword = await gwl.create_keyword('async keyword')
+        publication = await gwl.create_publication(
+            author='author', title='async publication', arxiv_id='5678', keywords=[keyword]
+        )
+        model = await gwl.create_model('async model')
+        dataset = await gwl.create_dataset(publication, model, datafile)
+        files = await gwl.get_files_by_reference((await gwl.get_files_by_datasets([dataset]))[0])
+        return publication, model, dataset, files
+
+    publication, model, dataset, files = run(_create, local_server.async_client(progress='none'))
+
+    assert dataset.publication == publication
+    assert dataset.model == model
+    assert files == [(files[0][0], datafile.read_bytes())]
+
+    gwl = local_server.client()
+    gwl.get_datasets(_id=dataset.id)[0].delete()
+    gwl.get_publications(_id=publication.id)[0].delete()
+    gwl.get_models(_id=model.id)[0].delete()
+    gwl.get_keywords(_id=publication.keywords[0].id)[0].delete()
+
+
+def test_async_create_dataset_in_thread(mocker, local_server, tmp_path):
+    datafile = create_compas_file(tmp_path / 'upload.h5', n_systems=100, chunks=10)
+    threads, reports = [], []
+    mocker.patch('gwlandscape_python.gwlandscape.validate_dataset',
+                 side_effect=lambda path: threads.append(threading.get_ident()))
+
+    def _optimise(*args, **kwargs):
+        threads.append(threading.get_ident())
+        reports.append(optimise_dataset(*args, **kwargs))
+        return reports[-1]
+
+    mocker.patch('gwlandscape_python.utils.optimise.optimise_dataset', side_effect=_optimise)
+
+    async def _create(gwl):
+        publication = (await gwl.get_publications())[0]
+        model = (await gwl.get_models())[0]
+        return await gwl.create_dataset(publication, model, datafile, optimise=True)
+
+    dataset = run(_create, local_server.async_client(progress='none'))
+
+    # The file is validated and optimised outside of the event loop, and the optimised copy is removed once uploaded
+    assert len(threads) == 2 and threading.get_ident() not in threads
+    assert not reports[0].path.exists()
+    local_server.client().get_datasets(_id=dataset.id)[0].delete()
+
+
+def test_async_run_request_errors(mocker):
+    client = mocker.Mock(request=mocker.AsyncMock(side_effect=[ConnectionError, {'fallback': True}]))
+    cleaned_up = []
+
+    def operation():
+        try:
+            try:
+                yield queries._call(query='first')
+            except ConnectionError:
+                return (yield queries._call(query='fallback'))
+        finally:
+            cleaned_up.append(True)
+
+    assert asyncio.run(queries.run_async(client, operation())) == {'fallback': True}
+    assert cleaned_up == [True]
+
+    # Operations are closed when the task running them is cancelled
+    async def _cancelled():
+        client.request = mocker.AsyncMock(side_effect=asyncio.CancelledError)
+        await queries.run_async(client, operation())
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(_cancelled())
+    assert cleaned_up == [True, True]
+
+
+def test_async_downloads(mocker, local_server, tmp_path):
+    events = []
+
+    # Track the number of downloads in progress at once
+    active, max_active = 0, 0
+    stream_file = file_download._stream_file_async
+
+    async def _tracked_stream_file(*args, **kwargs):
+        nonlocal active, max_active
+        active += 1
+        max_active = max(active, max_active)
+        try:
+            return await stream_file(*args, **kwargs)
+        finally:
+            active -= 1
+
+    mocker.patch('gwlandscape_python.utils.file_download._stream_file_async', _tracked_stream_file)
+
+    async def _download(gwl):
+        gwl.add_event_listener(events.append)
+        file_lists = await gwl.get_files_by_datasets(await gwl.get_datasets())
+        file_list = FileReferenceList([f for dataset_file_list in file_lists for f in dataset_file_list])
+        files = await gwl.get_files_by_reference(file_list)
+        saved = await gwl.save_files_by_reference(file_lists[0], tmp_path)
+        return file_list, file_lists[0], files, saved
+
+    file_list, saved_list, files, saved = run(
+        _download, local_server.async_client(progress='none', max_concurrency=2)
+    )
+
+    assert files.ok and saved.ok
+    assert files == [(ref.path, local_server.file_path(ref.download_token).read_bytes()) for ref in file_list]
+    assert saved == [tmp_path / ref.path for ref in saved_list]
+    assert verify(tmp_path) == []
+    assert max_active == 2
+    assert any(isinstance(event, RequestEvent) for event in events)
+
+
+def test_async_download_recovery(local_server, tmp_path):
+    async def _download(gwl):
+        file_list = (await gwl.get_files_by_datasets(await gwl.get_datasets()))[0]
+        h5_ref, missing_ref, flaky_ref = file_list
+
+        local_server.download_log.clear()
+        local_server.inject_fault(h5_ref.download_token, drop_after=20000)
+        local_server.inject_fault(missing_ref.download_token, status=404)
+        local_server.inject_fault(flaky_ref.download_token, status=503, times=2)
+
+        return file_list, await gwl.save_files_by_reference(file_list, tmp_path)
+
+    file_list, report = run(
+        _download, local_server.async_client(progress='none', retry=RetryPolicy(backoff=0))
+    )
+    h5_ref, missing_ref, flaky_ref = file_list
+
+    assert report == [tmp_path / h5_ref.path, tmp_path / flaky_ref.path]
+    assert [file_ref for file_ref, _ in report.failed] == [missing_ref]
+    for file_ref in [h5_ref, flaky_ref]:
+        assert (tmp_path / file_ref.path).read_bytes() == local_server.file_path(file_ref.download_token).read_bytes()
+    assert (h5_ref.download_token, 'bytes=20000-') in local_server.download_log
+
+
+def test_async_save_error_file_removed(mocker, local_server, tmp_path):
+    async def _save(gwl):
+        return await gwl.save_files_by_reference(file_list, tmp_path)
+
+    async def _stream_file_async(session, file_ref, f, *args, **kwargs):
+        # The file is removed by something else before the download fails
+        Path(f.name).unlink()
+        raise error
+
+    file_list = local_server.client().get_datasets()[0].get_full_file_list()[:1]
+    error = IOError('download failed')
+    mocker.patch('gwlandscape_python.utils.file_download._stream_file_async', _stream_file_async)
+    report = run(_save, local_server.async_client(progress='none', retry=None))
+
+    # The download's own error is reported, rather than one from cleaning up
+    assert report.failed == [(file_list[0], error)]
+
+
+def test_async_resume(local_server, tmp_path):
+    async def _save(gwl):
+        return await gwl.save_files_by_reference(file_list, tmp_path, resume=True)
+
+    file_list = local_server.client().get_datasets()[0].get_full_file_list()
+    h5_ref = file_list[0]
+    h5_path = tmp_path / h5_ref.path
+    partial_path = h5_path.with_name(h5_path.name + '.part')
+
+    local_server.inject_fault(h5_ref.download_token, drop_after=20000)
+    report = run(_save, local_server.async_client(progress='none', retry=None))
+
+    # The partial download is kept for the next call
+    assert [file_ref for file_ref, _ in report.failed] == [h5_ref]
+    assert not h5_path.exists()
+    offset = partial_path.stat().st_size
+    assert 0 < offset <= 20000
+
+    local_server.download_log.clear()
+    report = run(_save, local_server.async_client(progress='none', retry=None))
+
+    # Only the rest of the partial file is downloaded, and the complete files are skipped
+    assert report == [tmp_path / path for path in file_list.get_paths()]
+    assert local_server.download_log == [(h5_ref.download_token, f'bytes={offset}-')]
+    assert h5_path.read_bytes() == local_server.file_path(h5_ref.download_token).read_bytes()
+    assert not partial_path.exists()
+    assert verify(tmp_path) == []
+
+
+def test_async_extract(local_server, tmp_path):
+    async def _save(gwl, resume=False):
+        return await gwl.save_files_by_reference(file_list, tmp_path / 'saved', resume=resume, extract=True)
+
+    h5_path = create_compas_file(tmp_path / 'upload' / 'COMPAS_Output.h5', n_systems=2000)
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w:gz') as tar:
+        tar.add(h5_path, arcname='COMPAS_Output/COMPAS_Output.h5')
+    token = local_server.add_file(buffer.getvalue())
+    dataset = local_server.client().get_datasets()[0]
+    file_list = FileReferenceList([
+        FileReference(
+            path='COMPAS_Output.tar.gz', file_size=len(buffer.getvalue()), download_token=token, parent=dataset
+        ),
+    ])
+
+    # The dropped download is resumed into the same extraction
+    local_server.inject_fault(token, drop_after=5000)
+    report = run(_save, local_server.async_client(progress='none', retry=RetryPolicy(backoff=0)))
+
+    assert report == [tmp_path / 'saved' / 'COMPAS_Output.h5']
+    assert report[0].read_bytes() == h5_path.read_bytes()
+    assert not (tmp_path / 'saved' / 'COMPAS_Output.tar.gz').exists()
+    assert list(read_manifest(tmp_path / 'saved')) == ['COMPAS_Output.h5']
+
+    # Resuming skips the tarball, as its HDF5 file has already been extracted
+    n_downloads = len(local_server.download_log)
+    assert run(lambda gwl: _save(gwl, resume=True), local_server.async_client(progress='none')) == report
+    assert len(local_server.download_log) == n_downloads
+
+
+def test_async_dataset_file_list(local_server):
+    async def _datasets(gwl):
+        return await gwl.get_datasets()
+
+    dataset = run(_datasets, local_server.async_client())[0]
+    with pytest.raises(RuntimeError):
+        dataset.get_full_file_list()
@@ -0,0 +1,137 @@
+import pytest
+
+from gwlandscape_python import CatalogIndex, Dataset, Keyword
+
+
+@pytest.fixture
+def setup_catalog(setup_gwl_request, create_publication, create_model, create_dataset_files):
+    gwl, mock_request = setup_gwl_request
+
+    keywords = [Keyword(client=gwl, id=f'keyword_id{i}', tag=tag) for i, tag in enumerate(['Binary', 'Neutron'], 1)]
+
+    publications = [create_publication(gwl, i) for i in range(1, 4)]
+    publications[0].keywords = [keywords[0]]
+    publications[1].keywords = [keywords[0], keywords[1]]
+    publications[2].keywords = [keywords[1]]
+
+    models = [create_model(gwl, i) for i in range(1, 3)]
+
+    datasets = [
+        Dataset(gwl, f'dataset_id{i}', publications[p], models[m])
+        for i, (p, m) in enumerate([(0, 0), (1, 0), (1, 1), (2, 1)], 1)
+    ]
+
+    files = {dataset.id: create_dataset_files(dataset, 2) for dataset in datasets[:2]}
+
+    index = CatalogIndex(publications=publications, models=models, datasets=datasets, files=files, client=gwl)
+
+    return gwl, mock_request, index, keywords, publications, models, datasets
+
+
+def _ids(objects):
+    return [obj.id for obj in objects]
+
+
+def test_catalog_publications(setup_catalog):
+    _, _, index, keywords, _, models, _ = setup_catalog
+
+    assert _ids(index.publications()) == ['mock_publication_id1', 'mock_publication_id2', 'mock_publication_id3']
+    assert _ids(index.publications(keyword=keywords[0])) == ['mock_publication_id1', 'mock_publication_id2']
+    assert _ids(index.publications(keyword='NEUTRON')) == ['mock_publication_id2', 'mock_publication_id3']
+    assert _ids(index.publications(keyword='missing')) == []
+    assert _ids(index.publications(model=models[1])) == ['mock_publication_id2', 'mock_publication_id3']
+    assert _ids(index.publications(keyword='binary', model=models[1])) == ['mock_publication_id2']
+
+
+def test_catalog_datasets(setup_catalog):
+    _, _, index, keywords, publications, models, _ = setup_catalog
+
+    assert _ids(index.datasets()) == ['dataset_id1', 'dataset_id2', 'dataset_id3', 'dataset_id4']
+    assert _ids(index.datasets(publication=publications[1])) == ['dataset_id2', 'dataset_id3']
+    assert _ids(index.datasets(model=models[0])) == ['dataset_id1', 'dataset_id2']
+    assert _ids(index.datasets(keyword='binary')) == ['dataset_id1', 'dataset_id2', 'dataset_id3']
+    assert _ids(index.datasets(keyword='binary', model=models[1])) == ['dataset_id3']
+    assert _ids(index.datasets(keyword=keywords[1], publication=publications[0])) == []
+    assert _ids(index.datasets(keyword='neutron', publication=publications[1], model=models[0])) == ['dataset_id2']
+
+
+def test_catalog_models_keywords(setup_catalog):
+    _, _, index, keywords, publications, _, _ = setup_catalog
+
+    assert _ids(index.models(publication=publications[1])) == ['mock_model_id1', 'mock_model_id2']
+    assert _ids(index.models(keyword='Binary')) == ['mock_model_id1', 'mock_model_id2']
+    assert _ids(index.models(keyword=keywords[1], publication=publications[2])) == ['mock_model_id2']
+    assert index.keywords() == keywords
+    assert index.keywords(publication=publications[2]) == [keywords[1]]
+
+
+def test_catalog_files(setup_catalog):
+    _, _, index, _, publications, models, datasets = setup_catalog
+
+    assert index.files(dataset=datasets[0]).get_paths() == index.files(publication=publications[0]).get_paths()
+    assert len(index.files(model=models[0])) == 4
+    assert len(index.files(dataset=datasets[3])) == 0
+
+
+def test_catalog_follows_changes(setup_catalog):
+    _, mock_request, index, keywords, publications, models, datasets = setup_catalog
+
+    mock_request.return_value = {'update_compas_dataset_model': {'result': True}}
+    datasets[0].update(model=models[1])
+    assert _ids(index.datasets(model=models[0])) == ['dataset_id2']
+    assert _ids(index.datasets(model=models[1])) == ['dataset_id1', 'dataset_id3', 'dataset_id4']
+
+    mock_request.return_value = {'update_publication': {'result': True}}
+    publications[2].update(keywords=[keywords[0]])
+    assert _ids(index.publications(keyword='neutron')) == ['mock_publication_id2']
+    assert _ids(index.datasets(keyword='binary')) == ['dataset_id1', 'dataset_id2', 'dataset_id3', 'dataset_id4']
+
+    mock_request.return_value = {'update_keyword': {'result': True}}
+    keywords[1].update(tag='Pulsar')
+    assert _ids(index.publications(keyword='neutron')) == []
+    assert _ids(index.publications(keyword='pulsar')) == ['mock_publication_id2']
+
+    mock_request.return_value = {'delete_compas_model': {'result': True}}
+    models[1].delete()
+    assert _ids(index.datasets()) == ['dataset_id2']
+    assert _ids(index.models()) == ['mock_model_id1']
+
+    mock_request.return_value = {'delete_publication': {'result': True}}
+    publications[1].delete()
+    assert _ids(index.datasets()) == []
+    assert len(index.files()) == 0
+
+
+def test_catalog_keeps_publications(setup_catalog):
+    _, _, index, keywords, publications, _, _ = setup_catalog
+    replacement = Keyword(client=None, id=keywords[0].id, tag='Compact binary')
+
+    # Keyword changes are kept in the index, and never change the caller's publications
+    index.catalog_changed('updated', replacement)
+    assert index.keywords(publication=publications[1]) == [replacement, keywords[1]]
+    assert publications[1].keywords == [keywords[0], keywords[1]]
+    assert _ids(index.publications(keyword='compact binary')) == ['mock_publication_id1', 'mock_publication_id2']
+
+    index.catalog_changed('deleted', keywords[1])
+    assert index.keywords(publication=publications[1]) == [replacement]
+    assert publications[1].keywords == [keywords[0], keywords[1]]
+    assert _ids(index.publications(keyword='neutron')) == []
+
+
+def test_build_catalog_index(setup_gwl_request, query_dataset_return, query_publication_return, query_model_return,
+                             query_dataset_files_return):
+    gwl, mock_request = setup_gwl_request
+
+    mock_request.side_effect = [
+        query_dataset_return(1),
+        {'dataset0': query_dataset_files_return(2)['compas_dataset_model']},
+        query_publication_return(1),
+        query_model_return(1),
+    ]
+
+    index = gwl.build_catalog_index(include_files=True)
+
+    dataset = index.datasets()[0]
+    assert _ids(index.datasets(keyword='mock tag 1')) == ['mock_dataset_id1']
+    assert _ids(index.publications(model=dataset.model)) == ['mock_publication_id1']
+    assert len(index.files(dataset=dataset)) == 2
@@ -0,0 +1,123 @@
+import json
+
+import pytest
+
+from gwlandscape_python.cli import main
+from gwlandscape_python.tests.utils import create_compas_file
+from gwlandscape_python.utils import verify
+from gwlandscape_python.utils.sync import dataset_directory
+
+
+@pytest.fixture
+def run(local_server, capsys):
+    def _run(*args):
+        status = main([
+            *args,
+            '--token', 'local-token',
+            '--endpoint', local_server.endpoint,
+            '--file-download-endpoint', local_server.file_download_endpoint,
+        ])
+        out, err = capsys.readouterr()
+        return status, out, err
+    return _run
+
+
+def _json_lines(text):
+    return [json.loads(line) for line in text.splitlines()]
+
+
+def test_cli_list(run, local_gwl):
+    datasets = local_gwl.get_datasets()
+
+    status, out, _ = run('list')
+    assert status == 0
+    assert [line.split('\t')[0] for line in out.splitlines()] == [dataset.id for dataset in datasets]
+
+    status, out, _ = run('list', '--files', '--json', '--publication', datasets[0].publication.id)
+    selected = [dataset for dataset in datasets if dataset.publication == datasets[0].publication]
+    results = _json_lines(out)
+    assert [result['id'] for result in results] == [dataset.id for dataset in selected]
+    assert results[0]['files'] == [
+        {'path': str(file_ref.path), 'size': file_ref.file_size} for file_ref in selected[0].get_full_file_list()
+    ]
+
+
+def test_cli_download(run, local_server, local_gwl, tmp_path):
+    dataset = local_gwl.get_datasets()[1]
+    h5_ref, missing_ref, _ = dataset.get_full_file_list()
+    local_server.inject_fault(h5_ref.download_token, drop_after=20000)
+    local_server.inject_fault(missing_ref.download_token, status=404)
+
+    status, out, err = run(
+        'download', str(tmp_path), '--dataset', dataset.id, '--retries', '0', '--workers', '2', '--progress', 'json',
+        '--json', '--resume'
+    )
+
+    # Files that fail make the exit status non-zero, without stopping the others
+    assert status == 1
+    result = _json_lines(out)[0]
+    directory = tmp_path / dataset_directory(dataset)
+    assert sorted(error['path'] for error in result['failed']) == sorted(
+        str(dataset_directory(dataset) / file_ref.path) for file_ref in [h5_ref, missing_ref]
+    )
+    missing_path = directory / missing_ref.path
+    assert not missing_path.with_name(missing_path.name + '.part').exists()
+    events = _json_lines(err)
+    assert {event['event'] for event in events} == {'progress', 'file'}
+    assert len([event for event in events if event['event'] == 'file']) == 3
+
+    # Resuming continues the partial download and fetches the missing file
+    local_server.download_log.clear()
+    status, out, _ = run('download', str(tmp_path), '--dataset', dataset.id, '--resume', '--json')
+    assert status == 0
+    assert sorted(_json_lines(out)[0]['saved']) == sorted(
+        str(directory / file_ref.path) for file_ref in dataset.get_full_file_list()
+    )
+    assert (h5_ref.download_token, 'bytes=20000-') in local_server.download_log
+    assert verify(tmp_path) == []
+
+
+def test_cli_sync(run, local_gwl, tmp_path):
+    publication = local_gwl.get_publications()[0]
+    n_files = sum(len(dataset.get_full_file_list()) for dataset in local_gwl.get_datasets(publication=publication))
+
+    status, out, _ = run('sync', str(tmp_path), '--publication', publication.id, '--json', '--chunk-size', '1024')
+    assert status == 0
+    assert len(_json_lines(out)[0]['downloaded']) == n_files
+
+    status, out, _ = run('sync', str(tmp_path), '--publication', publication.id)
+    assert status == 0
+    assert out == f'Synced 2 datasets: 0 files downloaded, {n_files} up to date, 0 pruned, 0 failed\n'
+
+
+def test_cli_errors(run, monkeypatch):
+    status, _, err = run('download', 'unused', '--dataset', 'not-a-dataset')
+    assert status == 3
+    assert 'not-a-dataset' in err
+
+    monkeypatch.delenv('GWLANDSCAPE_TOKEN', raising=False)
+    with pytest.raises(SystemExit) as e:
+        main(['list'])
+    assert e.value.code == 2
+
+    with pytest.raises(SystemExit):
+        run('download', 'unused', '--workers', '0')
+
+
+def test_cli_upload(run, local_gwl, tmp_path):
+    publication = local_gwl.get_publications()[0]
+    model = local_gwl.get_models()[0]
+    datafile = create_compas_file(tmp_path / 'upload.h5', n_systems=100)
+    invalid = tmp_path / 'invalid.txt'
+    invalid.write_text('not a dataset')
+
+    status, out, err = run('upload', str(datafile), str(invalid), '--publication', publication.id, '--model', model.id)
+
+    assert status == 1
+    path, dataset_id = out.split()
+    assert path == str(datafile)
+    assert str(invalid) in err
+
+    dataset = local_gwl.get_datasets(_id=dataset_id)[0]
+    assert dataset.publication == publication and dataset.model == model
+    dataset.delete()
@@ -1,11 +1,15 @@
+import copy
 import uuid
+from dataclasses import fields
 from tempfile import NamedTemporaryFile
 import h5py
 
 import pytest
+import requests
 
-from gwlandscape_python import FileReference
+from gwlandscape_python import FileReference, RequestEvent, RetryEvent, queries
 from gwlandscape_python.tests.utils import compare_graphql_query
+from gwlandscape_python.utils import DownloadReport, RetryPolicy
 
 
 @pytest.fixture
@@ -223,7 +227,7 @@ def get_datasets_query():
 def setup_mock_download_fns(mocker, create_dataset_files):
     def _setup_mock_download_fns(dataset):
         mock_files = mocker.Mock(
-            return_value=[(f.path, NamedTemporaryFile()) for f in create_dataset_files(dataset, 3)]
+            return_value=DownloadReport([(f.path, NamedTemporaryFile()) for f in create_dataset_files(dataset, 3)])
         )
 
         return (
@@ -540,11 +544,11 @@ def test_create_dataset(create_dataset_request, mock_dataset_data, get_datasets_
 
     publication, model = dataset.publication, dataset.model
 
-    for key, val in publication.__dict__.items():
-        assert getattr(dataset.publication, key) == val
+    for field in fields(publication):
+        assert getattr(dataset.publication, field.name) == getattr(publication, field.name)
 
-    for key, val in model.__dict__.items():
-        assert getattr(dataset.model, key) == val
+    for field in fields(model):
+        assert getattr(dataset.model, field.name) == getattr(model, field.name)
 
     assert compare_graphql_query(
         mock_request.mock_calls[0].kwargs['query'],
@@ -634,6 +638,25 @@ def test_get_datasets(
     }
 
 
+def test_get_datasets_shares_objects(setup_gwl_request, query_dataset_return):
+    gwl, mock_request = setup_gwl_request
+
+    result = query_dataset_return(1)
+    edges = result['compas_dataset_models']['edges']
+    edges.append(copy.deepcopy(edges[0]))
+    edges[1]['node']['id'] = 'mock_dataset_id2'
+    mock_request.return_value = result
+
+    datasets = gwl.get_datasets()
+    assert [dataset.id for dataset in datasets] == ['mock_dataset_id1', 'mock_dataset_id2']
+
+    assert datasets[0].publication is datasets[1].publication
+    assert datasets[0].model is datasets[1].model
+    assert not hasattr(datasets[0].publication, '__dict__')
+    assert not hasattr(datasets[0].model, '__dict__')
+    assert all(not hasattr(keyword, '__dict__') for keyword in datasets[0].publication.keywords)
+
+
 def test_gwlandscape_files_by_dataset(
     setup_gwl_request,
     query_dataset_files_return,
@@ -655,7 +678,91 @@ def test_gwlandscape_files_by_dataset(
         )
 
 
+def test_gwlandscape_files_by_datasets(
+    setup_gwl_request,
+    query_dataset_files_return,
+    create_dataset_files,
+    create_dataset
+):
+    gwl, mr = setup_gwl_request
+
+    datasets = [create_dataset(gwl, i) for i in range(1, 4)]
+    mr.side_effect = [
+        {f'dataset{i}': query_dataset_files_return(n_files=i + 1)['compas_dataset_model'] for i in range(2)},
+        {'dataset0': query_dataset_files_return(n_files=3)['compas_dataset_model']},
+    ]
+
+    file_lists = gwl.get_files_by_datasets(datasets, batch_size=2)
+
+    assert file_lists == [create_dataset_files(dataset, n_files=i + 1) for i, dataset in enumerate(datasets)]
+    assert mr.call_count == 2
+
+    assert compare_graphql_query(
+        mr.mock_calls[0].kwargs['query'],
+        """
+            query ($id0: ID!, $id1: ID!) {
+                dataset0: compasDatasetModel (id: $id0) {
+                    files {
+                        path
+                        fileSize
+                        downloadToken
+                    }
+                }
+                dataset1: compasDatasetModel (id: $id1) {
+                    files {
+                        path
+                        fileSize
+                        downloadToken
+                    }
+                }
+            }
+        """
+    )
+    assert mr.mock_calls[0].kwargs['variables'] == {'id0': 'mock_dataset_id1', 'id1': 'mock_dataset_id2'}
+    assert mr.mock_calls[1].kwargs['variables'] == {'id0': 'mock_dataset_id3'}
+
+    # The file lists are cached on the datasets
+    assert [dataset.get_full_file_list() for dataset in datasets] == file_lists
+    assert gwl.get_files_by_datasets(datasets) == file_lists
+    assert mr.call_count == 2
+
+
+def test_gwlandscape_files_by_datasets_missing(
+    setup_gwl_request,
+    query_dataset_files_return,
+    create_dataset
+):
+    gwl, mr = setup_gwl_request
+
+    datasets = [create_dataset(gwl, i) for i in range(1, 3)]
+    mr.return_value = {'dataset0': query_dataset_files_return(n_files=1)['compas_dataset_model'], 'dataset1': None}
+
+    with pytest.raises(ValueError, match='mock_dataset_id2'):
+        gwl.get_files_by_datasets(datasets)
+
+    # A missing dataset isn't mistaken for an empty one
+    assert not any(dataset.has_cached_file_list() for dataset in datasets)
+
+
+def test_dataset_file_list_cache(setup_gwl_request, query_dataset_files_return, create_dataset):
+    gwl, mr = setup_gwl_request
+    mr.side_effect = [query_dataset_files_return(n_files=1), query_dataset_files_return(n_files=2)]
+
+    dataset = create_dataset(gwl)
+    assert not dataset.has_cached_file_list()
+
+    assert len(dataset.get_full_file_list()) == 1
+    assert len(dataset.get_full_file_list()) == 1
+    assert dataset.has_cached_file_list()
+    assert mr.call_count == 1
+
+    dataset.invalidate_file_list()
+    assert len(dataset.get_full_file_list()) == 2
+    assert mr.call_count == 2
+
+
 def test_gwlandscape_get_files_by_reference(
+    mocker,
     setup_gwl_request,
     setup_mock_download_fns,
     create_dataset,
@@ -674,11 +781,19 @@ def test_gwlandscape_get_files_by_reference(
 
     mock_download_files.assert_called_once_with(
         mock_get_fn,
-        test_files
+        test_files,
+        download_endpoint=gwl.file_download_endpoint,
+        emit=None,
+        progress=mocker.ANY,
+        retry=gwl.retry,
+        bandwidth=None,
+        max_workers=gwl.max_workers,
+        chunk_size=gwl.chunk_size
     )
 
 
 def test_gwlandscape_save_files_by_reference(
+    mocker,
     setup_gwl_request,
     setup_mock_download_fns,
     create_dataset,
@@ -698,5 +813,85 @@ def test_gwlandscape_save_files_by_reference(
     mock_download_files.assert_called_once_with(
         mock_save_fn,
         test_files,
-        mock_root_path
+        mock_root_path,
+        download_endpoint=gwl.file_download_endpoint,
+        emit=None,
+        progress=mocker.ANY,
+        retry=gwl.retry,
+        bandwidth=None,
+        max_workers=gwl.max_workers,
+        chunk_size=gwl.chunk_size,
+        manifest=mocker.ANY,
+        resume=False,
+        extract=False
     )
+
+
+def test_request_retries_queries(mocker, setup_gwl_request, query_keyword_return):
+    gwl, mock_request = setup_gwl_request
+    gwl.retry = RetryPolicy(backoff=0)
+    events = []
+    gwl.add_event_listener(events.append)
+
+    mock_request.side_effect = [requests.ConnectionError('reset'), query_keyword_return(1)]
+
+    assert len(gwl.get_keywords()) == 1
+    assert mock_request.call_count == 2
+    assert mock_request.mock_calls[1] == mock_request.mock_calls[0]
+    assert [type(event) for event in events] == [RequestEvent, RetryEvent, RequestEvent]
+    assert events[1].operation == 'keywords'
+
+
+def test_request_does_not_retry_mutations(setup_gwl_request):
+    gwl, mock_request = setup_gwl_request
+    gwl.retry = RetryPolicy(backoff=0)
+
+    mock_request.side_effect = requests.ConnectionError('reset')
+
+    with pytest.raises(requests.ConnectionError):
+        gwl.create_keyword('tag')
+    assert mock_request.call_count == 1
+
+
+def test_request_rate_limit(mocker, setup_gwl_request, query_keyword_return):
+    gwl, mock_request = setup_gwl_request
+    gwl.retry = RetryPolicy(backoff=0)
+    gwl.rate_limit = mocker.Mock()
+
+    mock_request.side_effect = [
+        requests.ConnectionError('reset'),
+        query_keyword_return(1),
+        {'add_keyword': {'id': 'mock_id'}},
+        query_keyword_return(1),
+    ]
+    gwl.get_keywords()
+    gwl.create_keyword('tag')
+
+    # Every attempt, including retries, takes a token
+    assert gwl.rate_limit.acquire.call_count == 4
+
+
+def _failing_operation(cleaned_up):
+    try:
+        try:
+            yield queries._call(query='first')
+        except requests.ConnectionError:
+            return (yield queries._call(query='fallback'))
+        yield queries._call(query='second')
+    finally:
+        cleaned_up.append(True)
+
+
+def test_run_request_errors(mocker):
+    client = mocker.Mock()
+    client.request.side_effect = [requests.ConnectionError, {'fallback': True}]
+    cleaned_up = []
+
+    # Errors from requests are raised inside the operation, which can handle them
+    assert queries.run(client, _failing_operation(cleaned_up)) == {'fallback': True}
+    assert cleaned_up == [True]
+
+    client.request.side_effect = [requests.ConnectionError, requests.Timeout]
+    with pytest.raises(requests.Timeout):
+        queries.run(client, _failing_operation(cleaned_up))
+    assert cleaned_up == [True, True]
@@ -0,0 +1,42 @@
+import subprocess
+import sys
+from importlib.metadata import version
+
+import pytest
+
+import gwlandscape_python
+
+
+def _imported_modules(statement):
+    # Modules imported by running statement in a fresh interpreter
+    process = subprocess.run(
+        [sys.executable, '-c', f'{statement}; import sys; print(" ".join(sys.modules))'],
+        capture_output=True, text=True, check=True
+    )
+    return set(process.stdout.split())
+
+
+def test_import_defers_heavy_modules():
+    modules = _imported_modules('import gwlandscape_python')
+    for name in ['h5py', 'numpy', 'tarfile', 'asyncio', 'aiohttp', 'sqlite3', 'gwlandscape_python.snapshot']:
+        assert name not in modules
+
+
+@pytest.mark.parametrize('name, module', [
+    ('AsyncGWLandscape', 'gwlandscape_python.async_gwlandscape'),
+    ('CatalogSnapshot', 'gwlandscape_python.snapshot'),
+    ('OfflineGWLandscape', 'gwlandscape_python.snapshot'),
+    ('PublicationIndex', 'gwlandscape_python.search'),
+    ('CatalogIndex', 'gwlandscape_python.catalog'),
+])
+def test_lazy_names(name, module):
+    assert module in _imported_modules(f'from gwlandscape_python import {name}')
+    assert getattr(gwlandscape_python, name).__module__ == module
+    assert name in dir(gwlandscape_python)
+
+
+def test_version():
+    assert gwlandscape_python.__version__ == version('gwlandscape_python')
+
+    with pytest.raises(AttributeError):
+        gwlandscape_python.not_a_name
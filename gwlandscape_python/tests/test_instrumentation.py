@@ -0,0 +1,100 @@
+import pytest
+
+from gwlandscape_python import EventAggregator, FileEvent, RequestEvent, ValidationEvent
+from gwlandscape_python.instrumentation import operation_name, request_size
+from gwlandscape_python.tests.utils import create_compas_file
+
+
+def test_operation_name():
+    assert operation_name('query ($id: ID) { compasDatasetModels (id: $id) { edges { node { id } } } }') == \
+        'compasDatasetModels'
+    assert operation_name('mutation AddKeywordMutation($input: AddKeywordMutationInput!) { addKeyword(input: $input) '
+                          '{ id } }') == 'addKeyword'
+
+
+def test_request_size(tmp_path):
+    datafile = tmp_path / 'test.h5'
+    datafile.write_bytes(b'0' * 1000)
+
+    without_file = request_size('query', {'input': {'jobFile': None}})
+    with datafile.open('rb') as f:
+        assert request_size('query', {'input': {'jobFile': f}}) == without_file + 1000
+
+
+def test_event_aggregator():
+    aggregator = EventAggregator()
+    for i in range(1, 101):
+        aggregator(RequestEvent(operation='keywords', duration=i / 100, request_bytes=i, response_bytes=10 * i))
+    aggregator(FileEvent(path='a', duration=2.0, time_to_first_byte=None, size=100, error=Exception()))
+
+    summary = aggregator.summary()
+
+    assert summary['request']['count'] == 100
+    assert summary['request']['errors'] == 0
+    assert summary['request']['duration']['p50'] == pytest.approx(0.505)
+    assert summary['request']['duration']['p95'] == pytest.approx(0.9505)
+    assert summary['request']['duration']['p99'] == pytest.approx(0.9901)
+    assert summary['request']['response_bytes']['total'] == 50500
+    assert summary['file']['errors'] == 1
+    assert summary['file']['throughput']['max'] == 50
+    assert 'time_to_first_byte' not in summary['file']
+
+    aggregator.reset()
+    assert aggregator.summary() == {}
+
+
+def test_request_events(setup_gwl_request, query_keyword_return):
+    gwl, mock_request = setup_gwl_request
+    uninstrumented_request = gwl._send_request
+    events = []
+
+    mock_request.return_value = query_keyword_return(2)
+    gwl.add_event_listener(events.append)
+    gwl.get_keywords()
+
+    assert len(events) == 1
+    assert events[0].operation == 'keywords'
+    assert events[0].response_bytes > 0
+    assert events[0].error is None
+
+    mock_request.side_effect = Exception('failed')
+    with pytest.raises(Exception):
+        gwl.get_keywords()
+    assert str(events[1].error) == 'failed'
+
+    # Removing the last listener restores the uninstrumented sender, and no more events are sent
+    gwl.remove_event_listener(events.append)
+    assert gwl._send_request == uninstrumented_request
+    assert gwl._send_request != gwl._instrumented_request
+
+    mock_request.side_effect = None
+    gwl.get_keywords()
+    assert len(events) == 2
+
+
+def test_file_and_validation_events(local_gwl, tmp_path):
+    aggregator = EventAggregator()
+    events = []
+    local_gwl.add_event_listener(aggregator)
+    local_gwl.add_event_listener(events.append)
+
+    file_list = local_gwl.get_datasets()[0].get_full_file_list()
+    local_gwl.save_files_by_reference(file_list, tmp_path)
+
+    file_events = sorted((event for event in events if isinstance(event, FileEvent)), key=lambda event: event.path)
+    assert [event.path for event in file_events] == sorted(file_list.get_paths())
+    assert [event.size for event in file_events] == [ref.file_size for ref in sorted(file_list, key=lambda f: f.path)]
+    assert all(0 < event.time_to_first_byte <= event.duration for event in file_events)
+
+    publication = local_gwl.get_publications()[0]
+    model = local_gwl.get_models()[0]
+    dataset = local_gwl.create_dataset(publication, model, create_compas_file(tmp_path / 'upload.h5', n_systems=10))
+    dataset.delete()
+
+    validation_events = [event for event in events if isinstance(event, ValidationEvent)]
+    assert [event.path for event in validation_events] == [tmp_path / 'upload.h5']
+
+    summary = aggregator.summary()
+    assert summary['file']['count'] == len(file_list)
+    assert summary['validation']['count'] == 1
+    assert summary['request']['request_bytes']['max'] > (tmp_path / 'upload.h5').stat().st_size
@@ -0,0 +1,419 @@
+import hashlib
+import io
+import tarfile
+import time
+from pathlib import Path
+
+import h5py
+import numpy as np
+import pytest
+import requests
+from gwdc_python.files import FileReference, FileReferenceList
+
+from gwlandscape_python import RetryEvent
+from gwlandscape_python.tests.utils import create_compas_file
+from gwlandscape_python.utils import RetryPolicy, TokenBucket, read_manifest, verify
+from gwlandscape_python.utils.columnar import cache_path, materialise
+from gwlandscape_python.utils.seed_index import get_seed_index, seed_index_path
+from gwlandscape_python.utils.sync import dataset_directory
+from gwlandscape_python.utils.zone_map import get_zone_map, zone_map_path
+
+
+def test_local_server_queries(local_gwl):
+    assert [keyword.tag for keyword in local_gwl.get_keywords()] == ['tag 0', 'tag 1']
+    assert [keyword.tag for keyword in local_gwl.get_keywords(contains='1')] == ['tag 1']
+
+    publications = local_gwl.get_publications(title='title 2')
+    assert len(publications) == 1
+    assert publications[0].keywords == local_gwl.get_keywords()
+
+    datasets = local_gwl.get_datasets(publication=publications[0])
+    assert len(datasets) == 2
+    assert {dataset.model.name for dataset in datasets} == {'model 0', 'model 1'}
+
+
+def test_local_server_downloads(local_server, local_gwl, tmp_path):
+    dataset = local_gwl.get_datasets()[0]
+    file_list = dataset.get_full_file_list()
+    assert file_list.get_paths()[0].name == 'COMPAS_Output.h5'
+
+    expected = {
+        ref.path: local_server.file_path(ref.download_token).read_bytes() for ref in file_list
+    }
+
+    assert dict(local_gwl.get_files_by_reference(file_list)) == expected
+
+    local_gwl.save_files_by_reference(file_list, tmp_path)
+    assert {path: (tmp_path / path).read_bytes() for path in expected} == expected
+
+
+def test_local_server_range_requests(local_server, local_gwl):
+    file_ref = local_gwl.get_datasets()[0].get_full_file_list()[0]
+    url = local_server.file_download_endpoint + file_ref.download_token
+    content = local_server.file_path(file_ref.download_token).read_bytes()
+
+    response = requests.get(url, headers={'Range': 'bytes=8-15'})
+    assert response.status_code == 206
+    assert response.content == content[8:16]
+    assert response.headers['Content-Range'] == f'bytes 8-15/{len(content)}'
+
+    response = requests.get(url, headers={'Range': 'bytes=-4'})
+    assert response.content == content[-4:]
+
+    assert requests.get(url, headers={'Range': f'bytes={len(content)}-'}).status_code == 416
+    assert requests.get(local_server.file_download_endpoint + 'missing').status_code == 404
+
+
+def test_local_server_create_dataset(local_gwl, tmp_path):
+    keyword = local_gwl.create_keyword('new keyword')
+    publication = local_gwl.create_publication(author='author', title='new publication', arxiv_id='1234',
+                                               keywords=[keyword])
+    model = local_gwl.create_model('new model')
+
+    datafile = create_compas_file(tmp_path / 'upload.h5', n_systems=100)
+    dataset = local_gwl.create_dataset(publication, model, datafile)
+
+    assert dataset.publication == publication
+    assert dataset.model == model
+
+    files = local_gwl.get_files_by_reference(dataset.get_full_file_list())
+    assert files == [(files[0][0], datafile.read_bytes())]
+
+    dataset.delete()
+    publication.delete()
+    model.delete()
+    keyword.delete()
+    assert local_gwl.get_datasets(publication=publication) == []
+
+
+def test_local_server_create_dataset_optimise(local_gwl, tmp_path):
+    datafile = create_compas_file(tmp_path / 'upload.h5', n_systems=1000, chunks=10)
+    original = datafile.read_bytes()
+
+    dataset = local_gwl.create_dataset(local_gwl.get_publications()[0], local_gwl.get_models()[0], datafile,
+                                       optimise=True)
+
+    # The original is left as it was, and the optimised copy holds the same values
+    assert datafile.read_bytes() == original
+    report = local_gwl.save_files_by_reference(dataset.get_full_file_list(), tmp_path / 'saved')
+    with h5py.File(tmp_path / 'saved' / report[0], 'r') as f, h5py.File(datafile, 'r') as expected:
+        masses = f['BSE_System_Parameters']['Mass@ZAMS(1)']
+        assert masses.chunks != expected['BSE_System_Parameters']['Mass@ZAMS(1)'].chunks
+        np.testing.assert_array_equal(masses[()], expected['BSE_System_Parameters']['Mass@ZAMS(1)'][()])
+    dataset.delete()
+
+
+def test_local_server_progress(local_gwl, tmp_path):
+    calls = []
+
+    def _progress(completed, total):
+        calls.append((completed, total))
+
+    file_list = local_gwl.get_datasets()[0].get_full_file_list()
+    local_gwl.save_files_by_reference(file_list, tmp_path, progress=_progress)
+    assert calls[-1] == (file_list.get_total_bytes(), file_list.get_total_bytes())
+
+    calls.clear()
+    datafile = create_compas_file(tmp_path / 'upload.h5', n_systems=100)
+    dataset = local_gwl.create_dataset(local_gwl.get_publications()[0], local_gwl.get_models()[0], datafile,
+                                       progress=_progress)
+    dataset.delete()
+    assert calls[-1] == (datafile.stat().st_size, datafile.stat().st_size)
+
+
+def test_local_server_create_dataset_no_progress(local_server, tmp_path, capfd):
+    gwl = local_server.client(progress='none')
+    datafile = create_compas_file(tmp_path / 'upload.h5', n_systems=100)
+    capfd.readouterr()
+
+    dataset = gwl.create_dataset(gwl.get_publications()[0], gwl.get_models()[0], datafile)
+
+    # Nothing is written to stderr, including the progress bar that GWDC shows for uploads
+    assert capfd.readouterr().err == ''
+    dataset.delete()
+
+
+def test_local_server_download_recovery(local_server, tmp_path):
+    gwl = local_server.client(progress='none', retry=RetryPolicy(backoff=0))
+    file_list = gwl.get_datasets()[0].get_full_file_list()
+    h5_ref, missing_ref, flaky_ref = file_list
+    events = []
+    gwl.add_event_listener(events.append)
+
+    local_server.download_log.clear()
+    local_server.inject_fault(h5_ref.download_token, drop_after=20000)
+    local_server.inject_fault(missing_ref.download_token, status=404)
+    local_server.inject_fault(flaky_ref.download_token, status=503, times=2)
+
+    report = gwl.save_files_by_reference(file_list, tmp_path)
+
+    assert not report.ok
+    assert report == [tmp_path / h5_ref.path, tmp_path / flaky_ref.path]
+    assert [file_ref for file_ref, _ in report.failed] == [missing_ref]
+    assert not (tmp_path / missing_ref.path).exists()
+
+    for file_ref in [h5_ref, flaky_ref]:
+        assert (tmp_path / file_ref.path).read_bytes() == local_server.file_path(file_ref.download_token).read_bytes()
+
+    # The dropped download resumes from the bytes already received
+    assert (h5_ref.download_token, 'bytes=20000-') in local_server.download_log
+    assert len([token for token, _ in local_server.download_log if token == flaky_ref.download_token]) == 3
+    assert len([event for event in events if isinstance(event, RetryEvent)]) == 3
+
+
+def test_local_server_get_files_recovery(local_server):
+    gwl = local_server.client(progress='none', retry=None)
+    file_list = gwl.get_datasets()[0].get_full_file_list()
+
+    local_server.inject_fault(file_list[2].download_token, status=503)
+
+    report = gwl.get_files_by_reference(file_list)
+
+    assert [path for path, _ in report] == file_list.get_paths()[:2]
+    assert report.failed[0][1].response.status_code == 503
+
+
+def test_local_server_bandwidth_limit(local_server, tmp_path):
+    gwl = local_server.client(progress='none', bandwidth_limit=TokenBucket(rate=4096, capacity=1024))
+    file_list = gwl.get_datasets()[0].get_full_file_list().filter_list_by_path(extension='txt')
+    assert file_list.get_total_bytes() == 2048
+
+    start = time.monotonic()
+    report = gwl.save_files_by_reference(file_list, tmp_path)
+
+    # Beyond the initial burst, the files arrive no faster than the limit allows
+    assert report.ok
+    assert time.monotonic() - start >= 1024 / 4096
+
+
+def test_local_server_manifest(local_server, tmp_path):
+    gwl = local_server.client(progress='none', retry=None)
+    file_list = gwl.get_datasets()[0].get_full_file_list()
+
+    assert gwl.save_files_by_reference(file_list, tmp_path).ok
+
+    manifest = read_manifest(tmp_path)
+    assert sorted(manifest) == sorted(str(path) for path in file_list.get_paths())
+    for file_ref in file_list:
+        content = local_server.file_path(file_ref.download_token).read_bytes()
+        assert manifest[str(file_ref.path)]['sha256'] == hashlib.sha256(content).hexdigest()
+    assert verify(tmp_path) == []
+
+    (tmp_path / file_list[1].path).write_bytes(b'corrupted')
+    assert verify(tmp_path) == [file_list[1].path]
+
+
+def test_local_server_size_mismatch(local_server, tmp_path):
+    gwl = local_server.client(progress='none', retry=None)
+    file_list = gwl.get_datasets()[0].get_full_file_list()
+    file_list[1].file_size += 1
+
+    report = gwl.save_files_by_reference(file_list, tmp_path)
+
+    assert [file_ref for file_ref, _ in report.failed] == [file_list[1]]
+    assert not (tmp_path / file_list[1].path).exists()
+    assert str(file_list[1].path) not in read_manifest(tmp_path)
+
+
+@pytest.mark.parametrize('resume', [False, True])
+def test_local_server_save_error_file_removed(mocker, local_server, tmp_path, resume):
+    gwl = local_server.client(progress='none', retry=None)
+    file_list = gwl.get_datasets()[0].get_full_file_list()[:1]
+    error = IOError('download failed')
+
+    def _stream_file(file_ref, f, *args, **kwargs):
+        # The file is removed by something else before the download fails
+        Path(f.name).unlink()
+        raise error
+
+    mocker.patch('gwlandscape_python.utils.file_download._stream_file', _stream_file)
+    report = gwl.save_files_by_reference(file_list, tmp_path, resume=resume)
+
+    # The download's own error is reported, rather than one from cleaning up
+    assert report.failed == [(file_list[0], error)]
+    assert list(tmp_path.rglob('*.h5*')) == []
+
+
+def test_local_server_resume(local_server, tmp_path):
+    gwl = local_server.client(progress='none', retry=None, chunk_size=4096)
+    file_list = gwl.get_datasets()[0].get_full_file_list()
+    h5_ref = file_list[0]
+    h5_path = tmp_path / h5_ref.path
+
+    local_server.inject_fault(h5_ref.download_token, drop_after=20000)
+    report = gwl.save_files_by_reference(file_list, tmp_path, resume=True)
+
+    # The partial download is kept for the next call
+    assert [file_ref for file_ref, _ in report.failed] == [h5_ref]
+    assert not h5_path.exists()
+    assert h5_path.with_name(h5_path.name + '.part').stat().st_size == 20000
+
+    local_server.download_log.clear()
+    report = gwl.save_files_by_reference(file_list, tmp_path, resume=True)
+
+    # Only the rest of the partial file is downloaded, and the complete files are skipped
+    assert report.ok
+    assert report == [tmp_path / path for path in file_list.get_paths()]
+    assert local_server.download_log == [(h5_ref.download_token, 'bytes=20000-')]
+    assert h5_path.read_bytes() == local_server.file_path(h5_ref.download_token).read_bytes()
+    assert not h5_path.with_name(h5_path.name + '.part').exists()
+    assert verify(tmp_path) == []
+
+
+def test_local_server_extract(local_server, tmp_path):
+    gwl = local_server.client(progress='none', retry=RetryPolicy(backoff=0))
+    h5_path = create_compas_file(tmp_path / 'upload' / 'COMPAS_Output.h5', n_systems=2000)
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w:gz') as tar:
+        tar.add(h5_path, arcname='COMPAS_Output/COMPAS_Output.h5')
+    token = local_server.add_file(buffer.getvalue())
+    dataset = gwl.get_datasets()[0]
+    txt_ref = dataset.get_full_file_list()[1]
+    file_list = FileReferenceList([
+        FileReference(
+            path='COMPAS_Output.tar.gz', file_size=len(buffer.getvalue()), download_token=token, parent=dataset
+        ),
+        txt_ref,
+    ])
+
+    # The dropped download is resumed into the same extraction
+    local_server.inject_fault(token, drop_after=5000)
+    report = gwl.save_files_by_reference(file_list, tmp_path / 'saved', extract=True)
+
+    assert report == [tmp_path / 'saved' / 'COMPAS_Output.h5', tmp_path / 'saved' / txt_ref.path]
+    assert report[0].read_bytes() == h5_path.read_bytes()
+    assert not (tmp_path / 'saved' / 'COMPAS_Output.tar.gz').exists()
+    assert (token, 'bytes=5000-') in local_server.download_log
+    assert sorted(read_manifest(tmp_path / 'saved')) == ['COMPAS_Output.h5', str(txt_ref.path)]
+    assert verify(tmp_path / 'saved') == []
+
+    # Resuming skips the tarball, as its HDF5 file has already been extracted
+    n_downloads = len(local_server.download_log)
+    assert gwl.save_files_by_reference(file_list, tmp_path / 'saved', resume=True, extract=True) == report
+    assert len(local_server.download_log) == n_downloads
+
+    # Unless the extracted file has been removed
+    report[0].unlink()
+    assert gwl.save_files_by_reference(file_list, tmp_path / 'saved', resume=True, extract=True) == report
+    assert local_server.download_log[n_downloads:] == [(token, None)]
+    assert report[0].read_bytes() == h5_path.read_bytes()
+
+
+def test_local_server_open_hdf5(local_server, tmp_path):
+    gwl = local_server.client(progress='none')
+    dataset = gwl.get_datasets()[0]
+    h5_ref = dataset.get_full_file_list()[0]
+    h5_path = local_server.file_path(h5_ref.download_token)
+    tar_path = tmp_path / 'COMPAS_Output.tar'
+    with tarfile.open(tar_path, 'w') as tar:
+        tar.add(h5_path, arcname='COMPAS_Output/COMPAS_Output.h5')
+    tar_ref = FileReference(
+        path=tar_path.name, file_size=tar_path.stat().st_size, download_token=local_server.add_file(tar_path),
+        parent=dataset
+    )
+
+    for file_ref in [h5_ref, tar_ref]:
+        local_server.download_log.clear()
+        with gwl.open_hdf5(file_ref) as f, h5py.File(h5_path, 'r') as expected:
+            for group in expected:
+                for column in expected[group]:
+                    np.testing.assert_array_equal(f[group][column][()], expected[group][column][()])
+
+        # Only byte ranges of the file are requested
+        assert all(header and header.startswith('bytes=') and not header.endswith('-')
+                   for _, header in local_server.download_log)
+
+
+def test_local_server_sync(local_server, tmp_path):
+    gwl = local_server.client(progress='none', retry=None)
+    publication = gwl.get_publications()[0]
+    datasets = gwl.get_datasets(publication=publication)
+    file_list = FileReferenceList([f for dataset in datasets for f in dataset.get_full_file_list()])
+
+    report = gwl.sync(publication, tmp_path)
+    assert report.ok
+    assert len(report.downloaded) == len(file_list)
+    assert report.bytes_downloaded == file_list.get_total_bytes()
+    assert report.skipped == [] and report.bytes_saved == 0
+    for dataset in datasets:
+        for file_ref in dataset.get_full_file_list():
+            path = tmp_path / dataset_directory(dataset) / file_ref.path
+            assert path.read_bytes() == local_server.file_path(file_ref.download_token).read_bytes()
+
+    # Nothing has changed, so nothing is downloaded
+    local_server.download_log.clear()
+    report = gwl.sync(datasets, tmp_path)
+    assert len(report.downloaded) == 0 and report.bytes_downloaded == 0
+    assert report.bytes_saved == file_list.get_total_bytes()
+    assert local_server.download_log == []
+
+    # Only the damaged file is downloaded again, and files not in the dataset are pruned
+    damaged = tmp_path / dataset_directory(datasets[0]) / file_list[1].path
+    damaged.write_bytes(b'damaged')
+    extra = tmp_path / dataset_directory(datasets[0]) / 'old' / 'removed.txt'
+    extra.parent.mkdir()
+    extra.write_bytes(b'removed')
+
+    report = gwl.sync(publication, tmp_path, prune=True)
+    assert report.downloaded == [damaged]
+    assert report.pruned == [extra.relative_to(tmp_path)]
+    assert not extra.parent.exists()
+    assert verify(tmp_path) == []
+
+
+def test_local_server_sync_prune_keeps_partial(local_server, tmp_path):
+    gwl = local_server.client(progress='none', retry=None, chunk_size=4096)
+    dataset = gwl.get_datasets()[0]
+    h5_ref = dataset.get_full_file_list()[0]
+    h5_path = tmp_path / dataset_directory(dataset) / h5_ref.path
+    partial_path = h5_path.with_name(h5_path.name + '.part')
+    stale_path = h5_path.with_name('removed.h5.part')
+    stale_path.parent.mkdir(parents=True)
+    stale_path.write_bytes(b'stale')
+
+    local_server.inject_fault(h5_ref.download_token, drop_after=20000)
+    report = gwl.sync(dataset, tmp_path, prune=True, resume=True)
+
+    # The partial download of a file in the dataset survives the prune, unlike one of a file no longer in it
+    assert [file_ref.path for file_ref, _ in report.downloaded.failed] == [h5_path.relative_to(tmp_path)]
+    assert report.pruned == [stale_path.relative_to(tmp_path)]
+    assert partial_path.stat().st_size == 20000
+
+    local_server.download_log.clear()
+    report = gwl.sync(dataset, tmp_path, prune=True, resume=True)
+
+    assert report.ok and report.pruned == []
+    assert local_server.download_log == [(h5_ref.download_token, 'bytes=20000-')]
+    assert h5_path.read_bytes() == local_server.file_path(h5_ref.download_token).read_bytes()
+    assert not partial_path.exists()
+
+
+def test_local_server_sync_prune_keeps_sidecars(local_server, tmp_path):
+    gwl = local_server.client(progress='none', retry=None)
+    dataset = gwl.get_datasets()[0]
+    h5_ref = dataset.get_full_file_list()[0]
+    h5_path = tmp_path / dataset_directory(dataset) / h5_ref.path
+    assert gwl.sync(dataset, tmp_path).ok
+
+    materialise(h5_path)
+    get_zone_map(h5_path)
+    get_seed_index(h5_path)
+    sidecars = [cache_path(h5_path), zone_map_path(h5_path), seed_index_path(h5_path)]
+    stale_path = h5_path.with_name('removed.h5' + cache_path(h5_path).suffix) / 'index.json'
+    stale_path.parent.mkdir()
+    stale_path.write_text('{}')
+
+    report = gwl.sync(dataset, tmp_path, prune=True)
+
+    # The caches and indexes of a file in the dataset survive the prune, unlike those of a file no longer in it
+    assert report.ok and report.pruned == [stale_path.relative_to(tmp_path)]
+    assert all(path.exists() for path in sidecars)
+    assert not stale_path.parent.exists()
+
+
+def test_local_server_files_by_datasets(local_server):
+    gwl = local_server.client(progress='none')
+    datasets = gwl.get_datasets()
+    expected = [gwl._get_files_by_dataset(dataset) for dataset in datasets]
+
+    assert gwl.get_files_by_datasets(gwl.get_datasets(), batch_size=4) == expected
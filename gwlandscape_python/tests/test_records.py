@@ -0,0 +1,85 @@
+import pickle
+
+import pytest
+
+from gwlandscape_python.records import (
+    KeywordRecord,
+    PublicationRecord,
+    ModelRecord,
+    DatasetRecord,
+    attach,
+    detach,
+)
+
+
+@pytest.fixture
+def setup_objects(setup_gwl_request, create_keyword, create_publication, create_model, create_dataset):
+    gwl, _ = setup_gwl_request
+    return gwl, {
+        'keyword': (create_keyword(gwl), KeywordRecord),
+        'publication': (create_publication(gwl, n_keywords=2), PublicationRecord),
+        'model': (create_model(gwl), ModelRecord),
+        'dataset': (create_dataset(gwl), DatasetRecord),
+    }
+
+
+@pytest.mark.parametrize('name', ['keyword', 'publication', 'model', 'dataset'])
+def test_detach_attach_roundtrip(setup_objects, name):
+    gwl, objects = setup_objects
+    obj, record_type = objects[name]
+
+    record = obj.detach()
+
+    assert isinstance(record, record_type)
+    assert not hasattr(record, '__dict__')
+    assert not hasattr(record, 'client')
+
+    unpickled = pickle.loads(pickle.dumps(record))
+    assert unpickled == record
+
+    reattached = unpickled.attach(gwl)
+    assert reattached == obj
+    assert reattached.client is gwl
+
+
+def test_record_is_immutable(setup_objects):
+    _, objects = setup_objects
+    record = objects['keyword'][0].detach()
+
+    with pytest.raises(AttributeError):
+        record.tag = 'new tag'
+
+    assert hash(record) == hash(KeywordRecord(record.id, record.tag))
+
+
+def test_record_missing_field():
+    with pytest.raises(TypeError):
+        KeywordRecord(id='mock_keyword_id1')
+
+    with pytest.raises(TypeError):
+        KeywordRecord(id='mock_keyword_id1', tag='mock tag 1', other=None)
+
+
+def test_publication_record_keywords(setup_objects):
+    _, objects = setup_objects
+    publication = objects['publication'][0]
+
+    record = publication.detach()
+
+    assert record.keywords == tuple(keyword.detach() for keyword in publication.keywords)
+
+
+def test_detach_attach_shares_objects(setup_gwl_request, create_dataset):
+    gwl, _ = setup_gwl_request
+    datasets = [create_dataset(gwl, i=1), create_dataset(gwl, i=1)]
+
+    records = detach(datasets)
+    assert records[0] is records[1]
+
+    records = [datasets[0].detach(), datasets[1].detach()]
+    assert records[0] is not records[1]
+
+    live = attach(records, gwl)
+    assert live == datasets
+    assert live[0].publication is live[1].publication
+    assert live[0].model is live[1].model
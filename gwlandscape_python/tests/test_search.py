@@ -0,0 +1,149 @@
+import pytest
+
+from gwlandscape_python import Keyword, Publication, PublicationIndex
+from gwlandscape_python.search import tokenize
+
+
+@pytest.fixture
+def setup_publications(setup_gwl_request, mock_publication_data):
+    gwl, mock_request = setup_gwl_request
+
+    binaries = Keyword(client=gwl, id='keyword_id1', tag='Binary Stars')
+    neutron = Keyword(client=gwl, id='keyword_id2', tag='Neutron stars')
+
+    texts = [
+        ('Double neutron star formation', 'Vigna-Gómez, Alejandro', 'COMPAS models of galactic DNS', [binaries]),
+        ('Black hole mergers', 'Stevenson, Simon', 'Formation of merging binary black holes', [binaries]),
+        ('Pulsar timing', 'Someone, Else', 'Neutron star spin down', [neutron]),
+    ]
+
+    publications = [
+        Publication(
+            client=gwl,
+            id=f'publication_id{i}',
+            creation_time='2022-06-20T02:12:59.459297+00:00',
+            **{
+                **mock_publication_data(i),
+                'title': title,
+                'author': author,
+                'description': description,
+                'keywords': keywords,
+            }
+        )
+        for i, (title, author, description, keywords) in enumerate(texts, start=1)
+    ]
+
+    return gwl, mock_request, publications
+
+
+def _ids(publications):
+    return [publication.id for publication in publications]
+
+
+def test_tokenize():
+    assert tokenize('Vigna-Gómez, ALEJANDRO  (2018)') == ['vigna', 'gómez', 'alejandro', '2018']
+    assert tokenize(None) == []
+
+
+@pytest.mark.parametrize('query,kwargs,expected', [
+    ('neutron', {}, ['publication_id3', 'publication_id1']),
+    ('NEUTRON STAR', {}, ['publication_id1', 'publication_id3']),
+    ('neut', {}, ['publication_id3', 'publication_id1']),
+    ('neut', {'prefix': False}, []),
+    ('formation black', {}, ['publication_id2']),
+    ('formation black', {'match_all': False}, ['publication_id2', 'publication_id1']),
+    ('binary', {}, ['publication_id2', 'publication_id1']),
+    ('gómez', {}, ['publication_id1']),
+    ('stars', {'limit': 1}, ['publication_id3']),
+    ('', {}, []),
+    ('nothing matches', {}, []),
+])
+def test_search(setup_publications, query, kwargs, expected):
+    _, _, publications = setup_publications
+
+    index = PublicationIndex(publications)
+
+    assert _ids(index.search(query, **kwargs)) == expected
+
+
+def test_title_ranks_above_description(setup_publications):
+    _, _, publications = setup_publications
+
+    index = PublicationIndex(publications)
+
+    # 'pulsar' is in the title of publication 3, but only in the description of publication 2
+    publications[1].description += ' pulsar'
+    index.add(publications[1])
+
+    assert _ids(index.search('pulsar')) == ['publication_id3', 'publication_id2']
+
+
+def test_build_publication_index(setup_publications, query_publication_return):
+    gwl, mock_request, _ = setup_publications
+
+    mock_request.return_value = query_publication_return(n_publications=1)
+
+    index = gwl.build_publication_index()
+
+    assert len(index) == 1
+    assert _ids(index.search('mock author')) == ['mock_publication_id1']
+
+
+def test_index_follows_publication_changes(setup_publications):
+    gwl, mock_request, publications = setup_publications
+
+    index = PublicationIndex(publications, client=gwl)
+
+    mock_request.return_value = {'update_publication': {'result': True}}
+    publications[2].update(title='Millisecond pulsars')
+    assert _ids(index.search('millisecond')) == ['publication_id3']
+    assert _ids(index.search('timing')) == []
+
+    mock_request.return_value = {'delete_publication': {'result': True}}
+    publications[0].delete()
+    assert publications[0] not in index
+    assert _ids(index.search('neutron')) == ['publication_id3']
+
+
+def test_index_ignores_failed_update(setup_publications):
+    gwl, mock_request, publications = setup_publications
+
+    index = PublicationIndex(publications, client=gwl)
+
+    mock_request.return_value = {'update_publication': {'result': False}}
+    publications[2].update(title='Millisecond pulsars')
+    assert _ids(index.search('millisecond')) == []
+
+
+def test_index_follows_created_publication(setup_publications, query_publication_return, mock_publication_data):
+    gwl, mock_request, publications = setup_publications
+
+    index = PublicationIndex(publications, client=gwl)
+
+    mock_request.side_effect = [
+        {'add_publication': {'id': 'mock_publication_id1'}},
+        query_publication_return(n_publications=1),
+    ]
+
+    publication_data = mock_publication_data(1)
+    publication_data.pop('keywords')
+    gwl.create_publication(**publication_data)
+
+    assert _ids(index.search('mock publication')) == ['mock_publication_id1']
+
+
+def test_index_follows_keyword_changes(setup_publications):
+    gwl, mock_request, publications = setup_publications
+
+    index = PublicationIndex(publications, client=gwl)
+    keyword = publications[0].keywords[0]
+
+    mock_request.return_value = {'update_keyword': {'result': True}}
+    keyword.update(tag='Compact binaries')
+    assert _ids(index.search('compact')) == ['publication_id2', 'publication_id1']
+
+    mock_request.return_value = {'delete_keyword': {'result': True}}
+    keyword.delete()
+    assert _ids(index.search('compact')) == []
+    # The publications belong to the caller, so are left as they were
+    assert publications[0].keywords == [keyword]
@@ -0,0 +1,225 @@
+import copy
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from gwlandscape_python import OfflineGWLandscape, CatalogSnapshot
+
+
+@pytest.fixture
+def catalog_data(query_keyword_return, mock_publication_data, query_model_return, mock_dataset_file_data):
+    publications = {
+        'compas_publications': {
+            'edges': [
+                {
+                    'node': {
+                        'id': f'mock_publication_id{i}',
+                        'creation_time': '2022-06-20T02:12:59.459297+00:00',
+                        **mock_publication_data(i),
+                        **query_keyword_return(2),
+                    }
+                } for i in range(1, 3)
+            ]
+        }
+    }
+    models = query_model_return(n_models=1)
+
+    def _dataset(i, publication):
+        return {
+            'node': {
+                'id': f'mock_dataset_id{i}',
+                'compas_publication': publication,
+                'compas_model': models['compas_models']['edges'][0]['node'],
+            }
+        }
+
+    return {
+        'keywords': query_keyword_return(n_keywords=2),
+        'publications': publications,
+        'models': models,
+        'datasets': {
+            'compas_dataset_models': {
+                'edges': [_dataset(1, publications['compas_publications']['edges'][0]['node'])]
+            }
+        },
+        'files': {
+            'mock_dataset_id1': [mock_dataset_file_data(i) for i in range(1, 4)]
+        },
+        'new_dataset': _dataset,
+    }
+
+
+@pytest.fixture
+def setup_catalog_request(setup_gwl_request, catalog_data):
+    gwl, mock_request = setup_gwl_request
+
+    def mock_request_fn(query, variables=None, **kwargs):
+        if 'compasDatasetModels' in query:
+            result = copy.deepcopy(catalog_data['datasets'])
+            if variables['publication'] is not None:
+                result['compas_dataset_models']['edges'] = [
+                    edge for edge in result['compas_dataset_models']['edges']
+                    if edge['node']['compas_publication']['id'] == variables['publication']
+                ]
+            return result
+        if 'compasDatasetModel' in query and 'id' in variables:
+            return {'compas_dataset_model': {'files': copy.deepcopy(catalog_data['files'][variables['id']])}}
+        if 'compasDatasetModel' in query:
+            return {
+                f'dataset{key[2:]}': {'files': copy.deepcopy(catalog_data['files'][_id])}
+                for key, _id in variables.items()
+            }
+        if 'compasPublications' in query:
+            return copy.deepcopy(catalog_data['publications'])
+        if 'compasModels' in query:
+            return copy.deepcopy(catalog_data['models'])
+        return copy.deepcopy(catalog_data['keywords'])
+
+    mock_request.side_effect = mock_request_fn
+    return gwl, mock_request
+
+
+def test_snapshot_offline_client(setup_catalog_request, tmp_path):
+    gwl, _ = setup_catalog_request
+    path = tmp_path / 'catalog.sqlite'
+
+    snapshot = gwl.snapshot(path)
+    assert isinstance(snapshot, CatalogSnapshot)
+    assert snapshot.watermark == '2022-06-20T02:12:59.459297+00:00'
+
+    offline = OfflineGWLandscape(path)
+
+    assert offline.get_keywords() == gwl.get_keywords()
+    assert offline.get_publications() == gwl.get_publications()
+    assert offline.get_models() == gwl.get_models()
+    assert offline.get_datasets() == gwl.get_datasets()
+
+    dataset = offline.get_datasets()[0]
+    assert dataset.client is offline
+    assert dataset.get_full_file_list() == gwl._get_files_by_dataset(dataset)
+
+
+@pytest.mark.parametrize('method,kwargs,expected_ids', [
+    ('get_keywords', {'exact': 'MOCK TAG 1'}, ['mock_keyword_id1']),
+    ('get_keywords', {'contains': 'tag 2'}, ['mock_keyword_id2']),
+    ('get_keywords', {'contains': '%'}, []),
+    ('get_keywords', {'_id': 'mock_keyword_id2'}, ['mock_keyword_id2']),
+    ('get_publications', {'author': 'AUTHOR 2'}, ['mock_publication_id2']),
+    ('get_publications', {'author': 'author', 'title': 'publication 1'}, ['mock_publication_id1']),
+    ('get_publications', {'_id': 'mock_publication_id1'}, ['mock_publication_id1']),
+    ('get_models', {'summary': 'summary 1'}, ['mock_model_id1']),
+    ('get_models', {'name': 'not a name'}, []),
+    ('get_datasets', {'_id': 'mock_dataset_id1'}, ['mock_dataset_id1']),
+    ('get_datasets', {'_id': 'mock_dataset_id2'}, []),
+])
+def test_offline_client_filters(setup_catalog_request, tmp_path, method, kwargs, expected_ids):
+    gwl, _ = setup_catalog_request
+    gwl.snapshot(tmp_path / 'catalog.sqlite')
+
+    offline = OfflineGWLandscape(tmp_path / 'catalog.sqlite')
+
+    assert [obj.id for obj in getattr(offline, method)(**kwargs)] == expected_ids
+
+
+def test_offline_client_datasets_by_relation(setup_catalog_request, tmp_path):
+    gwl, _ = setup_catalog_request
+    gwl.snapshot(tmp_path / 'catalog.sqlite')
+
+    offline = OfflineGWLandscape(tmp_path / 'catalog.sqlite')
+    publication_1, publication_2 = offline.get_publications()
+    model = offline.get_models()[0]
+
+    assert [dataset.id for dataset in offline.get_datasets(publication=publication_1)] == ['mock_dataset_id1']
+    assert offline.get_datasets(publication=publication_2) == []
+    assert [dataset.id for dataset in offline.get_datasets(model=model)] == ['mock_dataset_id1']
+
+    with pytest.raises(SyntaxError):
+        offline.get_datasets(publication=publication_1, _id='mock_dataset_id1')
+
+
+def test_offline_client_datasets_query_count(
+    mocker, setup_catalog_request, catalog_data, mock_dataset_file_data, tmp_path
+):
+    gwl, _ = setup_catalog_request
+    publications = catalog_data['publications']['compas_publications']['edges']
+    catalog_data['datasets']['compas_dataset_models']['edges'] += [
+        catalog_data['new_dataset'](i, publications[i % 2]['node']) for i in range(2, 6)
+    ]
+    catalog_data['files'].update({f'mock_dataset_id{i}': [mock_dataset_file_data(1)] for i in range(2, 6)})
+    gwl.snapshot(tmp_path / 'catalog.sqlite')
+    offline = OfflineGWLandscape(tmp_path / 'catalog.sqlite')
+
+    connections, statements = [], []
+    connect = sqlite3.connect
+
+    def _connect(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        conn.set_trace_callback(statements.append)
+        connections.append(conn)
+        return conn
+
+    mocker.patch('sqlite3.connect', _connect)
+    datasets = offline.get_datasets()
+
+    # The datasets, their publications, the keywords of those and their models are read with one query each, on one
+    # connection, however many datasets there are
+    assert datasets == gwl.get_datasets()
+    assert len(connections) == 1
+    assert len([statement for statement in statements if statement.startswith('SELECT')]) == 4
+
+
+def test_offline_client_no_requests(setup_catalog_request, tmp_path):
+    gwl, _ = setup_catalog_request
+    gwl.snapshot(tmp_path / 'catalog.sqlite')
+
+    offline = OfflineGWLandscape(tmp_path / 'catalog.sqlite')
+
+    with pytest.raises(Exception):
+        offline.create_keyword(tag='new tag')
+
+    # The client has the same state as an online one, so instrumenting it still refuses requests
+    assert offline.rate_limit is None
+    offline.add_event_listener(lambda event: None)
+    with pytest.raises(Exception, match='offline'):
+        offline._send_request(query='query { keywords { edges { node { id } } } }')
+
+    with pytest.raises(FileNotFoundError):
+        OfflineGWLandscape(tmp_path / 'missing.sqlite')
+
+
+def test_snapshot_refresh(setup_catalog_request, catalog_data, mock_dataset_file_data, tmp_path):
+    gwl, mock_request = setup_catalog_request
+    snapshot = gwl.snapshot(tmp_path / 'catalog.sqlite')
+
+    # Replace the second publication with a newer one that has a dataset
+    publications = catalog_data['publications']['compas_publications']['edges']
+    new_publication = copy.deepcopy(publications[1]['node'])
+    new_publication.update(id='mock_publication_id3', creation_time='2023-01-01T00:00:00.000000+00:00')
+    publications[1] = {'node': new_publication}
+
+    catalog_data['datasets']['compas_dataset_models']['edges'].append(
+        catalog_data['new_dataset'](2, new_publication)
+    )
+    catalog_data['files']['mock_dataset_id2'] = [mock_dataset_file_data(4)]
+
+    mock_request.reset_mock()
+    new_publications = snapshot.refresh(gwl)
+
+    assert [publication.id for publication in new_publications] == ['mock_publication_id3']
+    assert snapshot.watermark == '2023-01-01T00:00:00.000000+00:00'
+
+    # Only the datasets and files of the new publication are fetched
+    dataset_calls = [call for call in mock_request.mock_calls if 'compasDatasetModels' in call.kwargs['query']]
+    assert [call.kwargs['variables']['publication'] for call in dataset_calls] == ['mock_publication_id3']
+    file_calls = [call for call in mock_request.mock_calls if 'compasDatasetModel (' in call.kwargs['query']]
+    assert [list(call.kwargs['variables'].values()) for call in file_calls] == [['mock_dataset_id2']]
+
+    offline = OfflineGWLandscape(tmp_path / 'catalog.sqlite')
+    assert [publication.id for publication in offline.get_publications()] == [
+        'mock_publication_id1', 'mock_publication_id3'
+    ]
+    assert [dataset.id for dataset in offline.get_datasets()] == ['mock_dataset_id1', 'mock_dataset_id2']
+    assert offline.get_datasets(_id='mock_dataset_id2')[0].get_full_file_list().get_paths() == [
+        Path(mock_dataset_file_data(4)['path'])
+    ]
@@ -0,0 +1,81 @@
+import concurrent.futures
+import threading
+
+from gwlandscape_python import EventAggregator
+from gwlandscape_python.utils import read_manifest, verify
+
+N_THREADS = 16
+N_ITERATIONS = 10
+
+
+def _hammer(fn):
+    # Runs fn(thread, iteration) from many threads at once, re-raising the first error
+    barrier = threading.Barrier(N_THREADS)
+
+    def _worker(thread):
+        barrier.wait()
+        return [fn(thread, iteration) for iteration in range(N_ITERATIONS)]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=N_THREADS) as executor:
+        return [future.result() for future in [executor.submit(_worker, thread) for thread in range(N_THREADS)]]
+
+
+def test_shared_client_queries(local_server):
+    gwl = local_server.client(progress='none')
+    expected_keywords = gwl.get_keywords()
+    expected_datasets = gwl.get_datasets()
+    expected_files = gwl.get_files_by_datasets(gwl.get_datasets())
+
+    aggregator = EventAggregator()
+
+    def _query(thread, iteration):
+        # Listeners come and go while other threads are making requests
+        if iteration % 2 == 0:
+            gwl.add_event_listener(aggregator)
+        assert gwl.get_keywords() == expected_keywords
+        datasets = gwl.get_datasets()
+        assert datasets == expected_datasets
+        assert gwl.get_files_by_datasets(datasets, batch_size=thread % 4 + 1) == expected_files
+        if iteration % 2 == 1:
+            gwl.remove_event_listener(aggregator)
+
+    _hammer(_query)
+
+    assert gwl._event_listeners == ()
+    assert aggregator.summary()['request']['errors'] == 0
+
+
+def test_shared_client_mutations(local_server):
+    gwl = local_server.client(progress='none')
+    n_keywords = len(gwl.get_keywords())
+
+    def _mutate(thread, iteration):
+        keyword = gwl.create_keyword(f'thread {thread} keyword {iteration}')
+        if iteration % 2:
+            keyword.delete()
+        return keyword
+
+    _hammer(_mutate)
+
+    assert len(gwl.get_keywords()) == n_keywords + N_THREADS * N_ITERATIONS // 2
+
+
+def test_shared_client_downloads(local_server, tmp_path):
+    gwl = local_server.client(progress='none')
+    file_lists = gwl.get_files_by_datasets(gwl.get_datasets())
+    expected = [
+        [(ref.path, local_server.file_path(ref.download_token).read_bytes()) for ref in file_list]
+        for file_list in file_lists
+    ]
+
+    def _download(thread, iteration):
+        i = (thread + iteration) % len(file_lists)
+        assert gwl.get_files_by_reference(file_lists[i]) == expected[i]
+        if iteration == 0:
+            assert gwl.save_files_by_reference(file_lists[0], tmp_path / f'thread_{thread}').ok
+
+    _hammer(_download)
+
+    for thread in range(N_THREADS):
+        assert verify(tmp_path / f'thread_{thread}') == []
+        assert len(read_manifest(tmp_path / f'thread_{thread}')) == len(file_lists[0])
@@ -1,5 +1,82 @@
+from pathlib import Path
+
 import graphql
+import h5py
+import numpy as np
 
 
 def compare_graphql_query(a, b):
     return graphql.language.parse(a, no_location=True) == graphql.language.parse(b, no_location=True)
+
+
+def create_compas_file(path, n_systems=1000, seed=0, chunks=1024, compression='gzip'):
+    """Write a synthetic HDF5 file with the group and column layout of a COMPAS output file. Each group holds one
+    chunked, compressed 1D dataset per column, keyed by the SEED column.
+
+    Parameters
+    ----------
+    path : str or ~pathlib.Path
+        Path of the file to create
+    n_systems : int, optional
+        Number of binary systems, by default 1000
+    seed : int, optional
+        Random seed, by default 0
+    chunks : int, optional
+        Chunk length of each column, by default 1024
+    compression : str, optional
+        HDF5 compression filter, by default 'gzip'
+
+    Returns
+    -------
+    ~pathlib.Path
+        Path of the created file
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    seeds = np.arange(1, n_systems + 1, dtype=np.uint64) + np.uint64(seed) * np.uint64(n_systems)
+    n_dcos = n_systems // 10
+    n_supernovae = n_systems // 4
+    dco_seeds = np.sort(rng.choice(seeds, n_dcos, replace=False))
+    supernova_seeds = np.sort(rng.choice(seeds, n_supernovae, replace=False))
+
+    groups = {
+        'BSE_System_Parameters': {
+            'SEED': seeds,
+            'Mass@ZAMS(1)': rng.uniform(5, 150, n_systems),
+            'Mass@ZAMS(2)': rng.uniform(0.1, 150, n_systems),
+            'Metallicity@ZAMS(1)': rng.uniform(1e-4, 0.03, n_systems),
+            'SemiMajorAxis@ZAMS': rng.lognormal(0, 2, n_systems),
+            'Eccentricity@ZAMS': rng.uniform(0, 1, n_systems),
+            'Stellar_Type(1)': rng.integers(0, 16, n_systems, dtype=np.int32),
+            'Stellar_Type(2)': rng.integers(0, 16, n_systems, dtype=np.int32),
+            'Merger': rng.integers(0, 2, n_systems, dtype=np.uint8),
+        },
+        'BSE_Double_Compact_Objects': {
+            'SEED': dco_seeds,
+            'Mass(1)': rng.uniform(1, 50, n_dcos),
+            'Mass(2)': rng.uniform(1, 50, n_dcos),
+            'Coalescence_Time': rng.lognormal(5, 3, n_dcos),
+            'Merges_Hubble_Time': rng.integers(0, 2, n_dcos, dtype=np.uint8),
+        },
+        'BSE_Supernovae': {
+            'SEED': supernova_seeds,
+            'Mass_CO_Core@CO(SN)': rng.uniform(1, 40, n_supernovae),
+            'SN_Type(SN)': rng.integers(1, 6, n_supernovae, dtype=np.int32),
+            'Time': rng.uniform(0, 100, n_supernovae),
+        },
+    }
+
+    with h5py.File(path, 'w') as f:
+        for group_name, columns in groups.items():
+            group = f.create_group(group_name)
+            for name, values in columns.items():
+                group.create_dataset(
+                    name,
+                    data=values,
+                    chunks=(min(chunks, len(values)),) if len(values) else None,
+                    compression=compression if len(values) else None,
+                )
+
+    return path
@@ -1 +1,7 @@
-from .utils import mutually_exclusive, _get_args_dict, validate_dataset
+from .utils import mutually_exclusive, _get_args_dict, validate_dataset, dataclass_slots, obtain_public_id
+from .progress import ProgressSink, NullProgress, TqdmProgress, LoggingProgress, CallbackProgress, get_progress_sink
+from .retry import RetryPolicy, NO_RETRY, DEFAULT_RETRY
+from .file_download import DownloadReport
+from .rate_limit import TokenBucket, FileTokenBucket, get_token_bucket
+from .manifest import verify, read_manifest
+from .sync import SyncReport
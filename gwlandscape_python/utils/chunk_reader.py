@@ -0,0 +1,162 @@
+import itertools
+import os
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# HDF5 filter ids of the filters that can be undone without h5py
+_FILTER_SHUFFLE = 2
+_FILTER_DEFLATE = 1
+
+# Number of blocks decompressed ahead of the one being yielded, per worker
+READ_AHEAD = 2
+
+# Number of rows per block read through h5py, for datasets whose chunks can't be decompressed in parallel
+FALLBACK_BLOCK_ROWS = 64 * 1024
+
+
+def _filters(dataset):
+    # The ids of the filters applied to each chunk, in the order they were applied, or None if any can't be undone here
+    plist = dataset.id.get_create_plist()
+    filters = [plist.get_filter(i)[0] for i in range(plist.get_nfilters())]
+    if any(f not in (_FILTER_SHUFFLE, _FILTER_DEFLATE) for f in filters):
+        return None
+    return filters
+
+
+def _decode_chunk(data, filter_mask, filters, dtype, chunk_shape):
+    import numpy as np
+
+    # Filters are undone in the reverse order they were applied, skipping those the mask says weren't applied
+    for i in reversed(range(len(filters))):
+        if filter_mask & (1 << i):
+            continue
+        if filters[i] == _FILTER_DEFLATE:
+            data = zlib.decompress(data)
+        elif dtype.itemsize > 1:
+            data = np.frombuffer(data, dtype=np.uint8).reshape(dtype.itemsize, -1).T.tobytes()
+    return np.frombuffer(data, dtype=dtype).reshape(chunk_shape)
+
+
+def _decode_block(raw_chunks, filters, dtype, chunks, shape, fillvalue):
+    # Decompresses the chunks covering one block of rows, and copies them into the block, trimming the chunks at the
+    # edges of the dataset
+    import numpy as np
+
+    start = raw_chunks[0][0][0]
+    block = np.empty((min(chunks[0], shape[0] - start),) + shape[1:], dtype=dtype)
+    for offset, raw in raw_chunks:
+        target = (slice(0, len(block)),) + tuple(
+            slice(o, min(o + c, n)) for o, c, n in zip(offset[1:], chunks[1:], shape[1:])
+        )
+        if raw is None:
+            block[target] = fillvalue
+        else:
+            chunk = _decode_chunk(raw[1], raw[0], filters, dtype, chunks)
+            block[target] = chunk[tuple(slice(0, s.stop - s.start) for s in target)]
+    return block
+
+
+def _read_band(dataset, start, chunks):
+    # Reads the compressed chunks of the block of rows starting at start, in the calling thread. Chunks that have never
+    # been written are returned as None
+    others = [range(0, n, c) for n, c in zip(dataset.shape[1:], chunks[1:])]
+    raw_chunks = []
+    for rest in itertools.product(*others):
+        offset = (start,) + rest
+        if dataset.id.get_chunk_info_by_coord(offset).byte_offset is None:
+            raw_chunks.append((offset, None))
+        else:
+            raw_chunks.append((offset, dataset.id.read_direct_chunk(offset)))
+    return raw_chunks
+
+
+def iter_chunks(dataset, max_workers=None, executor=None, read_ahead=None):
+    """Read a HDF5 dataset in blocks of rows aligned with its chunks, decompressing several chunks at a time in a
+    thread pool. The compressed chunks are read in the calling thread, and decompressed by the pool, which runs in
+    parallel because ``zlib`` releases the GIL. Blocks are yielded in order, and only a few blocks are held in memory
+    at a time.
+
+    Only chunks compressed with gzip, optionally with the shuffle filter, are decompressed in parallel. Other datasets
+    are read through ``h5py`` in the same size of blocks.
+
+    Parameters
+    ----------
+    dataset : h5py.Dataset
+        The dataset to read
+    max_workers : int, optional
+        Number of threads decompressing chunks, by default the number of CPUs
+    executor : concurrent.futures.Executor, optional
+        Pool to decompress the chunks in, such as one shared by readers of several datasets at once, by default a
+        pool of max_workers threads is created for this dataset
+    read_ahead : int, optional
+        Number of blocks decompressed ahead of the one being yielded, by default READ_AHEAD per worker
+
+    Yields
+    ------
+    numpy.ndarray
+        Consecutive blocks of rows of the dataset, each as many rows as a chunk, apart from the last
+    """
+    shape = dataset.shape
+    if not shape:
+        yield dataset[()]
+        return
+
+    chunks = dataset.chunks
+    # Variable length values, such as strings, are stored outside the chunks, so need h5py to read them
+    filters = _filters(dataset) if chunks and not dataset.dtype.hasobject else None
+    if filters is None:
+        step = chunks[0] if chunks else FALLBACK_BLOCK_ROWS
+        for start in range(0, shape[0], step):
+            yield dataset[start:start + step]
+        return
+
+    max_workers = max_workers or os.cpu_count() or 1
+    read_ahead = max_workers * READ_AHEAD if read_ahead is None else read_ahead
+    if executor is None:
+        with ThreadPoolExecutor(max_workers) as executor:
+            yield from _decode_blocks(dataset, filters, executor, read_ahead)
+    else:
+        yield from _decode_blocks(dataset, filters, executor, read_ahead)
+
+
+def _decode_blocks(dataset, filters, executor, read_ahead):
+    shape, chunks = dataset.shape, dataset.chunks
+    dtype, fillvalue = dataset.dtype, dataset.fillvalue
+    pending = deque()
+    for start in range(0, shape[0], chunks[0]):
+        pending.append(executor.submit(
+            _decode_block, _read_band(dataset, start, chunks), filters, dtype, chunks, shape, fillvalue
+        ))
+        if len(pending) > read_ahead:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def read_dataset(dataset, max_workers=None):
+    """Read the whole of a HDF5 dataset, decompressing its chunks in parallel with :func:`iter_chunks`
+
+    Parameters
+    ----------
+    dataset : h5py.Dataset
+        The dataset to read
+    max_workers : int, optional
+        Number of threads decompressing chunks, by default the number of CPUs
+
+    Returns
+    -------
+    numpy.ndarray
+        The values of the dataset
+    """
+    import numpy as np
+
+    if not dataset.shape:
+        return dataset[()]
+
+    out = np.empty(dataset.shape, dtype=dataset.dtype)
+    start = 0
+    for block in iter_chunks(dataset, max_workers):
+        out[start:start + len(block)] = block
+        start += len(block)
+    return out
@@ -0,0 +1,222 @@
+import shutil
+from pathlib import Path
+
+from .chunk_reader import iter_chunks
+from .files import CACHE_SUFFIX, atomic_write, column_file_name, read_json, source_key, write_json
+
+# Name of the index of the cached columns, in the cache directory
+CACHE_INDEX_NAME = 'index.json'
+
+CACHE_VERSION = 1
+
+
+def cache_path(path):
+    """Path of the directory holding the columnar cache of a HDF5 file
+
+    Parameters
+    ----------
+    path : str or ~pathlib.Path
+        Path of the HDF5 file
+
+    Returns
+    -------
+    ~pathlib.Path
+        The file path with CACHE_SUFFIX appended
+    """
+    path = Path(path)
+    return path.with_name(path.name + CACHE_SUFFIX)
+
+
+def _is_mappable(dtype):
+    # Only plain numeric values can be stored in a .npy file and mapped without being converted
+    return dtype.kind in 'biufc' and dtype.fields is None
+
+
+def _copy_column(dataset, path):
+    # Copies the dataset into a new .npy file, written in place through a memory map
+    import numpy as np
+
+    if not _is_mappable(dataset.dtype):
+        raise TypeError(f'{dataset.name} has dtype {dataset.dtype}, which can\'t be memory mapped')
+
+    with atomic_write(path) as tmp_path:
+        out = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dataset.dtype, shape=dataset.shape)
+        if dataset.shape:
+            # Copied a chunk at a time, decompressing chunks in parallel, so the column is never all held in memory
+            start = 0
+            for block in iter_chunks(dataset):
+                out[start:start + len(block)] = block
+                start += len(block)
+        else:
+            out[()] = dataset[()]
+        out.flush()
+        del out
+
+
+class ColumnarCache:
+    """
+    The columns of a HDF5 file that have been materialised by :func:`materialise`, each opened as a read-only
+    ``numpy.memmap`` of an uncompressed ``.npy`` file. Reading a column reads the mapped file directly, with no
+    decompression and no copy of the data.
+
+    Columns are looked up by group, as ``cache[group][column]``.
+
+    Parameters
+    ----------
+    path : ~pathlib.Path
+        Directory holding the cache
+    columns : dict
+        Names of the files holding the cached columns, keyed by group and column name
+
+    Attributes
+    ----------
+    path : ~pathlib.Path
+        Directory holding the cache
+    """
+
+    def __init__(self, path, columns):
+        self.path = path
+        self._columns = columns
+
+    @property
+    def groups(self):
+        """Names of the cached groups"""
+        return list(self._columns)
+
+    def columns(self, group):
+        """Names of the cached columns of a group
+
+        Parameters
+        ----------
+        group : str
+            Name of the group
+
+        Returns
+        -------
+        list
+            The column names
+        """
+        return list(self._columns[group])
+
+    def column(self, group, column):
+        """Open a cached column
+
+        Parameters
+        ----------
+        group : str
+            Name of the group
+        column : str
+            Name of the column
+
+        Returns
+        -------
+        numpy.memmap
+            The column, mapped read-only
+        """
+        import numpy as np
+
+        return np.load(self.path / self._columns[group][column], mmap_mode='r')
+
+    def __getitem__(self, group):
+        return {column: self.column(group, column) for column in self._columns[group]}
+
+    def __contains__(self, group):
+        return group in self._columns
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __repr__(self):
+        return f'ColumnarCache({str(self.path)!r}, groups={self.groups})'
+
+
+def open_columns(path):
+    """Open the columnar cache of a HDF5 file, if it is still valid
+
+    Parameters
+    ----------
+    path : str or ~pathlib.Path
+        Path of the HDF5 file
+
+    Returns
+    -------
+    ColumnarCache or None
+        The cached columns, or None if there is no cache or the file has changed since it was built
+    """
+    directory = cache_path(path)
+    index = read_json(directory / CACHE_INDEX_NAME)
+    if index is None or index.get('version') != CACHE_VERSION or index['source'] != source_key(path):
+        return None
+    return ColumnarCache(directory, index['columns'])
+
+
+def materialise(path, columns=None):
+    """Convert columns of a COMPAS HDF5 file into an uncompressed, memory mapped columnar cache, and open them.
+
+    Each column is copied once into its own ``.npy`` file in a directory next to the HDF5 file, named after the file
+    with CACHE_SUFFIX appended, so that later sessions can map the columns rather than decompress them again. The
+    cache is keyed by the size and modification time of the HDF5 file, and is rebuilt if the file changes. Columns
+    already in a valid cache are not copied again, and columns added by later calls are kept alongside them.
+
+    Parameters
+    ----------
+    path : str or ~pathlib.Path
+        Path of the HDF5 file
+    columns : dict, optional
+        Lists of the names of the columns to cache, keyed by group name. A value of None caches every column of the
+        group. By default every column of every group is cached. Columns whose values can't be memory mapped, such as
+        strings, are skipped unless they are named
+
+    Returns
+    -------
+    ColumnarCache
+        The cached columns, including any cached by earlier calls
+
+    Raises
+    ------
+    KeyError
+        If a named group or column isn't in the file
+    TypeError
+        If a named column can't be memory mapped
+    """
+    import h5py
+
+    path = Path(path)
+    directory = cache_path(path)
+    source = source_key(path)
+
+    index = read_json(directory / CACHE_INDEX_NAME)
+    if index is None or index.get('version') != CACHE_VERSION or index['source'] != source:
+        # The file has changed, so the whole cache is stale
+        shutil.rmtree(directory, ignore_errors=True)
+        index = {'version': CACHE_VERSION, 'source': source, 'columns': {}}
+    directory.mkdir(parents=True, exist_ok=True)
+
+    with h5py.File(path, 'r') as f:
+        if columns is None:
+            columns = {name: None for name, group in f.items() if isinstance(group, h5py.Group)}
+
+        for group_name, names in columns.items():
+            group = f[group_name]
+            cached = index['columns'].setdefault(group_name, {})
+            if names is None:
+                names = [
+                    name for name, dataset in group.items()
+                    if isinstance(dataset, h5py.Dataset) and _is_mappable(dataset.dtype)
+                ]
+
+            for name in names:
+                dataset = group[name]
+                if not isinstance(dataset, h5py.Dataset):
+                    raise KeyError(f'{dataset.name} is not a column')
+                if name in cached and (directory / cached[name]).exists():
+                    continue
+                file_name = column_file_name(group_name, name)
+                _copy_column(dataset, directory / file_name)
+                cached[name] = file_name
+
+    if source_key(path) != source:
+        raise IOError(f'{path} changed while its columns were being cached')
+
+    write_json(directory / CACHE_INDEX_NAME, index)
+    return ColumnarCache(directory, index['columns'])
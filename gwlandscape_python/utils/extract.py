@@ -0,0 +1,234 @@
+import hashlib
+import io
+import queue
+import threading
+from pathlib import Path
+
+# Suffixes of the files that are extracted as they are downloaded, when extraction is requested
+TAR_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')
+
+# Suffixes of the dataset member extracted from a tarball
+HDF5_SUFFIXES = ('.h5', '.hdf5')
+
+# Number of chunks that can wait between stages before the earlier stage blocks
+PIPE_DEPTH = 64
+
+# Size of the blocks in which the extracted member is read and written
+EXTRACT_BLOCK_SIZE = 1024 * 1024
+
+# Seconds between checks of whether another stage has failed, while waiting on a pipe
+_POLL_INTERVAL = 0.1
+
+
+def is_tarball(path):
+    """Whether a file is a tarball that can be extracted as it is downloaded, judged by its name
+
+    Parameters
+    ----------
+    path : str or ~pathlib.Path
+        Path of the file
+
+    Returns
+    -------
+    bool
+        True if the name ends in one of TAR_SUFFIXES
+    """
+    return str(path).lower().endswith(TAR_SUFFIXES)
+
+
+class _Pipe(io.RawIOBase):
+    # A bounded queue of chunks passed from one thread to another, read as a file by the receiving thread. If either
+    # side aborts the pipe, the other raises the error rather than waiting forever
+
+    def __init__(self, depth=PIPE_DEPTH):
+        self._queue = queue.Queue(depth)
+        self._buffer = b''
+        self._eof = False
+        self._error = None
+
+    def readable(self):
+        return True
+
+    def put(self, chunk):
+        # A chunk of None marks the end of the stream
+        while True:
+            if self._error is not None:
+                raise self._error
+            try:
+                return self._queue.put(chunk, timeout=_POLL_INTERVAL)
+            except queue.Full:
+                pass
+
+    def get(self):
+        while True:
+            if self._error is not None:
+                raise self._error
+            try:
+                return self._queue.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                pass
+
+    def abort(self, error):
+        self._error = error
+
+    def readinto(self, b):
+        while not self._buffer and not self._eof:
+            chunk = self.get()
+            if chunk is None:
+                self._eof = True
+            else:
+                self._buffer = chunk
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+    def drain(self):
+        # Discards the rest of the stream, so that the sending thread isn't left blocked
+        while not self._eof:
+            if self.get() is None:
+                self._eof = True
+
+
+class TarStreamExtractor:
+    """
+    Extracts the HDF5 file from a tarball while it is being downloaded, without writing the tarball to disk. The
+    downloaded chunks are passed to :meth:`write`; one thread reads the tar stream from them, decompressing it if
+    needed, and another writes the HDF5 member to its destination, so that downloading, decompressing and writing
+    all run at the same time.
+
+    The member is written to the output directory under its own file name, ignoring any directories in the
+    tarball, and its size and SHA-256 checksum are computed as it is written.
+
+    Parameters
+    ----------
+    output_dir : ~pathlib.Path
+        Directory to write the extracted file to
+
+    Attributes
+    ----------
+    path : ~pathlib.Path or None
+        Path of the extracted file, once :meth:`close` has returned
+    size : int
+        Size of the extracted file in bytes
+    sha256 : str or None
+        Hex digest of the SHA-256 checksum of the extracted file
+    """
+
+    def __init__(self, output_dir):
+        self.output_dir = Path(output_dir)
+        self.path = None
+        self.size = 0
+        self.sha256 = None
+        self._received = 0
+        self._archive = _Pipe()
+        self._member = _Pipe()
+        self._errors = []
+        self._threads = [
+            threading.Thread(target=self._run, args=(self._read_archive,), daemon=True),
+            threading.Thread(target=self._run, args=(self._write_member,), daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def write(self, chunk):
+        """Pass on the next chunk of the tarball
+
+        Parameters
+        ----------
+        chunk : bytes
+            The chunk
+        """
+        self._archive.put(bytes(chunk))
+        self._received += len(chunk)
+
+    def tell(self):
+        """Number of bytes of the tarball received so far, so that an interrupted download can be resumed"""
+        return self._received
+
+    def seek(self, offset):
+        raise io.UnsupportedOperation('A tarball being extracted can only be resumed, not restarted')
+
+    def truncate(self):
+        raise io.UnsupportedOperation('A tarball being extracted can only be resumed, not restarted')
+
+    def close(self):
+        """Wait for the extraction to finish, once the whole tarball has been written
+
+        Raises
+        ------
+        Exception
+            The error raised while extracting or writing the file, such as for a corrupt tarball or one containing no
+            HDF5 file
+        """
+        try:
+            self._archive.put(None)
+        except Exception:
+            # A stage has already failed, and its error is raised below
+            pass
+        self._join()
+        if self._errors:
+            self._remove_output()
+            raise self._errors[0]
+
+    def abort(self, error):
+        """Stop the extraction after the download fails, removing any partly written file
+
+        Parameters
+        ----------
+        error : Exception
+            The error which stopped the download
+        """
+        self._archive.abort(error)
+        self._member.abort(error)
+        self._join()
+        self._remove_output()
+
+    def _run(self, stage):
+        try:
+            stage()
+        except Exception as e:
+            self._errors.append(e)
+            self._archive.abort(e)
+            self._member.abort(e)
+
+    def _join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def _remove_output(self):
+        if self.path is not None and self.path.exists():
+            self.path.unlink()
+        self.path = None
+
+    def _read_archive(self):
+        import tarfile
+
+        with tarfile.open(fileobj=self._archive, mode='r|*') as tar:
+            for member in tar:
+                if member.isfile() and member.name.lower().endswith(HDF5_SUFFIXES):
+                    self.path = self.output_dir / Path(member.name).name
+                    self._member.put(self.path)
+                    f = tar.extractfile(member)
+                    while block := f.read(EXTRACT_BLOCK_SIZE):
+                        self._member.put(block)
+                    break
+        self._member.put(None)
+        self._archive.drain()
+
+        if self.path is None:
+            raise IOError('Tarball does not contain a hdf5 file')
+
+    def _write_member(self):
+        path = self._member.get()
+        if path is None:
+            return
+
+        sha256 = hashlib.sha256()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        with path.open('wb') as f:
+            while (block := self._member.get()) is not None:
+                f.write(block)
+                sha256.update(block)
+                self.size += len(block)
+        self.sha256 = sha256.hexdigest()
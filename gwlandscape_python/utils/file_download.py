@@ -1,47 +1,418 @@
 import concurrent.futures
+import hashlib
+import io
+import threading
 from functools import partial
 import requests
-from tqdm import tqdm
+from gwdc_python.logger import create_logger
+from ..instrumentation import RetryEvent, file_timer
+from .extract import TarStreamExtractor, is_tarball
+from .progress import TqdmProgress, progress_counter
+from .retry import NO_RETRY
 from ..settings import GWLANDSCAPE_FILE_DOWNLOAD_ENDPOINT
 
+logger = create_logger(__name__)
 
-def _get_file_map_fn(file_ref, progress_bar, **kwargs):
-    download_url = GWLANDSCAPE_FILE_DOWNLOAD_ENDPOINT + str(file_ref.download_token)
+CHUNK_SIZE = 1024 * 16
 
-    content = b''
+# Number of files downloaded at once by each call
+MAX_WORKERS = 20
 
-    with requests.get(download_url, stream=True) as request:
-        for chunk in request.iter_content(chunk_size=1024 * 16, decode_unicode=True):
-            progress_bar.update(len(chunk))
-            content += chunk
-    return (file_ref.path, content)
+# Suffix of the files that partial downloads are kept in when resuming
+PARTIAL_SUFFIX = '.part'
 
+# requests.Session isn't safe to share between threads, so each download thread keeps its own, which reuses its
+# connections to the file server for every file the thread downloads
+_thread_local = threading.local()
 
-def _save_file_map_fn(file_ref, progress_bar, root_path):
-    download_url = GWLANDSCAPE_FILE_DOWNLOAD_ENDPOINT + str(file_ref.download_token)
 
+def _session():
+    session = getattr(_thread_local, 'session', None)
+    if session is None:
+        session = _thread_local.session = requests.Session()
+    return session
+
+
+class DownloadReport(list):
+    """
+    The files downloaded by :meth:`~.GWLandscape.get_files_by_reference` or saved by
+    :meth:`~.GWLandscape.save_files_by_reference`. Files that could not be downloaded don't stop the others from
+    being downloaded, and are listed in :attr:`failed` instead.
+
+    Attributes
+    ----------
+    failed : list
+        Tuples of the :class:`~gwdc_python.files.file_reference.FileReference` and the exception raised, for each file
+        that could not be downloaded
+    """
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.failed = []
+
+    @property
+    def ok(self):
+        """True if every file was downloaded"""
+        return not self.failed
+
+
+def _on_retry(file_ref, emit, attempt, delay, error):
+    logger.warning(f'Download of {file_ref.path} failed ({error}), retrying in {delay:.1f}s')
+    if emit is not None:
+        emit(RetryEvent(operation=str(file_ref.path), attempt=attempt, delay=delay, error=error))
+
+
+def _hash_written(f, offset):
+    # The SHA-256 checksum of the first offset bytes of f, such as those kept from an earlier partial download, which
+    # leaves f at offset
+    sha256 = hashlib.sha256()
+    f.seek(0)
+    while chunk := f.read(min(CHUNK_SIZE * 64, offset - f.tell())):
+        sha256.update(chunk)
+    return sha256
+
+
+def _restart(f):
+    f.seek(0)
+    f.truncate()
+
+
+def _is_saved(output_path, file_ref):
+    return output_path.exists() and output_path.stat().st_size == file_ref.file_size
+
+
+def _open_partial(partial_path, file_ref):
+    # Opens the partial download of a file to be continued
+    f = partial_path.open('ab+')
+    if f.tell() >= file_ref.file_size:
+        # Either complete but never moved into place, or left by a different version of the file
+        _restart(f)
+    return f
+
+
+def _remove_empty_partial(partial_path):
+    # There is nothing to resume if no data was received
+    try:
+        if partial_path.stat().st_size == 0:
+            partial_path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _stream_file(file_ref, f, progress, download_endpoint, emit, retry, bandwidth, checksum=False,
+                 chunk_size=CHUNK_SIZE):
+    # Writes the file to f, resuming from the bytes already written with a range request if an attempt fails, and
+    # returns the SHA-256 checksum of the file if requested, computed as it is written. Any bytes already in f, such
+    # as from an earlier partial download, are kept and the rest of the file is requested
+    download_url = download_endpoint + str(file_ref.download_token)
+    sha256 = hashlib.sha256() if checksum else None
+    if f.tell():
+        progress.update(f.tell())
+        if sha256 is not None:
+            sha256 = _hash_written(f, f.tell())
+
+    with file_timer(file_ref, emit) as received:
+        def _attempt():
+            nonlocal sha256
+            offset = f.tell()
+            headers = {'Range': f'bytes={offset}-'} if offset else None
+            with _session().get(download_url, headers=headers, stream=True) as request:
+                request.raise_for_status()
+                if offset and request.status_code != 206:
+                    # The server ignored the range, so start again
+                    progress.update(-offset)
+                    _restart(f)
+                    if sha256 is not None:
+                        sha256 = hashlib.sha256()
+                n_bytes = 0
+                for chunk in request.iter_content(chunk_size=chunk_size):
+                    if bandwidth is not None:
+                        bandwidth.acquire(len(chunk))
+                    n_bytes += len(chunk)
+                    received(len(chunk))
+                    progress.update(len(chunk))
+                    if sha256 is not None:
+                        sha256.update(chunk)
+                    f.write(chunk)
+
+                # Older versions of urllib3 don't report a connection closed before the whole response was received
+                expected = request.headers.get('Content-Length')
+                if expected is not None and n_bytes < int(expected):
+                    raise requests.exceptions.ChunkedEncodingError(
+                        f'Connection broken: received {n_bytes} of {expected} bytes'
+                    )
+
+        (retry or NO_RETRY).run(_attempt, on_retry=lambda *args: _on_retry(file_ref, emit, *args))
+
+        if f.tell() != file_ref.file_size:
+            raise IOError(f'Received {f.tell()} bytes of {file_ref.path}, expected {file_ref.file_size}')
+
+    return sha256.hexdigest() if sha256 is not None else None
+
+
+def _get_file_map_fn(file_ref, progress, download_endpoint=GWLANDSCAPE_FILE_DOWNLOAD_ENDPOINT, emit=None,
+                     retry=None, bandwidth=None, chunk_size=CHUNK_SIZE, **kwargs):
+    content = io.BytesIO()
+    _stream_file(file_ref, content, progress, download_endpoint, emit, retry, bandwidth, chunk_size=chunk_size)
+    return (file_ref.path, content.getvalue())
+
+
+def _save_file_map_fn(file_ref, progress, root_path, download_endpoint=GWLANDSCAPE_FILE_DOWNLOAD_ENDPOINT,
+                      emit=None, retry=None, bandwidth=None, manifest=None, chunk_size=CHUNK_SIZE, resume=False,
+                      extract=False):
     output_path = root_path / file_ref.path
     output_path.parents[0].mkdir(parents=True, exist_ok=True)
 
-    with requests.get(download_url, stream=True) as request:
-        with output_path.open("wb+") as f:
-            for chunk in request.iter_content(chunk_size=1024 * 16):
-                progress_bar.update(len(chunk))
-                f.write(chunk)
+    if extract and is_tarball(file_ref.path):
+        extracted = None
+        if resume and manifest is not None:
+            extracted = manifest.find_extracted(file_ref.path, file_ref.file_size)
+        if extracted is not None:
+            # Already extracted from the same tarball by an earlier call
+            progress.update(file_ref.file_size)
+            return root_path / extracted
+
+        # The tarball itself is never written, only the HDF5 file extracted from it
+        extractor = TarStreamExtractor(output_path.parent)
+        try:
+            _stream_file(
+                file_ref, extractor, progress, download_endpoint, emit, retry, bandwidth, chunk_size=chunk_size
+            )
+        except Exception as e:
+            extractor.abort(e)
+            raise
+        extractor.close()
+
+        if manifest is not None:
+            manifest.add(
+                extractor.path.relative_to(root_path), extractor.size, extractor.sha256,
+                source=(file_ref.path, file_ref.file_size)
+            )
+        return extractor.path
+
+    if resume:
+        if _is_saved(output_path, file_ref):
+            # Already saved by an earlier call
+            progress.update(file_ref.file_size)
+            return output_path
+
+        # Partial downloads are kept for the next call to continue, and only moved into place once complete
+        partial_path = output_path.with_name(output_path.name + PARTIAL_SUFFIX)
+        try:
+            with _open_partial(partial_path, file_ref) as f:
+                sha256 = _stream_file(
+                    file_ref, f, progress, download_endpoint, emit, retry, bandwidth, checksum=manifest is not None,
+                    chunk_size=chunk_size
+                )
+        except Exception:
+            _remove_empty_partial(partial_path)
+            raise
+        partial_path.replace(output_path)
+    else:
+        try:
+            with output_path.open("wb+") as f:
+                sha256 = _stream_file(
+                    file_ref, f, progress, download_endpoint, emit, retry, bandwidth, checksum=manifest is not None,
+                    chunk_size=chunk_size
+                )
+        except Exception:
+            # Don't leave a partial file behind
+            output_path.unlink(missing_ok=True)
+            raise
 
+    if manifest is not None:
+        manifest.add(file_ref.path, file_ref.file_size, sha256)
+    return output_path
 
-def _download_files(map_fn, file_refs, root_path=None):
-    with concurrent.futures.ThreadPoolExecutor(max_workers=20) as executor:
-        progress = tqdm(total=file_refs.get_total_bytes(), leave=True, unit='B', unit_scale=True)
-        files = list(
-            executor.map(
-                partial(
+
+def _download_files(map_fn, file_refs, root_path=None, download_endpoint=GWLANDSCAPE_FILE_DOWNLOAD_ENDPOINT,
+                    emit=None, progress=None, retry=None, bandwidth=None, max_workers=MAX_WORKERS, **kwargs):
+    report = DownloadReport()
+    with progress_counter(progress or TqdmProgress(), file_refs.get_total_bytes()) as counter:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(
                     map_fn,
-                    progress_bar=progress,
-                    root_path=root_path
-                ),
-                file_refs
+                    file_ref,
+                    progress=counter,
+                    root_path=root_path,
+                    download_endpoint=download_endpoint,
+                    emit=emit,
+                    retry=retry,
+                    bandwidth=bandwidth,
+                    **kwargs
+                )
+                for file_ref in file_refs
+            ]
+            for file_ref, future in zip(file_refs, futures):
+                try:
+                    report.append(future.result())
+                except Exception as e:
+                    report.failed.append((file_ref, e))
+    return report
+
+
+async def _run_now(fn, *args):
+    return fn(*args)
+
+
+async def _stream_file_async(session, file_ref, f, progress, download_endpoint, emit, retry, bandwidth,
+                             checksum=False, run=_run_now):
+    # As _stream_file, for an aiohttp session. The calls to f are made through run, which for files on disk runs them
+    # in an executor so that they don't hold up the event loop, and by default calls them directly
+    download_url = download_endpoint + str(file_ref.download_token)
+    sha256 = hashlib.sha256() if checksum else None
+    offset = await run(f.tell)
+    if offset:
+        progress.update(offset)
+        if sha256 is not None:
+            sha256 = await run(_hash_written, f, offset)
+
+    with file_timer(file_ref, emit) as received:
+        async def _attempt():
+            nonlocal sha256
+            offset = await run(f.tell)
+            headers = {'Range': f'bytes={offset}-'} if offset else None
+            async with session.get(download_url, headers=headers) as response:
+                response.raise_for_status()
+                if offset and response.status != 206:
+                    # The server ignored the range, so start again
+                    progress.update(-offset)
+                    await run(_restart, f)
+                    if sha256 is not None:
+                        sha256 = hashlib.sha256()
+                # Each chunk is written while the next is received
+                writing = None
+                try:
+                    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                        if bandwidth is not None:
+                            await bandwidth.acquire_async(len(chunk))
+                        received(len(chunk))
+                        progress.update(len(chunk))
+                        if sha256 is not None:
+                            sha256.update(chunk)
+                        if writing is not None:
+                            await writing
+                        writing = run(f.write, chunk)
+                finally:
+                    if writing is not None:
+                        await writing
+
+        await (retry or NO_RETRY).run_async(_attempt, on_retry=lambda *args: _on_retry(file_ref, emit, *args))
+
+        size = await run(f.tell)
+        if size != file_ref.file_size:
+            raise IOError(f'Received {size} bytes of {file_ref.path}, expected {file_ref.file_size}')
+
+    return sha256.hexdigest() if sha256 is not None else None
+
+
+async def _get_file_async(session, file_ref, progress, download_endpoint=GWLANDSCAPE_FILE_DOWNLOAD_ENDPOINT,
+                          emit=None, retry=None, bandwidth=None, **kwargs):
+    content = io.BytesIO()
+    await _stream_file_async(session, file_ref, content, progress, download_endpoint, emit, retry, bandwidth)
+    return (file_ref.path, content.getvalue())
+
+
+async def _save_file_async(session, file_ref, progress, root_path, download_endpoint=GWLANDSCAPE_FILE_DOWNLOAD_ENDPOINT,
+                           emit=None, retry=None, bandwidth=None, manifest=None, resume=False, extract=False):
+    # As _save_file_map_fn, with the file system calls and the extraction run in the default executor
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+
+    def run(fn, *args):
+        return loop.run_in_executor(None, fn, *args)
+
+    async def stream(f, checksum=False):
+        return await _stream_file_async(
+            session, file_ref, f, progress, download_endpoint, emit, retry, bandwidth, checksum=checksum, run=run
+        )
+
+    output_path = root_path / file_ref.path
+    await run(partial(output_path.parents[0].mkdir, parents=True, exist_ok=True))
+
+    if extract and is_tarball(file_ref.path):
+        extracted = None
+        if resume and manifest is not None:
+            extracted = manifest.find_extracted(file_ref.path, file_ref.file_size)
+        if extracted is not None:
+            # Already extracted from the same tarball by an earlier call
+            progress.update(file_ref.file_size)
+            return root_path / extracted
+
+        # The tarball itself is never written, only the HDF5 file extracted from it
+        extractor = TarStreamExtractor(output_path.parent)
+        try:
+            await stream(extractor)
+        except Exception as e:
+            await run(extractor.abort, e)
+            raise
+        await run(extractor.close)
+
+        if manifest is not None:
+            manifest.add(
+                extractor.path.relative_to(root_path), extractor.size, extractor.sha256,
+                source=(file_ref.path, file_ref.file_size)
             )
+        return extractor.path
+
+    if resume:
+        if await run(_is_saved, output_path, file_ref):
+            # Already saved by an earlier call
+            progress.update(file_ref.file_size)
+            return output_path
+
+        # Partial downloads are kept for the next call to continue, and only moved into place once complete
+        partial_path = output_path.with_name(output_path.name + PARTIAL_SUFFIX)
+        try:
+            f = await run(_open_partial, partial_path, file_ref)
+            try:
+                sha256 = await stream(f, checksum=manifest is not None)
+            finally:
+                await run(f.close)
+        except Exception:
+            await run(_remove_empty_partial, partial_path)
+            raise
+        await run(partial_path.replace, output_path)
+    else:
+        try:
+            f = await run(output_path.open, 'wb+')
+            try:
+                sha256 = await stream(f, checksum=manifest is not None)
+            finally:
+                await run(f.close)
+        except Exception:
+            # Don't leave a partial file behind
+            await run(partial(output_path.unlink, missing_ok=True))
+            raise
+
+    if manifest is not None:
+        manifest.add(file_ref.path, file_ref.file_size, sha256)
+    return output_path
+
+
+async def _download_files_async(session, download_fn, file_refs, root_path=None, max_concurrency=20,
+                                progress=None, **kwargs):
+    # As _download_files, with the files downloaded by tasks on the event loop rather than by threads, at most
+    # max_concurrency at a time
+    import asyncio
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _download(file_ref, counter):
+        async with semaphore:
+            return await download_fn(session, file_ref, progress=counter, root_path=root_path, **kwargs)
+
+    report = DownloadReport()
+    with progress_counter(progress or TqdmProgress(), file_refs.get_total_bytes()) as counter:
+        results = await asyncio.gather(
+            *(_download(file_ref, counter) for file_ref in file_refs),
+            return_exceptions=True
         )
-        progress.close()
-    return files
+    for file_ref, result in zip(file_refs, results):
+        if isinstance(result, Exception):
+            report.failed.append((file_ref, result))
+        else:
+            report.append(result)
+    return report
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+# Suffixes of the caches and indexes built next to a downloaded HDF5 file and named after it: the directories of the
+# columnar cache and of the SEED index, and the zone map file. They live in the same directories as the downloaded
+# files, so tools that manage those directories, such as GWLandscape.sync, check these to keep them
+CACHE_SUFFIX = '.columns'
+SEED_INDEX_SUFFIX = '.seeds'
+ZONE_MAP_SUFFIX = '.zonemap.npz'
+SIDECAR_SUFFIXES = (CACHE_SUFFIX, SEED_INDEX_SUFFIX, ZONE_MAP_SUFFIX)
+
+
+def source_key(path):
+    """The size and modification time of a file, stored with the caches and indexes built from it, so that they can
+    be rebuilt once the file changes
+
+    Parameters
+    ----------
+    path : str or ~pathlib.Path
+        Path of the file
+
+    Returns
+    -------
+    dict
+        The size in bytes and the modification time in nanoseconds
+    """
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def sidecar_source(path):
+    """Find the file that a sidecar, or a file inside a sidecar directory, was built from
+
+    Parameters
+    ----------
+    path : ~pathlib.Path
+        Path of the file, which may be relative
+
+    Returns
+    -------
+    ~pathlib.Path or None
+        Path of the file it was built from, relative to the same directory as path, or None if path isn't part of a
+        sidecar
+    """
+    parts = path.parts
+    for i, part in enumerate(parts):
+        for suffix in SIDECAR_SUFFIXES:
+            if part.endswith(suffix) and len(part) > len(suffix):
+                return Path(*parts[:i], part[:-len(suffix)])
+    return None
+
+
+@contextmanager
+def atomic_write(path):
+    """Write a file through a temporary file in the same directory, which is moved into place once the block exits
+    without an error. The file is never left half written, and a failed write leaves nothing behind.
+
+    Parameters
+    ----------
+    path : str or ~pathlib.Path
+        Path of the file to write
+
+    Yields
+    ------
+    ~pathlib.Path
+        Path of the temporary file to write to
+    """
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix='.tmp')
+    os.close(fd)
+    try:
+        yield Path(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+def read_json(path):
+    """Read a JSON file written by :func:`write_json`
+
+    Parameters
+    ----------
+    path : str or ~pathlib.Path
+        Path of the file
+
+    Returns
+    -------
+    object or None
+        The decoded contents, or None if the file is missing or isn't valid JSON
+    """
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def write_json(path, obj):
+    """Write an object to a JSON file with :func:`atomic_write`
+
+    Parameters
+    ----------
+    path : str or ~pathlib.Path
+        Path of the file
+    obj : object
+        The object to write
+    """
+    with atomic_write(path) as tmp_path, open(tmp_path, 'w') as f:
+        json.dump(obj, f, indent=1)
+
+
+def column_file_name(group, column):
+    """Name of a file holding a column of a HDF5 file. Column names such as 'Mass@ZAMS(1)' aren't safe file names, so
+    they are cleaned up, and a hash of the original names keeps cleaned up names that clash apart
+
+    Parameters
+    ----------
+    group : str
+        Name of the group holding the column
+    column : str
+        Name of the column
+
+    Returns
+    -------
+    str
+        The file name, with a ``.npy`` suffix
+    """
+    digest = hashlib.sha1(f'{group}/{column}'.encode()).hexdigest()[:8]
+    return re.sub(r'[^\w.-]', '_', f'{group}.{column}') + f'-{digest}.npy'
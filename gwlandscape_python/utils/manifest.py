@@ -0,0 +1,209 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+from .files import write_json
+
+# Name of the manifest file written to the root of each directory of saved files
+MANIFEST_NAME = '.gwlandscape_manifest.json'
+
+MANIFEST_VERSION = 1
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+# Serialises updates to manifests, so that threads saving files to the same directory don't lose each other's entries
+_write_lock = threading.Lock()
+
+
+def _file_sha256(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(_HASH_CHUNK_SIZE):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _entry(path, size, sha256, source=None):
+    # The mtime is recorded so that verify can skip files that haven't been touched since
+    entry = {'size': size, 'sha256': sha256, 'mtime_ns': os.stat(path).st_mtime_ns}
+    if source is not None:
+        entry['source'] = source
+    return entry
+
+
+def read_manifest(root_path):
+    """Read the manifest of the files saved to a directory
+
+    Parameters
+    ----------
+    root_path : str or ~pathlib.Path
+        Directory the files were saved to
+
+    Returns
+    -------
+    dict
+        The size, SHA-256 checksum and modification time of each saved file, keyed by its path relative to
+        root_path, along with the path and size of the tarball that files extracted while downloading came from.
+        Empty if there is no manifest
+    """
+    try:
+        with open(Path(root_path) / MANIFEST_NAME) as f:
+            return json.load(f)['files']
+    except FileNotFoundError:
+        return {}
+
+
+def _write_manifest(root_path, files):
+    write_json(Path(root_path) / MANIFEST_NAME, {'version': MANIFEST_VERSION, 'files': dict(sorted(files.items()))})
+
+
+class ManifestWriter:
+    """
+    Collects the checksums of the files saved by the download threads, and adds them to the manifest in the root
+    directory once the downloads have finished.
+
+    Parameters
+    ----------
+    root_path : str or ~pathlib.Path
+        Directory the files are saved to
+    """
+
+    def __init__(self, root_path):
+        self.root_path = Path(root_path)
+        self._lock = threading.Lock()
+        self._files = {}
+        self._removed = set()
+        self._extracted = None
+
+    def add(self, file_path, size, sha256, source=None):
+        """Record a saved file
+
+        Parameters
+        ----------
+        file_path : ~pathlib.Path
+            Path of the file, relative to the root directory
+        size : int
+            Size of the file in bytes
+        sha256 : str
+            Hex digest of the SHA-256 checksum of the file
+        source : tuple, optional
+            Path and size of the tarball the file was extracted from, if it was
+        """
+        if source is not None:
+            source = {'path': str(source[0]), 'size': source[1]}
+        entry = _entry(self.root_path / file_path, size, sha256, source)
+        with self._lock:
+            self._files[str(file_path)] = entry
+            self._removed.discard(str(file_path))
+
+    def find_extracted(self, source_path, source_size):
+        """Find a file extracted from a tarball by an earlier download, which is still in place with the size it was
+        saved with
+
+        Parameters
+        ----------
+        source_path : ~pathlib.Path
+            Path of the tarball
+        source_size : int
+            Size of the tarball in bytes
+
+        Returns
+        -------
+        ~pathlib.Path or None
+            Path of the extracted file, relative to the root directory, or None if there isn't one
+        """
+        with self._lock:
+            if self._extracted is None:
+                # Read once, and indexed by tarball, as this is called for every file that is downloaded
+                self._extracted = {
+                    (entry['source']['path'], entry['source']['size']): (file_path, entry['size'])
+                    for file_path, entry in read_manifest(self.root_path).items() if 'source' in entry
+                }
+            found = self._extracted.get((str(source_path), source_size))
+
+        if found is None:
+            return None
+        file_path, size = found
+        try:
+            if os.stat(self.root_path / file_path).st_size == size:
+                return Path(file_path)
+        except FileNotFoundError:
+            pass
+        return None
+
+    def remove(self, file_path):
+        """Record a file that has been deleted
+
+        Parameters
+        ----------
+        file_path : ~pathlib.Path
+            Path of the file, relative to the root directory
+        """
+        with self._lock:
+            self._files.pop(str(file_path), None)
+            self._removed.add(str(file_path))
+
+    def write(self):
+        """Add the recorded files to the manifest, replacing any earlier entries for the same paths, and drop the
+        removed files. Does nothing if no files were recorded."""
+        with self._lock, _write_lock:
+            if not self._files and not self._removed:
+                return
+            files = read_manifest(self.root_path)
+            files.update(self._files)
+            for file_path in self._removed:
+                files.pop(file_path, None)
+            _write_manifest(self.root_path, files)
+
+
+def verify(root_path, full=False):
+    """Check that the files saved to a directory by :meth:`~.GWLandscape.save_files_by_reference` are intact, using
+    the manifest written when they were saved. Only files whose size or modification time has changed since are read
+    again, unless full is True.
+
+    Parameters
+    ----------
+    root_path : str or ~pathlib.Path
+        Directory the files were saved to
+    full : bool, optional
+        If True, recompute the checksum of every file, by default False
+
+    Returns
+    -------
+    list
+        Paths, relative to root_path, of the files that are missing or whose contents have changed
+    """
+    root_path = Path(root_path)
+    files = read_manifest(root_path)
+
+    bad = []
+    updated = False
+    for file_path, entry in files.items():
+        try:
+            stat = os.stat(root_path / file_path)
+        except FileNotFoundError:
+            bad.append(Path(file_path))
+            continue
+
+        if stat.st_size != entry['size']:
+            bad.append(Path(file_path))
+        elif full or stat.st_mtime_ns != entry['mtime_ns']:
+            if _file_sha256(root_path / file_path) != entry['sha256']:
+                bad.append(Path(file_path))
+            elif stat.st_mtime_ns != entry['mtime_ns']:
+                # The file was touched but not changed, so it needn't be read again next time
+                entry['mtime_ns'] = stat.st_mtime_ns
+                updated = True
+
+    if updated:
+        with _write_lock:
+            # Only the mtimes of unchanged files are updated, so entries added by other threads since are kept
+            latest = read_manifest(root_path)
+            for file_path, entry in files.items():
+                if latest.get(file_path, {}).get('sha256') == entry['sha256']:
+                    latest[file_path]['mtime_ns'] = entry['mtime_ns']
+            _write_manifest(root_path, latest)
+
+    return bad
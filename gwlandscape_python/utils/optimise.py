@@ -0,0 +1,305 @@
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+from .chunk_reader import iter_chunks, read_dataset
+from .files import atomic_write
+
+# Uncompressed size of each chunk written, large enough that a scan isn't dominated by per-chunk overhead, and small
+# enough that reading a few rows doesn't decompress much more than is needed
+OPTIMISE_CHUNK_BYTES = 1024 * 1024
+
+# Combined size of the columns held in memory at once by the threads sorting them. Columns that aren't sorted are
+# streamed a chunk at a time
+OPTIMISE_MEMORY_BYTES = 512 * 1024 * 1024
+
+# Name of the column that groups can be sorted by
+SEED_COLUMN = 'SEED'
+
+# Attribute set on each group whose rows have been sorted, naming the column they were sorted by
+SORTED_BY_ATTR = 'sorted_by'
+
+
+@dataclass
+class OptimiseReport:
+    """
+    The result of :func:`optimise_dataset`
+
+    Attributes
+    ----------
+    path : ~pathlib.Path
+        Path of the optimised file
+    n_datasets : int
+        Number of datasets repacked
+    input_size : int
+        Size in bytes of the original file
+    output_size : int
+        Size in bytes of the optimised file
+    input_scan_s : float or None
+        Time taken to read every dataset of the original file with ``h5py``, if it was measured
+    output_scan_s : float or None
+        Time taken to read every dataset of the optimised file with ``h5py``, if it was measured
+    """
+    path: Path
+    n_datasets: int
+    input_size: int
+    output_size: int
+    input_scan_s: float = None
+    output_scan_s: float = None
+
+    @property
+    def size_ratio(self):
+        """Size of the optimised file as a fraction of the size of the original"""
+        return self.output_size / self.input_size if self.input_size else None
+
+    @property
+    def scan_speedup(self):
+        """How many times faster the optimised file is scanned than the original, if the scans were measured"""
+        if self.input_scan_s is None or not self.output_scan_s:
+            return None
+        return self.input_scan_s / self.output_scan_s
+
+
+def _scan_time(path):
+    # Time taken to read every dataset of a file, as a reader scanning the whole file would
+    import h5py
+
+    def _read(name, obj):
+        if isinstance(obj, h5py.Dataset):
+            obj[()]
+
+    start = time.perf_counter()
+    with h5py.File(path, 'r') as f:
+        f.visititems(_read)
+    return time.perf_counter() - start
+
+
+def _chunk_shape(shape, itemsize, chunk_bytes):
+    row_bytes = itemsize
+    for n in shape[1:]:
+        row_bytes *= n
+    rows = max(chunk_bytes // max(row_bytes, 1), 1)
+    return (min(rows, shape[0]),) + shape[1:]
+
+
+def _encode_chunk(values, shuffle, level):
+    # Applies the shuffle and deflate filters to a chunk the way HDF5 does, so it can be written directly
+    import numpy as np
+
+    data = np.ascontiguousarray(values)
+    if shuffle and data.dtype.itemsize > 1:
+        data = data.view(np.uint8).reshape(-1, data.dtype.itemsize).T
+    return zlib.compress(data.tobytes(), level)
+
+
+class _MemoryBudget:
+    # Caps the combined size in bytes of the columns held in memory at once by different threads. A column larger than
+    # the whole budget is still read, once no other column is held
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._held = 0
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def hold(self, n_bytes):
+        n_bytes = min(n_bytes, self.limit)
+        with self._condition:
+            self._condition.wait_for(lambda: self._held + n_bytes <= self.limit)
+            self._held += n_bytes
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._held -= n_bytes
+                self._condition.notify_all()
+
+
+def _is_sorted(blocks):
+    # Whether consecutive blocks of a column, such as those yielded by iter_chunks, are in ascending order. Only one
+    # block is held at a time, and no more blocks are taken once one is out of order
+    previous = None
+    for block in blocks:
+        if not len(block):
+            continue
+        if (previous is not None and block[0] < previous) or not (block[1:] >= block[:-1]).all():
+            return False
+        previous = block[-1]
+    return True
+
+
+def _sort_order(group):
+    # The order which sorts the rows of a group by SEED, or None if they are already sorted. The SEED column is only
+    # read whole if it needs sorting
+    import numpy as np
+
+    seeds = group.get(SEED_COLUMN)
+    if seeds is None or seeds.ndim != 1:
+        return None
+    # The blocks are closed as soon as one is out of order, which shuts down the pool decompressing them
+    with closing(iter_chunks(seeds, max_workers=1)) as blocks:
+        if _is_sorted(blocks):
+            return None
+    return np.argsort(read_dataset(seeds), kind='stable')
+
+
+def _rebatch(blocks, rows):
+    # Regroups consecutive blocks of rows into blocks of the given number of rows, apart from the last
+    import numpy as np
+
+    pending, n_pending = [], 0
+    for block in blocks:
+        pending.append(block)
+        n_pending += len(block)
+        while n_pending >= rows:
+            joined = np.concatenate(pending) if len(pending) > 1 else pending[0]
+            yield joined[:rows]
+            pending = [joined[rows:]]
+            n_pending -= rows
+    if n_pending:
+        yield np.concatenate(pending) if len(pending) > 1 else pending[0]
+
+
+def _repack(source, target, order, compression, level, shuffle, chunk_bytes, budget):
+    # Reads a dataset, reordering its rows if needed, and writes it to the target group with the new layout, one chunk
+    # at a time. Compressed chunks are encoded in the calling thread, so that datasets repacked by different threads
+    # compress in parallel
+    import numpy as np
+
+    name = source.name.rsplit('/', 1)[-1]
+    if not source.shape or not source.size:
+        dataset = target.create_dataset(name, data=source[()], dtype=source.dtype)
+    else:
+        chunks = _chunk_shape(source.shape, source.dtype.itemsize, chunk_bytes)
+        if compression == 'gzip' and not source.dtype.hasobject:
+            dataset = target.create_dataset(
+                name, shape=source.shape, dtype=source.dtype, chunks=chunks, compression='gzip',
+                compression_opts=level, shuffle=shuffle
+            )
+
+            def _write(start, chunk):
+                if len(chunk) < chunks[0]:
+                    # Chunks at the end of the dataset are stored at their full size
+                    chunk = np.concatenate([chunk, np.zeros((chunks[0] - len(chunk),) + chunks[1:], chunk.dtype)])
+                dataset.id.write_direct_chunk((start,) + (0,) * (len(chunks) - 1), _encode_chunk(chunk, shuffle, level))
+        else:
+            dataset = target.create_dataset(
+                name, shape=source.shape, dtype=source.dtype, chunks=chunks, compression=compression,
+                compression_opts=level if compression == 'gzip' else None, shuffle=shuffle and compression is not None
+            )
+
+            def _write(start, chunk):
+                dataset[start:start + len(chunk)] = chunk
+
+        if order is not None and source.shape[0] == len(order):
+            # Any row can end up in any chunk, so the column is read whole, within the budget shared by the threads
+            with budget.hold(source.size * source.dtype.itemsize):
+                values = read_dataset(source, max_workers=1) if not source.dtype.hasobject else source[()]
+                for start in range(0, len(values), chunks[0]):
+                    _write(start, values[order[start:start + chunks[0]]])
+        else:
+            start = 0
+            with closing(iter_chunks(source, max_workers=1)) as blocks:
+                for chunk in _rebatch(blocks, chunks[0]):
+                    _write(start, chunk)
+                    start += len(chunk)
+
+    for key, value in source.attrs.items():
+        dataset.attrs[key] = value
+
+
+def optimise_dataset(path, output_path=None, compression='gzip', level=4, shuffle=True, sort_by_seed=False,
+                     chunk_bytes=OPTIMISE_CHUNK_BYTES, max_workers=None, measure=True,
+                     max_memory=OPTIMISE_MEMORY_BYTES):
+    """Rewrite a COMPAS HDF5 file with a layout that is fast to read, such as before uploading it with
+    :meth:`~.GWLandscape.create_dataset`. Files written by COMPAS can have chunks of any shape and any compression,
+    which every later reader pays for. Every dataset is rewritten with chunks of about chunk_bytes and the chosen
+    compression, and the rows of each group can be sorted by SEED.
+
+    Datasets are repacked in parallel, each by its own thread, which decompresses the original chunks and compresses
+    the new ones itself, one chunk at a time. Only datasets whose rows are sorted are read whole, and the threads
+    together hold at most max_memory bytes of them at once. Groups, datasets and their attributes are kept, and groups
+    which are sorted have their ``sorted_by`` attribute set to ``'SEED'``.
+
+    Parameters
+    ----------
+    path : str or ~pathlib.Path
+        Path of the HDF5 file
+    output_path : str or ~pathlib.Path, optional
+        Path to write the optimised file to, by default the original file is replaced
+    compression : str, optional
+        Compression filter to use, one of 'gzip', 'lzf' or None for no compression, by default 'gzip'
+    level : int, optional
+        Level of gzip compression, from 0 to 9, by default 4
+    shuffle : bool, optional
+        Whether to apply the shuffle filter before compressing, which makes numeric columns compress better, by
+        default True
+    sort_by_seed : bool, optional
+        Whether to sort the rows of each group that has a SEED column by SEED, by default False. Only datasets with
+        as many rows as the SEED column are reordered
+    chunk_bytes : int, optional
+        Uncompressed size in bytes of each chunk written, by default OPTIMISE_CHUNK_BYTES
+    max_workers : int, optional
+        Number of datasets repacked at the same time, by default the number of CPUs
+    measure : bool, optional
+        Whether to time a scan of every dataset of the original and optimised files, for the report, by default True
+    max_memory : int, optional
+        Combined size in bytes of the datasets being sorted that are held in memory at once, by default
+        OPTIMISE_MEMORY_BYTES. A dataset larger than this is still sorted, once no other is held
+
+    Returns
+    -------
+    OptimiseReport
+        The sizes of the original and optimised files, and the times taken to scan them
+    """
+    import h5py
+
+    path = Path(path)
+    output_path = Path(output_path) if output_path is not None else path
+    if compression not in ('gzip', 'lzf', None):
+        raise ValueError(f'Unsupported compression {compression!r}, expected one of \'gzip\', \'lzf\' or None')
+
+    input_size = path.stat().st_size
+    input_scan_s = _scan_time(path) if measure else None
+
+    # Written to a temporary file and moved into place, so that a failed repack leaves no partial file behind
+    with atomic_write(output_path) as tmp_path:
+        with h5py.File(path, 'r') as source, h5py.File(tmp_path, 'w') as target:
+            # Groups are created up front, so that the threads only create datasets
+            jobs = []
+
+            def _plan(source_group, target_group):
+                target_group.attrs.update(source_group.attrs)
+                order = _sort_order(source_group) if sort_by_seed else None
+                if order is not None:
+                    target_group.attrs[SORTED_BY_ATTR] = SEED_COLUMN
+                for name, obj in source_group.items():
+                    if isinstance(obj, h5py.Group):
+                        _plan(obj, target_group.create_group(name))
+                    else:
+                        jobs.append((obj, target_group, order))
+
+            _plan(source, target)
+
+            budget = _MemoryBudget(max_memory)
+            with ThreadPoolExecutor(max_workers or os.cpu_count() or 1) as executor:
+                futures = [
+                    executor.submit(_repack, obj, group, order, compression, level, shuffle, chunk_bytes, budget)
+                    for obj, group, order in jobs
+                ]
+                for future in futures:
+                    future.result()
+
+    return OptimiseReport(
+        path=output_path,
+        n_datasets=len(jobs),
+        input_size=input_size,
+        output_size=output_path.stat().st_size,
+        input_scan_s=input_scan_s,
+        output_scan_s=_scan_time(output_path) if measure else None,
+    )
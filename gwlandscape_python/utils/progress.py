@@ -0,0 +1,301 @@
+import io
+import logging
+import threading
+from contextlib import contextmanager
+
+
+# Seconds between merging the byte counts of worker threads and reporting them to the progress sink
+PROGRESS_INTERVAL = 0.1
+
+
+def _sink_lock(sink):
+    # The lock serialising the calls to a sink, which may be shared by transfers running in different threads. Each
+    # sink gets its own lock the first time it is used, and setdefault is atomic, so transfers starting at once in
+    # different threads get the same lock
+    return vars(sink).setdefault('_progress_lock', threading.Lock())
+
+
+class ProgressSink:
+    """
+    Receives the progress of a download or upload. Subclasses override any of :meth:`start`, :meth:`update` and
+    :meth:`close`. The methods of a sink are never called concurrently, but a sink used by more than one transfer at
+    a time, such as a sink given to a client shared between threads, has their calls interleaved: :meth:`start` is
+    called by each transfer before the others have closed. The built-in sinks report the combined progress of
+    overlapping transfers.
+    """
+
+    def start(self, total):
+        """Called when a transfer starts
+
+        Parameters
+        ----------
+        total : int
+            Total number of bytes to transfer
+        """
+
+    def update(self, n_bytes):
+        """Called periodically while a transfer is running
+
+        Parameters
+        ----------
+        n_bytes : int
+            Number of bytes transferred since the previous update
+        """
+
+    def close(self):
+        """Called when a transfer has finished"""
+
+
+class NullProgress(ProgressSink):
+    """Does not report progress"""
+
+
+class TqdmProgress(ProgressSink):
+    """Reports progress with a ``tqdm`` progress bar
+
+    Parameters
+    ----------
+    **kwargs
+        Passed to :class:`tqdm.tqdm`
+    """
+
+    def __init__(self, **kwargs):
+        self.kwargs = {'leave': True, 'unit': 'B', 'unit_scale': True, **kwargs}
+        self.bar = None
+        self._active = 0
+
+    def start(self, total):
+        from tqdm import tqdm
+
+        if not self._active:
+            self.bar = tqdm(total=total, **self.kwargs)
+        else:
+            # Transfers that overlap share one bar
+            self.bar.total += total
+            self.bar.refresh()
+        self._active += 1
+
+    def update(self, n_bytes):
+        self.bar.update(n_bytes)
+
+    def close(self):
+        self._active -= 1
+        if not self._active:
+            self.bar.close()
+
+
+class LoggingProgress(ProgressSink):
+    """Reports progress as log messages, each time a further percentage of the transfer has completed
+
+    Parameters
+    ----------
+    logger : logging.Logger, optional
+        Logger to write to, by default the ``gwlandscape_python`` logger
+    level : int, optional
+        Level of the log messages, by default logging.INFO
+    step : int, optional
+        Percentage of the transfer between messages, by default 10
+    """
+
+    def __init__(self, logger=None, level=logging.INFO, step=10):
+        self.logger = logger or logging.getLogger('gwlandscape_python')
+        self.level = level
+        self.step = step
+        self._active = 0
+
+    def start(self, total):
+        if not self._active:
+            self.total = 0
+            self.completed = 0
+            self.reported = 0
+        self.total += total
+        self._active += 1
+
+    def update(self, n_bytes):
+        self.completed += n_bytes
+        percent = 100 * self.completed // self.total if self.total else 100
+        if percent >= self.reported + self.step:
+            self.reported = percent - percent % self.step
+            self.logger.log(self.level, f'Transferred {percent}% ({self.completed} of {self.total} bytes)')
+
+    def close(self):
+        self._active -= 1
+        if not self._active and self.completed and self.reported < 100:
+            self.logger.log(self.level, f'Transferred {self.completed} of {self.total} bytes')
+
+
+class CallbackProgress(ProgressSink):
+    """Reports progress by calling a function
+
+    Parameters
+    ----------
+    callback : callable
+        Called with the number of bytes transferred so far and the total number of bytes
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+        self._active = 0
+
+    def start(self, total):
+        if not self._active:
+            self.total = 0
+            self.completed = 0
+        self.total += total
+        self._active += 1
+
+    def update(self, n_bytes):
+        self.completed += n_bytes
+        self.callback(self.completed, self.total)
+
+    def close(self):
+        self._active -= 1
+
+
+def get_progress_sink(progress):
+    """Create a progress sink from any of the supported ways of choosing one
+
+    Parameters
+    ----------
+    progress : ProgressSink, str, callable, bool or None
+        A :class:`ProgressSink` instance, one of 'tqdm', 'logging' or 'none', a function to be called with the number
+        of bytes transferred and the total, True for 'tqdm' or False or None for 'none'
+
+    Returns
+    -------
+    ProgressSink
+        The progress sink
+    """
+    if isinstance(progress, ProgressSink):
+        return progress
+    if progress is True or progress == 'tqdm':
+        return TqdmProgress()
+    if progress == 'logging':
+        return LoggingProgress()
+    if progress is None or progress is False or progress == 'none':
+        return NullProgress()
+    if callable(progress):
+        return CallbackProgress(progress)
+    raise ValueError(f'Unknown progress reporting {progress!r}, must be one of "tqdm", "logging", "none"')
+
+
+class _ProgressCounter:
+    # Counts bytes in a separate cell for each thread, so that the hot path takes no locks. A timer thread merges the
+    # cells and reports the difference to the sink
+
+    def __init__(self, sink, interval):
+        self._sink = sink
+        self._sink_lock = _sink_lock(sink)
+        self._interval = interval
+        self._local = threading.local()
+        self._cells = []
+        self._lock = threading.Lock()
+        self._reported = 0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def update(self, n_bytes):
+        try:
+            cell = self._local.cell
+        except AttributeError:
+            cell = self._local.cell = [0]
+            with self._lock:
+                self._cells.append(cell)
+        cell[0] += n_bytes
+
+    def _merge(self):
+        with self._lock:
+            total = sum(cell[0] for cell in self._cells)
+        if total != self._reported:
+            with self._sink_lock:
+                self._sink.update(total - self._reported)
+            self._reported = total
+
+    def _run(self):
+        while not self._stopped.wait(self._interval):
+            self._merge()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        self._merge()
+
+
+class _NullCounter:
+    def update(self, n_bytes):
+        pass
+
+
+@contextmanager
+def progress_counter(sink, total, interval=PROGRESS_INTERVAL):
+    """Report the progress of a transfer to a sink. Yields a counter with an ``update(n_bytes)`` method, which is
+    cheap to call from many threads at once.
+
+    Parameters
+    ----------
+    sink : ProgressSink
+        Sink to report progress to
+    total : int
+        Total number of bytes to transfer
+    interval : float, optional
+        Seconds between reports to the sink, by default PROGRESS_INTERVAL
+    """
+    if isinstance(sink, NullProgress):
+        yield _NullCounter()
+        return
+
+    counter = _ProgressCounter(sink, interval)
+    with counter._sink_lock:
+        sink.start(total)
+    counter.start()
+    try:
+        yield counter
+    finally:
+        counter.stop()
+        with counter._sink_lock:
+            sink.close()
+
+
+class ProgressReader(io.RawIOBase):
+    """Wraps a binary file, counting the bytes read from it. Used to report the progress of uploads.
+
+    Parameters
+    ----------
+    f : file object
+        Binary file opened for reading
+    counter : object
+        Object with an ``update(n_bytes)`` method
+    """
+
+    def __init__(self, f, counter):
+        self._f = f
+        self._counter = counter
+        self.name = getattr(f, 'name', None)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return self._f.seekable()
+
+    def fileno(self):
+        return self._f.fileno()
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self._f.seek(offset, whence)
+
+    def tell(self):
+        return self._f.tell()
+
+    def read(self, size=-1):
+        data = self._f.read(size)
+        self._counter.update(len(data))
+        return data
+
+    def readinto(self, buffer):
+        n_bytes = self._f.readinto(buffer)
+        self._counter.update(n_bytes or 0)
+        return n_bytes
@@ -0,0 +1,169 @@
+import os
+import struct
+import threading
+import time
+import weakref
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+# Tokens available and the time they were last updated, as stored by FileTokenBucket
+_STATE = struct.Struct('<dd')
+
+# Fraction of its capacity that a FileTokenBucket takes from the shared file at a time, by default
+FILE_BUCKET_BATCH = 1 / 16
+
+
+class TokenBucket:
+    """
+    Limits the rate of an operation, such as requests or bytes downloaded, using a token bucket. Tokens are added at
+    a fixed rate up to a maximum, and each operation takes tokens, waiting until enough are available. Safe to share
+    between threads and between clients.
+
+    Parameters
+    ----------
+    rate : float
+        Tokens added per second
+    capacity : float, optional
+        Maximum number of tokens, which sets the largest burst allowed, by default one second's worth of tokens
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError('Rate must be positive')
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(rate={self.rate}, capacity={self.capacity})'
+
+    def _take(self, tokens):
+        # Takes tokens, possibly going into debt, and returns how long to wait until the debt is repaid
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            return max(-self._tokens / self.rate, 0)
+
+    def acquire(self, tokens=1):
+        """Take tokens from the bucket, waiting until they are available. Requests for more tokens than the capacity
+        are allowed, but wait for the time taken to add that many tokens.
+
+        Parameters
+        ----------
+        tokens : float, optional
+            Number of tokens to take, by default 1
+        """
+        wait = self._take(tokens)
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens=1):
+        """Take tokens from the bucket, waiting without blocking the event loop until they are available
+
+        Parameters
+        ----------
+        tokens : float, optional
+            Number of tokens to take, by default 1
+        """
+        wait = self._take(tokens)
+        if wait:
+            import asyncio
+
+            await asyncio.sleep(wait)
+
+
+class FileTokenBucket(TokenBucket):
+    """
+    A :class:`TokenBucket` whose state is kept in a local file, so that it can be shared by several processes on the
+    same machine, such as the jobs of an array running on one node. Every process must use the same rate and capacity.
+    Requires a platform with ``fcntl``, such as Linux or macOS.
+
+    The file is kept open, and tokens are taken from it in batches, which each process hands out to its own threads
+    without locking the file again. A process can therefore run ahead of the others by up to one batch.
+
+    Parameters
+    ----------
+    path : str or ~pathlib.Path
+        Path of the file holding the state of the bucket, which is created if it doesn't exist
+    rate : float
+        Tokens added per second
+    capacity : float, optional
+        Maximum number of tokens, by default one second's worth of tokens
+    batch : float, optional
+        Number of tokens taken from the file at a time, by default FILE_BUCKET_BATCH of the capacity
+    """
+
+    def __init__(self, path, rate, capacity=None, batch=None):
+        if fcntl is None:
+            raise RuntimeError('Sharing a rate limit between processes requires fcntl, which is not available')
+        super().__init__(rate, capacity)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch = batch if batch is not None else self.capacity * FILE_BUCKET_BATCH
+
+        # Tokens taken from the file but not yet handed out, which can be used once the file's debt is repaid
+        self._allowance = 0
+        self._ready = 0
+        self._fd = None
+        self._fd_pid = None
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({str(self.path)!r}, rate={self.rate}, capacity={self.capacity})'
+
+    def _open(self):
+        # Locks belong to the open file, which a forked process shares with its parent, so each process opens its own
+        if self._fd_pid != os.getpid():
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._fd_pid = os.getpid()
+            weakref.finalize(self, os.close, self._fd)
+        return self._fd
+
+    def _take(self, tokens):
+        # time.monotonic is not comparable between processes, so the wall clock is used throughout
+        with self._lock:
+            if tokens > self._allowance:
+                claim = max(tokens - self._allowance, self.batch)
+                fd = self._open()
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                try:
+                    now = time.time()
+                    data = os.pread(fd, _STATE.size, 0)
+                    available, updated = _STATE.unpack(data) if len(data) == _STATE.size else (self.capacity, now)
+
+                    available = min(self.capacity, available + max(now - updated, 0) * self.rate)
+                    available -= claim
+
+                    os.pwrite(fd, _STATE.pack(available, now), 0)
+                finally:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                self._allowance += claim
+                self._ready = now + max(-available / self.rate, 0)
+
+            self._allowance -= tokens
+            return max(self._ready - time.time(), 0)
+
+
+def get_token_bucket(limit):
+    """Create a token bucket from a rate, or return an existing bucket
+
+    Parameters
+    ----------
+    limit : float, TokenBucket or None
+        Tokens per second, or a bucket
+
+    Returns
+    -------
+    TokenBucket or None
+        The bucket, or None if there is no limit
+    """
+    if limit is None or isinstance(limit, TokenBucket):
+        return limit
+    return TokenBucket(limit)
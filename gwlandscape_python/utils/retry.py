@@ -0,0 +1,164 @@
+import json
+import random
+import sys
+import time
+
+import requests
+
+# Errors caused by transient network or server problems. GWDC.request raises a JSONDecodeError when the server
+# returns an HTML error page, such as for a 502 or 503 response from a proxy
+RETRYABLE_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    json.JSONDecodeError,
+)
+
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+
+
+class RetryPolicy:
+    """
+    Describes how many times, and how long to wait before, retrying an operation that failed with a transient error,
+    such as a connection reset or a 5xx response. The delay before each retry grows exponentially.
+
+    Parameters
+    ----------
+    max_attempts : int, optional
+        Maximum number of attempts, including the first, by default 3
+    backoff : float, optional
+        Seconds to wait before the first retry, by default 0.5
+    multiplier : float, optional
+        Factor by which the delay grows after each retry, by default 2
+    max_delay : float, optional
+        Maximum seconds to wait before a retry, by default 30
+    jitter : float, optional
+        Maximum random fraction added to each delay, so that many clients don't retry at the same time, by default 0.1
+    retry_statuses : tuple, optional
+        HTTP status codes of responses that are retried, by default RETRYABLE_STATUSES
+    """
+
+    def __init__(self, max_attempts=3, backoff=0.5, multiplier=2.0, max_delay=30.0, jitter=0.1,
+                 retry_statuses=RETRYABLE_STATUSES):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.multiplier = multiplier
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.retry_statuses = retry_statuses
+
+    def __repr__(self):
+        return f'RetryPolicy(max_attempts={self.max_attempts}, backoff={self.backoff}, multiplier={self.multiplier})'
+
+    def delay(self, attempt):
+        """Seconds to wait after a failed attempt
+
+        Parameters
+        ----------
+        attempt : int
+            Number of the failed attempt, starting from 1
+
+        Returns
+        -------
+        float
+            Delay in seconds
+        """
+        delay = min(self.max_delay, self.backoff * self.multiplier ** (attempt - 1))
+        return delay * (1 + self.jitter * random.random())
+
+    def is_retryable(self, error):
+        """Whether an error is transient, so the operation that raised it should be retried
+
+        Parameters
+        ----------
+        error : Exception
+            The error
+
+        Returns
+        -------
+        bool
+            True if the operation should be retried
+        """
+        if isinstance(error, requests.HTTPError):
+            return error.response is not None and error.response.status_code in self.retry_statuses
+
+        # Errors raised by AsyncGWLandscape. Neither asyncio nor aiohttp can have raised the error unless imported
+        asyncio = sys.modules.get('asyncio')
+        if asyncio is not None and isinstance(error, asyncio.TimeoutError):
+            return True
+
+        aiohttp = sys.modules.get('aiohttp')
+        if aiohttp is not None:
+            if isinstance(error, aiohttp.ClientResponseError):
+                return error.status in self.retry_statuses
+            if isinstance(error, (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError)):
+                return True
+
+        return isinstance(error, RETRYABLE_ERRORS)
+
+    def run(self, fn, on_retry=None):
+        """Call a function, retrying it while it fails with a transient error
+
+        Parameters
+        ----------
+        fn : callable
+            Function taking no arguments
+        on_retry : callable, optional
+            Called with the number of the failed attempt, the delay before the next attempt and the error, before
+            each retry
+
+        Returns
+        -------
+        object
+            The return value of fn
+        """
+        attempt = 1
+        while True:
+            try:
+                return fn()
+            except Exception as e:
+                if attempt >= self.max_attempts or not self.is_retryable(e):
+                    raise
+                delay = self.delay(attempt)
+                if on_retry is not None:
+                    on_retry(attempt, delay, e)
+                time.sleep(delay)
+                attempt += 1
+
+    async def run_async(self, fn, on_retry=None):
+        """Await a coroutine function, retrying it while it fails with a transient error
+
+        Parameters
+        ----------
+        fn : callable
+            Coroutine function taking no arguments
+        on_retry : callable, optional
+            Called with the number of the failed attempt, the delay before the next attempt and the error, before
+            each retry
+
+        Returns
+        -------
+        object
+            The return value of fn
+        """
+        import asyncio
+
+        attempt = 1
+        while True:
+            try:
+                return await fn()
+            except Exception as e:
+                if attempt >= self.max_attempts or not self.is_retryable(e):
+                    raise
+                delay = self.delay(attempt)
+                if on_retry is not None:
+                    on_retry(attempt, delay, e)
+                await asyncio.sleep(delay)
+                attempt += 1
+
+
+# Policy that makes a single attempt
+NO_RETRY = RetryPolicy(max_attempts=1)
+
+# Policy used by clients unless another is chosen
+DEFAULT_RETRY = RetryPolicy()
@@ -0,0 +1,209 @@
+import shutil
+from pathlib import Path
+
+from .chunk_reader import iter_chunks
+from .files import SEED_INDEX_SUFFIX, column_file_name, read_json, source_key, write_json
+from .optimise import SEED_COLUMN, _is_sorted
+
+# Name of the index of the indexed groups, in the SEED index directory
+SEED_INDEX_NAME = 'index.json'
+
+SEED_INDEX_VERSION = 1
+
+# Number of rows of the sorted SEEDs gathered at a time when a group isn't sorted by SEED
+SEED_INDEX_BLOCK_ROWS = 1024 * 1024
+
+
+def seed_index_path(path):
+    """Path of the directory holding the SEED index of a HDF5 file
+
+    Parameters
+    ----------
+    path : str or ~pathlib.Path
+        Path of the HDF5 file
+
+    Returns
+    -------
+    ~pathlib.Path
+        The file path with SEED_INDEX_SUFFIX appended
+    """
+    path = Path(path)
+    return path.with_name(path.name + SEED_INDEX_SUFFIX)
+
+
+class SeedIndex:
+    """
+    The SEED of every row of each group of a HDF5 file, sorted, along with the row each came from, built by
+    :func:`build_seed_index`. Looking up a SEED is a binary search of the sorted SEEDs, which are memory mapped, so
+    only the few pages the search touches are read. Groups whose rows are already sorted by SEED need no row array.
+
+    Parameters
+    ----------
+    path : ~pathlib.Path
+        Directory holding the index
+    groups : dict
+        Names of the files holding the sorted SEEDs and their rows, keyed by group name
+    """
+
+    def __init__(self, path, groups):
+        self.path = path
+        self._groups = groups
+
+    @property
+    def groups(self):
+        """Names of the indexed groups"""
+        return list(self._groups)
+
+    def rows(self, group, seeds):
+        """Find the rows of a group with any of the given SEEDs
+
+        Parameters
+        ----------
+        group : str
+            Name of the group
+        seeds : int or array_like
+            The SEEDs to look up
+
+        Returns
+        -------
+        numpy.ndarray
+            Sorted indices of the matching rows, which may be more than one per SEED, and none for SEEDs that aren't in
+            the group
+        """
+        import numpy as np
+
+        entry = self._groups[group]
+        keys = np.load(self.path / entry['keys'], mmap_mode='r')
+        seeds = np.unique(np.asarray(seeds, dtype=keys.dtype).ravel())
+        starts = np.searchsorted(keys, seeds, side='left')
+        stops = np.searchsorted(keys, seeds, side='right')
+
+        positions = [np.arange(start, stop) for start, stop in zip(starts, stops) if stop > start]
+        positions = np.concatenate(positions) if positions else np.empty(0, dtype=np.int64)
+        if entry['rows'] is None:
+            return positions
+        return np.sort(np.load(self.path / entry['rows'], mmap_mode='r')[positions])
+
+    def lookup(self, f, seeds, groups=None):
+        """Read the rows with any of the given SEEDs from every indexed group of a file
+
+        Parameters
+        ----------
+        f : h5py.File
+            The HDF5 file the index was built from
+        seeds : int or array_like
+            The SEEDs to look up
+        groups : list, optional
+            Names of the groups to read from, by default every indexed group
+
+        Returns
+        -------
+        dict
+            The values of each column of the matching rows, keyed by group and column name, for the columns with a
+            value for every row of the group
+        """
+        result = {}
+        for group in groups if groups is not None else self.groups:
+            rows = self.rows(group, seeds)
+            n_rows = self._groups[group]['n_rows']
+            result[group] = {
+                name: dataset[rows] for name, dataset in f[group].items()
+                if getattr(dataset, 'shape', ())[:1] == (n_rows,)
+            }
+        return result
+
+
+def _written(blocks, out):
+    # Passes on consecutive blocks of rows, copying each into out as it goes
+    start = 0
+    for block in blocks:
+        out[start:start + len(block)] = block
+        start += len(block)
+        yield block
+
+
+def build_seed_index(path):
+    """Build the SEED index of a HDF5 file, and save it in a directory next to the file, named after it with
+    SEED_INDEX_SUFFIX appended. Every group with a SEED column is indexed.
+
+    Parameters
+    ----------
+    path : str or ~pathlib.Path
+        Path of the HDF5 file
+
+    Returns
+    -------
+    SeedIndex
+        The index
+    """
+    import h5py
+    import numpy as np
+
+    path = Path(path)
+    directory = seed_index_path(path)
+    source = source_key(path)
+    shutil.rmtree(directory, ignore_errors=True)
+    directory.mkdir(parents=True)
+
+    groups = {}
+
+    def _index(name, obj):
+        seeds = obj.get(SEED_COLUMN) if isinstance(obj, h5py.Group) else None
+        if not isinstance(seeds, h5py.Dataset) or seeds.ndim != 1:
+            return
+
+        # The SEEDs are written to the keys file a block at a time, which is all that is needed if they are sorted
+        entry = {'n_rows': len(seeds), 'keys': column_file_name(name, 'keys'), 'rows': None}
+        keys = np.lib.format.open_memmap(directory / entry['keys'], mode='w+', dtype=seeds.dtype, shape=seeds.shape)
+        blocks = _written(iter_chunks(seeds), keys)
+        if not _is_sorted(blocks):
+            # The rest of the SEEDs are still written
+            for _ in blocks:
+                pass
+
+            # Sorting needs every SEED, which are read from the mapped keys file. The sorted SEEDs are gathered into
+            # a new keys file a block at a time
+            order = np.argsort(keys, kind='stable').astype(np.int64, copy=False)
+            entry['rows'] = column_file_name(name, 'rows')
+            np.save(directory / entry['rows'], order)
+            sorted_path = directory / f'{entry["keys"]}.sorted'
+            sorted_keys = np.lib.format.open_memmap(sorted_path, mode='w+', dtype=seeds.dtype, shape=seeds.shape)
+            for start in range(0, len(order), SEED_INDEX_BLOCK_ROWS):
+                sorted_keys[start:start + SEED_INDEX_BLOCK_ROWS] = keys[order[start:start + SEED_INDEX_BLOCK_ROWS]]
+            sorted_keys.flush()
+            del sorted_keys, keys
+            sorted_path.replace(directory / entry['keys'])
+        else:
+            keys.flush()
+            del keys
+        groups[name] = entry
+
+    with h5py.File(path, 'r') as f:
+        f.visititems(_index)
+
+    if source_key(path) != source:
+        raise IOError(f'{path} changed while its SEED index was being built')
+
+    write_json(directory / SEED_INDEX_NAME, {'version': SEED_INDEX_VERSION, 'source': source, 'groups': groups})
+    return SeedIndex(directory, groups)
+
+
+def get_seed_index(path):
+    """Open the SEED index of a HDF5 file, building it first if there isn't one, or if the file has changed since it
+    was built
+
+    Parameters
+    ----------
+    path : str or ~pathlib.Path
+        Path of the HDF5 file
+
+    Returns
+    -------
+    SeedIndex
+        The index
+    """
+    directory = seed_index_path(path)
+    index = read_json(directory / SEED_INDEX_NAME)
+    if index is not None and index.get('version') == SEED_INDEX_VERSION and index['source'] == source_key(path):
+        return SeedIndex(directory, index['groups'])
+    return build_seed_index(path)
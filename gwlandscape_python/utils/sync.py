@@ -0,0 +1,116 @@
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from gwdc_python.files import FileReference, FileReferenceList
+
+from .file_download import PARTIAL_SUFFIX, DownloadReport
+from .files import sidecar_source
+
+
+@dataclass
+class SyncReport:
+    """
+    The result of :meth:`~.GWLandscape.sync`
+
+    Attributes
+    ----------
+    downloaded : ~gwlandscape_python.utils.file_download.DownloadReport
+        Paths of the files that were new or changed and have been downloaded, and the files that could not be
+        downloaded
+    skipped : list
+        Paths, relative to the root directory, of the files that were already up to date
+    pruned : list
+        Paths, relative to the root directory, of the local files that were removed because they are no longer part
+        of their dataset
+    bytes_downloaded : int
+        Total size of the downloaded files
+    bytes_saved : int
+        Total size of the files that were up to date, so didn't need to be downloaded
+    """
+    downloaded: DownloadReport = field(default_factory=DownloadReport)
+    skipped: list = field(default_factory=list)
+    pruned: list = field(default_factory=list)
+    bytes_downloaded: int = 0
+    bytes_saved: int = 0
+
+    @property
+    def ok(self):
+        """True if every new or changed file was downloaded"""
+        return self.downloaded.ok
+
+
+def dataset_directory(dataset):
+    """Name of the directory, relative to the root of a mirror, holding the files of a dataset
+
+    Parameters
+    ----------
+    dataset : ~gwlandscape_python.dataset_type.Dataset
+        The dataset
+
+    Returns
+    -------
+    ~pathlib.Path
+        Directory named after the id of the dataset
+    """
+    return Path(re.sub(r'[^\w.-]', '_', dataset.id))
+
+
+def _mirror_file_list(datasets, file_lists):
+    # File references of every dataset, with paths relative to the root of the mirror rather than the dataset
+    file_list = FileReferenceList()
+    for dataset, dataset_file_list in zip(datasets, file_lists):
+        directory = dataset_directory(dataset)
+        for file_ref in dataset_file_list:
+            file_list.append(FileReference(
+                path=directory / file_ref.path,
+                file_size=file_ref.file_size,
+                download_token=file_ref.download_token,
+                parent=dataset,
+            ))
+    return file_list
+
+
+def _plan_sync(file_list, root_path):
+    # Splits the files into those that need downloading and those whose local copy already has the right size
+    changed = FileReferenceList()
+    skipped = []
+    for file_ref in file_list:
+        try:
+            up_to_date = os.stat(root_path / file_ref.path).st_size == file_ref.file_size
+        except FileNotFoundError:
+            up_to_date = False
+
+        if up_to_date:
+            skipped.append(file_ref)
+        else:
+            changed.append(file_ref)
+    return changed, skipped
+
+
+def _is_partial(path, keep):
+    # Whether a file is the partial download of a file in keep, which is kept so that the download can be resumed
+    return path.name.endswith(PARTIAL_SUFFIX) and path.with_name(path.name[:-len(PARTIAL_SUFFIX)]) in keep
+
+
+def _is_sidecar(path, keep):
+    # Whether a file is part of a cache or index built next to a file in keep, such as its columnar cache, zone map or
+    # SEED index, which are kept so that they needn't be built again
+    return sidecar_source(path) in keep
+
+
+def _prune(root_path, directories, keep):
+    # Removes the files under each directory that aren't in keep, other than partial downloads, caches and indexes of
+    # files in keep, then any directories left empty
+    pruned = []
+    for directory in directories:
+        for dirpath, _, filenames in os.walk(root_path / directory, topdown=False):
+            for filename in filenames:
+                path = Path(dirpath, filename).relative_to(root_path)
+                if path not in keep and not _is_partial(path, keep) and not _is_sidecar(path, keep):
+                    (root_path / path).unlink()
+                    pruned.append(path)
+            if dirpath != str(root_path / directory) and not os.listdir(dirpath):
+                os.rmdir(dirpath)
+    return sorted(pruned)
@@ -0,0 +1,241 @@
+import io
+import mmap
+from collections import OrderedDict
+
+from .extract import HDF5_SUFFIXES
+from .retry import NO_RETRY
+
+# Size of the blocks in which a RangeFile reads the remote file, and the number of blocks it keeps
+RANGE_BLOCK_SIZE = 1024 * 1024
+RANGE_CACHE_BLOCKS = 64
+
+
+def find_tar_member(f, suffixes=HDF5_SUFFIXES):
+    """Find the HDF5 file in an uncompressed tarball, reading only the tar headers. The data of a member of an
+    uncompressed tarball is stored as a single contiguous range of bytes, so it can be read in place.
+
+    Parameters
+    ----------
+    f : file object
+        The tarball, opened for reading in binary mode. Must be seekable
+    suffixes : tuple, optional
+        Suffixes of the member to find, by default HDF5_SUFFIXES
+
+    Returns
+    -------
+    tuple
+        The name of the member, and the offset and size in bytes of its data within the tarball
+
+    Raises
+    ------
+    ValueError
+        If the tarball is compressed, or the member is a sparse file, so its data can't be read in place
+    IOError
+        If the tarball contains no matching member
+    """
+    import tarfile
+
+    try:
+        tar = tarfile.open(fileobj=f, mode='r:')
+    except tarfile.ReadError as e:
+        raise ValueError('Only uncompressed tarballs can be read in place') from e
+
+    for member in tar:
+        if member.isfile() and member.name.lower().endswith(suffixes):
+            if member.sparse is not None:
+                raise ValueError(f'{member.name} is a sparse file, so can\'t be read in place')
+            return member.name, member.offset_data, member.size
+
+    raise IOError('Tarball does not contain a hdf5 file')
+
+
+class _ReadOnlyFile(io.RawIOBase):
+    # A read-only, seekable file of a fixed size, reading with _read_into(position, buffer)
+
+    def __init__(self, size):
+        self.size = size
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError(f'Negative seek position {offset}')
+        self._position = offset
+        return offset
+
+    def readinto(self, b):
+        n = max(min(len(b), self.size - self._position), 0)
+        if n:
+            self._read_into(self._position, memoryview(b).cast('B')[:n])
+            self._position += n
+        return n
+
+
+class MemoryFile(_ReadOnlyFile):
+    """
+    A read-only file object over a buffer, such as a slice of a memory map. Reads are copied straight from the
+    buffer into the caller's buffer, with no intermediate copies.
+
+    Parameters
+    ----------
+    buffer : bytes-like
+        The contents of the file
+    """
+
+    def __init__(self, buffer):
+        self._buffer = memoryview(buffer).cast('B')
+        super().__init__(len(self._buffer))
+
+    def _read_into(self, position, b):
+        b[:] = self._buffer[position:position + len(b)]
+
+    def close(self):
+        self._buffer.release()
+        super().close()
+
+
+class RangeFile(_ReadOnlyFile):
+    """
+    A read-only file object over a byte range of a file on the file server, which reads the parts of the file that are
+    needed with HTTP range requests rather than downloading the whole file. Small reads are made in blocks, the most
+    recently used of which are cached, and reads of at least a block are requested directly.
+
+    Parameters
+    ----------
+    url : str
+        Download URL of the file
+    size : int
+        Size of the range in bytes
+    offset : int, optional
+        Offset of the range within the file, by default 0
+    retry : ~gwlandscape_python.utils.retry.RetryPolicy, optional
+        How to retry requests that fail with transient errors, by default no retries
+    block_size : int, optional
+        Size of the blocks read, by default RANGE_BLOCK_SIZE
+    cache_blocks : int, optional
+        Number of blocks to cache, by default RANGE_CACHE_BLOCKS
+
+    Attributes
+    ----------
+    n_requests : int
+        Number of range requests made
+    """
+
+    def __init__(self, url, size, offset=0, retry=None, block_size=RANGE_BLOCK_SIZE, cache_blocks=RANGE_CACHE_BLOCKS):
+        super().__init__(size)
+        self.url = url
+        self.offset = offset
+        self.retry = retry or NO_RETRY
+        self.block_size = block_size
+        self.cache_blocks = cache_blocks
+        self.n_requests = 0
+        self._blocks = OrderedDict()
+
+    def _request(self, start, b):
+        # Reads len(b) bytes from start, relative to the range, into b
+        from .file_download import _session
+
+        def _attempt():
+            first = self.offset + start
+            headers = {'Range': f'bytes={first}-{first + len(b) - 1}'}
+            with _session().get(self.url, headers=headers, stream=True) as response:
+                response.raise_for_status()
+                if response.status_code != 206:
+                    raise IOError(f'{self.url} does not support range requests')
+                n = 0
+                for chunk in response.iter_content(chunk_size=self.block_size):
+                    b[n:n + len(chunk)] = chunk
+                    n += len(chunk)
+                if n != len(b):
+                    raise IOError(f'Received {n} of {len(b)} bytes requested from {self.url}')
+
+        self.n_requests += 1
+        self.retry.run(_attempt)
+
+    def _block(self, index):
+        block = self._blocks.get(index)
+        if block is None:
+            start = index * self.block_size
+            block = bytearray(min(self.block_size, self.size - start))
+            self._request(start, memoryview(block))
+            self._blocks[index] = block
+            if len(self._blocks) > self.cache_blocks:
+                self._blocks.popitem(last=False)
+        else:
+            self._blocks.move_to_end(index)
+        return block
+
+    def _read_into(self, position, b):
+        if len(b) >= self.block_size:
+            return self._request(position, b)
+
+        n = 0
+        while n < len(b):
+            index, start = divmod(position + n, self.block_size)
+            block = self._block(index)
+            length = min(len(block) - start, len(b) - n)
+            b[n:n + length] = memoryview(block)[start:start + length]
+            n += length
+
+
+def open_tar_member(path):
+    """Open the HDF5 file inside an uncompressed tarball with ``h5py``, without extracting it. The tarball is memory
+    mapped, and the HDF5 file is read in place from its range of the map.
+
+    Parameters
+    ----------
+    path : str or ~pathlib.Path
+        Path of the tarball
+
+    Returns
+    -------
+    h5py.File
+        The HDF5 file, opened read-only
+    """
+    import h5py
+
+    with open(path, 'rb') as f:
+        _, offset, size = find_tar_member(f)
+        # The map stays open after the file is closed, for as long as the HDF5 file uses it
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return h5py.File(MemoryFile(memoryview(buffer)[offset:offset + size]), 'r')
+
+
+def open_remote_hdf5(url, size, tarball=False, retry=None):
+    """Open a HDF5 file on the file server with ``h5py``, reading only the parts of it that are used with range
+    requests. If the file is an uncompressed tarball, the HDF5 file inside it is opened in place.
+
+    Parameters
+    ----------
+    url : str
+        Download URL of the file
+    size : int
+        Size of the file in bytes
+    tarball : bool, optional
+        Whether the file is an uncompressed tarball containing the HDF5 file, by default False
+    retry : ~gwlandscape_python.utils.retry.RetryPolicy, optional
+        How to retry requests that fail with transient errors, by default no retries
+
+    Returns
+    -------
+    h5py.File
+        The HDF5 file, opened read-only
+    """
+    import h5py
+
+    offset = 0
+    if tarball:
+        _, offset, size = find_tar_member(RangeFile(url, size, retry=retry))
+    return h5py.File(RangeFile(url, size, offset=offset, retry=retry), 'r')
@@ -0,0 +1,11 @@
+import pytest
+
+from gwlandscape_python.tests.utils import create_compas_file
+
+
+@pytest.fixture
+def compas_file(request, tmp_path):
+    # A synthetic COMPAS file. Tests that need a different number of rows or chunk length parametrise this fixture
+    # indirectly with the arguments of create_compas_file, such as {'n_systems': 2000, 'chunks': 300}
+    kwargs = {'n_systems': 5000, 'chunks': 500, **getattr(request, 'param', {})}
+    return create_compas_file(tmp_path / 'COMPAS_Output.h5', **kwargs)
@@ -0,0 +1,62 @@
+import h5py
+import numpy as np
+import pytest
+
+from gwlandscape_python.utils.chunk_reader import iter_chunks, read_dataset
+
+
+@pytest.fixture
+def h5_file(tmp_path):
+    with h5py.File(tmp_path / 'data.h5', 'w') as f:
+        yield f
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'compression': 'gzip'},
+    {'compression': 'gzip', 'shuffle': True},
+    {'compression': 'gzip', 'compression_opts': 9, 'shuffle': True, 'dtype': '>i4'},
+    {'compression': 'lzf'},
+    {'chunks': None},
+])
+def test_read_dataset(h5_file, kwargs):
+    values = np.random.default_rng(0).integers(0, 1000, 1003)
+    dtype = kwargs.pop('dtype', values.dtype)
+    dataset = h5_file.create_dataset('x', data=values, dtype=dtype, chunks=kwargs.pop('chunks', (100,)), **kwargs)
+
+    np.testing.assert_array_equal(read_dataset(dataset, max_workers=3), values)
+    assert read_dataset(dataset).dtype == dataset.dtype
+
+
+def test_iter_chunks_blocks(h5_file):
+    values = np.arange(1003, dtype=np.float64)
+    dataset = h5_file.create_dataset('x', data=values, chunks=(100,), compression='gzip', shuffle=True)
+
+    blocks = list(iter_chunks(dataset, max_workers=2))
+
+    assert [len(block) for block in blocks] == [100] * 10 + [3]
+    np.testing.assert_array_equal(np.concatenate(blocks), values)
+
+
+def test_read_dataset_2d(h5_file):
+    values = np.random.default_rng(0).normal(size=(205, 7))
+    dataset = h5_file.create_dataset('x', data=values, chunks=(50, 3), compression='gzip', shuffle=True)
+
+    np.testing.assert_array_equal(read_dataset(dataset, max_workers=2), values)
+
+
+def test_read_dataset_unwritten_chunks(h5_file):
+    dataset = h5_file.create_dataset('x', shape=(1000,), chunks=(100,), compression='gzip', dtype='i4', fillvalue=-1)
+    dataset[150:250] = np.arange(100)
+
+    values = read_dataset(dataset)
+
+    np.testing.assert_array_equal(values[150:250], np.arange(100))
+    assert (values[:150] == -1).all() and (values[250:] == -1).all()
+
+
+def test_read_dataset_scalar_and_empty(h5_file):
+    assert read_dataset(h5_file.create_dataset('scalar', data=5)) == 5
+    empty = h5_file.create_dataset(
+        'empty', shape=(0,), maxshape=(None,), chunks=(10,), dtype='f8', compression='gzip'
+    )
+    assert read_dataset(empty).shape == (0,)
@@ -0,0 +1,82 @@
+import os
+
+import h5py
+import numpy as np
+import pytest
+
+from gwlandscape_python.tests.utils import create_compas_file
+from gwlandscape_python.utils.columnar import cache_path, materialise, open_columns
+
+
+def test_materialise_all(compas_file):
+    cache = materialise(compas_file)
+
+    assert cache.path == compas_file.parent / 'COMPAS_Output.h5.columns'
+    with h5py.File(compas_file, 'r') as f:
+        assert sorted(cache) == sorted(f)
+        for group in f:
+            columns = cache[group]
+            assert sorted(columns) == sorted(f[group])
+            for name, values in columns.items():
+                assert isinstance(values, np.memmap)
+                assert values.dtype == f[group][name].dtype
+                np.testing.assert_array_equal(values, f[group][name][()])
+
+
+def test_materialise_selected(compas_file):
+    cache = materialise(compas_file, {'BSE_System_Parameters': ['SEED', 'Mass@ZAMS(1)']})
+    assert cache.groups == ['BSE_System_Parameters']
+    assert cache.columns('BSE_System_Parameters') == ['SEED', 'Mass@ZAMS(1)']
+
+    # Later calls add to the cache
+    cache = materialise(compas_file, {'BSE_System_Parameters': ['Mass@ZAMS(2)'], 'BSE_Supernovae': None})
+    assert cache.columns('BSE_System_Parameters') == ['SEED', 'Mass@ZAMS(1)', 'Mass@ZAMS(2)']
+    assert 'BSE_Supernovae' in cache
+    assert 'BSE_Double_Compact_Objects' not in cache
+
+    with pytest.raises(KeyError):
+        materialise(compas_file, {'BSE_System_Parameters': ['Missing']})
+
+
+def test_materialise_reuses_cache(compas_file, mocker):
+    materialise(compas_file, {'BSE_System_Parameters': None})
+    copy = mocker.patch('gwlandscape_python.utils.columnar._copy_column')
+
+    cache = materialise(compas_file, {'BSE_System_Parameters': None})
+
+    copy.assert_not_called()
+    assert open_columns(compas_file).columns('BSE_System_Parameters') == cache.columns('BSE_System_Parameters')
+
+
+@pytest.mark.parametrize('compas_file', [{'n_systems': 2000, 'chunks': 300}], indirect=True)
+def test_cache_invalidated(tmp_path, compas_file):
+    materialise(compas_file)
+    assert open_columns(compas_file) is not None
+
+    # Replace the source with a file of the same size but different contents
+    create_compas_file(compas_file, n_systems=2000, chunks=300, seed=1)
+    stat = os.stat(compas_file)
+    os.utime(compas_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert open_columns(compas_file) is None
+
+    cache = materialise(compas_file, {'BSE_Supernovae': ['SEED']})
+    assert cache.groups == ['BSE_Supernovae']
+    with h5py.File(compas_file, 'r') as f:
+        np.testing.assert_array_equal(cache['BSE_Supernovae']['SEED'], f['BSE_Supernovae']['SEED'][()])
+
+
+def test_open_columns_missing(compas_file):
+    assert open_columns(compas_file) is None
+    assert not cache_path(compas_file).exists()
+
+
+def test_materialise_unmappable_column(tmp_path):
+    path = tmp_path / 'data.h5'
+    with h5py.File(path, 'w') as f:
+        f.create_dataset('group/values', data=np.arange(10))
+        f.create_dataset('group/names', data=[b'a', b'b'], dtype=h5py.string_dtype())
+
+    # Skipped unless named
+    assert materialise(path).columns('group') == ['values']
+    with pytest.raises(TypeError):
+        materialise(path, {'group': ['names']})
@@ -0,0 +1,76 @@
+import hashlib
+import io
+import tarfile
+
+import pytest
+
+from gwlandscape_python.utils.extract import TarStreamExtractor, is_tarball
+
+
+def create_tarball(members, mode='w:gz'):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode=mode) as tar:
+        for name, content in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+    return buffer.getvalue()
+
+
+def extract(tarball, output_dir, chunk_size=1000):
+    extractor = TarStreamExtractor(output_dir)
+    for start in range(0, len(tarball), chunk_size):
+        extractor.write(tarball[start:start + chunk_size])
+    extractor.close()
+    return extractor
+
+
+@pytest.mark.parametrize('path, expected', [
+    ('data.tar', True),
+    ('dir/data.tar.gz', True),
+    ('DATA.TGZ', True),
+    ('data.tar.xz', True),
+    ('data.h5', False),
+    ('data.gz', False),
+])
+def test_is_tarball(path, expected):
+    assert is_tarball(path) == expected
+
+
+@pytest.mark.parametrize('mode', ['w', 'w:gz', 'w:bz2'])
+def test_extract_hdf5_member(tmp_path, mode):
+    content = bytes(range(256)) * 4000
+    tarball = create_tarball({'README': b'readme', 'output/COMPAS_Output.h5': content, 'other.txt': b'other'}, mode)
+
+    extractor = extract(tarball, tmp_path)
+
+    # Only the HDF5 file is written, without the directories of the tarball
+    assert extractor.path == tmp_path / 'COMPAS_Output.h5'
+    assert list(tmp_path.iterdir()) == [extractor.path]
+    assert extractor.path.read_bytes() == content
+    assert extractor.size == len(content)
+    assert extractor.sha256 == hashlib.sha256(content).hexdigest()
+    assert extractor.tell() == len(tarball)
+
+
+def test_extract_errors(tmp_path):
+    with pytest.raises(IOError, match='does not contain a hdf5 file'):
+        extract(create_tarball({'other.txt': b'other'}), tmp_path)
+
+    with pytest.raises(tarfile.ReadError):
+        extract(b'not a tarball' * 1000, tmp_path)
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_extract_abort(tmp_path):
+    tarball = create_tarball({'COMPAS_Output.h5': bytes(range(256)) * 4000}, mode='w')
+    extractor = TarStreamExtractor(tmp_path)
+    extractor.write(tarball[:len(tarball) // 2])
+
+    extractor.abort(IOError('Connection broken'))
+
+    # The partly extracted file is removed, and a restarted download can't be written
+    assert list(tmp_path.iterdir()) == []
+    with pytest.raises(io.UnsupportedOperation):
+        extractor.seek(0)
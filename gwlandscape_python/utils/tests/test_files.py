@@ -0,0 +1,67 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from gwlandscape_python.utils.files import (
+    atomic_write, column_file_name, read_json, sidecar_source, source_key, write_json
+)
+
+
+def test_atomic_write(tmp_path):
+    path = tmp_path / 'data.bin'
+    path.write_bytes(b'old')
+
+    with atomic_write(path) as tmp:
+        tmp.write_bytes(b'new')
+        # The file isn't replaced until the block exits
+        assert path.read_bytes() == b'old'
+    assert path.read_bytes() == b'new'
+
+    with pytest.raises(RuntimeError):
+        with atomic_write(path) as tmp:
+            tmp.write_bytes(b'partial')
+            raise RuntimeError
+
+    # A failed write leaves the file as it was, and no temporary file behind
+    assert path.read_bytes() == b'new'
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_read_write_json(tmp_path):
+    path = tmp_path / 'index.json'
+    assert read_json(path) is None
+
+    write_json(path, {'a': [1, 2]})
+    assert read_json(path) == {'a': [1, 2]}
+
+    path.write_text('{"a": ')
+    assert read_json(path) is None
+
+
+def test_source_key(tmp_path):
+    path = tmp_path / 'data.bin'
+    path.write_bytes(b'data')
+    key = source_key(path)
+    assert key['size'] == 4
+
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert source_key(path) != key
+
+
+def test_column_file_name():
+    assert column_file_name('BSE_System_Parameters', 'Mass@ZAMS(1)').startswith('BSE_System_Parameters.Mass_ZAMS_1_-')
+    assert column_file_name('group', 'a/b') != column_file_name('group', 'a_b')
+
+
+@pytest.mark.parametrize('path, source', [
+    ('a/b.h5.columns/index.json', 'a/b.h5'),
+    ('a/b.h5.seeds/BSE_System_Parameters.SEED-0123abcd.npy', 'a/b.h5'),
+    ('a/b.h5.zonemap.npz', 'a/b.h5'),
+    ('a/b.h5', None),
+    ('a/b.h5.part', None),
+    ('a/.columns', None),
+])
+def test_sidecar_source(path, source):
+    assert sidecar_source(Path(path)) == (source and Path(source))
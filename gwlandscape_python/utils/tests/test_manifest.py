@@ -0,0 +1,63 @@
+import hashlib
+import os
+from pathlib import Path
+
+from gwlandscape_python.utils import verify, read_manifest
+from gwlandscape_python.utils.manifest import ManifestWriter, MANIFEST_NAME
+
+
+def _save(root_path, files):
+    manifest = ManifestWriter(root_path)
+    for name, content in files.items():
+        path = root_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+        manifest.add(name, len(content), hashlib.sha256(content).hexdigest())
+    manifest.write()
+
+
+def test_manifest_writer(tmp_path):
+    _save(tmp_path, {'a.txt': b'abc', 'dir/b.txt': b'defg'})
+    _save(tmp_path, {'a.txt': b'xyz', 'c.txt': b''})
+
+    files = read_manifest(tmp_path)
+    assert sorted(files) == ['a.txt', 'c.txt', 'dir/b.txt']
+    assert files['a.txt']['sha256'] == hashlib.sha256(b'xyz').hexdigest()
+    assert files['dir/b.txt']['size'] == 4
+    assert files['c.txt']['mtime_ns'] == os.stat(tmp_path / 'c.txt').st_mtime_ns
+
+
+def test_manifest_writer_empty(tmp_path):
+    ManifestWriter(tmp_path).write()
+    assert not (tmp_path / MANIFEST_NAME).exists()
+    assert read_manifest(tmp_path) == {}
+
+
+def test_verify(tmp_path, mocker):
+    _save(tmp_path, {'a.txt': b'abc', 'b.txt': b'def', 'c.txt': b'ghi', 'd.txt': b'jkl'})
+    assert verify(tmp_path) == []
+
+    spy = mocker.spy(hashlib, 'sha256')
+    assert verify(tmp_path) == []
+    # Unchanged files are not read again
+    spy.assert_not_called()
+
+    (tmp_path / 'a.txt').unlink()
+    (tmp_path / 'b.txt').write_bytes(b'defg')
+    (tmp_path / 'c.txt').write_bytes(b'GHI')
+    os.utime(tmp_path / 'd.txt', ns=(0, 0))
+
+    assert sorted(verify(tmp_path)) == [Path('a.txt'), Path('b.txt'), Path('c.txt')]
+    # The touched file is unchanged, and its new mtime is recorded
+    assert read_manifest(tmp_path)['d.txt']['mtime_ns'] == 0
+
+
+def test_verify_full(tmp_path):
+    _save(tmp_path, {'a.txt': b'abc'})
+    stat = os.stat(tmp_path / 'a.txt')
+    (tmp_path / 'a.txt').write_bytes(b'xyz')
+    os.utime(tmp_path / 'a.txt', ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    # Changes that keep the size and mtime are only found by a full check
+    assert verify(tmp_path) == []
+    assert len(verify(tmp_path, full=True)) == 1
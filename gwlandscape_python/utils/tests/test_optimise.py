@@ -0,0 +1,102 @@
+import h5py
+import numpy as np
+import pytest
+
+from gwlandscape_python.utils import optimise
+from gwlandscape_python.utils.optimise import optimise_dataset
+
+
+@pytest.fixture
+def compas_file(compas_file):
+    # Adds attributes and datasets of other shapes and types to the shared COMPAS file
+    with h5py.File(compas_file, 'a') as f:
+        f['BSE_System_Parameters'].attrs['units'] = 'Msol'
+        f['BSE_System_Parameters']['Mass@ZAMS(1)'].attrs['units'] = 'Msol'
+        f.create_dataset('Run_Details/names', data=[b'a', b'bb'], dtype=h5py.string_dtype())
+        f.create_dataset('Run_Details/grid', data=np.arange(12.).reshape(4, 3))
+        f.create_dataset('Run_Details/version', data=3)
+    return compas_file
+
+
+def assert_same_contents(f, expected):
+    def _compare(name, obj):
+        assert dict(f[name].attrs) == dict(obj.attrs)
+        if isinstance(obj, h5py.Dataset):
+            assert f[name].dtype == obj.dtype
+            np.testing.assert_array_equal(f[name][()], obj[()])
+    expected.visititems(_compare)
+    assert sorted(f) == sorted(expected)
+
+
+@pytest.mark.parametrize('compression', ['gzip', 'lzf', None])
+def test_optimise_dataset(tmp_path, compas_file, compression):
+    report = optimise_dataset(compas_file, tmp_path / 'optimised.h5', compression=compression, chunk_bytes=8192,
+                              max_workers=3)
+
+    assert report.path == tmp_path / 'optimised.h5'
+    assert report.n_datasets == 21
+    assert report.input_size == compas_file.stat().st_size
+    assert report.output_size == report.path.stat().st_size
+    assert report.size_ratio == report.output_size / report.input_size
+    assert report.scan_speedup == report.input_scan_s / report.output_scan_s
+
+    with h5py.File(report.path, 'r') as f, h5py.File(compas_file, 'r') as expected:
+        assert_same_contents(f, expected)
+        masses = f['BSE_System_Parameters']['Mass@ZAMS(1)']
+        assert masses.chunks == (1024,)
+        assert masses.compression == compression
+
+
+def test_optimise_dataset_in_place(compas_file):
+    with h5py.File(compas_file, 'r') as f:
+        expected = f['BSE_System_Parameters']['Mass@ZAMS(1)'][()]
+
+    report = optimise_dataset(compas_file, measure=False)
+
+    assert report.path == compas_file
+    assert report.input_scan_s is None and report.scan_speedup is None
+    with h5py.File(compas_file, 'r') as f:
+        np.testing.assert_array_equal(f['BSE_System_Parameters']['Mass@ZAMS(1)'][()], expected)
+    assert [p.name for p in compas_file.parent.iterdir()] == [compas_file.name]
+
+
+def test_optimise_dataset_streams(mocker, tmp_path, compas_file):
+    read_dataset = mocker.spy(optimise, 'read_dataset')
+
+    # Datasets that aren't sorted, including the SEED columns that are already in order, are never read whole
+    report = optimise_dataset(compas_file, tmp_path / 'optimised.h5', chunk_bytes=8192, sort_by_seed=True,
+                              measure=False)
+
+    assert read_dataset.call_count == 0
+    with h5py.File(report.path, 'r') as f, h5py.File(compas_file, 'r') as expected:
+        assert_same_contents(f, expected)
+
+
+@pytest.mark.parametrize('max_memory', [optimise.OPTIMISE_MEMORY_BYTES, 1])
+def test_optimise_dataset_sort_by_seed(tmp_path, max_memory):
+    path = tmp_path / 'unsorted.h5'
+    seeds = np.random.default_rng(0).permutation(1000).astype(np.uint64)
+    with h5py.File(path, 'w') as f:
+        f.create_dataset('group/SEED', data=seeds, chunks=(64,), compression='gzip')
+        f.create_dataset('group/twice', data=seeds * 2, chunks=(64,), compression='gzip')
+        f.create_dataset('group/other', data=np.arange(10))
+        f.create_dataset('sorted/SEED', data=np.arange(10))
+
+    # Sorted columns are held whole, but no more than one at a time once they exceed max_memory
+    optimise_dataset(path, sort_by_seed=True, chunk_bytes=1024, max_workers=3, max_memory=max_memory)
+
+    with h5py.File(path, 'r') as f:
+        np.testing.assert_array_equal(f['group/SEED'][()], np.arange(1000))
+        np.testing.assert_array_equal(f['group/twice'][()], np.arange(1000) * 2)
+        np.testing.assert_array_equal(f['group/other'][()], np.arange(10))
+        assert f['group'].attrs['sorted_by'] == 'SEED'
+        assert 'sorted_by' not in f['sorted'].attrs
+
+
+def test_optimise_dataset_errors(tmp_path, compas_file):
+    with pytest.raises(ValueError):
+        optimise_dataset(compas_file, compression='zstd')
+
+    with pytest.raises(OSError):
+        optimise_dataset(tmp_path / 'missing.h5', tmp_path / 'output.h5')
+    assert not (tmp_path / 'output.h5').exists()
@@ -0,0 +1,145 @@
+import io
+import logging
+import threading
+
+import pytest
+
+from gwlandscape_python.utils import (
+    CallbackProgress, LoggingProgress, NullProgress, ProgressSink, TqdmProgress, get_progress_sink
+)
+from gwlandscape_python.utils.progress import ProgressReader, progress_counter
+
+
+@pytest.mark.parametrize("progress,sink_type", [
+    ('tqdm', TqdmProgress),
+    (True, TqdmProgress),
+    ('logging', LoggingProgress),
+    ('none', NullProgress),
+    (False, NullProgress),
+    (None, NullProgress),
+    (print, CallbackProgress),
+])
+def test_get_progress_sink(progress, sink_type):
+    assert type(get_progress_sink(progress)) is sink_type
+
+
+def test_get_progress_sink_instance():
+    sink = LoggingProgress()
+    assert get_progress_sink(sink) is sink
+
+    with pytest.raises(ValueError):
+        get_progress_sink('unknown')
+
+
+class RecordingSink(ProgressSink):
+    def start(self, total):
+        self.total = total
+        self.updates = []
+        self.closed = False
+
+    def update(self, n_bytes):
+        self.updates.append(n_bytes)
+
+    def close(self):
+        self.closed = True
+
+
+def test_progress_counter_merges_threads():
+    sink = RecordingSink()
+    n_threads, n_updates = 8, 1000
+
+    with progress_counter(sink, n_threads * n_updates * 16) as counter:
+        def _worker():
+            for _ in range(n_updates):
+                counter.update(16)
+
+        threads = [threading.Thread(target=_worker) for _ in range(n_threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert sink.total == n_threads * n_updates * 16
+    assert sum(sink.updates) == sink.total
+    assert len(sink.updates) < n_threads * n_updates
+    assert sink.closed
+
+
+def test_progress_counter_null_sink():
+    sink = NullProgress()
+    with progress_counter(sink, 100) as counter:
+        counter.update(100)
+
+
+def test_callback_progress():
+    calls = []
+    sink = CallbackProgress(lambda completed, total: calls.append((completed, total)))
+
+    with progress_counter(sink, 30, interval=60) as counter:
+        counter.update(10)
+        counter.update(20)
+
+    assert calls == [(30, 30)]
+
+
+def test_logging_progress(caplog):
+    sink = LoggingProgress(step=25)
+    sink.start(100)
+    with caplog.at_level(logging.INFO, logger='gwlandscape_python'):
+        for _ in range(10):
+            sink.update(10)
+        sink.close()
+
+    assert [record.getMessage() for record in caplog.records] == [
+        'Transferred 30% (30 of 100 bytes)',
+        'Transferred 50% (50 of 100 bytes)',
+        'Transferred 80% (80 of 100 bytes)',
+        'Transferred 100% (100 of 100 bytes)',
+    ]
+
+
+def test_progress_reader():
+    sink = RecordingSink()
+    with progress_counter(sink, 10) as counter:
+        reader = ProgressReader(io.BytesIO(b'0123456789'), counter)
+        assert reader.read(4) == b'0123'
+        assert reader.read() == b'456789'
+
+    assert sum(sink.updates) == 10
+
+
+def test_shared_sink_overlapping_transfers():
+    calls = []
+    sink = CallbackProgress(lambda completed, total: calls.append((completed, total)))
+
+    with progress_counter(sink, 30, interval=60) as first:
+        with progress_counter(sink, 20, interval=60) as second:
+            second.update(20)
+        first.update(30)
+
+    # The progress of the transfers is combined
+    assert calls == [(20, 50), (50, 50)]
+
+
+def test_shared_tqdm_sink():
+    stream = io.StringIO()
+    sink = TqdmProgress(file=stream)
+    n_threads = 4
+    barrier = threading.Barrier(n_threads)
+
+    def _transfer():
+        with progress_counter(sink, 100, interval=0.001) as counter:
+            barrier.wait()
+            for _ in range(10):
+                counter.update(10)
+            barrier.wait()
+
+    threads = [threading.Thread(target=_transfer) for _ in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # The transfers running at the same time share a single bar, closed once they have all finished
+    assert sink.bar.total == sink.bar.n == n_threads * 100
+    assert sink.bar.disable
@@ -0,0 +1,105 @@
+import asyncio
+import concurrent.futures
+import time
+
+import pytest
+
+from gwlandscape_python.utils import TokenBucket, FileTokenBucket, get_token_bucket
+
+
+def test_token_bucket_burst():
+    bucket = TokenBucket(rate=10, capacity=5)
+    start = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    assert time.monotonic() - start < 0.05
+
+
+def test_token_bucket_rate():
+    bucket = TokenBucket(rate=100, capacity=1)
+    start = time.monotonic()
+    for _ in range(21):
+        bucket.acquire()
+    assert time.monotonic() - start >= 0.19
+
+
+def test_token_bucket_large_request():
+    bucket = TokenBucket(rate=1000, capacity=100)
+    start = time.monotonic()
+    bucket.acquire(100)
+    bucket.acquire(200)
+    assert time.monotonic() - start >= 0.19
+
+
+def test_token_bucket_shared_between_threads():
+    bucket = TokenBucket(rate=200, capacity=1)
+    start = time.monotonic()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda _: [bucket.acquire() for _ in range(5)], range(8)))
+    # 40 tokens with one available at the start
+    assert time.monotonic() - start >= 39 / 200 - 0.01
+
+
+def test_token_bucket_invalid_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+
+def test_file_token_bucket_shared_state(tmp_path):
+    path = tmp_path / 'bucket'
+    first = FileTokenBucket(path, rate=100, capacity=2)
+    second = FileTokenBucket(path, rate=100, capacity=2)
+
+    start = time.monotonic()
+    first.acquire()
+    second.acquire()
+    assert time.monotonic() - start < 0.05
+
+    # The burst has been used up by the two buckets together
+    second.acquire(10)
+    first.acquire()
+    assert time.monotonic() - start >= 0.1
+
+
+def test_file_token_bucket_batches(tmp_path, mocker):
+    from gwlandscape_python.utils import rate_limit
+
+    bucket = FileTokenBucket(tmp_path / 'bucket', rate=1000, capacity=1600)
+    open_file = mocker.spy(rate_limit.os, 'open')
+    flock = mocker.spy(rate_limit.fcntl, 'flock')
+
+    start = time.monotonic()
+    for _ in range(250):
+        bucket.acquire()
+    assert time.monotonic() - start < 0.05
+
+    # The file is opened once, and locked once for each batch of 100 tokens
+    assert open_file.call_count == 1
+    assert flock.call_count == 2 * 3
+
+    # Requests larger than a batch take what they need
+    bucket.acquire(1000)
+    assert flock.call_count == 2 * 4
+    assert bucket._allowance == 0
+
+
+def test_get_token_bucket():
+    bucket = TokenBucket(rate=5)
+    assert get_token_bucket(None) is None
+    assert get_token_bucket(bucket) is bucket
+
+    bucket = get_token_bucket(100)
+    assert isinstance(bucket, TokenBucket)
+    assert bucket.rate == 100
+    assert bucket.capacity == 100
+
+
+def test_token_bucket_async():
+    bucket = TokenBucket(rate=100, capacity=1)
+
+    async def _acquire():
+        await asyncio.gather(*(bucket.acquire_async() for _ in range(11)))
+
+    start = time.monotonic()
+    asyncio.run(_acquire())
+    assert time.monotonic() - start >= 0.09
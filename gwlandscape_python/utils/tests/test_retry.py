@@ -0,0 +1,87 @@
+import asyncio
+import json
+
+import pytest
+import requests
+
+from gwlandscape_python.utils import RetryPolicy, NO_RETRY
+
+
+def _http_error(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    return requests.HTTPError(response=response)
+
+
+def test_retry_delay():
+    policy = RetryPolicy(backoff=1, multiplier=2, max_delay=5, jitter=0)
+    assert [policy.delay(attempt) for attempt in range(1, 6)] == [1, 2, 4, 5, 5]
+
+    policy = RetryPolicy(backoff=1, jitter=0.5)
+    assert all(1 <= policy.delay(1) <= 1.5 for _ in range(100))
+
+
+@pytest.mark.parametrize("error,retryable", [
+    (requests.ConnectionError(), True),
+    (requests.Timeout(), True),
+    (requests.exceptions.ChunkedEncodingError(), True),
+    (json.JSONDecodeError('Expecting value', '<html>', 0), True),
+    (_http_error(503), True),
+    (_http_error(429), True),
+    (_http_error(404), False),
+    (ValueError(), False),
+    (Exception(), False),
+])
+def test_is_retryable(error, retryable):
+    assert RetryPolicy().is_retryable(error) is retryable
+
+
+def test_retry_run(mocker):
+    mock_sleep = mocker.patch('gwlandscape_python.utils.retry.time.sleep')
+    on_retry = mocker.Mock()
+    fn = mocker.Mock(side_effect=[requests.ConnectionError('reset'), _http_error(502), 'result'])
+
+    policy = RetryPolicy(max_attempts=3, backoff=1, jitter=0)
+    assert policy.run(fn, on_retry=on_retry) == 'result'
+
+    assert fn.call_count == 3
+    assert [call.args[:2] for call in on_retry.call_args_list] == [(1, 1), (2, 2)]
+    assert [call.args[0] for call in mock_sleep.call_args_list] == [1, 2]
+
+
+def test_retry_gives_up(mocker):
+    mocker.patch('gwlandscape_python.utils.retry.time.sleep')
+
+    fn = mocker.Mock(side_effect=requests.ConnectionError('reset'))
+    with pytest.raises(requests.ConnectionError):
+        RetryPolicy(max_attempts=4).run(fn)
+    assert fn.call_count == 4
+
+    fn = mocker.Mock(side_effect=ValueError())
+    with pytest.raises(ValueError):
+        RetryPolicy(max_attempts=4).run(fn)
+    assert fn.call_count == 1
+
+    fn = mocker.Mock(side_effect=requests.ConnectionError('reset'))
+    with pytest.raises(requests.ConnectionError):
+        NO_RETRY.run(fn)
+    assert fn.call_count == 1
+
+
+def test_retry_run_async(mocker):
+    aiohttp = pytest.importorskip('aiohttp')
+    mock_sleep = mocker.patch('asyncio.sleep', mocker.AsyncMock())
+    fn = mocker.AsyncMock(side_effect=[
+        aiohttp.ServerDisconnectedError(),
+        aiohttp.ClientResponseError(None, (), status=503),
+        'result'
+    ])
+
+    policy = RetryPolicy(max_attempts=3, backoff=1, jitter=0)
+    assert asyncio.run(policy.run_async(fn)) == 'result'
+    assert [call.args[0] for call in mock_sleep.call_args_list] == [1, 2]
+
+    fn = mocker.AsyncMock(side_effect=aiohttp.ClientResponseError(None, (), status=404))
+    with pytest.raises(aiohttp.ClientResponseError):
+        asyncio.run(policy.run_async(fn))
+    assert fn.call_count == 1
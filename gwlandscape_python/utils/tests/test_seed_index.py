@@ -0,0 +1,80 @@
+import os
+
+import h5py
+import numpy as np
+import pytest
+
+from gwlandscape_python.utils.seed_index import build_seed_index, get_seed_index, seed_index_path
+
+
+@pytest.fixture
+def unsorted_file(tmp_path):
+    path = tmp_path / 'unsorted.h5'
+    seeds = np.array([30, 10, 20, 10, 40], dtype=np.uint64)
+    with h5py.File(path, 'w') as f:
+        f.create_dataset('group/SEED', data=seeds)
+        f.create_dataset('group/value', data=np.arange(5) * 1.5)
+        f.create_dataset('group/other', data=np.arange(3))
+        f.create_dataset('no_seeds/value', data=np.arange(5))
+    return path
+
+
+def test_seed_index_rows(compas_file):
+    index = build_seed_index(compas_file)
+
+    assert seed_index_path(compas_file).is_dir()
+    assert sorted(index.groups) == ['BSE_Double_Compact_Objects', 'BSE_Supernovae', 'BSE_System_Parameters']
+    with h5py.File(compas_file, 'r') as f:
+        seeds = f['BSE_Supernovae']['SEED'][()]
+        system_seeds = f['BSE_System_Parameters']['SEED'][()]
+
+    np.testing.assert_array_equal(index.rows('BSE_Supernovae', seeds[[7, 3, 900]]), [3, 7, 900])
+    np.testing.assert_array_equal(
+        index.rows('BSE_System_Parameters', seeds[7]), np.flatnonzero(system_seeds == seeds[7])
+    )
+    assert len(index.rows('BSE_Supernovae', [0])) == 0
+
+
+def test_seed_index_unsorted(mocker, unsorted_file):
+    # The sorted SEEDs are gathered a few rows at a time
+    mocker.patch('gwlandscape_python.utils.seed_index.SEED_INDEX_BLOCK_ROWS', 2)
+    index = build_seed_index(unsorted_file)
+
+    assert index.groups == ['group']
+    assert len(list(seed_index_path(unsorted_file).iterdir())) == 3
+    np.testing.assert_array_equal(index.rows('group', 10), [1, 3])
+    np.testing.assert_array_equal(index.rows('group', [40, 30, 50]), [0, 4])
+
+    with h5py.File(unsorted_file, 'r') as f:
+        result = index.lookup(f, [10, 20])
+    assert sorted(result['group']) == ['SEED', 'value']
+    np.testing.assert_array_equal(result['group']['SEED'], [10, 20, 10])
+    np.testing.assert_array_equal(result['group']['value'], [1.5, 3.0, 4.5])
+
+
+def test_seed_index_lookup(compas_file):
+    index = get_seed_index(compas_file)
+    with h5py.File(compas_file, 'r') as f:
+        seeds = f['BSE_Double_Compact_Objects']['SEED'][[2, 40]]
+        result = index.lookup(f, seeds)
+
+        for group, columns in result.items():
+            rows = np.flatnonzero(np.isin(f[group]['SEED'][()], seeds))
+            assert sorted(columns) == sorted(f[group])
+            for name, values in columns.items():
+                np.testing.assert_array_equal(values, f[group][name][()][rows])
+
+        assert list(index.lookup(f, seeds, groups=['BSE_Supernovae'])) == ['BSE_Supernovae']
+
+
+def test_get_seed_index_rebuilt(compas_file, mocker):
+    build_seed_index(compas_file)
+    build = mocker.patch('gwlandscape_python.utils.seed_index.build_seed_index', wraps=build_seed_index)
+
+    get_seed_index(compas_file)
+    build.assert_not_called()
+
+    stat = os.stat(compas_file)
+    os.utime(compas_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert get_seed_index(compas_file).groups
+    build.assert_called_once()
@@ -0,0 +1,67 @@
+import io
+import tarfile
+
+import h5py
+import numpy as np
+import pytest
+
+from gwlandscape_python.utils.tar_member import MemoryFile, find_tar_member, open_tar_member
+
+
+def create_tarball(path, members, mode='w'):
+    with tarfile.open(path, mode) as tar:
+        for name, member_path in members.items():
+            tar.add(member_path, arcname=name)
+    return path
+
+
+def assert_same_contents(f, expected):
+    def _compare(name, obj):
+        if isinstance(obj, h5py.Dataset):
+            np.testing.assert_array_equal(f[name][()], obj[()])
+    assert sorted(f) == sorted(expected)
+    expected.visititems(_compare)
+
+
+def test_find_tar_member(tmp_path, compas_file):
+    readme = tmp_path / 'README'
+    readme.write_text('readme')
+    tarball = create_tarball(
+        tmp_path / 'data.tar', {'README': readme, 'COMPAS_Output/COMPAS_Output.h5': compas_file}
+    )
+
+    with open(tarball, 'rb') as f:
+        name, offset, size = find_tar_member(f)
+        f.seek(offset)
+        assert f.read(size) == compas_file.read_bytes()
+    assert name == 'COMPAS_Output/COMPAS_Output.h5'
+
+
+def test_find_tar_member_errors(tmp_path, compas_file):
+    with open(create_tarball(tmp_path / 'data.tar.gz', {'data.h5': compas_file}, mode='w:gz'), 'rb') as f:
+        with pytest.raises(ValueError):
+            find_tar_member(f)
+
+    with open(create_tarball(tmp_path / 'other.tar', {'other.txt': compas_file}), 'rb') as f:
+        with pytest.raises(IOError):
+            find_tar_member(f)
+
+
+def test_open_tar_member(tmp_path, compas_file):
+    tarball = create_tarball(tmp_path / 'data.tar', {'COMPAS_Output/COMPAS_Output.h5': compas_file})
+
+    with open_tar_member(tarball) as f, h5py.File(compas_file, 'r') as expected:
+        assert_same_contents(f, expected)
+
+
+def test_memory_file():
+    f = MemoryFile(memoryview(b'0123456789')[2:8])
+
+    assert f.read(3) == b'234'
+    assert f.seek(-2, io.SEEK_END) == 4
+    assert f.read() == b'67'
+    assert f.read(1) == b''
+
+    b = bytearray(4)
+    f.seek(1)
+    assert f.readinto(b) == 4 and b == b'3456'
@@ -1,8 +1,13 @@
+import json
+import pickle
 import tempfile
 import tarfile
 import h5py
 import pytest
-from gwlandscape_python.utils import mutually_exclusive, _get_args_dict, validate_dataset
+from dataclasses import dataclass, field
+from gwlandscape_python.utils import (
+    mutually_exclusive, _get_args_dict, validate_dataset, dataclass_slots, obtain_public_id
+)
 
 
 @pytest.mark.parametrize("args,kwargs,args_dict", [
@@ -117,3 +122,39 @@ def test_validate_dataset_tar_with_multiple_h5():
 def test_validate_dataset_not_tar_or_h5():
     with pytest.raises(Exception):
         validate_dataset(tempfile.NamedTemporaryFile().name)
+
+
+@dataclass_slots
+@dataclass
+class SlottedData:
+    a: int
+    b: str = field(compare=False)
+    c: list = field(default_factory=list)
+
+
+def test_dataclass_slots():
+    data = SlottedData(1, 'b')
+
+    assert SlottedData.__slots__ == ('a', 'b', 'c')
+    assert not hasattr(data, '__dict__')
+    assert data == SlottedData(1, 'other b')
+    assert data.c == []
+    assert pickle.loads(pickle.dumps(data)) == data
+
+    with pytest.raises(AttributeError):
+        data.d = 1
+
+
+def test_obtain_public_id(mocker, tmp_path):
+    mocker.patch('appdirs.user_config_dir', return_value=str(tmp_path / 'config'))
+    config_file = tmp_path / 'config' / 'config.json'
+
+    # Created the first time, in the same format as gwdc_python, and kept after that
+    public_id = obtain_public_id()
+    assert json.loads(config_file.read_text()) == {'public_id': public_id}
+    assert obtain_public_id() == public_id
+
+    # A damaged config file is replaced
+    config_file.write_text('{')
+    assert obtain_public_id() != public_id
+    assert json.loads(config_file.read_text())['public_id'] == obtain_public_id()
@@ -0,0 +1,118 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import h5py
+import numpy as np
+import pytest
+
+from gwlandscape_python.tests.utils import create_compas_file
+from gwlandscape_python.utils.virtual_table import VirtualTable, create_virtual_file
+
+GROUP = 'BSE_System_Parameters'
+
+
+@pytest.fixture
+def compas_files(tmp_path):
+    return [
+        create_compas_file(tmp_path / f'dataset_id{i}' / 'COMPAS_Output.h5', n_systems=1000 + 500 * i, seed=i,
+                           chunks=300)
+        for i in range(3)
+    ]
+
+
+def read_column(paths, group, column):
+    values = []
+    for path in paths:
+        with h5py.File(path, 'r') as f:
+            values.append(f[group][column][()])
+    return np.concatenate(values)
+
+
+@pytest.fixture
+def table(compas_files):
+    with VirtualTable(compas_files, GROUP) as table:
+        yield table
+
+
+def test_virtual_table_layout(table):
+    assert len(table) == 4500
+    np.testing.assert_array_equal(table.offsets, [0, 1000, 2500, 4500])
+    assert 'SEED' in table.columns and 'Mass@ZAMS(1)' in table.columns
+
+    files, rows = table.locate([0, 999, 1000, 4499])
+    np.testing.assert_array_equal(files, [0, 0, 1, 2])
+    np.testing.assert_array_equal(rows, [0, 999, 0, 1999])
+    with pytest.raises(IndexError):
+        table.locate([4500])
+
+
+def test_virtual_table_read(table, compas_files):
+    masses = read_column(compas_files, GROUP, 'Mass@ZAMS(1)')
+
+    np.testing.assert_array_equal(table.column('Mass@ZAMS(1)'), masses)
+    rows = [4000, 3, 1200, 3, 999]
+    np.testing.assert_array_equal(table.take('Mass@ZAMS(1)', rows), masses[rows])
+    with pytest.raises(KeyError):
+        table.take('Missing', rows)
+
+
+def test_virtual_table_iter_blocks(table, compas_files):
+    seeds = read_column(compas_files, GROUP, 'SEED')
+
+    starts = []
+    for start, block in table.iter_blocks(['SEED', 'Merger']):
+        assert sorted(block) == ['Merger', 'SEED']
+        assert len(block['SEED']) <= 300
+        np.testing.assert_array_equal(block['SEED'], seeds[start:start + len(block['SEED'])])
+        starts.append(start)
+    assert starts[:5] == [0, 300, 600, 900, 1000]
+
+
+def test_virtual_table_iter_blocks_shared_pool(table, mocker):
+    # The columns of every file are decompressed by a single pool
+    pool = mocker.patch('gwlandscape_python.utils.virtual_table.ThreadPoolExecutor', wraps=ThreadPoolExecutor)
+    mocker.patch('gwlandscape_python.utils.chunk_reader.ThreadPoolExecutor', side_effect=AssertionError)
+
+    assert sum(len(block['SEED']) for _, block in table.iter_blocks(['SEED', 'Merger'], max_workers=2)) == 4500
+    pool.assert_called_once_with(2)
+
+
+@pytest.mark.parametrize('zone_maps', [True, False])
+def test_virtual_table_find_rows(table, compas_files, zone_maps):
+    masses = read_column(compas_files, GROUP, 'Mass@ZAMS(1)')
+    metallicities = read_column(compas_files, GROUP, 'Metallicity@ZAMS(1)')
+
+    rows = table.find_rows({'Mass@ZAMS(1)': (100, None), 'Metallicity@ZAMS(1)': (None, 0.01)}, zone_maps=zone_maps)
+
+    np.testing.assert_array_equal(rows, np.flatnonzero((masses >= 100) & (metallicities <= 0.01)))
+    np.testing.assert_array_equal(table.find_rows({}, zone_maps=zone_maps), np.arange(len(table)))
+
+
+def test_virtual_table_missing_group(tmp_path, compas_files):
+    path = tmp_path / 'empty.h5'
+    with h5py.File(path, 'w') as f:
+        f.create_group('other')
+
+    with VirtualTable([path] + compas_files, 'BSE_Double_Compact_Objects') as table:
+        np.testing.assert_array_equal(table.offsets, [0, 0, 100, 250, 450])
+        np.testing.assert_array_equal(
+            table.column('SEED'), read_column(compas_files, 'BSE_Double_Compact_Objects', 'SEED')
+        )
+
+
+def test_virtual_table_from_datasets(tmp_path, compas_files, mocker):
+    datasets = [mocker.Mock(id='dataset_id2'), mocker.Mock(id='dataset_id0')]
+
+    with VirtualTable.from_datasets(datasets, tmp_path, GROUP) as table:
+        assert table.paths == [compas_files[2], compas_files[0]]
+        assert len(table) == 3000
+
+
+def test_create_virtual_file(tmp_path, compas_files):
+    path = create_virtual_file(compas_files, tmp_path / 'virtual.h5')
+
+    with h5py.File(path, 'r') as f:
+        assert sorted(f) == ['BSE_Double_Compact_Objects', 'BSE_Supernovae', 'BSE_System_Parameters']
+        assert f[GROUP]['Mass@ZAMS(1)'].is_virtual
+        for group in f:
+            for column in f[group]:
+                np.testing.assert_array_equal(f[group][column][()], read_column(compas_files, group, column))
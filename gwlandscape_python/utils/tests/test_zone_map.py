@@ -0,0 +1,104 @@
+import os
+
+import h5py
+import numpy as np
+import pytest
+
+from gwlandscape_python.utils.zone_map import build_zone_map, get_zone_map, zone_map_path
+
+
+def test_build_zone_map(compas_file):
+    zone_map = build_zone_map(compas_file)
+
+    assert zone_map_path(compas_file).exists()
+    assert sorted(zone_map.groups) == ['BSE_Double_Compact_Objects', 'BSE_Supernovae', 'BSE_System_Parameters']
+    with h5py.File(compas_file, 'r') as f:
+        masses = f['BSE_System_Parameters']['Mass@ZAMS(1)'][()]
+    stats = zone_map.stats('BSE_System_Parameters', 'Mass@ZAMS(1)')
+    assert stats['block_rows'] == 500
+    np.testing.assert_array_equal(stats['min'], masses.reshape(10, 500).min(axis=1))
+    np.testing.assert_array_equal(stats['max'], masses.reshape(10, 500).max(axis=1))
+    assert (stats['nulls'] == 0).all()
+
+
+def test_candidate_ranges(compas_file):
+    zone_map = build_zone_map(compas_file)
+
+    # SEEDs increase through the file, so a range of them falls in a single block
+    with h5py.File(compas_file, 'r') as f:
+        seeds = f['BSE_System_Parameters']['SEED'][()]
+    assert zone_map.candidate_ranges('BSE_System_Parameters', 'SEED', seeds[1200], seeds[1300]) == [(1000, 1500)]
+    assert zone_map.candidate_ranges('BSE_System_Parameters', 'SEED', seeds[400], seeds[600]) == [(0, 1000)]
+    assert zone_map.candidate_ranges('BSE_System_Parameters', 'SEED', high=0) == []
+    assert zone_map.candidate_ranges('BSE_System_Parameters', 'SEED') == [(0, 5000)]
+
+
+def test_find_rows(compas_file):
+    zone_map = get_zone_map(compas_file)
+    with h5py.File(compas_file, 'r') as f:
+        group = f['BSE_System_Parameters']
+        seeds, masses = group['SEED'][()], group['Mass@ZAMS(1)'][()]
+        expected = np.flatnonzero((seeds >= seeds[1200]) & (seeds <= seeds[2400]) & (masses >= 100))
+
+        rows = zone_map.find_rows(f, 'BSE_System_Parameters', {
+            'SEED': (seeds[1200], seeds[2400]),
+            'Mass@ZAMS(1)': (100, None),
+        })
+
+        np.testing.assert_array_equal(rows, expected)
+        assert len(zone_map.find_rows(f, 'BSE_System_Parameters', {'Mass@ZAMS(1)': (1000, None)})) == 0
+
+        # Every row matches no predicates
+        np.testing.assert_array_equal(zone_map.find_rows(f, 'BSE_System_Parameters', {}), np.arange(len(seeds)))
+
+
+def test_find_rows_not_indexed(tmp_path):
+    path = tmp_path / 'data.h5'
+    with h5py.File(path, 'w') as f:
+        f.create_dataset('group/x', data=np.arange(10.))
+        f.create_dataset('group/names', data=[b'a'] * 10, dtype=h5py.string_dtype())
+
+    zone_map = build_zone_map(path)
+
+    with h5py.File(path, 'r') as f:
+        with pytest.raises(KeyError, match="'names'"):
+            zone_map.find_rows(f, 'group', {'names': (None, None)})
+        with pytest.raises(KeyError, match="'missing'"):
+            zone_map.find_rows(f, 'missing', {})
+
+
+def test_find_rows_nan(tmp_path):
+    path = tmp_path / 'data.h5'
+    values = np.arange(30, dtype=np.float64)
+    values[:10] = np.nan
+    values[15] = np.nan
+    with h5py.File(path, 'w') as f:
+        f.create_dataset('group/x', data=values, chunks=(10,))
+
+    zone_map = build_zone_map(path)
+
+    stats = zone_map.stats('group', 'x')
+    np.testing.assert_array_equal(stats['nulls'], [10, 1, 0])
+    assert np.isnan(stats['min'][0]) and stats['min'][1] == 10
+    assert zone_map.candidate_ranges('group', 'x') == [(10, 30)]
+    with h5py.File(path, 'r') as f:
+        np.testing.assert_array_equal(
+            zone_map.find_rows(f, 'group', {'x': (None, None)}), [*range(10, 15), *range(16, 30)]
+        )
+
+
+def test_get_zone_map_rebuilt(compas_file, mocker):
+    build_zone_map(compas_file)
+    build = mocker.patch('gwlandscape_python.utils.zone_map.build_zone_map', wraps=build_zone_map)
+
+    get_zone_map(compas_file)
+    build.assert_not_called()
+
+    stat = os.stat(compas_file)
+    os.utime(compas_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    get_zone_map(compas_file)
+    build.assert_called_once()
+
+    zone_map_path(compas_file).write_bytes(b'corrupt')
+    assert get_zone_map(compas_file).groups
+    assert build.call_count == 2
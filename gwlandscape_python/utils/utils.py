@@ -1,7 +1,8 @@
+import json
+import uuid
+from dataclasses import fields
 from functools import wraps
 from pathlib import Path
-import tarfile
-import h5py
 
 
 # Taken from https://stackoverflow.com/a/40363565
@@ -38,7 +39,31 @@ def mutually_exclusive(*keywords):
     return wrapper
 
 
+def dataclass_slots(cls):
+    """Class decorator that recreates a dataclass with ``__slots__`` for each of its fields, removing the per-instance
+    ``__dict__``. Equivalent to ``@dataclass(slots=True)``, which is only available from Python 3.10.
+    Must be applied after (above) the ``@dataclass`` decorator.
+    """
+    field_names = tuple(f.name for f in fields(cls))
+
+    cls_dict = dict(cls.__dict__)
+    cls_dict['__slots__'] = field_names
+    for name in field_names:
+        # Remove the class level defaults, which would otherwise conflict with the slots
+        cls_dict.pop(name, None)
+    cls_dict.pop('__dict__', None)
+    cls_dict.pop('__weakref__', None)
+
+    slotted_cls = type(cls)(cls.__name__, cls.__bases__, cls_dict)
+    slotted_cls.__qualname__ = cls.__qualname__
+    return slotted_cls
+
+
 def validate_dataset(file_path):
+    # h5py pulls in numpy, so is only imported when a dataset is uploaded
+    import h5py
+    import tarfile
+
     if h5py.is_hdf5(file_path):
         return None
 
@@ -48,3 +73,27 @@ def validate_dataset(file_path):
     with tarfile.open(file_path) as f:
         if sum(Path(name).suffix in ['.h5', '.hdf5'] for name in f.getnames()) != 1:
             raise Exception('Tarfile must contain exactly one hdf5 file')
+
+
+def obtain_public_id():
+    """The id sent with anonymous requests to identify this user, which is created the first time it is needed and
+    kept in the user's config directory. The same file is read by :class:`gwdc_python.GWDC`, so both clients send the
+    same id.
+
+    Returns
+    -------
+    str
+        The public id
+    """
+    from appdirs import user_config_dir
+    from gwdc_python.constants import APP_NAME, ORGANISATION
+
+    config_file = Path(user_config_dir(APP_NAME, ORGANISATION)) / 'config.json'
+    try:
+        return json.loads(config_file.read_text())['public_id']
+    except (FileNotFoundError, ValueError, KeyError, TypeError):
+        # Missing or damaged, so a new id is created
+        public_id = str(uuid.uuid4())
+        config_file.parent.mkdir(parents=True, exist_ok=True)
+        config_file.write_text(json.dumps({'public_id': public_id}))
+        return public_id
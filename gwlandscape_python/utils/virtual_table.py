@@ -0,0 +1,335 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .chunk_reader import FALLBACK_BLOCK_ROWS, READ_AHEAD, iter_chunks
+from .extract import HDF5_SUFFIXES
+from .optimise import SEED_COLUMN
+from .sync import dataset_directory
+
+
+def _layout(groups):
+    # The number of rows of each group, and the columns found in every group with a value for every row and the same
+    # dtype, in the order of the first group. Missing groups, given as None, have no rows
+    import h5py
+
+    lengths, columns = [], None
+    for group in groups:
+        if group is None:
+            lengths.append(0)
+            continue
+
+        datasets = {name: obj for name, obj in group.items() if isinstance(obj, h5py.Dataset) and obj.ndim == 1}
+        n_rows = len(datasets[SEED_COLUMN]) if SEED_COLUMN in datasets else len(next(iter(datasets.values()), ()))
+        lengths.append(n_rows)
+        group_columns = {name: obj.dtype for name, obj in datasets.items() if len(obj) == n_rows}
+        if columns is None:
+            columns = group_columns
+        else:
+            columns = {name: dtype for name, dtype in columns.items() if group_columns.get(name) == dtype}
+    return lengths, columns or {}
+
+
+def _block_rows(dataset):
+    return dataset.chunks[0] if dataset.chunks else FALLBACK_BLOCK_ROWS
+
+
+class VirtualTable:
+    """
+    A group of many downloaded COMPAS files, such as every dataset of a publication, viewed as one table. The columns
+    common to the group in every file make up a single namespace, and rows are numbered globally, in the order of the
+    files, using an index of the row offset of each file. No data is copied until it is read, and reading a block or a
+    selection of rows only reads the files holding them.
+
+    Files without the group contribute no rows. Columns are only included if every file with the group has them, with
+    the same dtype.
+
+    Parameters
+    ----------
+    paths : list
+        Paths of the HDF5 files, as str or :class:`~pathlib.Path`, in the order their rows are numbered
+    group : str
+        Name of the group, such as 'BSE_System_Parameters'
+
+    Attributes
+    ----------
+    paths : list
+        Paths of the files
+    group : str
+        Name of the group
+    columns : list
+        Names of the columns
+    offsets : numpy.ndarray
+        Global index of the first row of each file, followed by the total number of rows
+    """
+
+    def __init__(self, paths, group):
+        import h5py
+        import numpy as np
+
+        self.paths = [Path(path) for path in paths]
+        self.group = group
+        self._files = [h5py.File(path, 'r') for path in self.paths]
+        self._groups = [f.get(group) for f in self._files]
+        lengths, columns = _layout(self._groups)
+        self.columns = list(columns)
+        self.offsets = np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)])
+
+    @classmethod
+    def from_datasets(cls, datasets, root_path, group):
+        """Create a table from the HDF5 files of datasets saved to a mirror by :meth:`~.GWLandscape.sync`
+
+        Parameters
+        ----------
+        datasets : list
+            The :class:`~gwlandscape_python.dataset_type.Dataset` objects, such as every dataset of a publication or
+            of a model
+        root_path : str or ~pathlib.Path
+            Root directory of the mirror
+        group : str
+            Name of the group
+
+        Returns
+        -------
+        VirtualTable
+            The table, with the rows of each dataset in the order the datasets were given
+        """
+        paths = []
+        for dataset in datasets:
+            directory = Path(root_path) / dataset_directory(dataset)
+            paths.extend(sorted(
+                path for path in directory.rglob('*') if path.is_file() and path.name.lower().endswith(HDF5_SUFFIXES)
+            ))
+        return cls(paths, group)
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Close the files"""
+        for f in self._files:
+            f.close()
+
+    def locate(self, rows):
+        """Find the file holding each of a set of rows, and the index of the row within the file
+
+        Parameters
+        ----------
+        rows : int or array_like
+            Global row indices
+
+        Returns
+        -------
+        tuple
+            Arrays of the index of the file holding each row, and the index of the row within that file
+        """
+        import numpy as np
+
+        rows = np.asarray(rows, dtype=np.int64)
+        if ((rows < 0) | (rows >= len(self))).any():
+            raise IndexError(f'Row index out of range for a table of {len(self)} rows')
+        files = np.searchsorted(self.offsets, rows, side='right') - 1
+        return files, rows - self.offsets[files]
+
+    def _check_columns(self, columns):
+        missing = [column for column in columns if column not in self.columns]
+        if missing:
+            raise KeyError(f'Columns {missing} are not in every file of the table')
+
+    def take(self, column, rows):
+        """Read the values of a column at a set of rows, reading only the files that hold them
+
+        Parameters
+        ----------
+        column : str
+            Name of the column
+        rows : array_like
+            Global row indices, in any order
+
+        Returns
+        -------
+        numpy.ndarray
+            The values, in the order of rows
+        """
+        import numpy as np
+
+        self._check_columns([column])
+        rows = np.asarray(rows, dtype=np.int64)
+        files, local_rows = self.locate(rows)
+        values = np.empty(len(rows), dtype=self._dtype(column))
+        for index in np.unique(files):
+            selected = files == index
+            # h5py reads increasing, unique rows, so the values are read in that order and put back in place
+            unique, inverse = np.unique(local_rows[selected], return_inverse=True)
+            values[selected] = self._groups[index][column][unique][inverse]
+        return values
+
+    def _dtype(self, column):
+        return next(group[column].dtype for group in self._groups if group is not None)
+
+    def column(self, column):
+        """Read the whole of a column into one array. This copies every value, so :meth:`iter_blocks` is better
+        suited to large tables
+
+        Parameters
+        ----------
+        column : str
+            Name of the column
+
+        Returns
+        -------
+        numpy.ndarray
+            The values of the column, across every file
+        """
+        import numpy as np
+
+        self._check_columns([column])
+        values = np.empty(len(self), dtype=self._dtype(column))
+        for start, block in self.iter_blocks([column]):
+            values[start:start + len(block[column])] = block[column]
+        return values
+
+    def iter_blocks(self, columns=None, max_workers=None):
+        """Read columns block by block, through every file in turn. Where all of the columns of a file are chunked
+        alike, each block is one chunk, decompressed in parallel by :func:`~.chunk_reader.iter_chunks`, and otherwise
+        each block is as many rows as a chunk of the first column. The columns share one pool of threads, and the
+        blocks decompressed ahead of those being yielded are split between them
+
+        Parameters
+        ----------
+        columns : list, optional
+            Names of the columns to read, by default every column
+        max_workers : int, optional
+            Number of threads decompressing chunks, by default the number of CPUs
+
+        Yields
+        ------
+        tuple
+            The global index of the first row of the block, and the values of each column in the block, keyed by
+            column name. Blocks never span files
+        """
+        columns = self.columns if columns is None else list(columns)
+        self._check_columns(columns)
+        if not columns:
+            return
+
+        max_workers = max_workers or os.cpu_count() or 1
+        read_ahead = max(1, max_workers * READ_AHEAD // len(columns))
+        with ThreadPoolExecutor(max_workers) as executor:
+            for offset, group in zip(self.offsets, self._groups):
+                if group is None:
+                    continue
+                datasets = [group[column] for column in columns]
+                block_rows = {_block_rows(dataset) for dataset in datasets}
+                if len(block_rows) == 1:
+                    start = int(offset)
+                    readers = [iter_chunks(dataset, executor=executor, read_ahead=read_ahead) for dataset in datasets]
+                    for blocks in zip(*readers):
+                        yield start, dict(zip(columns, blocks))
+                        start += len(blocks[0])
+                else:
+                    step = _block_rows(datasets[0])
+                    for start in range(0, len(datasets[0]), step):
+                        yield int(offset) + start, {
+                            column: dataset[start:start + step] for column, dataset in zip(columns, datasets)
+                        }
+
+    def find_rows(self, predicates, zone_maps=True):
+        """Find the rows matching every one of a set of range predicates
+
+        Parameters
+        ----------
+        predicates : dict
+            Inclusive (low, high) bounds keyed by column name, where either bound may be None for no bound. NaN values
+            don't match any bounds. With no predicates every row matches
+        zone_maps : bool, optional
+            Whether to use the zone map of each file, from :func:`~.zone_map.get_zone_map`, to skip the blocks that
+            can't match, by default True. The zone maps are built the first time they are needed
+
+        Returns
+        -------
+        numpy.ndarray
+            Sorted global indices of the matching rows
+        """
+        import numpy as np
+
+        from .zone_map import get_zone_map
+
+        self._check_columns(predicates)
+        if not predicates:
+            return np.arange(len(self), dtype=np.int64)
+
+        rows = []
+        if zone_maps:
+            for path, f, offset, group in zip(self.paths, self._files, self.offsets, self._groups):
+                if group is not None:
+                    rows.append(get_zone_map(path).find_rows(f, self.group, predicates) + offset)
+        else:
+            for start, block in self.iter_blocks(list(predicates)):
+                match = True
+                for column, (low, high) in predicates.items():
+                    values = block[column]
+                    match = match & (values == values)
+                    if low is not None:
+                        match &= values >= low
+                    if high is not None:
+                        match &= values <= high
+                rows.append(np.flatnonzero(match) + start)
+        return np.concatenate(rows).astype(np.int64) if rows else np.empty(0, dtype=np.int64)
+
+
+def create_virtual_file(paths, output_path, groups=None):
+    """Write a HDF5 file of virtual datasets concatenating the columns of many COMPAS files, so that they can be read
+    as one file with ``h5py`` or any other HDF5 reader. The virtual datasets refer to the original files, which must
+    stay where they are, and no data is copied.
+
+    Parameters
+    ----------
+    paths : list
+        Paths of the HDF5 files, as str or :class:`~pathlib.Path`, in the order their rows are concatenated
+    output_path : str or ~pathlib.Path
+        Path of the file to write
+    groups : list, optional
+        Names of the groups to include, by default every group of any of the files
+
+    Returns
+    -------
+    ~pathlib.Path
+        Path of the written file
+    """
+    import h5py
+
+    paths = [Path(path).resolve() for path in paths]
+    files = [h5py.File(path, 'r') for path in paths]
+    try:
+        if groups is None:
+            groups = list(dict.fromkeys(
+                name for f in files for name, obj in f.items() if isinstance(obj, h5py.Group)
+            ))
+
+        with h5py.File(output_path, 'w') as output:
+            for group in groups:
+                members = [f.get(group) for f in files]
+                lengths, columns = _layout(members)
+                target = output.create_group(group)
+                for column, dtype in columns.items():
+                    layout = h5py.VirtualLayout(shape=(sum(lengths),), dtype=dtype)
+                    start = 0
+                    for path, n_rows in zip(paths, lengths):
+                        if n_rows:
+                            layout[start:start + n_rows] = h5py.VirtualSource(
+                                str(path), f'{group}/{column}', shape=(n_rows,)
+                            )
+                        start += n_rows
+                    target.create_virtual_dataset(column, layout)
+    finally:
+        for f in files:
+            f.close()
+
+    return Path(output_path)
@@ -0,0 +1,308 @@
+import json
+import zipfile
+from pathlib import Path
+
+from .chunk_reader import FALLBACK_BLOCK_ROWS, iter_chunks
+from .files import ZONE_MAP_SUFFIX, atomic_write, source_key
+from .optimise import SEED_COLUMN
+
+ZONE_MAP_VERSION = 1
+
+
+def zone_map_path(path):
+    """Path of the zone map of a HDF5 file
+
+    Parameters
+    ----------
+    path : str or ~pathlib.Path
+        Path of the HDF5 file
+
+    Returns
+    -------
+    ~pathlib.Path
+        The file path with ZONE_MAP_SUFFIX appended
+    """
+    path = Path(path)
+    return path.with_name(path.name + ZONE_MAP_SUFFIX)
+
+
+def _block_stats(dataset):
+    # The minimum, maximum and number of NaNs of each block of a column, where the blocks are its chunks. Blocks that
+    # are all NaN have a minimum and maximum of NaN, which no range matches
+    import numpy as np
+
+    mins, maxs, nulls = [], [], []
+    is_float = dataset.dtype.kind == 'f'
+    for block in iter_chunks(dataset):
+        n_null = int(np.isnan(block).sum()) if is_float else 0
+        if n_null == len(block):
+            mins.append(np.nan)
+            maxs.append(np.nan)
+        elif n_null:
+            mins.append(np.nanmin(block))
+            maxs.append(np.nanmax(block))
+        else:
+            mins.append(block.min())
+            maxs.append(block.max())
+        nulls.append(n_null)
+
+    dtype = np.float64 if is_float else dataset.dtype
+    return np.array(mins, dtype=dtype), np.array(maxs, dtype=dtype), np.array(nulls, dtype=np.int64)
+
+
+def _intersect(ranges, other):
+    # The intersection of two sorted lists of disjoint half-open row ranges
+    result = []
+    i = j = 0
+    while i < len(ranges) and j < len(other):
+        start = max(ranges[i][0], other[j][0])
+        stop = min(ranges[i][1], other[j][1])
+        if start < stop:
+            result.append((start, stop))
+        if ranges[i][1] < other[j][1]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+class ZoneMap:
+    """
+    The minimum, maximum and number of NaN values of each block of rows of every numeric column of a HDF5 file, built
+    by :func:`build_zone_map`. A block is one chunk of the column, so a range predicate can skip reading, and
+    decompressing, every chunk whose values all lie outside the range.
+
+    Parameters
+    ----------
+    columns : dict
+        Number of rows and rows per block of each column, keyed by group and column name, along with the key of its
+        statistics in arrays
+    arrays : dict
+        The minimum, maximum and NaN count arrays, keyed by '<key>.min', '<key>.max' and '<key>.nulls'
+    """
+
+    def __init__(self, columns, arrays):
+        self._columns = columns
+        self._arrays = arrays
+
+    @property
+    def groups(self):
+        """Names of the groups with indexed columns"""
+        return list(self._columns)
+
+    def columns(self, group):
+        """Names of the indexed columns of a group
+
+        Parameters
+        ----------
+        group : str
+            Name of the group
+
+        Returns
+        -------
+        list
+            The column names
+        """
+        return list(self._columns[group])
+
+    def _entry(self, group, column):
+        try:
+            return self._columns[group][column]
+        except KeyError:
+            raise KeyError(
+                f'There is no zone map of column {column!r} of group {group!r}, which is only built for the numeric '
+                'columns of the file'
+            ) from None
+
+    def stats(self, group, column):
+        """The statistics of each block of a column
+
+        Parameters
+        ----------
+        group : str
+            Name of the group
+        column : str
+            Name of the column
+
+        Returns
+        -------
+        dict
+            The rows per block under 'block_rows', and arrays of the minimum, maximum and number of NaN values of each
+            block under 'min', 'max' and 'nulls'
+        """
+        entry = self._entry(group, column)
+        key = entry['key']
+        return {
+            'block_rows': entry['block_rows'],
+            'min': self._arrays[f'{key}.min'],
+            'max': self._arrays[f'{key}.max'],
+            'nulls': self._arrays[f'{key}.nulls'],
+        }
+
+    def candidate_ranges(self, group, column, low=None, high=None):
+        """The row ranges of a column which may hold values between low and high, merging adjacent blocks
+
+        Parameters
+        ----------
+        group : str
+            Name of the group
+        column : str
+            Name of the column
+        low : number, optional
+            Inclusive lower bound, by default unbounded
+        high : number, optional
+            Inclusive upper bound, by default unbounded
+
+        Returns
+        -------
+        list
+            Sorted, disjoint (start, stop) tuples of row indices. Rows outside these ranges can't match
+        """
+        import numpy as np
+
+        entry = self._entry(group, column)
+        stats = self.stats(group, column)
+        # Blocks that are all NaN have a NaN minimum and maximum, so fail both comparisons
+        match = stats['max'] == stats['max']
+        if low is not None:
+            match &= stats['max'] >= low
+        if high is not None:
+            match &= stats['min'] <= high
+
+        block_rows, n_rows = entry['block_rows'], entry['rows']
+        ranges = []
+        for index in np.flatnonzero(match):
+            start, stop = int(index) * block_rows, min((int(index) + 1) * block_rows, n_rows)
+            if ranges and ranges[-1][1] == start:
+                ranges[-1] = (ranges[-1][0], stop)
+            else:
+                ranges.append((start, stop))
+        return ranges
+
+    def find_rows(self, f, group, predicates):
+        """Find the rows of a group matching every one of a set of range predicates, reading only the blocks of each
+        column that may match
+
+        Parameters
+        ----------
+        f : h5py.File
+            The HDF5 file the zone map was built from
+        group : str
+            Name of the group
+        predicates : dict
+            Inclusive (low, high) bounds keyed by column name, where either bound may be None for no bound. NaN values
+            don't match any bounds. With no predicates every row matches
+
+        Returns
+        -------
+        numpy.ndarray
+            Sorted indices of the matching rows
+
+        Raises
+        ------
+        KeyError
+            If a column has no zone map, such as a column that isn't numeric
+        """
+        import numpy as np
+
+        if not predicates:
+            return np.arange(self._n_rows(group))
+
+        ranges = None
+        for column, (low, high) in predicates.items():
+            column_ranges = self.candidate_ranges(group, column, low, high)
+            ranges = column_ranges if ranges is None else _intersect(ranges, column_ranges)
+
+        rows = []
+        for start, stop in ranges or []:
+            match = np.ones(stop - start, dtype=bool)
+            for column, (low, high) in predicates.items():
+                values = f[f'{group}/{column}'][start:stop]
+                # NaN never matches, just as blocks that are all NaN are skipped
+                match &= values == values
+                if low is not None:
+                    match &= values >= low
+                if high is not None:
+                    match &= values <= high
+            rows.append(np.flatnonzero(match) + start)
+        return np.concatenate(rows) if rows else np.empty(0, dtype=np.intp)
+
+    def _n_rows(self, group):
+        # The rows of the group are those of its SEED column, or of its first column if it has none
+        if group not in self._columns:
+            raise KeyError(f'There is no zone map of group {group!r}, which has no numeric columns')
+        columns = self._columns[group]
+        return columns.get(SEED_COLUMN, next(iter(columns.values())))['rows']
+
+
+def build_zone_map(path):
+    """Build the zone map of a HDF5 file, and save it next to the file, named after it with ZONE_MAP_SUFFIX appended.
+    Every numeric column of every group is indexed, in blocks of one chunk, or FALLBACK_BLOCK_ROWS rows for columns
+    that aren't chunked.
+
+    Parameters
+    ----------
+    path : str or ~pathlib.Path
+        Path of the HDF5 file
+
+    Returns
+    -------
+    ZoneMap
+        The zone map
+    """
+    import h5py
+    import numpy as np
+
+    path = Path(path)
+    source = source_key(path)
+    columns, arrays = {}, {}
+
+    def _index(name, obj):
+        if not isinstance(obj, h5py.Dataset) or obj.ndim != 1 or obj.dtype.kind not in 'biuf':
+            return
+        group, column = name.rsplit('/', 1) if '/' in name else ('', name)
+        key = f'c{len(arrays) // 3}'
+        arrays[f'{key}.min'], arrays[f'{key}.max'], arrays[f'{key}.nulls'] = _block_stats(obj)
+        columns.setdefault(group, {})[column] = {
+            'key': key, 'rows': len(obj), 'block_rows': obj.chunks[0] if obj.chunks else FALLBACK_BLOCK_ROWS,
+        }
+
+    with h5py.File(path, 'r') as f:
+        f.visititems(_index)
+
+    if source_key(path) != source:
+        raise IOError(f'{path} changed while its zone map was being built')
+
+    # The index is stored in the archive with the arrays, and is written to a temporary file and moved into place, so
+    # the zone map is never left half written
+    index = {'version': ZONE_MAP_VERSION, 'source': source, 'columns': columns}
+    with atomic_write(zone_map_path(path)) as tmp_path, open(tmp_path, 'wb') as f:
+        np.savez(f, index=np.array(json.dumps(index)), **arrays)
+
+    return ZoneMap(columns, arrays)
+
+
+def get_zone_map(path):
+    """Load the zone map of a HDF5 file, building it first if there isn't one, or if the file has changed since it was
+    built
+
+    Parameters
+    ----------
+    path : str or ~pathlib.Path
+        Path of the HDF5 file
+
+    Returns
+    -------
+    ZoneMap
+        The zone map
+    """
+    import numpy as np
+
+    try:
+        with np.load(zone_map_path(path)) as archive:
+            index = json.loads(str(archive['index']))
+            if index.get('version') == ZONE_MAP_VERSION and index['source'] == source_key(path):
+                return ZoneMap(index['columns'], {key: archive[key] for key in archive.files if key != 'index'})
+    except (FileNotFoundError, ValueError, KeyError, zipfile.BadZipFile):
+        pass
+    return build_zone_map(path)